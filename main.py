@@ -25,6 +25,7 @@ if env_path.exists():
 
 from models import (
     MemorySearchInput,
+    KnowledgeSearchInput,
     MemoryAddInput,
     MemoryGetInput,
     MemoryUpdateInput,
@@ -50,10 +51,12 @@ from models import (
     FeishuListChatsInput,
     FeishuFetchInboxInput,
     FeishuArchiveToMemoryInput,
+    FeishuArchiveBatchToMemoryInput,
     FeishuOAuthAuthorizeInput,
     FeishuOAuthExchangeTokenInput,
 )
 from tools.memory_search import memory_search
+from tools.knowledge_search import knowledge_search
 from tools.memory_add import memory_add
 from tools.memory_get import memory_get
 from tools.memory_update import memory_update
@@ -76,6 +79,7 @@ from tools.feishu_send_message import feishu_send_message
 from tools.feishu_list_chats import feishu_list_chats
 from tools.feishu_fetch_inbox import feishu_fetch_inbox
 from tools.feishu_archive_to_memory import feishu_archive_to_memory
+from tools.feishu_archive_batch_to_memory import feishu_archive_batch_to_memory
 from tools.feishu_get_document import feishu_get_document
 from tools.feishu_list_documents import feishu_list_documents
 from tools.feishu_list_wiki_nodes import feishu_list_wiki_nodes
@@ -139,6 +143,40 @@ async def search_tool(
     return await memory_search(params)
 
 
+@mcp.tool(
+    name="knowledge_search",
+    annotations={
+        "title": "搜索记忆和飞书文档",
+        "readOnlyHint": True,
+        "destructiveHint": False,
+        "idempotentHint": True,
+        "openWorldHint": False
+    }
+)
+async def knowledge_search_tool(
+    query: str,
+    source: str = "all",
+    limit: int = 10
+) -> str:
+    """同时搜索本地记忆和已索引的飞书文档。
+    
+    在本地一次查询记忆和飞书文档全文索引（由 sync/doc_indexer.py 后台建立），
+    不需要实时读取飞书文档。
+    
+    使用场景：
+    - 用户说"找一下关于 XX 的资料"、"文档里有没有提到 XX"
+    - 需要同时参考记忆和飞书文档回答问题
+    
+    Args:
+        query: 搜索关键词
+        source: 搜索范围，all（默认）、memory（仅记忆）或 doc（仅飞书文档）
+        limit: 返回数量，默认10，最大50
+    """
+    await ensure_db_initialized()
+    params = KnowledgeSearchInput(query=query, source=source, limit=limit)
+    return await knowledge_search(params)
+
+
 @mcp.tool(
     name="memory_add",
     annotations={
@@ -577,7 +615,9 @@ async def check_outdated_tool(
 )
 async def sync_to_feishu_tool(
     dry_run: bool = False,
-    limit: int = None
+    limit: int = None,
+    mode: str = "full",
+    concurrency: int = None
 ) -> str:
     """同步记忆数据到飞书多维表格。
     
@@ -592,9 +632,11 @@ async def sync_to_feishu_tool(
     Args:
         dry_run: 是否试运行（不实际同步），默认 False
         limit: 限制同步数量（用于测试），默认 None（同步所有）
+        mode: 同步模式，full（全量，默认）或 delta（双向增量：拉取飞书端修改，并推送上次同步后变化的记忆）
+        concurrency: 并发批量请求数（1-16），默认使用 SYNC_CONCURRENCY 配置
     """
     await ensure_db_initialized()
-    params = MemorySyncToFeishuInput(dry_run=dry_run, limit=limit)
+    params = MemorySyncToFeishuInput(dry_run=dry_run, limit=limit, mode=mode, concurrency=concurrency)
     return await memory_sync_to_feishu(params)
 
 
@@ -639,29 +681,43 @@ async def read_table_tool(
     app_token: str,
     table_id: str,
     limit: int = 10,
-    show_fields: bool = True
+    show_fields: bool = True,
+    export_path: str = None,
+    export_format: str = None,
+    page_token: str = None,
+    resume: bool = False
 ) -> str:
     """读取飞书多维表格中的数据。
     
     读取指定表格的字段列表和记录数据。
     支持分页读取，可以指定返回记录数量。
+    指定 export_path 时流式导出整张表到 JSONL / CSV 文件（不截断，可续传）。
     
     使用场景：
     - 用户说"读取我的小红书笔记"、"看看采集库的数据"
     - 用户提供表格链接，需要查看数据内容
     - 需要从飞书表格导入数据到记忆系统
+    - 用户说"把整张表导出来"、"备份采集库"
     
     Args:
         app_token: 多维表格的 App Token
         table_id: 数据表的 Table ID
         limit: 返回记录数量，默认10，最大100
         show_fields: 是否显示字段列表，默认true
+        export_path: 导出文件路径（可选），指定后导出整张表，忽略 limit
+        export_format: 导出格式 jsonl 或 csv，默认按扩展名判断
+        page_token: 导出时从该分页标记开始（可选）
+        resume: 是否从上次中断的导出继续，默认false
     """
     params = FeishuReadTableInput(
         app_token=app_token,
         table_id=table_id,
         limit=limit,
-        show_fields=show_fields
+        show_fields=show_fields,
+        export_path=export_path,
+        export_format=export_format,
+        page_token=page_token,
+        resume=resume
     )
     return await feishu_read_table(params)
 
@@ -696,6 +752,7 @@ async def create_document_tool(
         content: 文档内容（Markdown 格式）
         folder_token: 文件夹 token（可选，不指定则创建在根目录）
     """
+    await ensure_db_initialized()
     params = FeishuCreateDocumentInput(
         title=title,
         content=content,
@@ -731,6 +788,7 @@ async def update_document_tool(
         file_token: 文档 token
         content: 新的文档内容（Markdown 格式）
     """
+    await ensure_db_initialized()
     params = FeishuUpdateDocumentInput(
         file_token=file_token,
         content=content
@@ -820,7 +878,9 @@ async def list_chats_tool(
 )
 async def fetch_inbox_tool(
     limit: int = 10,
-    include_archived: bool = False
+    include_archived: bool = False,
+    since: int = None,
+    wait: int = 0
 ) -> str:
     """拉取飞书临时收件箱消息。
     
@@ -831,14 +891,19 @@ async def fetch_inbox_tool(
     - 用户说"查看飞书消息"、"有哪些新消息"
     - 定期检查飞书群聊内容
     - 分析用户在飞书中的讨论
+    - 持续跟进新消息：把上次返回的 cursor 作为 since 传入，只取之后到达的消息
     
     Args:
         limit: 返回数量，默认10，最大100
         include_archived: 是否包含已归档消息，默认False
+        since: 增量游标（上次返回的 cursor），传入后按到达顺序返回之后的消息
+        wait: 长轮询秒数（0-60），配合 since 使用，暂无新消息时等待新消息到达
     """
     params = FeishuFetchInboxInput(
         limit=limit,
-        include_archived=include_archived
+        include_archived=include_archived,
+        since=since,
+        wait=wait
     )
     return await feishu_fetch_inbox(params)
 
@@ -894,6 +959,41 @@ async def archive_to_memory_tool(
     return await feishu_archive_to_memory(params)
 
 
+@mcp.tool(
+    name="feishu_archive_batch_to_memory",
+    annotations={
+        "title": "批量归档飞书消息到记忆系统",
+        "readOnlyHint": False,
+        "destructiveHint": False,
+        "idempotentHint": False,
+        "openWorldHint": False
+    }
+)
+async def archive_batch_to_memory_tool(items: list) -> str:
+    """一次归档多条分析后的飞书消息到记忆系统。
+    
+    所有记忆在一个事务中写入，再用一次请求把消息全部标记为已归档，
+    比逐条调用 feishu_archive_to_memory 少 N 倍往返。返回每条消息的状态。
+    
+    使用场景：
+    - feishu_fetch_inbox 取回一批消息并分析后，一次性归档有价值的消息
+    - 用户说"把这些消息都保存到记忆"
+    
+    Args:
+        items: 消息列表（最多100条），每条包含：
+            - message_id: 飞书消息 ID
+            - analyzed_title: AI 分析后的标题
+            - analyzed_content: AI 分析后的内容
+            - category: 记忆类别，默认 conversation
+            - tags: 标签列表
+            - importance: 重要性 1-5，默认3
+            - project: 所属项目
+    """
+    await ensure_db_initialized()
+    params = FeishuArchiveBatchToMemoryInput(items=items)
+    return await feishu_archive_batch_to_memory(params)
+
+
 @mcp.tool(
     name="feishu_get_document",
     annotations={
@@ -916,6 +1016,7 @@ async def get_document_tool(file_token: str) -> str:
     Args:
         file_token: 文档 token
     """
+    await ensure_db_initialized()
     params = FeishuGetDocumentInput(file_token=file_token)
     return await feishu_get_document(params)
 
@@ -933,7 +1034,10 @@ async def get_document_tool(file_token: str) -> str:
 async def list_documents_tool(
     folder_token: str = None,
     page_size: int = 50,
-    use_user_token: bool = False
+    use_user_token: bool = False,
+    recursive: bool = False,
+    max_depth: int = 3,
+    refresh: bool = False
 ) -> str:
     """列出飞书文档列表。
     
@@ -945,13 +1049,20 @@ async def list_documents_tool(
     
     Args:
         folder_token: 文件夹 token（可选，不指定则列出根目录）
-        page_size: 每页数量，默认50，最大100
+        page_size: 最多返回的条目数，默认50
         use_user_token: 是否使用用户身份 token（默认 False，使用应用身份 token）
+        recursive: 是否递归列出子文件夹中的文档（默认 False）
+        max_depth: 递归时最多列出的层数，默认3
+        refresh: 是否忽略本地路径索引（最多缓存 10 分钟），重新从飞书列出（默认 False）
     """
+    await ensure_db_initialized()
     params = FeishuListDocumentsInput(
         folder_token=folder_token,
         page_size=page_size,
-        use_user_token=use_user_token
+        use_user_token=use_user_token,
+        recursive=recursive,
+        max_depth=max_depth,
+        refresh=refresh
     )
     return await feishu_list_documents(params)
 
@@ -968,7 +1079,10 @@ async def list_documents_tool(
 )
 async def list_wiki_nodes_tool(
     space_id: str,
-    page_size: int = 50
+    page_size: int = 50,
+    recursive: bool = False,
+    max_depth: int = 3,
+    refresh: bool = False
 ) -> str:
     """列出飞书知识库中的文档列表。
     
@@ -980,11 +1094,18 @@ async def list_wiki_nodes_tool(
     
     Args:
         space_id: 知识库空间 ID（从知识库 URL 中获取，如 https://my.feishu.cn/wiki/{space_id}）
-        page_size: 每页数量，默认50，最大100
+        page_size: 最多返回的节点数，默认50
+        recursive: 是否递归列出子节点（默认 False，只列出顶层节点）
+        max_depth: 递归时最多列出的层数，默认3
+        refresh: 是否忽略本地路径索引（最多缓存 10 分钟），重新从飞书列出（默认 False）
     """
+    await ensure_db_initialized()
     params = FeishuListWikiNodesInput(
         space_id=space_id,
-        page_size=page_size
+        page_size=page_size,
+        recursive=recursive,
+        max_depth=max_depth,
+        refresh=refresh
     )
     return await feishu_list_wiki_nodes(params)
 
@@ -82,6 +82,13 @@ class MemorySearchInput(BaseModel):
     limit: Optional[int] = Field(5, description="返回数量，默认5", ge=1, le=50)
 
 
+class KnowledgeSearchInput(BaseModel):
+    """Input model for knowledge_search tool."""
+    query: str = Field(..., description="搜索关键词")
+    source: Optional[Literal["all", "memory", "doc"]] = Field("all", description="搜索范围：all（记忆和飞书文档）、memory（仅记忆）、doc（仅已索引的飞书文档），默认 all")
+    limit: Optional[int] = Field(10, description="返回数量，默认10", ge=1, le=50)
+
+
 class MemoryGetInput(BaseModel):
     """Input model for memory_get tool."""
     id: str = Field(..., description="记忆ID")
@@ -177,6 +184,8 @@ class MemorySyncToFeishuInput(BaseModel):
     """Input model for memory_sync_to_feishu tool."""
     dry_run: Optional[bool] = Field(False, description="是否试运行（不实际同步），默认 False")
     limit: Optional[int] = Field(None, description="限制同步数量（用于测试），默认 None（同步所有）")
+    mode: Optional[Literal["full", "delta"]] = Field("full", description="同步模式：full（全量，清理飞书中多余的记录）或 delta（拉取飞书端修改并推送上次同步后变化的记忆），默认 full")
+    concurrency: Optional[int] = Field(None, description="并发批量请求数，默认使用 SYNC_CONCURRENCY 配置", ge=1, le=16)
 
 
 class FeishuListTablesInput(BaseModel):
@@ -190,6 +199,10 @@ class FeishuReadTableInput(BaseModel):
     table_id: str = Field(..., description="数据表的 Table ID")
     limit: Optional[int] = Field(10, description="返回记录数量，默认10，最大100", ge=1, le=100)
     show_fields: Optional[bool] = Field(True, description="是否显示字段列表，默认true")
+    export_path: Optional[str] = Field(None, description="导出文件路径（可选）。指定后流式导出整张表到文件，不截断字段，忽略 limit")
+    export_format: Optional[Literal["jsonl", "csv"]] = Field(None, description="导出格式：jsonl 或 csv，默认按 export_path 扩展名判断")
+    page_token: Optional[str] = Field(None, description="导出时从该分页标记开始，追加写入已有文件")
+    resume: Optional[bool] = Field(False, description="从上次中断的导出继续（读取 <export_path>.progress.json），默认false")
 
 
 class FeishuCreateDocumentInput(BaseModel):
@@ -213,14 +226,20 @@ class FeishuGetDocumentInput(BaseModel):
 class FeishuListDocumentsInput(BaseModel):
     """Input model for feishu_list_documents tool."""
     folder_token: Optional[str] = Field(None, description="文件夹 token（可选，不指定则列出根目录）")
-    page_size: int = Field(50, description="每页数量，默认50，最大100")
+    page_size: int = Field(50, description="最多返回的条目数，默认50")
     use_user_token: Optional[bool] = Field(False, description="是否使用用户身份 token（默认 False，使用应用身份 token）")
+    recursive: Optional[bool] = Field(False, description="是否递归列出子文件夹中的文档（默认 False）")
+    max_depth: Optional[int] = Field(3, ge=1, le=10, description="递归时最多列出的层数，默认3")
+    refresh: Optional[bool] = Field(False, description="是否忽略本地路径索引，重新从飞书列出（默认 False）")
 
 
 class FeishuListWikiNodesInput(BaseModel):
     """Input model for feishu_list_wiki_nodes tool."""
     space_id: str = Field(..., description="知识库空间 ID（从知识库 URL 中获取，如 https://my.feishu.cn/wiki/{space_id}）")
-    page_size: int = Field(50, description="每页数量，默认50，最大100")
+    page_size: int = Field(50, description="最多返回的节点数，默认50")
+    recursive: Optional[bool] = Field(False, description="是否递归列出子节点（默认 False，只列出顶层节点）")
+    max_depth: Optional[int] = Field(3, ge=1, le=10, description="递归时最多列出的层数，默认3")
+    refresh: Optional[bool] = Field(False, description="是否忽略本地路径索引，重新从飞书列出（默认 False）")
 
 
 class FeishuSendMessageInput(BaseModel):
@@ -246,6 +265,8 @@ class FeishuFetchInboxInput(BaseModel):
     """Input model for feishu_fetch_inbox tool."""
     limit: Optional[int] = Field(10, description="返回数量，默认10，最大100", ge=1, le=100)
     include_archived: Optional[bool] = Field(False, description="是否包含已归档消息，默认False")
+    since: Optional[int] = Field(None, description="增量游标：只返回该游标之后到达的消息（按到达顺序），取上次返回的 cursor", ge=0)
+    wait: Optional[int] = Field(0, description="配合 since 使用的长轮询秒数：暂无新消息时最多等待这么久，默认0不等待", ge=0, le=60)
 
 
 class FeishuArchiveToMemoryInput(BaseModel):
@@ -259,6 +280,22 @@ class FeishuArchiveToMemoryInput(BaseModel):
     project: Optional[str] = Field(None, description="所属项目")
 
 
+class FeishuArchiveItem(BaseModel):
+    """One analyzed message in feishu_archive_batch_to_memory."""
+    message_id: str = Field(..., description="飞书消息 ID")
+    analyzed_title: str = Field(..., description="AI 分析后的标题")
+    analyzed_content: str = Field(..., description="AI 分析后的内容")
+    category: Optional[str] = Field("conversation", description="记忆类别，默认 conversation")
+    tags: Optional[List[str]] = Field(None, description="标签列表")
+    importance: Optional[int] = Field(3, description="重要性 1-5，默认3", ge=1, le=5)
+    project: Optional[str] = Field(None, description="所属项目")
+
+
+class FeishuArchiveBatchToMemoryInput(BaseModel):
+    """Input model for feishu_archive_batch_to_memory tool."""
+    items: List[FeishuArchiveItem] = Field(..., description="分析后的消息列表（最多100条）", min_length=1, max_length=100)
+
+
 class FeishuOAuthAuthorizeInput(BaseModel):
     """Input model for feishu_oauth_authorize tool."""
     redirect_uri: str = Field(..., description="授权后的回调地址（需要在飞书开放平台配置）")
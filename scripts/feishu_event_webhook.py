@@ -1,17 +1,36 @@
 #!/usr/bin/env python3
-"""Feishu event webhook server (receive group messages)."""
+"""Feishu event webhook server (receive group messages).
+
+Runs on a single asyncio event loop:
+- A minimal HTTP/1.1 server on asyncio.start_server with keep-alive.
+- Message events go into a bounded in-memory queue and the request returns at once.
+- A fixed set of workers drains the queue and stores events in batches
+  (one SQLite transaction per batch, see storage/inbox.py).
+- When the queue is full, event requests get 503 + Retry-After. Feishu
+  retries later, so bursts are applied as backpressure instead of spawning
+  threads.
+- Stored messages are pushed to /feishu/stream (SSE) subscribers and wake
+  long-polling /feishu/temp_inbox?since=<cursor>&wait=<seconds> requests.
+- Old archived messages are moved to the inbox cold store every
+  FEISHU_INBOX_COMPACT_INTERVAL seconds (see storage/inbox.py compact()).
+- With FEISHU_IM_SAVE_TO_MEMORY=true, stored messages are also batched per
+  chat and written to memory as conversation entries (see sync/im_ingest.py).
+
+With --workers N, a supervisor forks N such processes listening on the same
+port via SO_REUSEPORT and restarts any that crash (see supervise()).
+"""
 
 import argparse
 import asyncio
 import json
 import os
-import threading
-# import queue  # [SSE-REALTIME] Future feature
-from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import signal
+import socket
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Any, Dict, Optional
-from urllib.parse import parse_qs, urlparse
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
 
 from dotenv import load_dotenv
 
@@ -25,43 +44,61 @@ if env_path.exists():
 import sys
 sys.path.insert(0, str(project_root))
 
+import storage.inbox as inbox
+from storage.db import init_db
+from storage.event_dedup import EventDedup
+from sync.im_ingest import MemoryIngestor
+
 
 VERIFICATION_TOKEN = os.getenv("FEISHU_VERIFICATION_TOKEN", "")
 ENCRYPT_KEY = os.getenv("FEISHU_ENCRYPT_KEY", "")
 IM_TABLE_ID = os.getenv("FEISHU_IM_TABLE_ID", "")
 IM_DOC_TOKEN = os.getenv("FEISHU_IM_DOC_TOKEN", "")
-SAVE_TO_MEMORY = os.getenv("FEISHU_IM_SAVE_TO_MEMORY", "true").lower() == "true"
+SAVE_TO_MEMORY = os.getenv("FEISHU_IM_SAVE_TO_MEMORY", "false").lower() == "true"
 READ_API_TOKEN = os.getenv("FEISHU_WEBHOOK_READ_TOKEN", "")
 PUSH_API_TOKEN = os.getenv("FEISHU_WEBHOOK_PUSH_TOKEN", "")
 
-DEDUP_PATH = project_root / "storage" / "feishu_event_ids.json"
-DEDUP_MAX = 1000
-TEMP_INBOX_PATH = project_root / "storage" / "feishu_temp_inbox.jsonl"
+# Event queue: capacity, number of store workers, events per batch and how long
+# a worker waits to fill a batch (seconds)
+QUEUE_SIZE = int(os.getenv("FEISHU_WEBHOOK_QUEUE_SIZE", "1000"))
+STORE_WORKERS = int(os.getenv("FEISHU_WEBHOOK_STORE_WORKERS", "2"))
+BATCH_SIZE = int(os.getenv("FEISHU_WEBHOOK_BATCH_SIZE", "100"))
+BATCH_WAIT = float(os.getenv("FEISHU_WEBHOOK_BATCH_WAIT", "0.05"))
 
-# [SSE-REALTIME] Future feature - currently commented out
-# SUBSCRIBERS_LOCK = threading.Lock()
-# SUBSCRIBERS: set = set()
+# HTTP limits
+KEEPALIVE_TIMEOUT = float(os.getenv("FEISHU_WEBHOOK_KEEPALIVE_TIMEOUT", "15"))
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+RETRY_AFTER_SECONDS = 1
 
+# Realtime delivery: SSE heartbeat interval, per-subscriber buffer (a slower
+# subscriber catches up from the inbox instead) and the longest long-poll wait
+HEARTBEAT_INTERVAL = float(os.getenv("FEISHU_WEBHOOK_HEARTBEAT", "15"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("FEISHU_WEBHOOK_SUBSCRIBER_QUEUE", "100"))
+LONG_POLL_MAX = 60
+SSE_RETRY_MS = 3000
 
-def _load_dedup_ids() -> set:
-    if not DEDUP_PATH.exists():
-        return set()
-    try:
-        data = json.loads(DEDUP_PATH.read_text(encoding="utf-8"))
-        if isinstance(data, list):
-            return set(data)
-    except Exception:
-        pass
-    return set()
+# Most message_ids accepted by one batched archive PATCH
+MAX_ARCHIVE_BATCH = 1000
+
+# Seconds between inbox retention/compaction runs; 0 disables
+COMPACT_INTERVAL = float(os.getenv("FEISHU_INBOX_COMPACT_INTERVAL", "3600"))
 
+# --workers mode: worker processes, how often each one checks the inbox for
+# messages stored by the others, and how long the supervisor waits before
+# restarting a worker that crashed right after starting
+WORKERS = int(os.getenv("FEISHU_WEBHOOK_WORKERS", "1"))
+FOLLOW_INTERVAL = float(os.getenv("FEISHU_WEBHOOK_FOLLOW_INTERVAL", "0.5"))
+RESTART_DELAY = 1.0
+MIN_WORKER_UPTIME = 5.0
 
-def _save_dedup_ids(ids: set) -> None:
-    ids_list = list(ids)[-DEDUP_MAX:]
-    DEDUP_PATH.parent.mkdir(parents=True, exist_ok=True)
-    DEDUP_PATH.write_text(json.dumps(ids_list, ensure_ascii=False, indent=2), encoding="utf-8")
+# Event IDs already received, remembered for FEISHU_WEBHOOK_DEDUP_TTL seconds
+DEDUP_PATH = project_root / "storage" / "feishu_event_ids.log"
+DEDUP_TTL = float(os.getenv("FEISHU_WEBHOOK_DEDUP_TTL", str(24 * 3600)))
 
 
-DEDUP_IDS = _load_dedup_ids()
+
+DEDUP = EventDedup(DEDUP_PATH, ttl=DEDUP_TTL)
 
 
 def _parse_text_message(message: Dict[str, Any]) -> str:
@@ -75,91 +112,14 @@ def _parse_text_message(message: Dict[str, Any]) -> str:
     return f"[{message_type}] {content}"
 
 
-def _load_temp_inbox(limit: int = 20, include_archived: bool = False) -> list:
-    """Load messages from temp inbox JSONL file."""
-    if not TEMP_INBOX_PATH.exists():
-        return []
-    
-    safe_limit = max(1, min(limit, 100))
-    entries = []
-    
-    try:
-        with open(TEMP_INBOX_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                    if not include_archived and entry.get("archived"):
-                        continue
-                    entries.append(entry)
-                except Exception:
-                    continue
-        
-        # Sort by created_at desc
-        entries.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        return entries[:safe_limit]
-    except Exception:
-        return []
-
-
-def _mark_message_archived(message_id: str) -> bool:
-    """Mark a message as archived in temp inbox."""
-    if not TEMP_INBOX_PATH.exists():
-        return False
-    
-    try:
-        lines = []
-        updated = False
-        with open(TEMP_INBOX_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                entry = json.loads(line)
-                if entry.get("message_id") == message_id:
-                    entry["archived"] = True
-                    updated = True
-                lines.append(json.dumps(entry, ensure_ascii=False))
-        
-        if updated:
-            with open(TEMP_INBOX_PATH, "w", encoding="utf-8") as f:
-                f.write("\n".join(lines) + "\n")
-        
-        return updated
-    except Exception:
-        return False
-
-
-# [SSE-REALTIME] Future feature - currently commented out
-# def _broadcast_event(payload: Dict[str, Any]) -> None:
-#     with SUBSCRIBERS_LOCK:
-#         subscribers = list(SUBSCRIBERS)
-#     print(f"[DEBUG] _broadcast_event called: {len(subscribers)} subscribers, text={payload.get('text', '')[:50]}")
-#     if not subscribers:
-#         return
-#     for subscriber in subscribers:
-#         try:
-#             subscriber.put_nowait(payload)
-#             print(f"[DEBUG] Sent to subscriber")
-#         except Exception as e:
-#             print(f"[DEBUG] Failed to send: {e}")
-#             continue
-
-
-async def _store_event(event_payload: Dict[str, Any]) -> None:
-    """Store Feishu event to temp inbox (not memory)."""
+def _build_entry(event_payload: Dict[str, Any]) -> Tuple[Optional[str], Dict[str, Any]]:
+    """Turn a message event into (event_id, temp inbox entry)."""
     event = event_payload.get("event", {})
     header = event_payload.get("header", {})
     message = event.get("message", {})
     sender = event.get("sender", {}).get("sender_id", {})
 
     event_id = header.get("event_id") or message.get("message_id")
-    if event_id in DEDUP_IDS:
-        return
-    DEDUP_IDS.add(event_id)
-    _save_dedup_ids(DEDUP_IDS)
 
     text = _parse_text_message(message).strip()
     if not text:
@@ -171,7 +131,6 @@ async def _store_event(event_payload: Dict[str, Any]) -> None:
     except Exception:
         created_at = datetime.now().isoformat()
 
-    # Write to temp inbox (JSONL format)
     entry = {
         "message_id": message.get("message_id"),
         "chat_id": message.get("chat_id"),
@@ -182,208 +141,865 @@ async def _store_event(event_payload: Dict[str, Any]) -> None:
         "text": text,
         "archived": False,
         "received_at": datetime.now().isoformat(),
+        "event_id": header.get("event_id"),
     }
-    
-    TEMP_INBOX_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(TEMP_INBOX_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-    
-    # [SSE-REALTIME] Future feature - currently commented out
-    # _broadcast_event({
-    #     "message_id": message.get("message_id"),
-    #     "chat_id": message.get("chat_id"),
-    #     "chat_type": message.get("chat_type"),
-    #     "sender_open_id": sender.get("open_id"),
-    #     "created_at": created_at,
-    #     "text": text,
-    # })
-
-
-class FeishuWebhookHandler(BaseHTTPRequestHandler):
-    def _send_json(self, payload: Dict[str, Any], status: int = 200) -> None:
-        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        self.send_response(status)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
-        self.end_headers()
-        self.wfile.write(body)
-
-    def _get_bearer_token(self) -> str:
-        auth = self.headers.get("Authorization", "")
+    return event_id, entry
+
+
+async def _store_events(event_payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store a batch of Feishu events to the temp inbox (not memory).
+
+    Duplicates (already seen or repeated within the batch) are skipped.
+    The batch is inserted in one transaction with one dedup-log append.
+
+    Returns:
+        The stored entries, with their inbox seq
+    """
+    built = {}
+    for payload in event_payloads:
+        event_id, entry = _build_entry(payload)
+        if event_id:
+            built[event_id] = entry
+    new_ids = DEDUP.filter_new(built)
+    if not new_ids:
+        return []
+
+    # Stored message_ids are ignored by the inbox, so events racing between
+    # workers are still written once
+    stored = await inbox.add_messages([built[event_id] for event_id in new_ids])
+    # Recorded only after the insert, so a failed batch is accepted on retry
+    await asyncio.to_thread(DEDUP.add, new_ids)
+    return stored
+
+
+# ==================== Minimal HTTP/1.1 on asyncio ====================
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Payload Too Large", 429: "Too Many Requests",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error", 501: "Not Implemented",
+    503: "Service Unavailable",
+}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, error: str):
+        super().__init__(error)
+        self.status = status
+        self.error = error
+
+
+class Request:
+    """A parsed HTTP request."""
+
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parsed = urlparse(target)
+        self.path = parsed.path
+        self.query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def json(self) -> Dict[str, Any]:
+        try:
+            data = json.loads(self.body.decode("utf-8") or "{}")
+        except Exception:
+            raise HttpError(400, "invalid_json")
+        if not isinstance(data, dict):
+            raise HttpError(400, "invalid_json")
+        return data
+
+    def bearer_token(self) -> str:
+        auth = self.headers.get("authorization", "")
         if auth.startswith("Bearer "):
             return auth[len("Bearer "):].strip()
         return ""
 
-    def _is_authorized(self) -> bool:
+
+class Response:
+    def __init__(self, payload: Dict[str, Any], status: int = 200, headers: Optional[Dict[str, str]] = None):
+        self.payload = payload
+        self.status = status
+        self.headers = headers or {}
+
+    def encode(self, keep_alive: bool) -> bytes:
+        body = json.dumps(self.payload, ensure_ascii=False).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {self.status} {_REASONS.get(self.status, 'Unknown')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if keep_alive:
+            lines.append(f"Keep-Alive: timeout={int(KEEPALIVE_TIMEOUT)}")
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """Read one request; None when the client closed the connection between requests."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "incomplete_request")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "headers_too_large")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "bad_request_line")
+    headers: Dict[str, str] = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(501, "chunked_not_supported")
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "bad_content_length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "body_too_large")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, version, headers, body)
+
+
+class StreamResponse:
+    """A response whose body is written by a coroutine until it returns; the connection closes afterwards."""
+
+    def __init__(self, send: Callable[[asyncio.StreamWriter], Awaitable[None]], content_type: str,
+                 headers: Optional[Dict[str, str]] = None):
+        self.send = send
+        self.content_type = content_type
+        self.headers = headers or {}
+
+    def encode_head(self) -> bytes:
+        lines = [
+            "HTTP/1.1 200 OK",
+            f"Content-Type: {self.content_type}",
+            "Cache-Control: no-cache",
+            "Connection: close",
+        ]
+        lines.extend(f"{name}: {value}" for name, value in self.headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+Handler = Callable[[Request], Awaitable[Any]]
+
+
+class HttpServer:
+    """Serve a request handler over HTTP/1.1 keep-alive connections on one event loop."""
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+        self.server: Optional[asyncio.base_events.Server] = None
+        self.connections = 0
+
+    async def start(self, host: str, port: int, sock=None) -> int:
+        if sock is not None:
+            self.server = await asyncio.start_server(self._serve, sock=sock, limit=MAX_HEADER_BYTES)
+        else:
+            self.server = await asyncio.start_server(self._serve, host, port, limit=MAX_HEADER_BYTES)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    writer.write(Response({"error": e.error}, status=e.status).encode(keep_alive=False))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                try:
+                    response = await self.handler(request)
+                except HttpError as e:
+                    response = Response({"error": e.error}, status=e.status)
+                except Exception as e:
+                    print(f"❌ Webhook handler error: {e}")
+                    response = Response({"error": "internal_error"}, status=500)
+
+                if isinstance(response, StreamResponse):
+                    writer.write(response.encode_head())
+                    await writer.drain()
+                    await response.send(writer)
+                    break
+
+                keep_alive = request.keep_alive
+                writer.write(response.encode(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+# ==================== Webhook application ====================
+
+class Subscriber:
+    """An SSE client's buffer of new messages.
+
+    The buffer is bounded: when it is full the subscriber is marked as
+    lagged and drops further messages, and the stream catches up from the
+    inbox by seq once the buffer is drained.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, chat_id: Optional[str] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize or SUBSCRIBER_QUEUE_SIZE))
+        self.chat_id = chat_id
+        self.lagged = False
+        self.closed = False
+
+    def offer(self, entry: Dict[str, Any]) -> None:
+        if self.lagged or self.closed or (self.chat_id and entry.get("chat_id") != self.chat_id):
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+def _sse_event(entry: Dict[str, Any]) -> bytes:
+    data = json.dumps(entry, ensure_ascii=False)
+    return f"id: {entry['seq']}\nevent: message\ndata: {data}\n\n".encode("utf-8")
+
+
+class FeishuWebhook:
+    """Webhook routes plus the bounded event queue and its store workers.
+
+    Args:
+        queue_size: Events buffered in memory; beyond this requests get 503
+        store_workers: Workers draining the queue
+        batch_size: Max events stored per batch
+        batch_wait: Seconds a worker waits for more events to fill a batch
+        store: Async batch store (default _store_events)
+        ingestor: Optional memory ingestion stage fed with every stored batch
+        compact_interval: Seconds between inbox compaction runs (0 disables)
+        shared_store: Other processes write the same inbox (--workers mode):
+            stream subscribers, long-polls and the ingestor are fed by
+            following the inbox seq instead of this process's own batches
+    """
+
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        store_workers: int = STORE_WORKERS,
+        batch_size: int = BATCH_SIZE,
+        batch_wait: float = BATCH_WAIT,
+        store: Callable[[List[Dict[str, Any]]], Awaitable[int]] = _store_events,
+        ingestor: Optional[MemoryIngestor] = None,
+        compact_interval: float = COMPACT_INTERVAL,
+        shared_store: bool = False
+    ):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.store_workers = max(1, store_workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.store = store
+        self.ingestor = ingestor
+        self.stats = {"accepted": 0, "rejected": 0, "duplicates": 0, "stored": 0, "batches": 0, "failed": 0}
+        if ingestor:
+            self.stats["ingested"] = 0
+        self._workers: List[asyncio.Task] = []
+        self._ingest_task: Optional[asyncio.Task] = None
+        self.compact_interval = compact_interval
+        self._compact_task: Optional[asyncio.Task] = None
+        self._ingest_wake = asyncio.Event()
+        self._stopping = False
+        self.shared_store = shared_store
+        self._follow_task: Optional[asyncio.Task] = None
+        self._follow_wake = asyncio.Event()
+        self._published_seq = 0
+        self.subscribers: set = set()
+        # Replaced after every publish; long-polls wait on the current one
+        self._arrival = asyncio.Event()
+        self.http = HttpServer(self.handle)
+
+    # ---------- lifecycle ----------
+
+    async def start(self, host: str = "0.0.0.0", port: int = 9000, sock=None) -> int:
+        imported = await inbox.init_inbox()
+        if imported:
+            print(f"📥 已从旧版 JSONL 收件箱导入 {imported} 条消息")
+        if self.shared_store:
+            self._published_seq = await inbox.latest_seq()
+        if self.ingestor:
+            await init_db()
+            # Messages a previous (possibly crashed) process buffered but never
+            # wrote; anything after _published_seq reaches the ingestor by following
+            pending = [
+                entry for entry in await inbox.list_uningested()
+                if not self.shared_store or entry["seq"] <= self._published_seq
+            ]
+            if pending:
+                print(f"🔁 恢复 {len(pending)} 条尚未写入记忆的消息")
+                self.ingestor.add(pending)
+            self._ingest_task = asyncio.create_task(self._ingest_loop())
+        if self.compact_interval > 0:
+            self._compact_task = asyncio.create_task(self._compact_loop())
+        if self.shared_store:
+            self._follow_task = asyncio.create_task(self._follow_loop())
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.store_workers)]
+        return await self.http.start(host, port, sock=sock)
+
+    async def stop(self, drain_timeout: float = 10.0):
+        """Stop accepting connections, store what is queued, then stop workers."""
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+        self._arrival.set()
+        if self._compact_task:
+            self._compact_task.cancel()
+            await asyncio.gather(self._compact_task, return_exceptions=True)
+        await self.http.close()
+        try:
+            await asyncio.wait_for(self.queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️  {self.queue.qsize()} queued events not stored before shutdown")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        if self._follow_task:
+            self._follow_task.cancel()
+            await asyncio.gather(self._follow_task, return_exceptions=True)
+            await self._follow()
+        if self._ingest_task:
+            # The loop writes what is still buffered instead of waiting for its window
+            self._stopping = True
+            self._ingest_wake.set()
+            await asyncio.gather(self._ingest_task, return_exceptions=True)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                stored = await self.store(batch)
+                self.stats["stored"] += len(stored)
+                self.stats["batches"] += 1
+                if self.shared_store:
+                    # Published by the follow loop, in seq order with other processes' messages
+                    self._follow_wake.set()
+                else:
+                    self._deliver(stored)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                print(f"❌ Failed to store {len(batch)} events: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _ingest_loop(self):
+        """Write buffered messages to memory as each chat's window comes due."""
+        while True:
+            due = self.ingestor.next_due()
+            timeout = None if due is None else max(0.0, due - self.ingestor.clock())
+            try:
+                await asyncio.wait_for(self._ingest_wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._ingest_wake.clear()
+            await self.ingestor.flush_due(force=self._stopping)
+            self.stats["ingested"] = self.ingestor.ingested
+            if self._stopping:
+                return
+
+    async def _compact_loop(self):
+        """Apply the inbox retention policy periodically (first run at startup)."""
+        while True:
+            try:
+                result = await inbox.compact()
+                if result["moved"] or result["purged"]:
+                    print(f"🗄️  收件箱压缩：移入冷存储 {result['moved']} 条，删除过期 {result['purged']} 条")
+            except Exception as e:
+                print(f"❌ 收件箱压缩失败: {e}")
+            await asyncio.sleep(self.compact_interval)
+
+    def _deliver(self, entries: List[Dict[str, Any]]) -> None:
+        """Hand newly stored messages to subscribers, long-polls and the ingestor."""
+        self._publish(entries)
+        if self.ingestor and entries:
+            self.ingestor.add(entries)
+            self._ingest_wake.set()
+
+    async def _follow_loop(self):
+        """Deliver messages stored by any worker process (shared_store mode)."""
+        while True:
+            try:
+                await asyncio.wait_for(self._follow_wake.wait(), FOLLOW_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._follow_wake.clear()
+            try:
+                await self._follow()
+            except Exception as e:
+                print(f"❌ Failed to read new inbox messages: {e}")
+
+    async def _follow(self) -> None:
+        # seq is assigned under the inbox write lock, so reading past the last
+        # delivered seq never skips a message committed later by another process
+        while True:
+            entries = await inbox.list_since(self._published_seq, inbox.MAX_LIMIT, include_archived=True)
+            if not entries:
+                return
+            self._published_seq = entries[-1]["seq"]
+            self._deliver(entries)
+            if len(entries) < inbox.MAX_LIMIT:
+                return
+
+    def _publish(self, entries: List[Dict[str, Any]]) -> None:
+        """Push stored messages to stream subscribers and wake long-polls."""
+        if not entries:
+            return
+        for subscriber in list(self.subscribers):
+            for entry in entries:
+                subscriber.offer(entry)
+        arrival, self._arrival = self._arrival, asyncio.Event()
+        arrival.set()
+
+    # ---------- routes ----------
+
+    def _is_authorized(self, request: Request) -> bool:
         if not READ_API_TOKEN:
             return True
-        token = self._get_bearer_token()
+        token = request.bearer_token()
         if token:
             return token == READ_API_TOKEN
-        parsed = urlparse(self.path)
-        token_param = parse_qs(parsed.query).get("token", [""])[0]
-        return token_param == READ_API_TOKEN
+        return request.query.get("token", "") == READ_API_TOKEN
 
-    def _is_stream_authorized(self) -> bool:
+    def _is_stream_authorized(self, request: Request) -> bool:
         token = PUSH_API_TOKEN or READ_API_TOKEN
         if not token:
             return True
-        auth = self._get_bearer_token()
+        auth = request.bearer_token()
         if auth:
             return auth == token
-        parsed = urlparse(self.path)
-        token_param = parse_qs(parsed.query).get("token", [""])[0]
-        return token_param == token
-
-    def do_GET(self) -> None:
-        parsed = urlparse(self.path)
-        
-        # Health check
-        if parsed.path == "/health":
-            self._send_json({"ok": True})
-            return
-        
-        # [SSE-REALTIME] Future feature - currently commented out
-        # if parsed.path in ("/stream", "/feishu/stream"):
-        #     if not self._is_stream_authorized():
-        #         self._send_json({"error": "unauthorized"}, status=401)
-        #         return
-        #     self.send_response(200)
-        #     self.send_header("Content-Type", "text/event-stream; charset=utf-8")
-        #     self.send_header("Cache-Control", "no-cache")
-        #     self.send_header("Connection", "keep-alive")
-        #     self.end_headers()
-        #     subscriber = queue.Queue(maxsize=100)
-        #     with SUBSCRIBERS_LOCK:
-        #         SUBSCRIBERS.add(subscriber)
-        #     print(f"[DEBUG] New SSE subscriber registered. Total subscribers: {len(SUBSCRIBERS)}")
-        #     try:
-        #         self.wfile.write(b": ok\n\n")
-        #         self.wfile.flush()
-        #         while True:
-        #             try:
-        #                 payload = subscriber.get(timeout=15)
-        #                 data = json.dumps(payload, ensure_ascii=False)
-        #                 self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
-        #                 self.wfile.flush()
-        #             except queue.Empty:
-        #                 self.wfile.write(b": keep-alive\n\n")
-        #                 self.wfile.flush()
-        #     except (BrokenPipeError, ConnectionResetError):
-        #         pass
-        #     finally:
-        #         with SUBSCRIBERS_LOCK:
-        #             SUBSCRIBERS.discard(subscriber)
-        #     return
-        
-        # Temp inbox endpoint (NEW)
-        if parsed.path in ("/temp_inbox", "/feishu/temp_inbox"):
-            if not self._is_authorized():
-                self._send_json({"error": "unauthorized"}, status=401)
-                return
-            params = parse_qs(parsed.query)
-            try:
-                limit = int(params.get("limit", ["20"])[0])
-                include_archived = params.get("include_archived", ["false"])[0].lower() == "true"
-            except Exception:
-                limit = 20
-                include_archived = False
-            entries = _load_temp_inbox(limit=limit, include_archived=include_archived)
-            self._send_json({"ok": True, "count": len(entries), "items": entries})
-            return
-        
-        self._send_json({"error": "not_found"}, status=404)
+        return request.query.get("token", "") == token
+
+    async def handle(self, request: Request) -> Response:
+        path = request.path
+        if request.method == "GET":
+            # Health check
+            if path == "/health":
+                return Response({"ok": True, "pid": os.getpid(), "queued": self.queue.qsize(), "stats": self.stats})
+
+            # Realtime stream (Server-Sent Events)
+            if path in ("/stream", "/feishu/stream"):
+                if not self._is_stream_authorized(request):
+                    return Response({"error": "unauthorized"}, status=401)
+                return self._stream_response(request)
+
+            # Compacted history of one chat
+            if path in ("/temp_inbox/history", "/feishu/temp_inbox/history"):
+                if not self._is_authorized(request):
+                    return Response({"error": "unauthorized"}, status=401)
+                return await self._handle_history(request)
+
+            # Temp inbox endpoint
+            if path in ("/temp_inbox", "/feishu/temp_inbox"):
+                if not self._is_authorized(request):
+                    return Response({"error": "unauthorized"}, status=401)
+                return await self._handle_temp_inbox(request)
+            return Response({"error": "not_found"}, status=404)
+
+        if request.method == "PATCH":
+            return await self._handle_patch(request)
+        if request.method == "POST":
+            return self._handle_event(request)
+        return Response({"error": "method_not_allowed"}, status=405)
+
+    async def _handle_temp_inbox(self, request: Request) -> Response:
+        """List messages: newest first, or after a since cursor with optional long-poll wait."""
+        try:
+            limit = int(request.query.get("limit", "20"))
+            include_archived = request.query.get("include_archived", "false").lower() == "true"
+        except Exception:
+            limit = 20
+            include_archived = False
+        chat_id = request.query.get("chat_id") or None
+
+        if "since" not in request.query:
+            entries = await inbox.list_messages(limit, include_archived, chat_id=chat_id)
+            cursor = await inbox.latest_seq()
+            return Response({"ok": True, "count": len(entries), "items": entries, "cursor": cursor})
 
-    def do_PATCH(self) -> None:
+        try:
+            since = int(request.query["since"])
+            wait = max(0.0, min(float(request.query.get("wait", "0")), LONG_POLL_MAX))
+        except ValueError:
+            return Response({"error": "invalid_cursor"}, status=400)
+
+        # Take the arrival event before querying so a message stored in between still wakes us
+        arrival = self._arrival
+        entries = await inbox.list_since(since, limit, include_archived, chat_id=chat_id)
+        if not entries and wait > 0:
+            try:
+                await asyncio.wait_for(arrival.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            entries = await inbox.list_since(since, limit, include_archived, chat_id=chat_id)
+        cursor = entries[-1]["seq"] if entries else since
+        return Response({"ok": True, "count": len(entries), "items": entries, "cursor": cursor})
+
+    async def _handle_history(self, request: Request) -> Response:
+        """List a chat's compacted messages, newest first, paging with a before cursor."""
+        chat_id = request.query.get("chat_id")
+        if not chat_id:
+            return Response({"error": "chat_id_required"}, status=400)
+        try:
+            limit = int(request.query.get("limit", "20"))
+            before = int(request.query["before"]) if "before" in request.query else None
+        except ValueError:
+            return Response({"error": "invalid_cursor"}, status=400)
+        entries = await inbox.list_history(chat_id, before=before, limit=limit)
+        cursor = entries[-1]["seq"] if entries else before
+        return Response({"ok": True, "count": len(entries), "items": entries, "before": cursor})
+
+    def _stream_response(self, request: Request) -> StreamResponse:
+        try:
+            last_id = int(request.headers.get("last-event-id") or request.query.get("since") or 0)
+        except ValueError:
+            last_id = 0
+        chat_id = request.query.get("chat_id") or None
+
+        async def send(writer: asyncio.StreamWriter) -> None:
+            subscriber = Subscriber(chat_id=chat_id)
+            # Subscribe before replaying so nothing stored during the replay is missed
+            self.subscribers.add(subscriber)
+            last_sent = last_id
+            try:
+                writer.write(f"retry: {SSE_RETRY_MS}\n\n".encode("utf-8"))
+                if last_id:
+                    last_sent = await self._replay(writer, last_sent, chat_id)
+                await writer.drain()
+                while not subscriber.closed:
+                    try:
+                        entry = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+                    except asyncio.TimeoutError:
+                        writer.write(b": keep-alive\n\n")
+                        await writer.drain()
+                        continue
+                    if entry is None:
+                        break
+                    if entry["seq"] > last_sent:
+                        writer.write(_sse_event(entry))
+                        last_sent = entry["seq"]
+                    if subscriber.lagged and subscriber.queue.empty():
+                        subscriber.lagged = False
+                        last_sent = await self._replay(writer, last_sent, chat_id)
+                    await writer.drain()
+            finally:
+                self.subscribers.discard(subscriber)
+
+        return StreamResponse(send, "text/event-stream; charset=utf-8", headers={"X-Accel-Buffering": "no"})
+
+    async def _replay(self, writer: asyncio.StreamWriter, last_sent: int, chat_id: Optional[str]) -> int:
+        """Send stored messages after last_sent from the inbox; returns the new cursor."""
+        while True:
+            entries = await inbox.list_since(last_sent, inbox.MAX_LIMIT, chat_id=chat_id)
+            for entry in entries:
+                writer.write(_sse_event(entry))
+                last_sent = entry["seq"]
+            await writer.drain()
+            if len(entries) < inbox.MAX_LIMIT:
+                return last_sent
+
+    async def _handle_patch(self, request: Request) -> Response:
         """Handle PATCH requests for archiving messages."""
-        parsed = urlparse(self.path)
-        
+        path = request.path
+
+        # PATCH /feishu/temp_inbox  {"message_ids": [...], "archived": true}
+        if path in ("/temp_inbox", "/feishu/temp_inbox"):
+            if not self._is_authorized(request):
+                return Response({"error": "unauthorized"}, status=401)
+            return await self._handle_archive_batch(request)
+
         # PATCH /feishu/temp_inbox/:message_id
-        if parsed.path.startswith("/feishu/temp_inbox/") or parsed.path.startswith("/temp_inbox/"):
-            if not self._is_authorized():
-                self._send_json({"error": "unauthorized"}, status=401)
-                return
-            
-            # Extract message_id from path
-            parts = parsed.path.split("/")
-            message_id = parts[-1] if len(parts) > 0 else None
-            
+        if path.startswith("/feishu/temp_inbox/") or path.startswith("/temp_inbox/"):
+            if not self._is_authorized(request):
+                return Response({"error": "unauthorized"}, status=401)
+
+            message_id = unquote(path.rsplit("/", 1)[-1])
             if not message_id:
-                self._send_json({"error": "message_id_required"}, status=400)
-                return
-            
-            # Read request body
-            length = int(self.headers.get("Content-Length", "0"))
-            if length > 0:
-                raw = self.rfile.read(length)
-                try:
-                    data = json.loads(raw.decode("utf-8") or "{}")
-                except Exception:
-                    self._send_json({"error": "invalid_json"}, status=400)
-                    return
-            else:
-                data = {}
-            
+                return Response({"error": "message_id_required"}, status=400)
+
+            data = request.json()
+
             # Mark as archived
             if data.get("archived") is True:
-                success = _mark_message_archived(message_id)
-                if success:
-                    self._send_json({"ok": True, "message": "marked_as_archived"})
-                else:
-                    self._send_json({"error": "message_not_found"}, status=404)
-                return
-        
-        self._send_json({"error": "not_found"}, status=404)
-
-    def do_POST(self) -> None:
-        length = int(self.headers.get("Content-Length", "0"))
-        raw = self.rfile.read(length)
-        try:
-            data = json.loads(raw.decode("utf-8") or "{}")
-        except Exception:
-            self._send_json({"error": "invalid_json"}, status=400)
-            return
+                if await inbox.archive_message(message_id):
+                    return Response({"ok": True, "message": "marked_as_archived"})
+                return Response({"error": "message_not_found"}, status=404)
+
+        return Response({"error": "not_found"}, status=404)
+
+    async def _handle_archive_batch(self, request: Request) -> Response:
+        """Archive many messages in one transaction; reports which IDs were not found."""
+        data = request.json()
+        message_ids = data.get("message_ids")
+        if data.get("archived") is not True:
+            return Response({"error": "archived_must_be_true"}, status=400)
+        if not isinstance(message_ids, list) or not all(isinstance(mid, str) and mid for mid in message_ids):
+            return Response({"error": "message_ids_required"}, status=400)
+        if len(message_ids) > MAX_ARCHIVE_BATCH:
+            return Response({"error": "too_many_message_ids", "max": MAX_ARCHIVE_BATCH}, status=413)
+
+        archived = await inbox.archive_messages(message_ids)
+        archived_set = set(archived)
+        not_found = [mid for mid in dict.fromkeys(message_ids) if mid not in archived_set]
+        return Response({"ok": True, "archived": archived, "not_found": not_found})
+
+    def _handle_event(self, request: Request) -> Response:
+        data = request.json()
 
         # URL verification
         if data.get("type") == "url_verification" and data.get("challenge"):
-            self._send_json({"challenge": data.get("challenge")})
-            return
+            return Response({"challenge": data.get("challenge")})
 
         # Encrypted payload (not supported unless ENCRYPT_KEY is configured)
         if "encrypt" in data:
             if not ENCRYPT_KEY:
-                self._send_json({"error": "encrypt_key_missing"}, status=400)
-                return
+                return Response({"error": "encrypt_key_missing"}, status=400)
             # Placeholder: encryption not implemented in this script
-            self._send_json({"error": "encrypt_not_supported"}, status=400)
-            return
+            return Response({"error": "encrypt_not_supported"}, status=400)
 
         # Token validation
         token = data.get("token") or data.get("header", {}).get("token")
         if VERIFICATION_TOKEN and token != VERIFICATION_TOKEN:
-            self._send_json({"error": "token_invalid"}, status=401)
-            return
+            return Response({"error": "token_invalid"}, status=401)
 
         # Event type check
         event_type = data.get("header", {}).get("event_type") or data.get("event", {}).get("type")
         if event_type != "im.message.receive_v1":
-            self._send_json({"ok": True})
-            return
+            return Response({"ok": True})
 
-        # Return immediately; process in background
-        self._send_json({"ok": True})
-        threading.Thread(target=lambda: asyncio.run(_store_event(data)), daemon=True).start()
+        # Retried delivery of an event we already stored
+        event_id = data.get("header", {}).get("event_id") or data.get("event", {}).get("message", {}).get("message_id")
+        if event_id and event_id in DEDUP:
+            self.stats["duplicates"] += 1
+            return Response({"ok": True, "duplicate": True})
+
+        # Queue for the store workers; when full, ask Feishu to retry later
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            return Response(
+                {"error": "busy", "retry_after": RETRY_AFTER_SECONDS},
+                status=503,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        self.stats["accepted"] += 1
+        return Response({"ok": True})
+
+
+async def serve(host: str, port: int, webhook: Optional[FeishuWebhook] = None, sock=None) -> None:
+    """Run the webhook until SIGINT/SIGTERM, then drain the queue."""
+    webhook = webhook or FeishuWebhook(ingestor=MemoryIngestor() if SAVE_TO_MEMORY else None)
+    port = await webhook.start(host, port, sock=sock)
+    print(f"Feishu webhook listening on http://{host}:{port}/ "
+          f"(queue {webhook.queue.maxsize}, {webhook.store_workers} store workers)")
+    if webhook.ingestor:
+        print(f"Saving messages to memory every {webhook.ingestor.window:.0f}s per chat "
+              f"(up to {webhook.ingestor.max_messages} messages per entry)")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    await stop.wait()
+    print("Shutting down, storing queued events...")
+    started = time.monotonic()
+    await webhook.stop()
+    print(f"Stopped in {time.monotonic() - started:.1f}s, stats: {webhook.stats}")
+
+
+def _reuseport_socket(host: str, port: int) -> socket.socket:
+    """A TCP socket bound with SO_REUSEPORT, so every worker can listen on the same port."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.setblocking(False)
+    return sock
+
+
+def _run_worker(index: int, host: str, port: int, make_webhook: Callable[[int], FeishuWebhook]) -> int:
+    """Body of a forked worker process; returns its exit code."""
+    global DEDUP
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # Workers share the SQLite event claims instead of one dedup log file;
+    # this in-memory copy only short-circuits retries that hit the same worker
+    DEDUP = EventDedup(ttl=DEDUP_TTL)
+    try:
+        asyncio.run(serve(host, port, make_webhook(index), sock=_reuseport_socket(host, port)))
+        return 0
+    except KeyboardInterrupt:
+        return 0
+    except Exception as e:
+        print(f"❌ Worker {index} failed: {e}")
+        return 1
+
+
+def supervise(host: str, port: int, workers: int, make_webhook: Callable[[int], FeishuWebhook]) -> None:
+    """Fork worker processes sharing the port via SO_REUSEPORT and restart crashed ones.
+
+    The kernel spreads incoming connections across the workers. They share
+    the inbox (SQLite WAL): inserts and event dedup claims are serialized by
+    its write lock, and each worker follows the inbox seq to feed its own
+    stream subscribers and long-polls. SIGINT/SIGTERM are forwarded to the
+    workers, which drain their queues before exiting.
+    """
+    # Bound (not listening) for the supervisor's lifetime: fails early if the
+    # port is taken and resolves port 0 to the port all workers use
+    probe = _reuseport_socket(host, port)
+    port = probe.getsockname()[1]
+    children: Dict[int, Tuple[int, float]] = {}
+    stopping = False
+
+    def spawn(index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            probe.close()
+            code = 1
+            try:
+                code = _run_worker(index, host, port, make_webhook)
+            finally:
+                sys.stdout.flush()
+                os._exit(code)
+        children[pid] = (index, time.monotonic())
+
+    def shutdown(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    print(f"Feishu webhook supervisor {os.getpid()}: {workers} workers on http://{host}:{port}/")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in children:
+            continue
+        index, started = children.pop(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        print(f"⚠️  Worker {index} (pid {pid}) exited with {code}, restarting")
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            time.sleep(RESTART_DELAY)
+        if not stopping:
+            spawn(index)
+    probe.close()
+    print("Supervisor stopped")
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Feishu event webhook server.")
     parser.add_argument("--host", default="0.0.0.0")
     parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Max events buffered in memory")
+    parser.add_argument("--store-workers", type=int, default=STORE_WORKERS, help="Workers storing events")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Max events stored per batch")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="Worker processes sharing the port via SO_REUSEPORT (default 1: no fork)")
     args = parser.parse_args()
 
-    server = ThreadingHTTPServer((args.host, args.port), FeishuWebhookHandler)
-    print(f"Feishu webhook listening on http://{args.host}:{args.port}/")
-    server.serve_forever()
+    if args.workers > 1:
+        if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+            parser.error("--workers needs fork() and SO_REUSEPORT (Linux/BSD)")
+
+        def make_webhook(index: int) -> FeishuWebhook:
+            # Worker 0 also runs compaction and memory ingestion, so they happen once
+            return FeishuWebhook(
+                queue_size=args.queue_size,
+                store_workers=args.store_workers,
+                batch_size=args.batch_size,
+                ingestor=MemoryIngestor() if SAVE_TO_MEMORY and index == 0 else None,
+                compact_interval=COMPACT_INTERVAL if index == 0 else 0,
+                shared_store=True
+            )
+
+        supervise(args.host, args.port, args.workers, make_webhook)
+        return
+
+    async def run():
+        webhook = FeishuWebhook(
+            queue_size=args.queue_size,
+            store_workers=args.store_workers,
+            batch_size=args.batch_size,
+            ingestor=MemoryIngestor() if SAVE_TO_MEMORY else None
+        )
+        await serve(args.host, args.port, webhook)
+
+    asyncio.run(run())
 
 
 if __name__ == "__main__":
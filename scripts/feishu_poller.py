@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-"""Feishu poller: periodically check temp inbox and send notifications."""
+"""Feishu poller: periodically check temp inbox and send coalesced digest notifications."""
 
 import argparse
 import asyncio
@@ -8,7 +8,7 @@ import os
 import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
 from dotenv import load_dotenv
 
@@ -22,111 +22,117 @@ if env_path.exists():
 import sys
 sys.path.insert(0, str(project_root))
 
-from sync.feishu_client import FeishuClient
+import storage.inbox as inbox
+from sync.feishu_client import get_feishu_client
+from sync.notifier import CoalescingNotifier
 
 
-TEMP_INBOX_PATH = project_root / "storage" / "feishu_temp_inbox.jsonl"
 NOTIFICATION_CHAT_ID = os.getenv("FEISHU_NOTIFICATION_CHAT_ID", "")
 POLLER_INTERVAL = int(os.getenv("FEISHU_POLLER_INTERVAL", "300"))  # Default 5 minutes
 LAST_NOTIFIED_PATH = project_root / "storage" / "feishu_poller_state.json"
 
 
-def _load_unarchived_messages() -> List[Dict[str, Any]]:
-    """Load unarchived messages from temp inbox."""
-    if not TEMP_INBOX_PATH.exists():
-        return []
-    
-    messages = []
-    try:
-        with open(TEMP_INBOX_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    entry = json.loads(line)
-                    if not entry.get("archived", False):
-                        messages.append(entry)
-                except Exception:
-                    continue
-        return messages
-    except Exception:
-        return []
+def _load_state() -> Dict[str, Any]:
+    """Load poller state: inbox cursor (seq) and archived count at the last poll.
 
-
-def _load_last_notified_count() -> int:
-    """Load last notified message count."""
+    A state file from before the cursor existed only has a notified count;
+    it returns cursor None so the poller starts from the newest message.
+    """
+    state = {"cursor": 0, "archived": 0}
     if not LAST_NOTIFIED_PATH.exists():
-        return 0
+        return state
     try:
         data = json.loads(LAST_NOTIFIED_PATH.read_text(encoding="utf-8"))
-        return data.get("count", 0)
     except Exception:
-        return 0
+        return state
+    if "cursor" not in data:
+        return {"cursor": None, "archived": None}
+    state.update({key: data[key] for key in ("cursor", "archived") if key in data})
+    return state
 
 
-def _save_last_notified_count(count: int) -> None:
-    """Save last notified message count."""
+def _save_state(cursor: int, archived: int, unread: int) -> None:
+    """Save poller state atomically."""
     LAST_NOTIFIED_PATH.parent.mkdir(parents=True, exist_ok=True)
     data = {
-        "count": count,
+        "cursor": cursor,
+        "archived": archived,
+        "unread": unread,
         "timestamp": datetime.now().isoformat()
     }
-    LAST_NOTIFIED_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp_path = LAST_NOTIFIED_PATH.with_name(LAST_NOTIFIED_PATH.name + ".tmp")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp_path, LAST_NOTIFIED_PATH)
 
 
-async def _send_notification(count: int) -> bool:
-    """Send Feishu notification about new messages."""
-    if not NOTIFICATION_CHAT_ID:
-        print(f"⚠️  FEISHU_NOTIFICATION_CHAT_ID 未配置，跳过通知")
-        return False
+async def _load_new_messages(cursor: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Unarchived messages that arrived after cursor, and the new cursor."""
+    messages = []
+    while True:
+        page = await inbox.list_since(cursor, inbox.MAX_LIMIT, include_archived=True)
+        if not page:
+            return messages, cursor
+        messages.extend(entry for entry in page if not entry["archived"])
+        cursor = page[-1]["seq"]
+        if len(page) < inbox.MAX_LIMIT:
+            return messages, cursor
+
+
+def _targets() -> List[str]:
+    """Notification chats (FEISHU_NOTIFICATION_CHAT_ID, comma-separated)."""
+    return [chat_id.strip() for chat_id in NOTIFICATION_CHAT_ID.split(",") if chat_id.strip()]
+
+
+# One notifier (and Feishu client) for the life of the poller
+_NOTIFIER = CoalescingNotifier(get_feishu_client)
+
+# Cursor of the last message handed to the notifier; may run ahead of the
+# persisted cursor while digests are waiting for their window
+_SCAN_CURSOR: Optional[int] = None
+
+
+async def _poll_once(notifier: Optional[CoalescingNotifier] = None) -> None:
+    """Poll temp inbox once, queue new messages for notification and send due digests.
+
+    Only messages after the cursor are read, and counts come from the inbox
+    stats table, so a poll costs the same however long the inbox history is.
+    New arrivals are detected by cursor, not by comparing counts, so
+    archiving and new messages in the same interval can't cancel out.
+
+    The persisted cursor stops before the oldest message still waiting in the
+    notifier, so a restart re-queues messages that were never notified.
+    """
+    global _SCAN_CURSOR
+    notifier = notifier or _NOTIFIER
+    state = _load_state()
+    if state["cursor"] is None:
+        # Upgraded from the count-only state: treat existing messages as notified
+        state = {"cursor": await inbox.latest_seq(), "archived": await inbox.count_messages(archived=True)}
+
+    scan_from = state["cursor"] if _SCAN_CURSOR is None else max(_SCAN_CURSOR, state["cursor"])
+    new_messages, scan_cursor = await _load_new_messages(scan_from)
+    _SCAN_CURSOR = scan_cursor
+    unread = await inbox.count_messages()
+    archived = await inbox.count_messages(archived=True)
     
-    try:
-        client = FeishuClient()
-        text = f"📬 您有 {count} 条新的飞书消息待处理\n\n💡 在 Claude 中使用 feishu_fetch_inbox 查看详情"
-        
-        content = {"text": text}
-        
-        await client.send_message(
-            receive_id_type="chat_id",
-            receive_id=NOTIFICATION_CHAT_ID,
-            msg_type="text",
-            content=content,
-            use_user_token=False
-        )
-        
-        print(f"✅ 已发送通知：{count} 条新消息")
-        return True
+    print(f"[{datetime.now().isoformat()}] 未归档消息: {unread} 条，新消息: {len(new_messages)} 条，"
+          f"新归档: {max(0, archived - state['archived'])} 条")
     
-    except Exception as e:
-        print(f"❌ 发送通知失败: {e}")
-        return False
+    for target in _targets():
+        notifier.add(target, new_messages)
+    await notifier.flush_due(unread)
 
-
-async def _poll_once() -> None:
-    """Poll temp inbox once and send notification if needed."""
-    messages = _load_unarchived_messages()
-    current_count = len(messages)
-    last_count = _load_last_notified_count()
-    
-    print(f"[{datetime.now().isoformat()}] 未归档消息: {current_count} 条（上次通知: {last_count} 条）")
-    
-    # Only notify if count increased
-    if current_count > last_count and current_count > 0:
-        success = await _send_notification(current_count)
-        if success:
-            _save_last_notified_count(current_count)
-    elif current_count == 0:
-        # Reset counter when inbox is empty
-        if last_count > 0:
-            _save_last_notified_count(0)
+    floor = notifier.pending_floor()
+    cursor = scan_cursor if floor is None else min(scan_cursor, floor - 1)
+    _save_state(cursor, archived, unread)
 
 
 async def _poll_loop(interval: int) -> None:
     """Main polling loop."""
     print(f"🚀 Feishu poller started (interval: {interval}s)")
-    print(f"   Temp inbox: {TEMP_INBOX_PATH}")
+    print(f"   Temp inbox: {inbox.INBOX_DB_PATH}")
     print(f"   Notification chat: {NOTIFICATION_CHAT_ID or '(未配置)'}")
+    print(f"   Digest window: {_NOTIFIER.window:.0f}s, min interval per chat: {_NOTIFIER.min_interval:.0f}s")
     
     while True:
         try:
@@ -134,7 +140,12 @@ async def _poll_loop(interval: int) -> None:
         except Exception as e:
             print(f"❌ 轮询出错: {e}")
         
-        await asyncio.sleep(interval)
+        # Wake up early when a pending digest becomes due
+        delay = interval
+        due = _NOTIFIER.next_due()
+        if due is not None:
+            delay = max(1.0, min(interval, due - _NOTIFIER.clock()))
+        await asyncio.sleep(delay)
 
 
 def main() -> None:
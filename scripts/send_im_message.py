@@ -5,11 +5,11 @@ import argparse
 import asyncio
 import os
 
-from sync.feishu_client import FeishuClient
+from sync.feishu_client import get_feishu_client
 
 
 async def send_text(chat_id: str, text: str, use_user_token: bool) -> None:
-    client = FeishuClient()
+    client = get_feishu_client()
     await client.send_message(
         receive_id_type="chat_id",
         receive_id=chat_id,
@@ -67,6 +67,9 @@ async def init_db():
         await db.execute("""
             CREATE INDEX IF NOT EXISTS idx_created_at ON memories(created_at)
         """)
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_updated_at ON memories(updated_at)
+        """)
         
         # Create projects table
         await db.execute("""
@@ -99,6 +102,103 @@ async def init_db():
             CREATE INDEX IF NOT EXISTS idx_tag ON memory_tags(tag)
         """)
         
+        # Feishu sync state: one row per synced memory
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS feishu_sync_state (
+                memory_id TEXT PRIMARY KEY,
+                record_id TEXT,
+                fields_hash TEXT,
+                memory_updated_at TEXT,
+                synced_at TEXT NOT NULL
+            )
+        """)
+        
+        # Key/value store for sync watermarks and checkpoints
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS sync_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TEXT NOT NULL
+            )
+        """)
+        
+        # Feishu document content cache, valid while revision_id is unchanged
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS feishu_doc_cache (
+                document_id TEXT PRIMARY KEY,
+                revision_id INTEGER NOT NULL,
+                title TEXT,
+                blocks TEXT NOT NULL,
+                markdown TEXT,
+                cached_at TEXT NOT NULL
+            )
+        """)
+        
+        # Feishu drive/wiki path index: children of each listed folder or wiki node
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS feishu_path_index (
+                scope TEXT NOT NULL,
+                token TEXT NOT NULL,
+                parent_token TEXT NOT NULL,
+                path TEXT NOT NULL,
+                name TEXT,
+                obj_type TEXT,
+                has_child INTEGER NOT NULL DEFAULT 0,
+                data TEXT,
+                indexed_at REAL NOT NULL,
+                PRIMARY KEY (scope, token)
+            )
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_path_index_parent ON feishu_path_index(scope, parent_token)
+        """)
+        
+        await db.execute("""
+            CREATE INDEX IF NOT EXISTS idx_path_index_path ON feishu_path_index(scope, path)
+        """)
+        
+        # Folders/nodes whose children were fully listed, and when
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS feishu_path_index_listed (
+                scope TEXT NOT NULL,
+                token TEXT NOT NULL,
+                listed_at REAL NOT NULL,
+                PRIMARY KEY (scope, token)
+            )
+        """)
+        
+        # Local full-text index of Feishu documents (see storage.doc_index)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS feishu_doc_index (
+                document_id TEXT PRIMARY KEY,
+                revision_id INTEGER NOT NULL,
+                title TEXT,
+                url TEXT,
+                source TEXT,
+                indexed_at TEXT NOT NULL
+            )
+        """)
+        
+        try:
+            # trigram tokenizer (SQLite 3.34+) lets LIKE '%中文%' use the index
+            await db.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS feishu_docs_fts USING fts5(
+                    document_id UNINDEXED,
+                    title,
+                    content,
+                    tokenize = 'trigram'
+                )
+            """)
+        except aiosqlite.OperationalError:
+            await db.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS feishu_docs_fts USING fts5(
+                    document_id UNINDEXED,
+                    title,
+                    content
+                )
+            """)
+        
         await db.commit()
         
         # Migrate existing tags from JSON to memory_tags table
@@ -286,6 +386,58 @@ async def get_memory(memory_id: str) -> Optional[dict]:
         return None
 
 
+async def list_memory_ids() -> List[str]:
+    """List the IDs of all memories (archived included)."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT id FROM memories")
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def list_memories_updated_since(
+    watermark: Optional[str] = None,
+    after_id: Optional[str] = None,
+    limit: int = 500
+) -> List[dict]:
+    """List memories changed at or after a watermark, oldest change first.
+    
+    Uses idx_updated_at, so the cost depends on the number of changed rows
+    rather than the table size. Archived memories are included so that
+    archiving is propagated too.
+    
+    Args:
+        watermark: ISO timestamp; None lists from the beginning
+        after_id: Keyset cursor within the same timestamp; when given, rows
+            with updated_at == watermark and id <= after_id are skipped
+        limit: Maximum number of rows to return
+    """
+    conditions = []
+    params: list = []
+    if watermark and after_id:
+        conditions.append("(updated_at > ? OR (updated_at = ? AND id > ?))")
+        params.extend([watermark, watermark, after_id])
+    elif watermark:
+        conditions.append("updated_at >= ?")
+        params.append(watermark)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit)
+    
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT entry_path FROM memories {where_clause} ORDER BY updated_at, id LIMIT ?",
+            params
+        )
+        rows = await cursor.fetchall()
+    
+    results = []
+    for row in rows:
+        entry_path = row["entry_path"]
+        if os.path.exists(entry_path):
+            with open(entry_path, "r", encoding="utf-8") as f:
+                results.append(json.load(f))
+    return results
+
+
 async def add_memory(
     memory_id: str,
     category: str,
@@ -361,6 +513,146 @@ async def add_memory(
     return entry_data
 
 
+async def add_memories_bulk(memories: List[dict]) -> List[dict]:
+    """Add many memory entries in one transaction.
+
+    Each item has the add_memory arguments as keys ("memory_id", "category",
+    "title", "content" required; "project", "importance", "source_type",
+    "tags" optional). Either all rows are inserted or none; JSON entry files
+    are written after the database transaction commits.
+
+    Returns:
+        The created entries, in input order
+    """
+    if not memories:
+        return []
+
+    now = datetime.now().isoformat()
+    entry_dir = os.path.join(ENTRIES_DIR, datetime.now().strftime("%Y/%m"))
+    written = []
+    async with aiosqlite.connect(DB_PATH) as db:
+        for memory in memories:
+            memory_id = memory["memory_id"]
+            tags = memory.get("tags") or []
+            entry_data = {
+                "id": memory_id,
+                "created_at": now,
+                "updated_at": now,
+                "category": memory["category"],
+                "tags": tags,
+                "title": memory["title"],
+                "content": memory["content"],
+                "project": memory.get("project"),
+                "importance": memory.get("importance") or 3,
+                "archived": False,
+                "source": {
+                    "type": memory.get("source_type") or "claude_ai",
+                    "timestamp": now
+                }
+            }
+            entry_path = os.path.join(entry_dir, f"{memory_id}.json")
+
+            await db.execute("""
+                INSERT INTO memories (
+                    id, created_at, updated_at, category, tags, title, content,
+                    project, importance, archived, source_type, source_timestamp, entry_path
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                memory_id, now, now, entry_data["category"], json.dumps(tags), entry_data["title"],
+                entry_data["content"], entry_data["project"], entry_data["importance"], 0,
+                entry_data["source"]["type"], now, entry_path
+            ))
+            await db.execute("""
+                INSERT INTO memories_fts (id, title, content, category, project)
+                VALUES (?, ?, ?, ?, ?)
+            """, (memory_id, entry_data["title"], entry_data["content"], entry_data["category"], entry_data["project"]))
+            await db.executemany(
+                "INSERT OR IGNORE INTO memory_tags (memory_id, tag) VALUES (?, ?)",
+                [(memory_id, tag) for tag in tags if tag]
+            )
+            written.append((entry_path, entry_data))
+
+        await db.commit()
+
+    Path(entry_dir).mkdir(parents=True, exist_ok=True)
+    for entry_path, entry_data in written:
+        with open(entry_path, "w", encoding="utf-8") as f:
+            json.dump(entry_data, f, ensure_ascii=False, indent=2)
+
+    return [entry_data for _, entry_data in written]
+
+
+# Memory fields that can be changed through update_memories_bulk
+BULK_UPDATABLE_FIELDS = ("title", "content", "category", "project", "importance", "tags", "archived")
+
+
+async def update_memories_bulk(updates: List[dict]) -> List[dict]:
+    """Apply field changes to many memories in one transaction.
+
+    Each update is {"id": ..., <field>: <value>, ...} with fields from
+    BULK_UPDATABLE_FIELDS; an optional "updated_at" is kept as the new
+    timestamp (defaults to now). JSON entry files are rewritten after the
+    database transaction commits.
+
+    Returns:
+        The updated entries (memories that no longer exist are skipped)
+    """
+    if not updates:
+        return []
+
+    now = datetime.now().isoformat()
+    written = []
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        for update in updates:
+            memory_id = update["id"]
+            cursor = await db.execute("SELECT entry_path FROM memories WHERE id = ?", (memory_id,))
+            row = await cursor.fetchone()
+            if not row or not os.path.exists(row["entry_path"]):
+                continue
+            with open(row["entry_path"], "r", encoding="utf-8") as f:
+                entry = json.load(f)
+
+            changes = {k: v for k, v in update.items() if k in BULK_UPDATABLE_FIELDS}
+            entry.update(changes)
+            entry["updated_at"] = update.get("updated_at") or now
+
+            await db.execute("""
+                UPDATE memories
+                SET title = ?, content = ?, category = ?, project = ?, importance = ?,
+                    tags = ?, archived = ?, updated_at = ?
+                WHERE id = ?
+            """, (
+                entry["title"], entry["content"], entry["category"], entry.get("project"),
+                entry["importance"], json.dumps(entry.get("tags", [])),
+                1 if entry.get("archived") else 0, entry["updated_at"], memory_id
+            ))
+
+            if {"title", "content", "category", "project"} & changes.keys():
+                await db.execute("DELETE FROM memories_fts WHERE id = ?", (memory_id,))
+                await db.execute("""
+                    INSERT INTO memories_fts (id, title, content, category, project)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (memory_id, entry["title"], entry["content"], entry["category"], entry.get("project")))
+
+            if "tags" in changes:
+                await db.execute("DELETE FROM memory_tags WHERE memory_id = ?", (memory_id,))
+                await db.executemany(
+                    "INSERT OR IGNORE INTO memory_tags (memory_id, tag) VALUES (?, ?)",
+                    [(memory_id, tag) for tag in entry.get("tags", []) if tag]
+                )
+
+            written.append((row["entry_path"], entry))
+
+        await db.commit()
+
+    for entry_path, entry in written:
+        with open(entry_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+
+    return [entry for _, entry in written]
+
+
 async def list_tags(project: Optional[str] = None) -> List[dict]:
     """List all tags with their usage counts.
     
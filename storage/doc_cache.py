@@ -0,0 +1,64 @@
+"""Feishu document content cache keyed by document_id and revision_id.
+
+The feishu_doc_cache table is created by storage.db.init_db(). A cached entry
+is only reused while the document's current revision_id matches the cached
+one, so checking freshness costs a single metadata request.
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+from storage.db import DB_PATH
+
+
+async def get_cached_document(document_id: str) -> Optional[Dict[str, Any]]:
+    """Get the cached entry for a document, or None.
+
+    Returns:
+        Dict with document_id, revision_id, title, blocks (list), markdown
+        (may be None) and cached_at.
+    """
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM feishu_doc_cache WHERE document_id = ?", (document_id,)
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return None
+    entry = dict(row)
+    entry["blocks"] = json.loads(entry["blocks"])
+    return entry
+
+
+async def save_cached_document(
+    document_id: str,
+    revision_id: int,
+    title: Optional[str],
+    blocks: List[Dict[str, Any]],
+    markdown: Optional[str] = None
+) -> None:
+    """Store (or replace) the cached blocks and Markdown for a revision."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("""
+            INSERT INTO feishu_doc_cache (document_id, revision_id, title, blocks, markdown, cached_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(document_id) DO UPDATE SET
+                revision_id = excluded.revision_id,
+                title = excluded.title,
+                blocks = excluded.blocks,
+                markdown = excluded.markdown,
+                cached_at = excluded.cached_at
+        """, (
+            document_id,
+            revision_id,
+            title,
+            json.dumps(blocks, ensure_ascii=False),
+            markdown,
+            datetime.now().isoformat()
+        ))
+        await db.commit()
+
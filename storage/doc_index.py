@@ -0,0 +1,157 @@
+"""Local full-text index of Feishu documents, searchable together with memories.
+
+Tables are created by storage.db.init_db():
+- feishu_doc_index: document_id -> indexed revision_id, title, url, source
+- feishu_docs_fts: FTS5 table with the plain text of each document
+
+Documents are re-indexed only when their revision_id changes
+(see sync.doc_indexer).
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import aiosqlite
+
+from storage.db import DB_PATH, _is_chinese_text
+
+# Characters of context around the first hit in a search snippet
+SNIPPET_BEFORE = 30
+SNIPPET_LENGTH = 120
+
+
+async def get_indexed_revisions() -> Dict[str, int]:
+    """document_id -> revision_id of every indexed document."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT document_id, revision_id FROM feishu_doc_index")
+        return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def upsert_document(
+    document_id: str,
+    revision_id: int,
+    title: Optional[str],
+    content: str,
+    url: Optional[str] = None,
+    source: Optional[str] = None
+) -> None:
+    """Index (or re-index) one document's text in a single transaction."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("DELETE FROM feishu_docs_fts WHERE document_id = ?", (document_id,))
+        await db.execute(
+            "INSERT INTO feishu_docs_fts (document_id, title, content) VALUES (?, ?, ?)",
+            (document_id, title or "", content)
+        )
+        await db.execute("""
+            INSERT INTO feishu_doc_index (document_id, revision_id, title, url, source, indexed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(document_id) DO UPDATE SET
+                revision_id = excluded.revision_id,
+                title = excluded.title,
+                url = COALESCE(excluded.url, feishu_doc_index.url),
+                source = COALESCE(excluded.source, feishu_doc_index.source),
+                indexed_at = excluded.indexed_at
+        """, (document_id, revision_id, title, url, source, datetime.now().isoformat()))
+        await db.commit()
+
+
+async def delete_documents(document_ids: Iterable[str]) -> None:
+    """Remove documents from the index."""
+    ids = [(document_id,) for document_id in document_ids]
+    if not ids:
+        return
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.executemany("DELETE FROM feishu_docs_fts WHERE document_id = ?", ids)
+        await db.executemany("DELETE FROM feishu_doc_index WHERE document_id = ?", ids)
+        await db.commit()
+
+
+def _word_conditions(columns: List[str], words: List[str], joiner: str) -> tuple:
+    """(SQL, params) matching each word in any of the columns, words joined by joiner."""
+    parts = []
+    params = []
+    for word in words:
+        parts.append("(" + " OR ".join(f"{column} LIKE ?" for column in columns) + ")")
+        params.extend([f"%{word}%"] * len(columns))
+    return f"({f' {joiner} '.join(parts)})", params
+
+
+async def search_knowledge(
+    query: str,
+    limit: int = 10,
+    include_memories: bool = True,
+    include_docs: bool = True
+) -> List[dict]:
+    """Search memories and indexed Feishu documents in one local query.
+
+    Matching follows search_memories: multi-word Chinese queries match any
+    word, other queries must match every word. Memories use memories_fts for
+    non-Chinese queries; documents use LIKE, which the trigram tokenizer
+    serves from the FTS index.
+
+    Results are ordered by title hits first, then most recently updated.
+
+    Returns:
+        List of {"source": "memory"|"doc", "id", "title", "snippet", "url",
+        "updated_at", "importance"}.
+    """
+    words = query.strip().split()
+    if not words or not (include_memories or include_docs):
+        return []
+    chinese = _is_chinese_text(query)
+    joiner = "OR" if chinese else "AND"
+    first_word = words[0]
+
+    arms = []
+    params: list = []
+
+    if include_memories:
+        snippet = (
+            f"substr(m.content, max(1, instr(lower(m.content), lower(?)) - {SNIPPET_BEFORE}), {SNIPPET_LENGTH})"
+        )
+        title_hit = "CASE WHEN m.title LIKE ? THEN 0 ELSE 1 END"
+        if chinese:
+            where, where_params = _word_conditions(["m.title", "m.content"], words, joiner)
+            from_clause = "memories m"
+        else:
+            where = "memories_fts MATCH ?"
+            where_params = [" AND ".join(words)]
+            from_clause = "memories m JOIN memories_fts ON m.id = memories_fts.id"
+        arms.append(f"""
+            SELECT 'memory' AS source, m.id AS id, m.title AS title, {snippet} AS snippet,
+                   NULL AS url, m.updated_at AS updated_at, m.importance AS importance,
+                   {title_hit} AS title_rank
+            FROM {from_clause}
+            WHERE {where} AND m.archived = 0
+        """)
+        params.extend([first_word, f"%{first_word}%"] + where_params)
+
+    if include_docs:
+        snippet = (
+            f"substr(d.content, max(1, instr(lower(d.content), lower(?)) - {SNIPPET_BEFORE}), {SNIPPET_LENGTH})"
+        )
+        where, where_params = _word_conditions(["d.title", "d.content"], words, joiner)
+        arms.append(f"""
+            SELECT 'doc' AS source, d.document_id AS id, d.title AS title, {snippet} AS snippet,
+                   i.url AS url, i.indexed_at AS updated_at, NULL AS importance,
+                   CASE WHEN d.title LIKE ? THEN 0 ELSE 1 END AS title_rank
+            FROM feishu_docs_fts d JOIN feishu_doc_index i ON i.document_id = d.document_id
+            WHERE {where}
+        """)
+        params.extend([first_word, f"%{first_word}%"] + where_params)
+
+    sql = " UNION ALL ".join(arms) + " ORDER BY title_rank, updated_at DESC LIMIT ?"
+    params.append(limit)
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(sql, params)
+        rows = await cursor.fetchall()
+
+    results = []
+    for row in rows:
+        result = dict(row)
+        result.pop("title_rank", None)
+        result["snippet"] = " ".join((result.get("snippet") or "").split())
+        results.append(result)
+    return results
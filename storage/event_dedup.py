@@ -0,0 +1,220 @@
+"""Dedup of Feishu event deliveries (Feishu retries events it got no 200 for).
+
+EventDedup remembers event IDs for a time window:
+- An ordered, time-bounded LRU (OrderedDict of event_id -> first seen time,
+  oldest first) answers exactly for the most recent max_entries IDs.
+- Two generations of Bloom filters, rotated every ttl seconds, remember IDs
+  that were evicted from the LRU by its size bound, at a configured false
+  positive rate. They are only consulted while such an ID can still be
+  inside the ttl window, so normally every answer is exact.
+- New IDs are appended to a tab-separated log ("<timestamp>\\t<event_id>"),
+  one write per batch. The log is compacted to the live entries on load and
+  whenever it grows past twice the LRU size.
+
+All methods are thread-safe.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+DEFAULT_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_ERROR_RATE = 1e-6
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(1, capacity)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class EventDedup:
+    """Time-bounded event ID dedup with an append-only log.
+
+    Args:
+        path: Log file; None keeps everything in memory
+        ttl: Seconds an event ID is remembered
+        max_entries: Size bound of the exact LRU (and Bloom generation capacity)
+        error_rate: Bloom filter false positive rate for IDs outside the LRU
+    """
+
+    def __init__(
+        self,
+        path: Optional[os.PathLike] = None,
+        ttl: float = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        error_rate: float = DEFAULT_ERROR_RATE
+    ):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._bloom = BloomFilter(self.max_entries, error_rate)
+        self._previous_bloom: Optional[BloomFilter] = None
+        self._bloom_started = time.time()
+        self._last_eviction: Optional[float] = None
+        self._log_lines = 0
+        if self.path:
+            self._load()
+
+    # ---------- queries ----------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._recent)
+
+    def __contains__(self, event_id: str) -> bool:
+        with self._lock:
+            return self._seen(event_id, time.time())
+
+    def filter_new(self, event_ids: Iterable[str]) -> List[str]:
+        """Event IDs not seen before, in order, without duplicates."""
+        now = time.time()
+        new: List[str] = []
+        batch = set()
+        with self._lock:
+            for event_id in event_ids:
+                if event_id in batch or self._seen(event_id, now):
+                    continue
+                batch.add(event_id)
+                new.append(event_id)
+        return new
+
+    # ---------- updates ----------
+
+    def add(self, event_ids: Iterable[str]) -> int:
+        """Record event IDs as seen (one log append). Returns how many were new."""
+        now = time.time()
+        added = []
+        with self._lock:
+            self._expire(now)
+            for event_id in event_ids:
+                if not event_id or self._seen(event_id, now):
+                    continue
+                self._remember(event_id, now)
+                added.append(event_id)
+            if added and self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(f"{now:.3f}\t{event_id}\n" for event_id in added))
+                self._log_lines += len(added)
+                if self._log_lines > 2 * self.max_entries:
+                    self._write_snapshot()
+        return len(added)
+
+    def compact(self) -> None:
+        """Rewrite the log with only the live entries."""
+        with self._lock:
+            self._expire(time.time())
+            if self.path:
+                self._write_snapshot()
+
+    # ---------- internals (lock held) ----------
+
+    def _seen(self, event_id: str, now: float) -> bool:
+        seen_at = self._recent.get(event_id)
+        if seen_at is not None:
+            if now - seen_at >= self.ttl:
+                del self._recent[event_id]
+                return False
+            return True
+        # Evicted IDs were first seen before their eviction, so once the last
+        # eviction is older than ttl the LRU alone is complete
+        if self._last_eviction is None or now - self._last_eviction >= self.ttl:
+            return False
+        self._rotate(now)
+        return event_id in self._bloom or (self._previous_bloom is not None and event_id in self._previous_bloom)
+
+    def _remember(self, event_id: str, seen_at: float) -> None:
+        self._recent[event_id] = seen_at
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+            self._last_eviction = seen_at
+        self._rotate(seen_at)
+        self._bloom.add(event_id)
+
+    def _rotate(self, now: float) -> None:
+        # An ID stays in the current or previous generation for at least ttl
+        if now - self._bloom_started >= self.ttl or self._bloom.count >= self._bloom.capacity:
+            self._previous_bloom = self._bloom
+            self._bloom = BloomFilter(self.max_entries, self.error_rate)
+            self._bloom_started = now
+
+    def _expire(self, now: float) -> None:
+        # Entries are in first-seen order: drop from the front until the first live one
+        while self._recent:
+            event_id, seen_at = next(iter(self._recent.items()))
+            if now - seen_at < self.ttl:
+                break
+            del self._recent[event_id]
+        self._rotate(now)
+
+    def _load(self) -> None:
+        now = time.time()
+        entries = []
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    seen_at, _, event_id = line.rstrip("\n").partition("\t")
+                    try:
+                        seen_at = float(seen_at)
+                    except ValueError:
+                        continue
+                    if event_id and now - seen_at < self.ttl:
+                        entries.append((seen_at, event_id))
+        entries.extend((now, event_id) for event_id in self._load_legacy_json())
+        entries.sort()
+        if entries:
+            self._bloom_started = entries[0][0]
+        for seen_at, event_id in entries:
+            self._remember(event_id, seen_at)
+        if entries or self.path.exists():
+            self._write_snapshot()
+
+    def _load_legacy_json(self) -> List[str]:
+        """IDs from the old feishu_event_ids.json list next to the log (migrated once)."""
+        legacy = self.path.with_suffix(".json")
+        if legacy == self.path or not legacy.exists():
+            return []
+        try:
+            data = json.loads(legacy.read_text(encoding="utf-8"))
+        except Exception:
+            data = []
+        legacy.rename(legacy.with_name(legacy.name + ".migrated"))
+        return [event_id for event_id in data if isinstance(event_id, str)] if isinstance(data, list) else []
+
+    def _write_snapshot(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("".join(f"{seen_at:.3f}\t{event_id}\n" for event_id, seen_at in self._recent.items()))
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self._recent)
@@ -0,0 +1,644 @@
+"""Feishu temp inbox: received IM messages waiting to be reviewed or archived.
+
+Stored in its own SQLite file (WAL mode) so the webhook, the poller and the
+MCP server can read and write it concurrently without touching memory.db:
+- feishu_inbox: one row per message, keyed by message_id; seq is a
+  monotonically increasing arrival number used as the stream/long-poll cursor;
+  event_id is the Feishu event that delivered it and memory_id the memory
+  it was ingested into (when FEISHU_IM_SAVE_TO_MEMORY is on)
+- feishu_inbox_stats: per-state message counts kept up to date by triggers,
+  so unread counts don't scan the table
+- feishu_inbox_meta: the seq high-water mark, so compaction never causes a
+  seq to be reused, and the seq memory ingestion was first enabled at
+- feishu_event_claims: Feishu event IDs already stored, claimed in the same
+  transaction as the insert, so webhook worker processes dedup retried
+  events against each other; claims expire after EVENT_CLAIM_TTL seconds
+
+Retention: compact() moves archived messages older than
+ARCHIVED_RETENTION_DAYS (and, if configured, unarchived messages older than
+UNARCHIVED_RETENTION_DAYS) out of feishu_inbox into a cold store, a second
+SQLite file whose WITHOUT ROWID table is clustered by (chat_id, seq), so one
+chat's history is stored contiguously and read without touching other
+chats. Cold messages older than COLD_RETENTION_DAYS are deleted. The hot
+table therefore only holds recent and unprocessed messages however long
+the inbox has been running.
+
+The legacy feishu_temp_inbox.jsonl file is imported once on first use and
+renamed to *.migrated.
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+project_root = Path(__file__).parent.parent
+
+INBOX_DB_PATH = os.getenv("FEISHU_INBOX_DB_PATH", str(project_root / "storage" / "feishu_inbox.db"))
+LEGACY_JSONL_PATH = project_root / "storage" / "feishu_temp_inbox.jsonl"
+COLD_DB_PATH = os.getenv("FEISHU_INBOX_COLD_DB_PATH", str(project_root / "storage" / "feishu_inbox_archive.db"))
+
+# Retention in days; 0 keeps messages in place forever
+ARCHIVED_RETENTION_DAYS = float(os.getenv("FEISHU_INBOX_ARCHIVED_RETENTION_DAYS", "7"))
+UNARCHIVED_RETENTION_DAYS = float(os.getenv("FEISHU_INBOX_UNARCHIVED_RETENTION_DAYS", "0"))
+COLD_RETENTION_DAYS = float(os.getenv("FEISHU_INBOX_COLD_RETENTION_DAYS", "0"))
+
+# Messages moved per compaction transaction, to keep the write lock short
+COMPACT_BATCH = 500
+
+# Seconds an event claim is kept (Feishu stops retrying well within a day)
+EVENT_CLAIM_TTL = float(os.getenv("FEISHU_WEBHOOK_DEDUP_TTL", str(24 * 3600)))
+
+# Seconds a writer waits for another process holding the write lock
+BUSY_TIMEOUT = 10.0
+
+MAX_LIMIT = 100
+
+# message_ids per UPDATE statement in archive_messages
+ARCHIVE_CHUNK = 500
+
+INBOX_COLUMNS = [
+    "message_id", "chat_id", "chat_type", "sender_open_id", "sender_union_id",
+    "created_at", "text", "archived", "received_at", "archived_at", "seq",
+    "event_id", "memory_id",
+]
+
+COLD_COLUMNS = INBOX_COLUMNS + ["compacted_at"]
+
+# Highest seq ever assigned: rows may have been compacted away from feishu_inbox
+_LAST_SEQ_SQL = """
+    SELECT MAX(
+        COALESCE((SELECT MAX(seq) FROM feishu_inbox), 0),
+        COALESCE((SELECT value FROM feishu_inbox_meta WHERE key = 'last_seq'), 0)
+    )
+"""
+
+# DB paths whose schema has been created in this process
+_READY: set = set()
+
+
+def _row_to_entry(row: aiosqlite.Row) -> Dict[str, Any]:
+    entry = dict(row)
+    entry["archived"] = bool(entry["archived"])
+    return entry
+
+
+def _entry_values(entry: Dict[str, Any]) -> tuple:
+    values = {column: entry.get(column) for column in INBOX_COLUMNS}
+    values["archived"] = 1 if entry.get("archived") else 0
+    values["created_at"] = values["created_at"] or datetime.now().isoformat()
+    return tuple(values[column] for column in INBOX_COLUMNS)
+
+
+async def _create_schema(db: aiosqlite.Connection) -> None:
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feishu_inbox (
+            message_id TEXT PRIMARY KEY,
+            chat_id TEXT,
+            chat_type TEXT,
+            sender_open_id TEXT,
+            sender_union_id TEXT,
+            created_at TEXT NOT NULL,
+            text TEXT,
+            archived INTEGER NOT NULL DEFAULT 0,
+            received_at TEXT,
+            archived_at TEXT,
+            seq INTEGER,
+            event_id TEXT,
+            memory_id TEXT
+        )
+    """)
+    cursor = await db.execute("PRAGMA table_info(feishu_inbox)")
+    columns = [row[1] for row in await cursor.fetchall()]
+    if "seq" not in columns:
+        # Inbox created before seq existed: number existing rows in arrival order
+        await db.execute("ALTER TABLE feishu_inbox ADD COLUMN seq INTEGER")
+        await db.execute("UPDATE feishu_inbox SET seq = rowid")
+    for column in ("event_id", "memory_id"):
+        if column not in columns:
+            await db.execute(f"ALTER TABLE feishu_inbox ADD COLUMN {column} TEXT")
+    await db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_feishu_inbox_seq ON feishu_inbox(seq)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feishu_inbox_archived_seq ON feishu_inbox(archived, seq)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feishu_inbox_chat_seq ON feishu_inbox(chat_id, seq)")
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feishu_inbox_archived_created ON feishu_inbox(archived, created_at)"
+    )
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feishu_inbox_created ON feishu_inbox(created_at)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feishu_inbox_chat ON feishu_inbox(chat_id, created_at)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_feishu_inbox_memory ON feishu_inbox(memory_id)")
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feishu_inbox_archived_at ON feishu_inbox(archived, archived_at)"
+    )
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feishu_inbox_meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feishu_event_claims (
+            event_id TEXT PRIMARY KEY,
+            claimed_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_feishu_event_claims_at ON feishu_event_claims(claimed_at)"
+    )
+
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS feishu_inbox_stats (
+            archived INTEGER PRIMARY KEY,
+            count INTEGER NOT NULL
+        )
+    """)
+    await db.execute("INSERT OR IGNORE INTO feishu_inbox_stats (archived, count) VALUES (0, 0), (1, 0)")
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS feishu_inbox_count_insert AFTER INSERT ON feishu_inbox
+        BEGIN
+            UPDATE feishu_inbox_stats SET count = count + 1 WHERE archived = NEW.archived;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS feishu_inbox_count_delete AFTER DELETE ON feishu_inbox
+        BEGIN
+            UPDATE feishu_inbox_stats SET count = count - 1 WHERE archived = OLD.archived;
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS feishu_inbox_count_update AFTER UPDATE OF archived ON feishu_inbox
+        WHEN OLD.archived != NEW.archived
+        BEGIN
+            UPDATE feishu_inbox_stats SET count = count - 1 WHERE archived = OLD.archived;
+            UPDATE feishu_inbox_stats SET count = count + 1 WHERE archived = NEW.archived;
+        END
+    """)
+    await db.commit()
+
+
+async def _import_legacy_jsonl(db: aiosqlite.Connection, path: Path) -> int:
+    """Import the old JSONL inbox, then rename it so it is imported only once."""
+    if not path.exists():
+        return 0
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except Exception:
+                continue
+            entries.append(entry)
+    inserted = await _insert(db, entries)
+    try:
+        path.rename(path.with_name(path.name + ".migrated"))
+    except FileNotFoundError:
+        pass  # Another process imported it at the same time
+    return len(inserted)
+
+
+async def _insert(db: aiosqlite.Connection, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert entries in one write transaction, numbering new ones with seq.
+
+    Entries whose event_id was already claimed (by any process) are skipped.
+    """
+    placeholders = ", ".join("?" for _ in INBOX_COLUMNS)
+    sql = f"INSERT OR IGNORE INTO feishu_inbox ({', '.join(INBOX_COLUMNS)}) VALUES ({placeholders})"
+    claim_sql = "INSERT OR IGNORE INTO feishu_event_claims (event_id, claimed_at) VALUES (?, ?)"
+    claimed_at = time.time()
+    inserted = []
+    # Take the write lock before reading MAX(seq) so writers in other processes can't reuse it
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await db.execute(_LAST_SEQ_SQL)
+        seq = (await cursor.fetchone())[0]
+        for entry in entries:
+            if not entry.get("message_id"):
+                continue
+            if entry.get("event_id"):
+                cursor = await db.execute(claim_sql, (entry["event_id"], claimed_at))
+                if cursor.rowcount == 0:
+                    continue
+            entry = {**entry, "seq": seq + 1}
+            cursor = await db.execute(sql, _entry_values(entry))
+            if cursor.rowcount > 0:
+                seq += 1
+                inserted.append(entry)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return inserted
+
+
+def _connect() -> aiosqlite.Connection:
+    return aiosqlite.connect(INBOX_DB_PATH, timeout=BUSY_TIMEOUT)
+
+
+async def init_inbox() -> int:
+    """Create the inbox tables and import the legacy JSONL inbox if present.
+
+    Safe to call from several processes; cheap after the first call.
+
+    Returns:
+        Number of messages imported from the legacy file
+    """
+    if INBOX_DB_PATH in _READY:
+        return 0
+    Path(INBOX_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    async with _connect() as db:
+        await _create_schema(db)
+        imported = await _import_legacy_jsonl(db, LEGACY_JSONL_PATH)
+    _READY.add(INBOX_DB_PATH)
+    return imported
+
+
+async def add_messages(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert messages in one transaction; already stored message_ids are skipped.
+
+    Returns:
+        The entries that were actually inserted, with their seq
+    """
+    await init_inbox()
+    async with _connect() as db:
+        return await _insert(db, entries)
+
+
+async def list_messages(
+    limit: int = 20,
+    include_archived: bool = False,
+    chat_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Newest messages first (limit clamped to 1..100)."""
+    await init_inbox()
+    safe_limit = max(1, min(limit, MAX_LIMIT))
+    conditions = []
+    args: List[Any] = []
+    if not include_archived:
+        conditions.append("archived = 0")
+    if chat_id:
+        conditions.append("chat_id = ?")
+        args.append(chat_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT * FROM feishu_inbox {where} ORDER BY created_at DESC LIMIT ?",
+            args + [safe_limit]
+        )
+        return [_row_to_entry(row) for row in await cursor.fetchall()]
+
+
+async def get_message(message_id: str) -> Optional[Dict[str, Any]]:
+    await init_inbox()
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute("SELECT * FROM feishu_inbox WHERE message_id = ?", (message_id,))
+        row = await cursor.fetchone()
+        if row:
+            return _row_to_entry(row)
+    # Compacted messages are still reachable by ID
+    rows = await _query_cold("SELECT * FROM feishu_inbox_cold WHERE message_id = ?", (message_id,))
+    return rows[0] if rows else None
+
+
+async def archive_message(message_id: str) -> bool:
+    """Mark a message as archived. Returns False if it doesn't exist."""
+    await init_inbox()
+    async with _connect() as db:
+        cursor = await db.execute(
+            "UPDATE feishu_inbox SET archived = 1, archived_at = COALESCE(archived_at, ?) WHERE message_id = ?",
+            (datetime.now().isoformat(), message_id)
+        )
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+async def archive_messages(message_ids: List[str]) -> List[str]:
+    """Mark many messages as archived in one transaction.
+
+    Returns:
+        The message_ids that exist in the inbox (already archived ones included)
+    """
+    await init_inbox()
+    message_ids = list(dict.fromkeys(mid for mid in message_ids if mid))
+    if not message_ids:
+        return []
+    now = datetime.now().isoformat()
+    found: List[str] = []
+    async with _connect() as db:
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            # Chunked to stay under SQLite's bound parameter limit
+            for start in range(0, len(message_ids), ARCHIVE_CHUNK):
+                chunk = message_ids[start:start + ARCHIVE_CHUNK]
+                placeholders = ", ".join("?" for _ in chunk)
+                await db.execute(
+                    f"UPDATE feishu_inbox SET archived = 1, archived_at = COALESCE(archived_at, ?) "
+                    f"WHERE message_id IN ({placeholders})",
+                    [now] + chunk
+                )
+                cursor = await db.execute(
+                    f"SELECT message_id FROM feishu_inbox WHERE message_id IN ({placeholders})", chunk
+                )
+                found.extend(row[0] for row in await cursor.fetchall())
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+    found_set = set(found)
+    return [mid for mid in message_ids if mid in found_set]
+
+
+async def link_memories(links: Dict[str, str]) -> int:
+    """Record the memory each message was ingested into ({message_id: memory_id}).
+
+    Returns:
+        Number of messages updated
+    """
+    if not links:
+        return 0
+    await init_inbox()
+    async with _connect() as db:
+        cursor = await db.executemany(
+            "UPDATE feishu_inbox SET memory_id = ? WHERE message_id = ?",
+            [(memory_id, message_id) for message_id, memory_id in links.items()]
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+async def list_uningested() -> List[Dict[str, Any]]:
+    """Unarchived messages not yet ingested into memory, oldest first.
+
+    Only messages that arrived after ingestion was first enabled count: the
+    seq at that point is recorded on the first call, so turning
+    FEISHU_IM_SAVE_TO_MEMORY on does not ingest the existing backlog. Used at
+    webhook startup to re-buffer messages a stopped or crashed process had
+    not written yet.
+    """
+    await init_inbox()
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        await db.execute(
+            "INSERT OR IGNORE INTO feishu_inbox_meta (key, value) VALUES ('ingest_from', (" + _LAST_SEQ_SQL + "))"
+        )
+        await db.commit()
+        cursor = await db.execute("""
+            SELECT * FROM feishu_inbox
+            WHERE seq > (SELECT value FROM feishu_inbox_meta WHERE key = 'ingest_from')
+              AND archived = 0 AND memory_id IS NULL
+            ORDER BY seq
+        """)
+        return [_row_to_entry(row) for row in await cursor.fetchall()]
+
+
+async def list_by_memory(memory_id: str) -> List[Dict[str, Any]]:
+    """Messages ingested into a memory (hot and compacted), in arrival order."""
+    await init_inbox()
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM feishu_inbox WHERE memory_id = ? ORDER BY seq", (memory_id,)
+        )
+        entries = [_row_to_entry(row) for row in await cursor.fetchall()]
+    entries += await _query_cold("SELECT * FROM feishu_inbox_cold WHERE memory_id = ?", (memory_id,))
+    return sorted(entries, key=lambda entry: entry["seq"] or 0)
+
+
+async def count_messages(archived: bool = False) -> int:
+    """Number of unarchived (or archived) messages, read from the stats table."""
+    await init_inbox()
+    async with _connect() as db:
+        cursor = await db.execute(
+            "SELECT count FROM feishu_inbox_stats WHERE archived = ?", (1 if archived else 0,)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else 0
+
+
+async def list_since(
+    since: int = 0,
+    limit: int = 20,
+    include_archived: bool = False,
+    chat_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Messages that arrived after the seq cursor, oldest first (limit clamped to 1..100)."""
+    await init_inbox()
+    safe_limit = max(1, min(limit, MAX_LIMIT))
+    conditions = ["seq > ?"]
+    args: List[Any] = [since]
+    if not include_archived:
+        conditions.append("archived = 0")
+    if chat_id:
+        conditions.append("chat_id = ?")
+        args.append(chat_id)
+    async with _connect() as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT * FROM feishu_inbox WHERE {' AND '.join(conditions)} ORDER BY seq LIMIT ?",
+            args + [safe_limit]
+        )
+        return [_row_to_entry(row) for row in await cursor.fetchall()]
+
+
+async def latest_seq() -> int:
+    """Cursor of the newest message (0 when the inbox is empty)."""
+    await init_inbox()
+    async with _connect() as db:
+        cursor = await db.execute(_LAST_SEQ_SQL)
+        return (await cursor.fetchone())[0]
+
+
+# ---------- retention and cold store ----------
+
+def _cold_row_to_entry(row: aiosqlite.Row) -> Dict[str, Any]:
+    entry = _row_to_entry(row)
+    entry["chat_id"] = entry["chat_id"] or None
+    entry["compacted"] = True
+    return entry
+
+
+async def _create_cold_schema(db: aiosqlite.Connection, schema: str = "main") -> None:
+    await db.execute(f"PRAGMA {schema}.journal_mode=WAL")
+    # Clustered by chat: a chat's messages share pages, ordered by arrival
+    await db.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.feishu_inbox_cold (
+            chat_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            message_id TEXT NOT NULL,
+            chat_type TEXT,
+            sender_open_id TEXT,
+            sender_union_id TEXT,
+            created_at TEXT NOT NULL,
+            text TEXT,
+            archived INTEGER NOT NULL DEFAULT 0,
+            received_at TEXT,
+            archived_at TEXT,
+            event_id TEXT,
+            memory_id TEXT,
+            compacted_at TEXT,
+            PRIMARY KEY (chat_id, seq, message_id)
+        ) WITHOUT ROWID
+    """)
+    await db.execute(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS {schema}.idx_feishu_inbox_cold_message ON feishu_inbox_cold(message_id)"
+    )
+    await db.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_feishu_inbox_cold_memory ON feishu_inbox_cold(memory_id)"
+    )
+    await db.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_feishu_inbox_cold_created ON feishu_inbox_cold(created_at)"
+    )
+    await db.commit()
+
+
+async def _query_cold(sql: str, args: tuple) -> List[Dict[str, Any]]:
+    """Run a read on the cold store (empty if nothing was compacted yet)."""
+    if not Path(COLD_DB_PATH).exists():
+        return []
+    async with aiosqlite.connect(COLD_DB_PATH, timeout=BUSY_TIMEOUT) as db:
+        db.row_factory = aiosqlite.Row
+        try:
+            cursor = await db.execute(sql, args)
+        except aiosqlite.OperationalError:
+            return []  # Cold file created by another process but its table not yet
+        return [_cold_row_to_entry(row) for row in await cursor.fetchall()]
+
+
+async def list_history(
+    chat_id: str,
+    before: Optional[int] = None,
+    limit: int = 20
+) -> List[Dict[str, Any]]:
+    """A chat's compacted messages, newest first, with seq below the before cursor.
+
+    Reads one contiguous range of the cold store's (chat_id, seq) clustering.
+    """
+    safe_limit = max(1, min(limit, MAX_LIMIT))
+    conditions = ["chat_id = ?"]
+    args: List[Any] = [chat_id or ""]
+    if before is not None:
+        conditions.append("seq < ?")
+        args.append(before)
+    return await _query_cold(
+        f"SELECT * FROM feishu_inbox_cold WHERE {' AND '.join(conditions)} ORDER BY seq DESC LIMIT ?",
+        tuple(args + [safe_limit])
+    )
+
+
+def _cutoff(days: float, now: datetime) -> Optional[str]:
+    return (now - timedelta(days=days)).isoformat() if days and days > 0 else None
+
+
+async def compact(
+    archived_days: Optional[float] = None,
+    unarchived_days: Optional[float] = None,
+    cold_days: Optional[float] = None,
+    batch_size: int = COMPACT_BATCH,
+    now: Optional[datetime] = None
+) -> Dict[str, int]:
+    """Apply the retention policy: move old messages to the cold store, purge old cold ones.
+
+    Args:
+        archived_days: Move archived messages archived longer ago than this
+            (default ARCHIVED_RETENTION_DAYS; 0 disables)
+        unarchived_days: Move unarchived messages received longer ago than this
+            (default UNARCHIVED_RETENTION_DAYS; 0 disables)
+        cold_days: Delete cold messages created longer ago than this
+            (default COLD_RETENTION_DAYS; 0 keeps them forever)
+        batch_size: Messages moved per transaction
+        now: Reference time (tests)
+
+    Expired event claims are deleted as well.
+
+    Returns:
+        {"moved": ..., "purged": ..., "claims_expired": ...}
+    """
+    await init_inbox()
+    now = now or datetime.now()
+    archived_before = _cutoff(ARCHIVED_RETENTION_DAYS if archived_days is None else archived_days, now)
+    unarchived_before = _cutoff(UNARCHIVED_RETENTION_DAYS if unarchived_days is None else unarchived_days, now)
+    cold_before = _cutoff(COLD_RETENTION_DAYS if cold_days is None else cold_days, now)
+    batch_size = max(1, batch_size)
+
+    selects = []
+    if archived_before:
+        selects.append(("SELECT message_id FROM feishu_inbox WHERE archived = 1 AND archived_at < ? LIMIT ?",
+                        archived_before))
+    if unarchived_before:
+        selects.append(("SELECT message_id FROM feishu_inbox WHERE archived = 0 AND created_at < ? LIMIT ?",
+                        unarchived_before))
+
+    moved = purged = 0
+    async with _connect() as db:
+        cursor = await db.execute(
+            "DELETE FROM feishu_event_claims WHERE claimed_at < ?", (time.time() - EVENT_CLAIM_TTL,)
+        )
+        await db.commit()
+        claims_expired = cursor.rowcount
+    if not selects and not cold_before:
+        return {"moved": 0, "purged": 0, "claims_expired": claims_expired}
+
+    Path(COLD_DB_PATH).parent.mkdir(parents=True, exist_ok=True)
+    hot_columns = ", ".join(INBOX_COLUMNS)
+    cold_values = ", ".join(
+        "COALESCE(chat_id, '')" if c == "chat_id" else "COALESCE(seq, 0)" if c == "seq" else c
+        for c in INBOX_COLUMNS
+    )
+    async with _connect() as db:
+        await db.execute("ATTACH DATABASE ? AS cold", (COLD_DB_PATH,))
+        await _create_cold_schema(db, "cold")
+        if archived_before:
+            # Archived before archived_at was recorded: age them from their arrival
+            await db.execute(
+                "UPDATE feishu_inbox SET archived_at = COALESCE(received_at, created_at) "
+                "WHERE archived = 1 AND archived_at IS NULL"
+            )
+            await db.commit()
+
+        for select, cutoff in selects:
+            while True:
+                await db.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor = await db.execute(select, (cutoff, batch_size))
+                    ids = [row[0] for row in await cursor.fetchall()]
+                    if ids:
+                        placeholders = ", ".join("?" for _ in ids)
+                        # Keep the seq high-water mark before the newest rows may leave
+                        await db.execute(
+                            "INSERT INTO feishu_inbox_meta (key, value) VALUES ('last_seq', (" + _LAST_SEQ_SQL + ")) "
+                            "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)"
+                        )
+                        await db.execute(
+                            f"INSERT OR IGNORE INTO cold.feishu_inbox_cold ({hot_columns}, compacted_at) "
+                            f"SELECT {cold_values}, ? FROM feishu_inbox WHERE message_id IN ({placeholders})",
+                            [now.isoformat()] + ids
+                        )
+                        await db.execute(f"DELETE FROM feishu_inbox WHERE message_id IN ({placeholders})", ids)
+                    await db.commit()
+                except BaseException:
+                    await db.rollback()
+                    raise
+                moved += len(ids)
+                if len(ids) < batch_size:
+                    break
+
+        if cold_before:
+            while True:
+                cursor = await db.execute(
+                    "DELETE FROM cold.feishu_inbox_cold WHERE message_id IN ("
+                    "SELECT message_id FROM cold.feishu_inbox_cold WHERE created_at < ? LIMIT ?)",
+                    (cold_before, batch_size)
+                )
+                await db.commit()
+                purged += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+    return {"moved": moved, "purged": purged, "claims_expired": claims_expired}
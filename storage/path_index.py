@@ -0,0 +1,135 @@
+"""Local index of Feishu drive folders and wiki nodes.
+
+Tables are created by storage.db.init_db():
+- feishu_path_index: one row per file/folder/node with its parent and path
+- feishu_path_index_listed: containers whose children were fully listed
+
+A scope separates trees ("drive:<identity>:<root token>", "wiki:<space id>").
+Children of a container are served locally while its listing is younger
+than max_age seconds; after that the container is listed again. Writes made
+through FeishuClient (create, move, delete) invalidate the affected
+listings right away.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import aiosqlite
+
+from storage.db import DB_PATH
+
+# Columns stored directly; everything else in an entry goes to the data JSON
+_COLUMNS = ("token", "parent_token", "path", "name", "obj_type", "has_child")
+
+
+def _row_to_entry(row: aiosqlite.Row) -> Dict[str, Any]:
+    entry = json.loads(row["data"]) if row["data"] else {}
+    entry.update({key: row[key] for key in _COLUMNS})
+    entry["has_child"] = bool(entry["has_child"])
+    return entry
+
+
+async def get_children(scope: str, parent_token: str, max_age: float) -> Optional[List[Dict[str, Any]]]:
+    """Children of a container, or None if it was never listed or the listing is stale."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT listed_at FROM feishu_path_index_listed WHERE scope = ? AND token = ?",
+            (scope, parent_token)
+        )
+        row = await cursor.fetchone()
+        if not row or time.time() - row["listed_at"] > max_age:
+            return None
+        cursor = await db.execute(
+            "SELECT * FROM feishu_path_index WHERE scope = ? AND parent_token = ? ORDER BY rowid",
+            (scope, parent_token)
+        )
+        return [_row_to_entry(r) for r in await cursor.fetchall()]
+
+
+async def save_children(scope: str, parent_token: str, entries: List[Dict[str, Any]]) -> None:
+    """Replace the stored children of a container and mark it as listed now."""
+    now = time.time()
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "DELETE FROM feishu_path_index WHERE scope = ? AND parent_token = ?",
+            (scope, parent_token)
+        )
+        await db.executemany("""
+            INSERT OR REPLACE INTO feishu_path_index
+                (scope, token, parent_token, path, name, obj_type, has_child, data, indexed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                scope,
+                entry["token"],
+                parent_token,
+                entry["path"],
+                entry.get("name"),
+                entry.get("obj_type"),
+                int(bool(entry.get("has_child"))),
+                json.dumps({k: v for k, v in entry.items() if k not in _COLUMNS}, ensure_ascii=False),
+                now
+            )
+            for entry in entries
+        ])
+        await db.execute("""
+            INSERT INTO feishu_path_index_listed (scope, token, listed_at) VALUES (?, ?, ?)
+            ON CONFLICT(scope, token) DO UPDATE SET listed_at = excluded.listed_at
+        """, (scope, parent_token, now))
+        await db.commit()
+
+
+async def get_by_path(scope: str, path: str, max_age: float) -> Optional[Dict[str, Any]]:
+    """Look up an entry by its path ("/A/B") within a scope, if indexed recently."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            "SELECT * FROM feishu_path_index WHERE scope = ? AND path = ? AND indexed_at >= ?",
+            (scope, path, time.time() - max_age)
+        )
+        row = await cursor.fetchone()
+        return _row_to_entry(row) if row else None
+
+
+async def invalidate(token: str, scope: Optional[str] = None) -> int:
+    """Mark a container's listing stale (in every scope unless one is given).
+
+    Returns:
+        Number of listings invalidated
+    """
+    sql = "DELETE FROM feishu_path_index_listed WHERE token = ?"
+    args: tuple = (token,)
+    if scope is not None:
+        sql += " AND scope = ?"
+        args += (scope,)
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(sql, args)
+        await db.commit()
+        return cursor.rowcount
+
+
+async def invalidate_parents(token: str) -> int:
+    """Mark stale the listings of every container that holds this entry."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("""
+            DELETE FROM feishu_path_index_listed
+            WHERE (scope, token) IN (
+                SELECT scope, parent_token FROM feishu_path_index WHERE token = ?
+            )
+        """, (token,))
+        await db.commit()
+        return cursor.rowcount
+
+
+async def invalidate_drive_roots(identity: str) -> int:
+    """Mark stale the root listing of every drive scope of an identity
+    (a file created without a folder lands in the identity's root folder)."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "DELETE FROM feishu_path_index_listed WHERE scope = 'drive:' || ? || ':' || token",
+            (identity,)
+        )
+        await db.commit()
+        return cursor.rowcount
@@ -0,0 +1,109 @@
+"""Feishu sync state: per-memory record mapping and sync watermarks.
+
+Tables are created by storage.db.init_db():
+- feishu_sync_state: memory_id -> Feishu record_id and the hash of the last pushed fields
+- sync_meta: key/value store for watermarks and checkpoints
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import aiosqlite
+
+from storage.db import DB_PATH
+
+# sync_meta keys
+PUSH_WATERMARK_KEY = "feishu_push_watermark"
+PULL_WATERMARK_KEY = "feishu_pull_watermark"
+
+
+def fields_hash(fields: Dict) -> str:
+    """Stable hash of a record's field values (key order independent)."""
+    payload = json.dumps(fields, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+async def get_sync_meta(key: str) -> Optional[str]:
+    """Read a value from sync_meta."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT value FROM sync_meta WHERE key = ?", (key,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def set_sync_meta(key: str, value: Optional[str]) -> None:
+    """Write a value to sync_meta (None deletes the key)."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        if value is None:
+            await db.execute("DELETE FROM sync_meta WHERE key = ?", (key,))
+        else:
+            await db.execute("""
+                INSERT INTO sync_meta (key, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, (key, value, datetime.now().isoformat()))
+        await db.commit()
+
+
+async def get_sync_states(memory_ids: Iterable[str]) -> Dict[str, dict]:
+    """Get sync state rows for the given memory IDs, keyed by memory_id."""
+    ids = list(memory_ids)
+    states: Dict[str, dict] = {}
+    if not ids:
+        return states
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        # SQLite limits bound parameters per statement; query in chunks
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor = await db.execute(
+                f"SELECT * FROM feishu_sync_state WHERE memory_id IN ({placeholders})",
+                chunk
+            )
+            for row in await cursor.fetchall():
+                states[row["memory_id"]] = dict(row)
+    return states
+
+
+async def upsert_sync_states(rows: List[dict]) -> None:
+    """Insert or update sync state rows in one transaction.
+
+    Each row needs memory_id and may carry record_id, fields_hash and
+    memory_updated_at. A missing/None record_id keeps the stored one.
+    """
+    if not rows:
+        return
+    now = datetime.now().isoformat()
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.executemany("""
+            INSERT INTO feishu_sync_state (memory_id, record_id, fields_hash, memory_updated_at, synced_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(memory_id) DO UPDATE SET
+                record_id = COALESCE(excluded.record_id, feishu_sync_state.record_id),
+                fields_hash = excluded.fields_hash,
+                memory_updated_at = excluded.memory_updated_at,
+                synced_at = excluded.synced_at
+        """, [
+            (
+                row["memory_id"],
+                row.get("record_id"),
+                row.get("fields_hash"),
+                row.get("memory_updated_at"),
+                now
+            )
+            for row in rows
+        ])
+        await db.commit()
+
+
+async def delete_sync_states(memory_ids: Iterable[str]) -> None:
+    """Forget the sync state of deleted records."""
+    ids = [(memory_id,) for memory_id in memory_ids]
+    if not ids:
+        return
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.executemany("DELETE FROM feishu_sync_state WHERE memory_id = ?", ids)
+        await db.commit()
@@ -11,7 +11,8 @@ from datetime import datetime
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from sync.sync_to_feishu import sync_all_memories
+from sync.sync_to_feishu import sync_all_memories, sync_delta
+from sync.sync_from_feishu import pull_delta
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -20,25 +21,45 @@ load_dotenv()
 # 获取同步间隔（秒）
 SYNC_INTERVAL = int(os.getenv("SYNC_INTERVAL", "3600"))  # 默认1小时
 
+# 同步模式：delta（双向增量，默认）或 full（全量推送）
+SYNC_MODE = os.getenv("SYNC_MODE", "delta")
 
-async def sync_loop():
+
+async def run_sync(mode: str = SYNC_MODE):
+    """执行一次同步"""
+    if mode == "full":
+        await sync_all_memories(dry_run=False)
+    else:
+        # 先拉取飞书端的修改，再推送本地变化（拉取的内容已记录同步状态，不会被推回）
+        try:
+            pulled = await pull_delta()
+            print(f"   拉取 {pulled['pulled']} 条飞书端修改")
+        except Exception as e:
+            print(f"⚠️ 拉取飞书端修改失败，继续推送: {e}")
+        stats = await sync_delta()
+        print(f"   新增 {stats['created']} 条，更新 {stats['updated']} 条，"
+              f"未变化 {stats['unchanged']} 条，失败 {stats['failed']} 条")
+
+
+async def sync_loop(interval: int = SYNC_INTERVAL, mode: str = SYNC_MODE):
     """同步循环"""
     print("=" * 60)
     print("🔄 自动同步服务启动")
     print("=" * 60)
-    print(f"同步间隔: {SYNC_INTERVAL} 秒 ({SYNC_INTERVAL // 60} 分钟)")
+    print(f"同步间隔: {interval} 秒 ({interval // 60} 分钟)")
+    print(f"同步模式: {mode}")
     print(f"按 Ctrl+C 停止")
     print()
     
     while True:
         try:
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始同步...")
-            await sync_all_memories(dry_run=False)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 同步完成，等待 {SYNC_INTERVAL} 秒...")
+            await run_sync(mode)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 同步完成，等待 {interval} 秒...")
             print()
             
             # 等待指定时间
-            await asyncio.sleep(SYNC_INTERVAL)
+            await asyncio.sleep(interval)
             
         except KeyboardInterrupt:
             print()
@@ -48,8 +69,8 @@ async def sync_loop():
             break
         except Exception as e:
             print(f"❌ 同步出错: {e}")
-            print(f"   等待 {SYNC_INTERVAL} 秒后重试...")
-            await asyncio.sleep(SYNC_INTERVAL)
+            print(f"   等待 {interval} 秒后重试...")
+            await asyncio.sleep(interval)
 
 
 async def main():
@@ -63,6 +84,12 @@ async def main():
         help=f"同步间隔（秒），默认 {SYNC_INTERVAL}",
         default=SYNC_INTERVAL
     )
+    parser.add_argument(
+        "--mode",
+        choices=["delta", "full"],
+        help=f"同步模式，默认 {SYNC_MODE}",
+        default=SYNC_MODE
+    )
     parser.add_argument(
         "--once",
         action="store_true",
@@ -73,12 +100,10 @@ async def main():
     
     if args.once:
         # 只同步一次
-        await sync_all_memories(dry_run=False)
+        await run_sync(args.mode)
     else:
         # 循环同步
-        global SYNC_INTERVAL
-        SYNC_INTERVAL = args.interval
-        await sync_loop()
+        await sync_loop(interval=args.interval, mode=args.mode)
 
 
 if __name__ == "__main__":
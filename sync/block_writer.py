@@ -0,0 +1,149 @@
+"""飞书文档块分片写入
+
+把 Markdown 转换出的块按接口上限（每次最多 50 个子块）切成分片，按顺序写入：
+- 每个分片带固定的 client_token，超时等瞬时错误重试时不会重复插入
+- 使用上一次写入返回的 document_revision_id，不需要每批额外获取文档版本
+- 请求经过共享限流器，不需要手动 sleep
+- 失败时记录已确认写入的分片，调用 resume() 从下一个分片继续
+- 可以传入块的迭代器（如 iter_markdown_blocks），边转换边上传
+
+同一父块下的插入位置依赖前一个分片的结果，分片之间必须按顺序写入；
+多个文档同时写入时由共享限流器统一控制总速率。
+"""
+
+import asyncio
+import uuid
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sync.rate_limiter import backoff_delay
+
+# 创建子块接口单次最多块数
+DOCX_MAX_CHILDREN_PER_CALL = 50
+
+# 单个分片遇到瞬时错误时的最多尝试次数
+CHUNK_MAX_ATTEMPTS = 3
+
+
+class BlockWriteError(Exception):
+    """分片写入失败；written 为已确认写入的块数，可通过 BlockWriter.resume() 继续
+
+    total 为块总数；传入的迭代器尚未读完时为 None。
+    """
+
+    def __init__(self, message: str, written: int, total: Optional[int], cause: Optional[Exception] = None):
+        super().__init__(message)
+        self.written = written
+        self.total = total
+        self.cause = cause
+
+
+def _is_transient(error: Exception) -> bool:
+    """超时、连接失败、服务端错误可以重试；参数和权限错误不重试"""
+    status_code = getattr(error, "status_code", None)
+    return status_code is None or status_code >= 500
+
+
+class BlockWriter:
+    """按顺序分片写入文档块
+
+    Args:
+        client: FeishuClient
+        document_id: 文档 ID
+        parent_block_id: 父块 ID，默认根块
+        use_user_token: 是否使用用户身份 token
+        chunk_size: 每次请求的块数（不超过 DOCX_MAX_CHILDREN_PER_CALL）
+    """
+
+    def __init__(
+        self,
+        client,
+        document_id: str,
+        parent_block_id: Optional[str] = None,
+        use_user_token: bool = False,
+        chunk_size: int = DOCX_MAX_CHILDREN_PER_CALL
+    ):
+        self.client = client
+        self.document_id = document_id
+        self.parent_block_id = parent_block_id or document_id
+        self.use_user_token = use_user_token
+        self.chunk_size = max(1, min(chunk_size, DOCX_MAX_CHILDREN_PER_CALL))
+        self.revision_id = -1
+        self.written = 0
+        self._blocks: List[Dict[str, Any]] = []
+        self._source: Optional[Iterator[Dict[str, Any]]] = None
+        self._index: Optional[int] = None
+        self._tokens: Dict[int, str] = {}
+
+    async def write(self, blocks: Iterable[Dict[str, Any]], index: Optional[int] = None) -> int:
+        """从头写入一组块
+
+        Args:
+            blocks: 要插入的块（列表或迭代器，迭代器按分片逐步读取）
+            index: 插入位置（None 表示追加到末尾）
+
+        Returns:
+            写入的块数
+
+        Raises:
+            BlockWriteError: 某个分片写入失败（之前的分片已写入）
+        """
+        if isinstance(blocks, list):
+            self._blocks, self._source = blocks, None
+        else:
+            self._blocks, self._source = [], iter(blocks)
+        self._index = index
+        self._tokens = {}
+        self.written = 0
+        return await self.resume()
+
+    async def resume(self) -> int:
+        """从最后确认写入的分片之后继续写入"""
+        endpoint = f"/docx/v1/documents/{self.document_id}/blocks/{self.parent_block_id}/children"
+        while True:
+            start = self.written
+            self._fill(start + self.chunk_size)
+            chunk = self._blocks[start:start + self.chunk_size]
+            if not chunk:
+                break
+            # 同一分片重试时使用同一个 client_token，服务端据此去重
+            client_token = self._tokens.setdefault(start, str(uuid.uuid4()))
+            data: Dict[str, Any] = {"children": chunk}
+            if self._index is not None:
+                data["index"] = self._index + start
+
+            attempt = 0
+            while True:
+                try:
+                    result = await self.client._request(
+                        "POST",
+                        endpoint,
+                        params={"document_revision_id": self.revision_id, "client_token": client_token},
+                        data=data,
+                        use_user_token=self.use_user_token
+                    )
+                    break
+                except Exception as e:
+                    attempt += 1
+                    if not _is_transient(e) or attempt >= CHUNK_MAX_ATTEMPTS:
+                        raise BlockWriteError(
+                            f"写入第 {start + 1}-{start + len(chunk)} 个块失败: {e}",
+                            written=self.written,
+                            total=None if self._source is not None else len(self._blocks),
+                            cause=e
+                        )
+                    await asyncio.sleep(backoff_delay(attempt - 1))
+
+            self.revision_id = result.get("data", {}).get("document_revision_id", self.revision_id)
+            self.written = start + len(chunk)
+        return self.written
+
+    def _fill(self, size: int):
+        """从迭代器读取块，直到缓存中至少有 size 个或迭代器读完（已读取的块保留用于续写）"""
+        if self._source is None or len(self._blocks) >= size:
+            return
+        wanted = size - len(self._blocks)
+        batch = list(islice(self._source, wanted))
+        self._blocks.extend(batch)
+        if len(batch) < wanted:
+            self._source = None
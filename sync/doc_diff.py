@@ -0,0 +1,130 @@
+"""飞书文档块级差异
+
+把文档根块下现有的子块与 Markdown 转换出的新块逐块比较（按内容哈希），
+生成最少的删除 / 插入 / 更新操作，代替“删除全部再重建”：
+- 未变化的块保持原样（评论、协作者的修改都保留）
+- 只改了文字的块用 update_text_elements 原地更新
+- 其余变化用按区间删除和在指定位置插入完成
+
+操作按从后往前的顺序生成，前面的索引不会因为后面的操作而失效。
+"""
+
+import difflib
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+
+# block_type -> 块内容所在字段
+BLOCK_PAYLOAD_KEYS: Dict[int, str] = {
+    2: "text",
+    **{2 + level: f"heading{level}" for level in range(1, 10)},
+    12: "bullet",
+    13: "ordered",
+    14: "code",
+    15: "quote",
+    17: "todo",
+    22: "divider",
+}
+
+# 可以用 update_text_elements 原地更新文字的块类型
+TEXT_UPDATABLE_TYPES = {2, *range(3, 12), 12, 13, 14, 15, 17}
+
+# 行内样式：转换器使用的名称 -> 接口返回的名称
+_STYLE_ALIASES = {"strikeThrough": "strikethrough", "codeInline": "inline_code"}
+_STYLE_KEYS = ("bold", "italic", "strikethrough", "underline", "inline_code")
+
+
+def _normalize_element(element: Dict[str, Any]) -> Any:
+    """只保留影响显示的部分：文字和开启的样式"""
+    text_run = element.get("text_run")
+    if text_run is None:
+        # 提及、公式等其他元素按原样比较
+        return json.dumps(element, ensure_ascii=False, sort_keys=True)
+    style = {
+        _STYLE_ALIASES.get(key, key): value
+        for key, value in (text_run.get("text_element_style") or {}).items()
+    }
+    flags = [key for key in _STYLE_KEYS if style.get(key)]
+    link = (style.get("link") or {}).get("url")
+    return [text_run.get("content", ""), flags, link]
+
+
+def _block_parts(block: Dict[str, Any]) -> Tuple[List[Any], List[Any]]:
+    """拆成 (块属性, 文字元素) 两部分，分别用于判断能否原地更新和内容是否相同"""
+    block_type = block.get("block_type")
+    payload = block.get(BLOCK_PAYLOAD_KEYS.get(block_type, ""), {}) or {}
+    style = payload.get("style") or {}
+    attributes = [
+        block_type,
+        payload.get("language") or style.get("language"),
+        bool(style.get("done") or payload.get("done")),
+        # 有子块的块（如表格、分栏）不做原地更新
+        bool(block.get("children")),
+    ]
+    elements = [_normalize_element(e) for e in payload.get("elements", [])]
+    return attributes, elements
+
+
+def block_signature(block: Dict[str, Any]) -> str:
+    """块内容哈希（与块 ID、默认样式等无关）"""
+    attributes, elements = _block_parts(block)
+    payload = json.dumps([attributes, elements], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _can_update_in_place(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    if old.get("block_type") not in TEXT_UPDATABLE_TYPES or not old.get("block_id"):
+        return False
+    return _block_parts(old)[0] == _block_parts(new)[0]
+
+
+def plan_block_diff(
+    old_blocks: List[Dict[str, Any]],
+    new_blocks: List[Dict[str, Any]]
+) -> List[Tuple]:
+    """计算把 old_blocks 变成 new_blocks 的操作
+
+    Args:
+        old_blocks: 根块下现有的子块（按顺序，含 block_id）
+        new_blocks: 新内容转换出的块
+
+    Returns:
+        操作列表（已按从后往前排序）：
+        - ("delete", start_index, end_index)
+        - ("insert", index, blocks)
+        - ("update", block_id, elements)
+    """
+    old_sigs = [block_signature(b) for b in old_blocks]
+    new_sigs = [block_signature(b) for b in new_blocks]
+    matcher = difflib.SequenceMatcher(None, old_sigs, new_sigs, autojunk=False)
+
+    ops: List[Tuple] = []
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == "equal":
+            continue
+        if tag == "replace" and i2 - i1 == j2 - j1 and all(
+            _can_update_in_place(old_blocks[i], new_blocks[j])
+            for i, j in zip(range(i1, i2), range(j1, j2))
+        ):
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                payload_key = BLOCK_PAYLOAD_KEYS[new_blocks[j]["block_type"]]
+                ops.append(("update", old_blocks[i]["block_id"], new_blocks[j][payload_key]["elements"]))
+            continue
+        if tag in ("delete", "replace"):
+            ops.append(("delete", i1, i2))
+        if tag in ("insert", "replace"):
+            ops.append(("insert", i1, new_blocks[j1:j2]))
+    return ops
+
+
+def summarize_ops(ops: List[Tuple]) -> Dict[str, int]:
+    """统计各类操作涉及的块数"""
+    summary = {"deleted": 0, "inserted": 0, "updated": 0}
+    for op in ops:
+        if op[0] == "delete":
+            summary["deleted"] += op[2] - op[1]
+        elif op[0] == "insert":
+            summary["inserted"] += len(op[2])
+        else:
+            summary["updated"] += 1
+    return summary
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""飞书文档本地全文索引
+
+从云空间文件夹和知识库中找出文档（docx），读取文档块转成纯文本，
+写入 memory.db 中的 FTS5 表（storage.doc_index），供 knowledge_search 与记忆一起检索。
+
+按 revision_id 增量索引：每个文档先获取元信息（一次小请求），版本未变的直接跳过。
+
+用法：
+    python sync/doc_indexer.py [--folder TOKEN] [--wiki-space ID ...] [--interval 秒]
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuClient, get_feishu_client
+from sync.drive_walker import walk_drive, walk_wiki
+from sync.markdown_blocks import blocks_to_text
+from storage.db import init_db
+from storage.doc_index import get_indexed_revisions, upsert_document, delete_documents
+
+# 默认索引的云空间文件夹和知识库空间（逗号分隔）；都未设置时索引用户的“我的空间”
+DOC_INDEX_FOLDER_TOKEN = os.getenv("FEISHU_DOC_INDEX_FOLDER_TOKEN")
+DOC_INDEX_WIKI_SPACES = [s for s in os.getenv("FEISHU_DOC_INDEX_WIKI_SPACES", "").split(",") if s]
+
+# 遍历深度和并发读取文档数量
+DOC_INDEX_MAX_DEPTH = int(os.getenv("FEISHU_DOC_INDEX_MAX_DEPTH", "5"))
+DOC_INDEX_CONCURRENCY = int(os.getenv("FEISHU_DOC_INDEX_CONCURRENCY", "4"))
+
+# 后台索引间隔（秒）
+DOC_INDEX_INTERVAL = int(os.getenv("FEISHU_DOC_INDEX_INTERVAL", "3600"))
+
+
+async def discover_documents(
+    client: FeishuClient,
+    folder_token: Optional[str] = None,
+    wiki_spaces: Optional[List[str]] = None,
+    use_user_token: bool = False,
+    max_depth: int = DOC_INDEX_MAX_DEPTH
+) -> Dict[str, Dict[str, str]]:
+    """找出要索引的文档
+
+    Returns:
+        document_id -> {"title", "url", "source"}
+    """
+    documents: Dict[str, Dict[str, str]] = {}
+
+    if folder_token is not None:
+        async for entry in walk_drive(client, folder_token, max_depth=max_depth, use_user_token=use_user_token):
+            if entry["obj_type"] == "docx":
+                documents[entry["token"]] = {
+                    "title": entry["name"],
+                    "url": entry.get("url") or f"https://my.feishu.cn/docx/{entry['token']}",
+                    "source": f"drive:{entry['path']}",
+                }
+
+    for space_id in wiki_spaces or []:
+        async for node in walk_wiki(client, space_id, max_depth=max_depth):
+            if node["obj_type"] == "docx" and node.get("obj_token"):
+                documents[node["obj_token"]] = {
+                    "title": node["name"],
+                    "url": f"https://my.feishu.cn/wiki/{node['token']}",
+                    "source": f"wiki:{space_id}{node['path']}",
+                }
+    return documents
+
+
+async def index_documents(
+    client: FeishuClient,
+    documents: Dict[str, Dict[str, str]],
+    use_user_token: bool = False,
+    concurrency: int = DOC_INDEX_CONCURRENCY,
+    prune: bool = False,
+    verbose: bool = True
+) -> Dict[str, int]:
+    """按 revision_id 增量索引文档
+
+    Args:
+        client: 飞书客户端
+        documents: discover_documents 的结果
+        use_user_token: 是否使用用户身份 token
+        concurrency: 并发读取的文档数量
+        prune: 是否删除索引中不在 documents 里的文档（完整发现后使用）
+        verbose: 是否打印每个文档的结果
+
+    Returns:
+        统计 {"indexed", "unchanged", "failed", "removed"}
+    """
+    await init_db()
+    indexed_revisions = await get_indexed_revisions()
+    stats = {"indexed": 0, "unchanged": 0, "failed": 0, "removed": 0}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def index_one(document_id: str, info: Dict[str, str]):
+        async with semaphore:
+            try:
+                meta = await client.get_document_meta(document_id, use_user_token=use_user_token)
+                revision_id = meta.get("revision_id", -1)
+                if revision_id != -1 and indexed_revisions.get(document_id) == revision_id:
+                    stats["unchanged"] += 1
+                    return
+                document = await client.load_document(document_id, use_user_token=use_user_token, meta=meta)
+                await upsert_document(
+                    document_id,
+                    revision_id,
+                    document.get("title") or info.get("title"),
+                    blocks_to_text(document["blocks"]),
+                    url=info.get("url"),
+                    source=info.get("source")
+                )
+                stats["indexed"] += 1
+                if verbose:
+                    print(f"   ✅ {document.get('title') or document_id}（版本 {revision_id}）")
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"   ⚠️  索引 {info.get('title') or document_id} 失败: {e}")
+
+    await asyncio.gather(*(index_one(doc_id, info) for doc_id, info in documents.items()))
+
+    if prune:
+        removed = [doc_id for doc_id in indexed_revisions if doc_id not in documents]
+        await delete_documents(removed)
+        stats["removed"] = len(removed)
+    return stats
+
+
+async def run_index(
+    folder_token: Optional[str] = DOC_INDEX_FOLDER_TOKEN,
+    wiki_spaces: Optional[List[str]] = None,
+    use_user_token: bool = True
+) -> Dict[str, int]:
+    """发现并增量索引一轮文档"""
+    client = get_feishu_client()
+    await init_db()
+    wiki_spaces = DOC_INDEX_WIKI_SPACES if wiki_spaces is None else wiki_spaces
+    if folder_token is None and not wiki_spaces:
+        root_info = await client.get_root_folder_meta(use_user_token=use_user_token)
+        folder_token = root_info.get("token")
+
+    documents = await discover_documents(
+        client, folder_token=folder_token, wiki_spaces=wiki_spaces, use_user_token=use_user_token
+    )
+    print(f"📄 发现 {len(documents)} 个文档")
+    return await index_documents(client, documents, use_user_token=use_user_token, prune=True)
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="索引飞书文档，供 knowledge_search 本地全文检索")
+    parser.add_argument("--folder", help="云空间文件夹 token（默认 FEISHU_DOC_INDEX_FOLDER_TOKEN 或我的空间）")
+    parser.add_argument("--wiki-space", action="append", help="知识库空间 ID，可重复")
+    parser.add_argument("--tenant", action="store_true", help="使用应用身份（默认使用用户身份）")
+    parser.add_argument("--interval", type=int, default=0,
+                        help=f"后台运行时的索引间隔（秒），0 表示只运行一次；建议 {DOC_INDEX_INTERVAL}")
+    args = parser.parse_args()
+
+    while True:
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 开始索引飞书文档...")
+        try:
+            stats = await run_index(
+                folder_token=args.folder or DOC_INDEX_FOLDER_TOKEN,
+                wiki_spaces=args.wiki_space,
+                use_user_token=not args.tenant
+            )
+            print(f"📊 索引完成: 更新 {stats['indexed']} 个，未变化 {stats['unchanged']} 个，"
+                  f"失败 {stats['failed']} 个，移除 {stats['removed']} 个")
+        except Exception as e:
+            print(f"❌ 索引出错: {e}")
+        if not args.interval:
+            break
+        await asyncio.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+"""飞书云空间文件夹树和知识库节点树的并发遍历
+
+- 固定数量的协程并发列出各个文件夹 / 节点的子项（每个文件夹完整分页），
+  请求经过共享限流器
+- 结果以异步迭代器的形式按到达顺序产出，调用方可以边遍历边处理，找到目标后提前结束
+- 列出的子项写入本地路径索引（storage.path_index），在 PATH_INDEX_TTL 秒内
+  再次遍历同一文件夹直接读取本地索引，不再请求飞书
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from storage import path_index
+
+# 并发列出文件夹的协程数量
+WALK_CONCURRENCY = int(os.getenv("FEISHU_WALK_CONCURRENCY", "4"))
+
+# 路径索引有效期（秒）
+PATH_INDEX_TTL = float(os.getenv("FEISHU_PATH_INDEX_TTL", "600"))
+
+ListChildren = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+
+
+def drive_scope(root_token: str, use_user_token: bool = False) -> str:
+    """云空间索引范围（应用身份和用户身份看到的文件不同，分开保存）"""
+    return f"drive:{'user' if use_user_token else 'tenant'}:{root_token}"
+
+
+def wiki_scope(space_id: str) -> str:
+    """知识库索引范围"""
+    return f"wiki:{space_id}"
+
+
+def _drive_entry(file: Dict[str, Any]) -> Dict[str, Any]:
+    file_type = file.get("type")
+    return {
+        "token": file.get("token"),
+        "name": file.get("name"),
+        "obj_type": file_type,
+        "has_child": file_type == "folder",
+        "url": file.get("url"),
+        "created_time": file.get("created_time"),
+        "modified_time": file.get("modified_time"),
+    }
+
+
+def _wiki_entry(node: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "token": node.get("node_token"),
+        "name": node.get("title"),
+        "obj_type": node.get("obj_type"),
+        "obj_token": node.get("obj_token"),
+        "has_child": bool(node.get("has_child")),
+    }
+
+
+async def _walk(
+    scope: str,
+    root_token: str,
+    list_children: ListChildren,
+    max_depth: int,
+    concurrency: int,
+    max_age: float,
+    stats: Optional[Dict[str, int]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """按层并发遍历，产出每个子项（带 path、parent_token、depth）"""
+    if stats is None:
+        stats = {}
+    stats.setdefault("listed", 0)
+    stats.setdefault("cached", 0)
+
+    containers: asyncio.Queue = asyncio.Queue()
+    entries: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    pending = 1
+    containers.put_nowait((root_token, "", 1))
+
+    async def worker():
+        nonlocal pending
+        while True:
+            token, path, depth = await containers.get()
+            try:
+                children = await path_index.get_children(scope, token, max_age)
+                if children is None:
+                    children = await list_children(token)
+                    for child in children:
+                        child["path"] = f"{path}/{child['name']}"
+                    await path_index.save_children(scope, token, children)
+                    stats["listed"] += 1
+                else:
+                    stats["cached"] += 1
+                for child in children:
+                    child["parent_token"] = token
+                    child["depth"] = depth
+                    await entries.put(child)
+                    if child["has_child"] and depth < max_depth:
+                        pending += 1
+                        containers.put_nowait((child["token"], child["path"], depth + 1))
+            except Exception as e:
+                if token == root_token:
+                    # 起始目录都列不出来（如没有权限）时把错误交给调用方
+                    await entries.put(e)
+                else:
+                    print(f"⚠️  列出 {path or '/'} 失败，跳过该目录: {e}")
+            finally:
+                pending -= 1
+                if pending == 0:
+                    await entries.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        while True:
+            entry = await entries.get()
+            if entry is None:
+                return
+            if isinstance(entry, Exception):
+                raise entry
+            yield entry
+    finally:
+        # 遍历完成或调用方提前结束时停止所有协程
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def walk_drive(
+    client,
+    root_token: str,
+    max_depth: int = 5,
+    use_user_token: bool = False,
+    concurrency: int = WALK_CONCURRENCY,
+    max_age: float = PATH_INDEX_TTL,
+    stats: Optional[Dict[str, int]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """遍历云空间文件夹树
+
+    Args:
+        client: FeishuClient
+        root_token: 起始文件夹 token
+        max_depth: 最多列出的层数（1 表示只列出起始文件夹）
+        use_user_token: 是否使用用户身份 token
+        concurrency: 并发列出文件夹的协程数量
+        max_age: 本地索引有效期（秒），0 表示强制刷新
+        stats: 可选，遍历后写入 {"listed": 请求飞书的文件夹数, "cached": 使用索引的文件夹数}
+
+    Yields:
+        子项 {"token", "name", "obj_type", "has_child", "path", "parent_token", "depth", "url", ...}
+    """
+    async def list_children(folder_token: str) -> List[Dict[str, Any]]:
+        return [
+            _drive_entry(file)
+            async for file in client.iter_folder_files(folder_token, use_user_token=use_user_token)
+        ]
+
+    scope = drive_scope(root_token, use_user_token)
+    return _walk(scope, root_token, list_children, max_depth, concurrency, max_age, stats)
+
+
+def walk_wiki(
+    client,
+    space_id: str,
+    max_depth: int = 5,
+    concurrency: int = WALK_CONCURRENCY,
+    max_age: float = PATH_INDEX_TTL,
+    stats: Optional[Dict[str, int]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """遍历知识库节点树（参数和产出格式同 walk_drive，节点另带 obj_token）"""
+    async def list_children(node_token: str) -> List[Dict[str, Any]]:
+        parent = None if node_token == space_id else node_token
+        return [_wiki_entry(node) async for node in client.iter_wiki_nodes(space_id, parent_node_token=parent)]
+
+    return _walk(wiki_scope(space_id), space_id, list_children, max_depth, concurrency, max_age, stats)
+
+
+async def find_in_drive(
+    client,
+    root_token: str,
+    name: str,
+    obj_type: Optional[str] = "folder",
+    max_depth: int = 5,
+    use_user_token: bool = False
+) -> Optional[Dict[str, Any]]:
+    """按名称（或以 / 分隔的路径）查找文件夹或文件，找到后立即停止遍历
+
+    路径在索引有效期内直接从本地索引解析。
+    """
+    scope = drive_scope(root_token, use_user_token)
+    if "/" in name:
+        path = "/" + name.strip("/")
+        entry = await path_index.get_by_path(scope, path, PATH_INDEX_TTL)
+        if entry and (obj_type is None or entry.get("obj_type") == obj_type):
+            return entry
+        walker = walk_drive(client, root_token, max_depth=max_depth, use_user_token=use_user_token)
+        try:
+            async for entry in walker:
+                if entry["path"] == path and (obj_type is None or entry["obj_type"] == obj_type):
+                    return entry
+        finally:
+            await walker.aclose()
+        return None
+
+    best = None
+    walker = walk_drive(client, root_token, max_depth=max_depth, use_user_token=use_user_token)
+    try:
+        async for entry in walker:
+            if entry["name"] == name and (obj_type is None or entry["obj_type"] == obj_type):
+                # 并发遍历时结果到达顺序不固定，取层级最浅的匹配
+                if best is None or entry["depth"] < best["depth"]:
+                    best = entry
+                if best["depth"] == 1:
+                    break
+    finally:
+        await walker.aclose()
+    return best
@@ -1,28 +1,105 @@
 """飞书多维表格 API 客户端"""
 
 import os
+import asyncio
+import itertools
+import threading
+import weakref
 import httpx
 import json
-import re
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator, Iterable, Tuple
+from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
+from sync.field_mapping import FieldMapper, TableSchema, convert_memory_to_feishu_fields, field_text
+from sync.rate_limiter import FEISHU_MAX_RETRIES, backoff_delay, get_rate_limiter
+from sync.doc_diff import plan_block_diff, summarize_ops
+from sync.block_writer import BlockWriter, BlockWriteError
+from sync.markdown_blocks import blocks_to_markdown, iter_markdown_blocks, list_blocks, markdown_to_blocks, parse_inline
+from sync.drive_walker import find_in_drive
+from storage.doc_cache import get_cached_document, save_cached_document
+from storage import path_index
+
 # 加载环境变量
 load_dotenv()
 
 # 飞书 API 配置
-FEISHU_API_BASE = "https://open.feishu.cn/open-apis"
+# 可指向本地模拟服务（tests/fake_feishu_server.py）用于离线测试和性能基准
+FEISHU_API_BASE = os.getenv("FEISHU_API_BASE", "https://open.feishu.cn/open-apis").rstrip("/")
 FEISHU_APP_ID = os.getenv("FEISHU_APP_ID")
 FEISHU_APP_SECRET = os.getenv("FEISHU_APP_SECRET")
 FEISHU_APP_TOKEN = os.getenv("FEISHU_APP_TOKEN")
 FEISHU_TABLE_ID = os.getenv("FEISHU_TABLE_ID")
 FEISHU_DEFAULT_FOLDER_TOKEN = os.getenv("FEISHU_DEFAULT_FOLDER_TOKEN")  # 默认文件夹 token（None 表示使用应用身份创建在根目录）
 
+# 表格字段结构缓存时间（秒）
+FEISHU_SCHEMA_TTL = int(os.getenv("FEISHU_SCHEMA_TTL", "600"))
+
+# 频率限制错误码
+RATE_LIMIT_ERROR_CODE = "99991400"
+
+# 多维表格批量创建/更新接口单次最多记录数
+BITABLE_BATCH_SIZE = 500
+
+# records/search 单个过滤条件组最多条件数
+SEARCH_MAX_CONDITIONS = 50
+
+# 文档批量更新接口单次最多块数
+DOCX_MAX_UPDATES_PER_CALL = 200
+
+# 写入记录时表示字段不存在或字段值转换失败的错误码（出现时丢弃缓存的表结构）
+FIELD_SCHEMA_ERROR_CODES = {
+    "1254045",  # FieldNameNotFound
+    "1254060",  # TextFieldConvFail
+    "1254061",  # NumberFieldConvFail
+    "1254062",  # SingleSelectFieldConvFail
+    "1254063",  # MultiSelectFieldConvFail
+    "1254064",  # DatetimeFieldConvFail
+    "1254065",  # CheckboxFieldConvFail
+}
+
+# refresh_token 已过期、被撤销或已使用：只能重新授权，重试没有意义
+REFRESH_TOKEN_INVALID_CODES = {
+    20026,  # refresh_token 无效
+    20037,  # refresh_token 已过期
+    20064,  # refresh_token 已被撤销
+    20073,  # refresh_token 已被使用
+}
+
+# 更新的记录在飞书中已被删除（RecordIdNotFound）
+RECORD_NOT_FOUND_ERROR_CODE = "1254043"
+
 # Token 文件路径
 USER_TOKEN_FILE = Path(__file__).parent.parent / ".user_token.json"
 
+# 共享 HTTP 连接池：httpx.AsyncClient 绑定事件循环，按循环各保留一个
+_HTTP_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_HTTP_CLIENTS_LOCK = threading.Lock()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取当前事件循环共享的 HTTP 客户端（复用连接池）"""
+    loop = asyncio.get_running_loop()
+    with _HTTP_CLIENTS_LOCK:
+        client = _HTTP_CLIENTS.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(30.0, connect=10.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+            )
+            _HTTP_CLIENTS[loop] = client
+        return client
+
+
+async def close_http_client():
+    """关闭当前事件循环的共享 HTTP 客户端（脚本退出前调用）"""
+    loop = asyncio.get_running_loop()
+    with _HTTP_CLIENTS_LOCK:
+        client = _HTTP_CLIENTS.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
 
 class FeishuAPIError(Exception):
     """飞书 API 调用异常"""
@@ -105,94 +182,91 @@ def _handle_api_error(e: Exception, endpoint: str = "") -> FeishuAPIError:
         )
 
 
-class FeishuClient:
-    """飞书多维表格 API 客户端"""
-    
-    def __init__(self):
-        self.app_id = FEISHU_APP_ID
-        self.app_secret = FEISHU_APP_SECRET
-        self.app_token = FEISHU_APP_TOKEN
-        self.table_id = FEISHU_TABLE_ID
-        self.default_folder_token = FEISHU_DEFAULT_FOLDER_TOKEN  # 默认文件夹 token
-        self.access_token: Optional[str] = None
-        self.token_expires_at: Optional[datetime] = None
-        # 用户身份 token
+class RefreshTokenInvalidError(Exception):
+    """refresh_token 已失效，需要重新进行 OAuth 授权"""
+
+
+class FeishuTokenManager:
+    """进程级 token 管理器
+
+    同一进程内所有 FeishuClient 共享一个实例（按 app_id 区分）：
+    - 内存缓存应用身份 token 和用户身份 token，用户 token 文件只加载一次
+    - 刷新请求 single-flight：同一时刻每类 token 只有一个刷新请求在途，并发调用共享结果，
+      避免到期瞬间多个工具调用同时刷新把 refresh_token 用废
+    - 后台任务在过期前主动续期；临近过期的 token 仍然直接返回并触发后台刷新，
+      只有冷启动（没有任何可用 token）时调用方才需要等待
+    """
+
+    # 应用身份 token 剩余不足 30 分钟时接口才会返回新 token，因此提前 30 分钟续期
+    TENANT_REFRESH_MARGIN = 1800
+    # 用户身份 token 提前 10 分钟续期
+    USER_REFRESH_MARGIN = 600
+    # 后台续期失败后的重试间隔（秒），连续失败时指数退避，最长 RENEWAL_MAX_RETRY_DELAY
+    RENEWAL_RETRY_DELAY = 30
+    RENEWAL_MAX_RETRY_DELAY = 1800
+
+    def __init__(self, app_id: str, app_secret: str, token_file: Path = USER_TOKEN_FILE):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.token_file = token_file
+
+        self.tenant_token: Optional[str] = None
+        self.tenant_expires_at: Optional[datetime] = None
         self.user_access_token: Optional[str] = None
         self.user_token_expires_at: Optional[datetime] = None
         self.refresh_token: Optional[str] = None
-        
-        if not all([self.app_id, self.app_secret, self.app_token]):
-            raise ValueError("缺少必要的飞书配置，请检查 .env 文件")
-        
-        # 尝试从文件加载用户 token
-        self._load_user_token()
-    
-    async def get_access_token(self, force_refresh: bool = False) -> str:
-        """获取访问令牌"""
-        # 如果 token 未过期且不强制刷新，直接返回
-        if not force_refresh and self.access_token and self.token_expires_at:
-            if datetime.now() < self.token_expires_at:
-                return self.access_token
-        
-        # 获取新 token
-        url = f"{FEISHU_API_BASE}/auth/v3/tenant_access_token/internal"
-        payload = {
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        
-        timeout = httpx.Timeout(30.0, connect=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("code") != 0:
-                raise Exception(f"获取 token 失败: {data.get('msg')}")
-            
-            self.access_token = data["tenant_access_token"]
-            # token 有效期通常是 2 小时，这里设置 1.5 小时后过期
-            from datetime import timedelta
-            self.token_expires_at = datetime.now() + timedelta(hours=1, minutes=30)
-            
-            return self.access_token
-    
-    def _load_user_token(self):
-        """从文件加载用户身份 token"""
-        if USER_TOKEN_FILE.exists():
-            try:
-                with open(USER_TOKEN_FILE, 'r', encoding='utf-8') as f:
-                    token_data = json.load(f)
 
-                self.user_access_token = token_data.get("access_token")
-                self.refresh_token = token_data.get("refresh_token")
+        self._token_file_mtime: Optional[float] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._renewal_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+        self._load_user_token(verbose=True)
+
+    # ---------- 用户 token 文件 ----------
+
+    def _load_user_token(self, verbose: bool = False):
+        """从文件加载用户身份 token（文件未变化时不重复读取）"""
+        try:
+            mtime = self.token_file.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._token_file_mtime:
+            return
+
+        try:
+            with open(self.token_file, 'r', encoding='utf-8') as f:
+                token_data = json.load(f)
+            self._token_file_mtime = mtime
+
+            self.user_access_token = token_data.get("access_token")
+            self.refresh_token = token_data.get("refresh_token")
 
-                # 计算过期时间
-                from datetime import timedelta
-                # 检查是否有保存的创建时间
-                saved_at = token_data.get("saved_at")
-                expires_in = token_data.get("expires_in", 7200)
+            # 检查是否有保存的创建时间
+            saved_at = token_data.get("saved_at")
+            expires_in = token_data.get("expires_in", 7200)
 
-                if saved_at:
-                    # 如果有保存时间，根据保存时间计算过期时间
-                    saved_time = datetime.fromisoformat(saved_at)
-                    self.user_token_expires_at = saved_time + timedelta(seconds=expires_in)
+            if saved_at:
+                # 如果有保存时间，根据保存时间计算过期时间
+                saved_time = datetime.fromisoformat(saved_at)
+                self.user_token_expires_at = saved_time + timedelta(seconds=expires_in)
 
-                    # 检查是否已过期
-                    if datetime.now() >= self.user_token_expires_at:
+                if datetime.now() >= self.user_token_expires_at:
+                    if verbose:
                         print(f"⚠️  用户 token 已过期，将在首次使用时自动刷新")
-                        self.user_access_token = None  # 标记为需要刷新
-                    else:
-                        remaining = (self.user_token_expires_at - datetime.now()).total_seconds()
-                        print(f"✅ 已从文件加载用户身份 token（剩余 {int(remaining/60)} 分钟）")
-                else:
-                    # 如果没有保存时间，假设是刚保存的（向后兼容）
-                    self.user_token_expires_at = datetime.now() + timedelta(seconds=expires_in - 300)
+                    self.user_access_token = None  # 标记为需要刷新
+                elif verbose:
+                    remaining = (self.user_token_expires_at - datetime.now()).total_seconds()
+                    print(f"✅ 已从文件加载用户身份 token（剩余 {int(remaining/60)} 分钟）")
+            else:
+                # 如果没有保存时间，假设是刚保存的（向后兼容）
+                self.user_token_expires_at = datetime.now() + timedelta(seconds=expires_in - 300)
+                if verbose:
                     print(f"✅ 已从文件加载用户身份 token（假设为最新）")
 
-            except Exception as e:
-                print(f"⚠️  加载用户 token 失败: {e}")
-    
+        except Exception as e:
+            print(f"⚠️  加载用户 token 失败: {e}")
+
     def _save_user_token(self, token_data: Dict[str, Any]):
         """保存用户身份 token 到文件"""
         try:
@@ -202,14 +276,348 @@ class FeishuClient:
                 "saved_at": datetime.now().isoformat()
             }
 
-            with open(USER_TOKEN_FILE, 'w', encoding='utf-8') as f:
+            with open(self.token_file, 'w', encoding='utf-8') as f:
                 json.dump(token_data_with_timestamp, f, indent=2, ensure_ascii=False)
+            # 自己写入的文件不需要再重新加载
+            self._token_file_mtime = self.token_file.stat().st_mtime
 
             expires_in = token_data.get("expires_in", 7200)
-            print(f"💾 用户 token 已保存到: {USER_TOKEN_FILE}")
+            print(f"💾 用户 token 已保存到: {self.token_file}")
             print(f"   有效期: {expires_in} 秒 ({int(expires_in/60)} 分钟)")
         except Exception as e:
             print(f"⚠️  保存用户 token 失败: {e}")
+
+    def _apply_user_token(self, token_data: Dict[str, Any]):
+        self.user_access_token = token_data.get("access_token")
+        # 可能返回新的 refresh_token
+        self.refresh_token = token_data.get("refresh_token", self.refresh_token)
+        expires_in = token_data.get("expires_in", 7200)
+        self.user_token_expires_at = datetime.now() + timedelta(seconds=expires_in)
+        self._save_user_token(token_data)
+
+    # ---------- single-flight ----------
+
+    async def _single_flight(self, kind: str, factory) -> str:
+        """同一事件循环内，同一类 token 只允许一个刷新请求在途"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._inflight.get(kind)
+            if task is None or task.done() or task.get_loop() is not loop:
+                task = loop.create_task(factory())
+                self._inflight[kind] = task
+                task.add_done_callback(lambda t, k=kind: self._clear_inflight(k, t))
+        return await asyncio.shield(task)
+
+    def _clear_inflight(self, kind: str, task: asyncio.Task):
+        with self._lock:
+            if self._inflight.get(kind) is task:
+                del self._inflight[kind]
+        # 后台刷新没有等待者时，避免 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
+
+    def _refresh_in_background(self, kind: str):
+        """触发一次后台刷新，调用方不等待"""
+        factory = self._fetch_tenant_token if kind == "tenant" else self._refresh_user_token
+        task = asyncio.ensure_future(self._single_flight(kind, factory))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    # ---------- 应用身份 token ----------
+
+    async def _fetch_tenant_token(self) -> str:
+        url = f"{FEISHU_API_BASE}/auth/v3/tenant_access_token/internal"
+        payload = {
+            "app_id": self.app_id,
+            "app_secret": self.app_secret
+        }
+
+        response = await get_http_client().post(url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("code") != 0:
+            raise Exception(f"获取 token 失败: {data.get('msg')}")
+
+        self.tenant_token = data["tenant_access_token"]
+        # token 有效期通常是 2 小时
+        self.tenant_expires_at = datetime.now() + timedelta(seconds=data.get("expire", 7200))
+        return self.tenant_token
+
+    async def get_tenant_token(self, force_refresh: bool = False) -> str:
+        """获取应用身份访问令牌"""
+        if not force_refresh and self.tenant_token and self.tenant_expires_at:
+            remaining = (self.tenant_expires_at - datetime.now()).total_seconds()
+            if remaining > 0:
+                if remaining < self.TENANT_REFRESH_MARGIN:
+                    self._refresh_in_background("tenant")
+                self.ensure_background_renewal()
+                return self.tenant_token
+
+        token = await self._single_flight("tenant", self._fetch_tenant_token)
+        self.ensure_background_renewal()
+        return token
+
+    # ---------- 用户身份 token ----------
+
+    async def exchange_user_token(self, code: str) -> Dict[str, Any]:
+        """使用授权码换取 user_access_token"""
+        url = f"{FEISHU_API_BASE}/authen/v1/access_token"
+        payload = {
+            "grant_type": "authorization_code",
+            "code": code,
+            "app_id": self.app_id,
+            "app_secret": self.app_secret
+        }
+
+        response = await get_http_client().post(url, json=payload)
+        response.raise_for_status()
+        data = response.json()
+
+        if data.get("code") != 0:
+            raise Exception(f"获取 user_access_token 失败: {data.get('msg')}")
+
+        token_data = data.get("data", {})
+        self._apply_user_token(token_data)
+        self.ensure_background_renewal()
+        return token_data
+
+    def _clear_user_token(self):
+        """丢弃失效的用户 token，停止后台续期，直到重新授权或 token 文件被更新"""
+        self.user_access_token = None
+        self.user_token_expires_at = None
+        self.refresh_token = None
+
+    async def _refresh_user_token(self) -> str:
+        if not self.refresh_token:
+            raise Exception("没有 refresh_token，请重新授权")
+
+        url = f"{FEISHU_API_BASE}/authen/v1/refresh_access_token"
+        payload = {
+            "grant_type": "refresh_token",
+            "refresh_token": self.refresh_token,
+            "app_id": self.app_id,
+            "app_secret": self.app_secret
+        }
+
+        response = await get_http_client().post(url, json=payload)
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if data.get("code") in REFRESH_TOKEN_INVALID_CODES:
+            self._clear_user_token()
+            raise RefreshTokenInvalidError(f"refresh_token 已失效（{data.get('code')}）: {data.get('msg')}")
+        response.raise_for_status()
+
+        if data.get("code") != 0:
+            raise Exception(f"刷新 user_access_token 失败: {data.get('msg')}")
+
+        self._apply_user_token(data.get("data", {}))
+        return self.user_access_token
+
+    async def refresh_user_token(self) -> str:
+        """刷新 user_access_token（与其他并发刷新共享同一个请求）"""
+        return await self._single_flight("user", self._refresh_user_token)
+
+    async def get_user_token(self, force_refresh: bool = False) -> str:
+        """获取用户身份访问令牌"""
+        # 其他进程（如 OAuth 脚本）可能更新了 token 文件
+        self._load_user_token()
+
+        if not force_refresh and self.user_access_token and self.user_token_expires_at:
+            remaining = (self.user_token_expires_at - datetime.now()).total_seconds()
+            if remaining > 0:
+                if remaining < self.USER_REFRESH_MARGIN and self.refresh_token:
+                    # 即将过期：继续使用当前 token，后台提前刷新
+                    self._refresh_in_background("user")
+                self.ensure_background_renewal()
+                return self.user_access_token
+
+        # Token 已过期或不存在，尝试刷新
+        if self.refresh_token:
+            try:
+                if "user" not in self._inflight:
+                    print(f"🔄 用户 token 已过期，使用 refresh_token 刷新...")
+                token = await self.refresh_user_token()
+            except Exception as e:
+                print(f"❌ 刷新 token 失败: {e}")
+                # 检查是否是 refresh_token 过期
+                if isinstance(e, RefreshTokenInvalidError) or "expired" in str(e).lower() or "invalid" in str(e).lower():
+                    raise Exception(
+                        "refresh_token 已过期或无效，请重新进行 OAuth 授权。\n"
+                        "使用 feishu_oauth_authorize 工具生成授权链接。"
+                    )
+                else:
+                    raise Exception(f"刷新 token 失败: {str(e)}")
+            self.ensure_background_renewal()
+            return token
+
+        # 没有 refresh_token
+        raise Exception(
+            "user_access_token 不存在或已过期，且没有 refresh_token。\n"
+            "请使用 feishu_oauth_authorize 工具重新进行 OAuth 授权。"
+        )
+
+    # ---------- 后台续期 ----------
+
+    def ensure_background_renewal(self):
+        """确保当前事件循环中有一个后台续期任务"""
+        loop = asyncio.get_running_loop()
+        task = self._renewal_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            return
+        self._renewal_task = loop.create_task(self._renewal_loop())
+
+    def _due_in(self) -> Dict[str, float]:
+        """每类 token 距离需要续期还有多少秒"""
+        now = datetime.now()
+        due = {}
+        if self.tenant_token and self.tenant_expires_at:
+            due["tenant"] = (self.tenant_expires_at - now).total_seconds() - self.TENANT_REFRESH_MARGIN
+        if self.refresh_token and self.user_token_expires_at:
+            due["user"] = (self.user_token_expires_at - now).total_seconds() - self.USER_REFRESH_MARGIN
+        return due
+
+    async def _renewal_loop(self):
+        failures = 0
+        while True:
+            due = self._due_in()
+            if not due:
+                # 没有需要维护的 token，下次获取 token 时会重新启动
+                return
+            await asyncio.sleep(max(0.0, min(due.values())))
+
+            failed = False
+            for kind, seconds in self._due_in().items():
+                if seconds > 0:
+                    continue
+                factory = self._fetch_tenant_token if kind == "tenant" else self._refresh_user_token
+                try:
+                    await self._single_flight(kind, factory)
+                except RefreshTokenInvalidError as e:
+                    # 用户 token 已清除，不再续期；重新授权后会重新启动
+                    print(f"⚠️  {e}，已停止续期用户 token，请使用 feishu_oauth_authorize 重新授权")
+                except Exception as e:
+                    print(f"⚠️  后台续期 {kind} token 失败: {e}")
+                    failed = True
+            if failed:
+                failures += 1
+                delay = min(self.RENEWAL_RETRY_DELAY * 2 ** (failures - 1), self.RENEWAL_MAX_RETRY_DELAY)
+                await asyncio.sleep(delay)
+            else:
+                failures = 0
+
+
+_TOKEN_MANAGERS: Dict[str, FeishuTokenManager] = {}
+_TOKEN_MANAGERS_LOCK = threading.Lock()
+
+
+def get_token_manager(app_id: str, app_secret: str) -> FeishuTokenManager:
+    """获取进程内共享的 token 管理器"""
+    with _TOKEN_MANAGERS_LOCK:
+        manager = _TOKEN_MANAGERS.get(app_id)
+        if manager is None or manager.app_secret != app_secret:
+            manager = FeishuTokenManager(app_id, app_secret)
+            _TOKEN_MANAGERS[app_id] = manager
+        return manager
+
+
+class FeishuClient:
+    """飞书多维表格 API 客户端
+
+    推荐通过 get_feishu_client() 获取进程内长期复用的实例；
+    需要访问其他表格时使用 with_table() 得到新的实例，而不是修改 app_token/table_id。
+    """
+    
+    def __init__(
+        self,
+        app_token: Optional[str] = None,
+        table_id: Optional[str] = None,
+        identity: str = "tenant"
+    ):
+        """
+        Args:
+            app_token: 多维表格 App Token（默认使用环境变量 FEISHU_APP_TOKEN）
+            table_id: 数据表 ID（默认使用环境变量 FEISHU_TABLE_ID）
+            identity: 默认调用身份，tenant（应用身份）或 user（用户身份）
+        """
+        if identity not in ("tenant", "user"):
+            raise ValueError(f"identity 不合法: {identity}")
+
+        self.app_id = FEISHU_APP_ID
+        self.app_secret = FEISHU_APP_SECRET
+        self.app_token = app_token or FEISHU_APP_TOKEN
+        self.table_id = table_id or FEISHU_TABLE_ID
+        self.identity = identity
+        self.default_folder_token = FEISHU_DEFAULT_FOLDER_TOKEN  # 默认文件夹 token
+        
+        if not all([self.app_id, self.app_secret, self.app_token]):
+            raise ValueError("缺少必要的飞书配置，请检查 .env 文件")
+        
+        # token 由进程级管理器统一缓存和续期，所有客户端实例共享
+        self.tokens = get_token_manager(self.app_id, self.app_secret)
+        # 表格元数据缓存：table_id -> 字段结构 / 预编译的字段映射
+        self._schema_cache: Dict[str, TableSchema] = {}
+        self._mapper_cache: Dict[str, FieldMapper] = {}
+
+    def with_table(
+        self,
+        app_token: Optional[str] = None,
+        table_id: Optional[str] = None,
+        identity: Optional[str] = None
+    ) -> "FeishuClient":
+        """返回指向另一个表格（或身份）的客户端，不修改当前实例"""
+        return get_feishu_client(
+            app_token=app_token or self.app_token,
+            table_id=table_id or self.table_id,
+            identity=identity or self.identity
+        )
+
+    # 兼容旧代码直接读写 token 属性，实际读写共享的 token 管理器
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.tenant_token
+
+    @access_token.setter
+    def access_token(self, value: Optional[str]):
+        self.tokens.tenant_token = value
+
+    @property
+    def token_expires_at(self) -> Optional[datetime]:
+        return self.tokens.tenant_expires_at
+
+    @token_expires_at.setter
+    def token_expires_at(self, value: Optional[datetime]):
+        self.tokens.tenant_expires_at = value
+
+    @property
+    def user_access_token(self) -> Optional[str]:
+        return self.tokens.user_access_token
+
+    @user_access_token.setter
+    def user_access_token(self, value: Optional[str]):
+        self.tokens.user_access_token = value
+
+    @property
+    def user_token_expires_at(self) -> Optional[datetime]:
+        return self.tokens.user_token_expires_at
+
+    @user_token_expires_at.setter
+    def user_token_expires_at(self, value: Optional[datetime]):
+        self.tokens.user_token_expires_at = value
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self.tokens.refresh_token
+
+    @refresh_token.setter
+    def refresh_token(self, value: Optional[str]):
+        self.tokens.refresh_token = value
+    
+    async def get_access_token(self, force_refresh: bool = False) -> str:
+        """获取访问令牌"""
+        return await self.tokens.get_tenant_token(force_refresh=force_refresh)
     
     def get_oauth_authorize_url(self, redirect_uri: str, state: Optional[str] = None) -> str:
         """生成 OAuth 授权链接
@@ -242,36 +650,7 @@ class FeishuClient:
         Returns:
             包含 access_token, refresh_token 等信息
         """
-        url = f"{FEISHU_API_BASE}/authen/v1/access_token"
-        payload = {
-            "grant_type": "authorization_code",
-            "code": code,
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        
-        timeout = httpx.Timeout(30.0, connect=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("code") != 0:
-                raise Exception(f"获取 user_access_token 失败: {data.get('msg')}")
-            
-            token_data = data.get("data", {})
-            self.user_access_token = token_data.get("access_token")
-            self.refresh_token = token_data.get("refresh_token")
-            
-            # 设置过期时间（通常是 7200 秒，即 2 小时）
-            expires_in = token_data.get("expires_in", 7200)
-            from datetime import timedelta
-            self.user_token_expires_at = datetime.now() + timedelta(seconds=expires_in - 300)  # 提前 5 分钟过期
-            
-            # 保存到文件
-            self._save_user_token(token_data)
-            
-            return token_data
+        return await self.tokens.exchange_user_token(code)
     
     async def refresh_user_access_token(self) -> str:
         """刷新 user_access_token
@@ -279,38 +658,7 @@ class FeishuClient:
         Returns:
             新的 user_access_token
         """
-        if not self.refresh_token:
-            raise Exception("没有 refresh_token，请重新授权")
-        
-        url = f"{FEISHU_API_BASE}/authen/v1/refresh_access_token"
-        payload = {
-            "grant_type": "refresh_token",
-            "refresh_token": self.refresh_token,
-            "app_id": self.app_id,
-            "app_secret": self.app_secret
-        }
-        
-        timeout = httpx.Timeout(30.0, connect=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("code") != 0:
-                raise Exception(f"刷新 user_access_token 失败: {data.get('msg')}")
-            
-            token_data = data.get("data", {})
-            self.user_access_token = token_data.get("access_token")
-            self.refresh_token = token_data.get("refresh_token", self.refresh_token)  # 可能返回新的 refresh_token
-            
-            expires_in = token_data.get("expires_in", 7200)
-            from datetime import timedelta
-            self.user_token_expires_at = datetime.now() + timedelta(seconds=expires_in - 300)
-            
-            # 保存到文件
-            self._save_user_token(token_data)
-            
-            return self.user_access_token
+        return await self.tokens.refresh_user_token()
     
     async def get_user_access_token(self, force_refresh: bool = False) -> str:
         """获取用户身份访问令牌
@@ -326,43 +674,7 @@ class FeishuClient:
         Raises:
             Exception: 如果 token 过期且无法刷新
         """
-        # 如果 token 未过期且不强制刷新，直接返回
-        if not force_refresh and self.user_access_token and self.user_token_expires_at:
-            remaining = (self.user_token_expires_at - datetime.now()).total_seconds()
-            if remaining > 0:
-                # Token 还有效
-                if remaining < 300:  # 剩余不到5分钟，提前刷新
-                    print(f"⚠️  用户 token 即将过期（剩余 {int(remaining)} 秒），提前刷新")
-                    try:
-                        return await self.refresh_user_access_token()
-                    except Exception as e:
-                        print(f"⚠️  提前刷新失败: {e}，继续使用当前 token")
-                        return self.user_access_token
-                else:
-                    # Token 仍然有效，直接返回
-                    return self.user_access_token
-
-        # Token 已过期或不存在，尝试刷新
-        if self.refresh_token:
-            try:
-                print(f"🔄 用户 token 已过期，使用 refresh_token 刷新...")
-                return await self.refresh_user_access_token()
-            except Exception as e:
-                print(f"❌ 刷新 token 失败: {e}")
-                # 检查是否是 refresh_token 过期
-                if "expired" in str(e).lower() or "invalid" in str(e).lower():
-                    raise Exception(
-                        "refresh_token 已过期或无效，请重新进行 OAuth 授权。\n"
-                        "使用 feishu_oauth_authorize 工具生成授权链接。"
-                    )
-                else:
-                    raise Exception(f"刷新 token 失败: {str(e)}")
-
-        # 没有 refresh_token
-        raise Exception(
-            "user_access_token 不存在或已过期，且没有 refresh_token。\n"
-            "请使用 feishu_oauth_authorize 工具重新进行 OAuth 授权。"
-        )
+        return await self.tokens.get_user_token(force_refresh=force_refresh)
     
     async def _request(
         self,
@@ -372,7 +684,32 @@ class FeishuClient:
         params: Optional[Dict] = None,
         use_user_token: bool = False
     ) -> Dict[str, Any]:
-        """发送 API 请求
+        """发送 API 请求（经过进程共享的限流器，遇到频率限制时指数退避重试）
+        
+        参数和返回值同 _send_request
+        """
+        limiter = get_rate_limiter()
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            try:
+                return await self._send_request(method, endpoint, data, params, use_user_token)
+            except FeishuAPIError as e:
+                rate_limited = e.error_code == RATE_LIMIT_ERROR_CODE or e.status_code == 429
+                if not rate_limited or attempt >= FEISHU_MAX_RETRIES:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+    
+    async def _send_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        use_user_token: bool = False
+    ) -> Dict[str, Any]:
+        """发送一次 API 请求
         
         Args:
             method: HTTP 方法 (GET, POST, PUT, DELETE)
@@ -389,7 +726,7 @@ class FeishuClient:
         """
         try:
             # 根据参数选择使用应用身份或用户身份 token
-            if use_user_token:
+            if use_user_token or self.identity == "user":
                 try:
                     token = await self.get_user_access_token()
                 except Exception as e:
@@ -407,61 +744,60 @@ class FeishuClient:
                 "Content-Type": "application/json"
             }
             
-            # 设置超时时间
-            timeout = httpx.Timeout(30.0, connect=10.0)
+            # 复用当前事件循环的共享连接池
+            client = get_http_client()
             
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                # 发送请求
-                if method == "GET":
-                    response = await client.get(url, headers=headers, params=params)
-                elif method == "POST":
-                    response = await client.post(url, headers=headers, json=data)
-                elif method == "PUT":
-                    response = await client.put(url, headers=headers, json=data)
-                elif method == "PATCH":
-                    response = await client.patch(url, headers=headers, json=data)
-                elif method == "DELETE":
-                    response = await client.delete(url, headers=headers, params=params)
-                else:
-                    raise ValueError(f"不支持的 HTTP 方法: {method}")
-                
-                # 检查 HTTP 状态码
-                response.raise_for_status()
-                
-                # 解析 JSON 响应
-                try:
-                    result = response.json()
-                except json.JSONDecodeError:
-                    raise FeishuAPIError(
-                        message=f"API 返回非 JSON 响应: {response.text[:500]}",
-                        status_code=response.status_code,
-                        suggestion="请检查 API 端点是否正确，或联系飞书技术支持"
-                    )
+            # 发送请求
+            if method == "GET":
+                response = await client.get(url, headers=headers, params=params)
+            elif method == "POST":
+                response = await client.post(url, headers=headers, params=params, json=data)
+            elif method == "PUT":
+                response = await client.put(url, headers=headers, params=params, json=data)
+            elif method == "PATCH":
+                response = await client.patch(url, headers=headers, params=params, json=data)
+            elif method == "DELETE":
+                response = await client.request("DELETE", url, headers=headers, params=params, json=data)
+            else:
+                raise ValueError(f"不支持的 HTTP 方法: {method}")
+            
+            # 检查 HTTP 状态码
+            response.raise_for_status()
+            
+            # 解析 JSON 响应
+            try:
+                result = response.json()
+            except json.JSONDecodeError:
+                raise FeishuAPIError(
+                    message=f"API 返回非 JSON 响应: {response.text[:500]}",
+                    status_code=response.status_code,
+                    suggestion="请检查 API 端点是否正确，或联系飞书技术支持"
+                )
+            
+            # 检查业务状态码（飞书 API 使用 code 字段表示业务状态）
+            if result.get("code") != 0:
+                error_code = result.get("code", "N/A")
+                error_msg = result.get("msg", "未知错误")
+                error_data = result.get("data", {})
                 
-                # 检查业务状态码（飞书 API 使用 code 字段表示业务状态）
-                if result.get("code") != 0:
-                    error_code = result.get("code", "N/A")
-                    error_msg = result.get("msg", "未知错误")
-                    error_data = result.get("data", {})
-                    
-                    # 根据错误代码提供建议
-                    suggestion = ""
-                    if error_code == 99991400:  # 频率限制
-                        suggestion = "请求频率过高（每秒最多3次），请使用指数退避算法重试，或降低调用频率"
-                    elif error_code == 1770029:  # block not support to create
-                        suggestion = "请检查 block_type 是否正确（文本块应为 2）"
-                    elif error_code in [99991663, 99991664]:  # 权限相关
-                        suggestion = "请检查应用权限是否已申请并开通（应用身份权限）"
-                    
-                    raise FeishuAPIError(
-                        message=f"API 调用失败: {error_msg}",
-                        status_code=response.status_code,
-                        error_code=str(error_code),
-                        error_data=error_data,
-                        suggestion=suggestion or "请检查请求参数和权限配置"
-                    )
+                # 根据错误代码提供建议
+                suggestion = ""
+                if error_code == 99991400:  # 频率限制
+                    suggestion = "请求频率过高（每秒最多3次），请使用指数退避算法重试，或降低调用频率"
+                elif error_code == 1770029:  # block not support to create
+                    suggestion = "请检查 block_type 是否正确（文本块应为 2）"
+                elif error_code in [99991663, 99991664]:  # 权限相关
+                    suggestion = "请检查应用权限是否已申请并开通（应用身份权限）"
                 
-                return result
+                raise FeishuAPIError(
+                    message=f"API 调用失败: {error_msg}",
+                    status_code=response.status_code,
+                    error_code=str(error_code),
+                    error_data=error_data,
+                    suggestion=suggestion or "请检查请求参数和权限配置"
+                )
+            
+            return result
                 
         except httpx.HTTPStatusError as e:
             raise _handle_api_error(e, endpoint)
@@ -526,15 +862,77 @@ class FeishuClient:
         result = await self._request("GET", endpoint)
         return result.get("data", {}).get("items", [])
     
-    async def get_table_fields(self, table_id: Optional[str] = None) -> List[Dict]:
-        """获取数据表的字段列表"""
+    async def get_table_schema(
+        self,
+        table_id: Optional[str] = None,
+        max_age: Optional[float] = None
+    ) -> TableSchema:
+        """获取数据表字段结构（带缓存）
+
+        缓存超过 max_age（默认 FEISHU_SCHEMA_TTL）秒后重新拉取，
+        并与旧结构对比指纹，字段变化时使预编译的字段映射失效。
+
+        Args:
+            table_id: 数据表ID
+            max_age: 可接受的缓存时间（秒），0 表示强制刷新
+        """
+        table_id = table_id or self.table_id
+        if not table_id:
+            raise ValueError("需要指定 table_id")
+        
+        max_age = FEISHU_SCHEMA_TTL if max_age is None else max_age
+        cached = self._schema_cache.get(table_id)
+        if cached is not None and cached.age() < max_age:
+            return cached
+        
+        endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/fields"
+        items: List[Dict] = []
+        page_token = None
+        while True:
+            params = {"page_size": 100}
+            if page_token:
+                params["page_token"] = page_token
+            result = await self._request("GET", endpoint, params=params)
+            data = result.get("data", {})
+            items.extend(data.get("items", []))
+            page_token = data.get("page_token")
+            if not data.get("has_more") or not page_token:
+                break
+        
+        schema = TableSchema(table_id, items)
+        if cached is not None and cached.fingerprint != schema.fingerprint:
+            changes = cached.diff(schema)
+            print(f"⚠️  数据表 {table_id} 字段结构已变化: "
+                  f"新增 {changes['added']}，删除 {changes['removed']}，变更 {changes['changed']}")
+            self._mapper_cache.pop(table_id, None)
+        self._schema_cache[table_id] = schema
+        return schema
+    
+    def invalidate_table_schema(self, table_id: Optional[str] = None):
+        """丢弃缓存的字段结构（写入报字段错误时调用，下次重新拉取）"""
+        table_id = table_id or self.table_id
+        self._schema_cache.pop(table_id, None)
+        self._mapper_cache.pop(table_id, None)
+    
+    async def get_table_fields(self, table_id: Optional[str] = None, use_cache: bool = True) -> List[Dict]:
+        """获取数据表的字段列表
+
+        Args:
+            table_id: 数据表ID
+            use_cache: 是否使用缓存的字段结构（默认 True，缓存时间见 FEISHU_SCHEMA_TTL）
+        """
+        schema = await self.get_table_schema(table_id, max_age=None if use_cache else 0)
+        return schema.fields
+    
+    async def get_field_mapper(self, table_id: Optional[str] = None) -> FieldMapper:
+        """获取根据当前表结构预编译的记忆字段映射"""
         table_id = table_id or self.table_id
-        if not table_id:
-            raise ValueError("需要指定 table_id")
-        
-        endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/fields"
-        result = await self._request("GET", endpoint)
-        return result.get("data", {}).get("items", [])
+        schema = await self.get_table_schema(table_id)
+        mapper = self._mapper_cache.get(table_id)
+        if mapper is None or mapper.fingerprint != schema.fingerprint:
+            mapper = FieldMapper(schema)
+            self._mapper_cache[table_id] = mapper
+        return mapper
     
     async def create_record(
         self,
@@ -553,22 +951,21 @@ class FeishuClient:
         if not table_id:
             raise ValueError("需要指定 table_id")
         
-        # 如果使用字段ID，需要先获取字段映射
+        # 如果使用字段ID，需要先获取字段映射（使用缓存的表结构）
         if use_field_id:
-            field_list = await self.get_table_fields(table_id)
-            field_name_to_id = {f.get("field_name"): f.get("field_id") for f in field_list}
+            schema = await self.get_table_schema(table_id)
             # 转换字段名称到字段ID
             fields_by_id = {}
             for name, value in fields.items():
-                field_id = field_name_to_id.get(name)
-                if field_id:
-                    fields_by_id[field_id] = value
+                field = schema.by_name.get(name)
+                if field:
+                    fields_by_id[field["field_id"]] = value
             fields = fields_by_id
         
         endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/records"
         data = {"fields": fields}
         
-        result = await self._request("POST", endpoint, data=data)
+        result = await self._write_records("POST", endpoint, data, table_id)
         return result.get("data", {}).get("record", {})
     
     async def update_record(
@@ -584,8 +981,62 @@ class FeishuClient:
         
         endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/{record_id}"
         data = {"fields": fields}
-        result = await self._request("PUT", endpoint, data=data)
+        result = await self._write_records("PUT", endpoint, data, table_id)
         return result.get("data", {}).get("record", {})
+
+    async def batch_create_records(
+        self,
+        fields_list: List[Dict[str, Any]],
+        table_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """批量创建记录（每次请求最多 BITABLE_BATCH_SIZE 条）
+
+        Returns:
+            创建的记录列表，顺序与 fields_list 一致
+        """
+        table_id = table_id or self.table_id
+        if not table_id:
+            raise ValueError("需要指定 table_id")
+
+        endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/batch_create"
+        created = []
+        for start in range(0, len(fields_list), BITABLE_BATCH_SIZE):
+            chunk = fields_list[start:start + BITABLE_BATCH_SIZE]
+            data = {"records": [{"fields": fields} for fields in chunk]}
+            result = await self._write_records("POST", endpoint, data, table_id)
+            created.extend(result.get("data", {}).get("records", []))
+        return created
+
+    async def batch_update_records(
+        self,
+        records: List[Dict[str, Any]],
+        table_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """批量更新记录（每次请求最多 BITABLE_BATCH_SIZE 条）
+
+        Args:
+            records: [{"record_id": ..., "fields": {...}}, ...]
+        """
+        table_id = table_id or self.table_id
+        if not table_id:
+            raise ValueError("需要指定 table_id")
+
+        endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/batch_update"
+        updated = []
+        for start in range(0, len(records), BITABLE_BATCH_SIZE):
+            data = {"records": records[start:start + BITABLE_BATCH_SIZE]}
+            result = await self._write_records("POST", endpoint, data, table_id)
+            updated.extend(result.get("data", {}).get("records", []))
+        return updated
+
+    async def _write_records(self, method: str, endpoint: str, data: Dict, table_id: str) -> Dict[str, Any]:
+        """写入记录；字段相关错误说明表结构已变化，丢弃缓存后重新抛出"""
+        try:
+            return await self._request(method, endpoint, data=data)
+        except FeishuAPIError as e:
+            if e.error_code in FIELD_SCHEMA_ERROR_CODES:
+                self.invalidate_table_schema(table_id)
+            raise
     
     async def delete_record(
         self,
@@ -619,8 +1070,166 @@ class FeishuClient:
         
         result = await self._request("GET", endpoint, params=params)
         return result.get("data", {})
+
+    async def iter_record_pages(
+        self,
+        table_id: Optional[str] = None,
+        page_size: int = 500,
+        page_token: Optional[str] = None,
+        prefetch: bool = True
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页读取记录，处理当前页时预取下一页
+
+        Args:
+            table_id: 数据表ID
+            page_size: 每页数量，最大 500
+            page_token: 从该分页标记开始（用于续传）
+            prefetch: 是否在产出当前页前发出下一页请求
+
+        Yields:
+            {"items": [...], "page_token": 下一页标记（最后一页为 None）}
+        """
+        page_size = min(page_size, BITABLE_BATCH_SIZE)
+        pending = asyncio.ensure_future(self.list_records(table_id=table_id, page_size=page_size, page_token=page_token))
+        try:
+            while pending is not None:
+                data = await pending
+                next_token = data.get("page_token") if data.get("has_more") else None
+                pending = None
+                if next_token and prefetch:
+                    pending = asyncio.ensure_future(
+                        self.list_records(table_id=table_id, page_size=page_size, page_token=next_token)
+                    )
+                yield {"items": data.get("items") or [], "page_token": next_token}
+                if next_token and pending is None:
+                    pending = asyncio.ensure_future(
+                        self.list_records(table_id=table_id, page_size=page_size, page_token=next_token)
+                    )
+        finally:
+            # 调用方提前结束时取消预取
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def iter_records(
+        self,
+        table_id: Optional[str] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐条读取表中全部记录（按页预取）"""
+        async for page in self.iter_record_pages(table_id=table_id, page_size=page_size):
+            for record in page["items"]:
+                yield record
+
+    async def search_records(
+        self,
+        filter: Optional[Dict[str, Any]] = None,
+        sort: Optional[List[Dict[str, Any]]] = None,
+        field_names: Optional[List[str]] = None,
+        automatic_fields: bool = False,
+        page_size: int = 500,
+        page_token: Optional[str] = None,
+        table_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """按条件查询记录（服务端过滤）
+
+        Args:
+            filter: 过滤条件，如 {"conjunction": "and", "conditions": [{"field_name": ..., "operator": "is", "value": [...]}]}
+            sort: 排序，如 [{"field_name": ..., "desc": False}]
+            field_names: 只返回这些字段
+            automatic_fields: 是否返回 created_time / last_modified_time 等自动字段
+            page_size: 每页数量，最大 500
+
+        Returns:
+            {"items": [...], "has_more": bool, "page_token": str, "total": int}
+        """
+        table_id = table_id or self.table_id
+        if not table_id:
+            raise ValueError("需要指定 table_id")
+
+        endpoint = f"/bitable/v1/apps/{self.app_token}/tables/{table_id}/records/search"
+        params = {"page_size": page_size}
+        if page_token:
+            params["page_token"] = page_token
+        data: Dict[str, Any] = {"automatic_fields": automatic_fields}
+        if filter:
+            data["filter"] = filter
+        if sort:
+            data["sort"] = sort
+        if field_names:
+            data["field_names"] = field_names
+
+        result = await self._request("POST", endpoint, data=data, params=params)
+        return result.get("data", {})
+
+    async def find_records(
+        self,
+        field_name: str,
+        values: List[str],
+        table_id: Optional[str] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """按字段值查找记录（如 记忆ID = x 或属于一批 ID）
+
+        用 records/search 在服务端过滤，每 SEARCH_MAX_CONDITIONS 个值一次请求，
+        不需要遍历整张表。
+
+        Returns:
+            字段值 -> 记录；没有找到的值不在结果中
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        unique_values = list(dict.fromkeys(v for v in values if v))
+        for start in range(0, len(unique_values), SEARCH_MAX_CONDITIONS):
+            chunk = unique_values[start:start + SEARCH_MAX_CONDITIONS]
+            filter = {
+                "conjunction": "or",
+                "conditions": [
+                    {"field_name": field_name, "operator": "is", "value": [value]}
+                    for value in chunk
+                ]
+            }
+            page_token = None
+            while True:
+                result = await self.search_records(
+                    filter=filter,
+                    page_size=500,
+                    page_token=page_token,
+                    table_id=table_id
+                )
+                for record in result.get("items") or []:
+                    value = field_text(record.get("fields", {}).get(field_name))
+                    if value:
+                        found.setdefault(value, record)
+                page_token = result.get("page_token")
+                if not result.get("has_more") or not page_token:
+                    break
+        return found
     
     # ==================== 文档操作（需要 drive:drive 权限）====================
+
+    async def _invalidate_path_index(
+        self,
+        folder_token: Optional[str] = None,
+        file_token: Optional[str] = None,
+        use_user_token: bool = False
+    ):
+        """云空间有写入后让本地路径索引中受影响的文件夹列表失效
+
+        Args:
+            folder_token: 新增了子项的文件夹（None 表示调用身份的根目录）
+            file_token: 被移走或删除的文件，其原所在文件夹的列表失效
+        """
+        try:
+            if file_token:
+                # 文件本身若是文件夹，重新列出它以更新子项的路径
+                await path_index.invalidate_parents(file_token)
+                await path_index.invalidate(file_token)
+            if folder_token:
+                await path_index.invalidate(folder_token)
+            elif not file_token:
+                await path_index.invalidate_drive_roots("user" if use_user_token else "tenant")
+        except Exception as e:
+            # 索引不可用（如未初始化）时不影响写入本身，索引过期后会重新列出
+            print(f"⚠️  更新本地路径索引失败: {e}")
+    
     
     async def create_document(
         self,
@@ -726,6 +1335,7 @@ class FeishuClient:
             )
         
         print(f"✅ 获取到 document_id: {document_id}")
+        await self._invalidate_path_index(folder_token=target_folder_token, use_user_token=use_user_token)
         
         # 验证文档是否真的创建成功（使用 docx API 获取文档信息）
         print(f"🔍 开始验证文档是否存在: {document_id}")
@@ -838,6 +1448,7 @@ class FeishuClient:
         
         try:
             result = await self._request("POST", endpoint, data=data)
+            await self._invalidate_path_index(folder_token=folder_token, file_token=file_token)
             # 移动操作返回 task_id，表示异步任务
             task_id = result.get("task_id")
             if task_id:
@@ -871,236 +1482,7 @@ class FeishuClient:
         Returns:
             飞书文档块列表
         """
-        blocks = []
-        lines = content.split('\n')
-        i = 0
-        in_code_block = False
-        code_block_language = ""
-        code_block_content = []
-        in_list = False
-        list_type = None  # 'bullet' or 'ordered'
-        list_items = []
-        
-        while i < len(lines):
-            line = lines[i]
-            stripped = line.strip()
-            
-            # 处理代码块
-            if stripped.startswith('```'):
-                if in_code_block:
-                    # 结束代码块
-                    if code_block_content:
-                        # 飞书代码块语言代码：1=PlainText, 2=ABAP, 3=Ada, 4=Apache, 5=Apex, ...
-                        # 如果未指定语言，使用 1 (PlainText)
-                        language_code = 1  # 默认 PlainText
-                        if code_block_language:
-                            # 常见语言映射（可以根据需要扩展）
-                            lang_map = {
-                                'python': 11, 'py': 11,
-                                'javascript': 12, 'js': 12,
-                                'java': 13,
-                                'cpp': 14, 'c++': 14,
-                                'c': 15,
-                                'go': 16,
-                                'rust': 17,
-                                'php': 18,
-                                'ruby': 19,
-                                'swift': 20,
-                                'kotlin': 21,
-                                'typescript': 22, 'ts': 22,
-                                'sql': 23,
-                                'html': 24,
-                                'css': 25,
-                                'json': 26,
-                                'xml': 27,
-                                'markdown': 28, 'md': 28,
-                                'bash': 29, 'shell': 29, 'sh': 29,
-                            }
-                            language_code = lang_map.get(code_block_language.lower(), 1)
-                        
-                        blocks.append({
-                            "block_type": 14,  # code block
-                            "code": {
-                                "language": language_code,
-                                "elements": [
-                                    {
-                                        "text_run": {
-                                            "content": '\n'.join(code_block_content)
-                                        }
-                                    }
-                                ]
-                            }
-                        })
-                    code_block_content = []
-                    code_block_language = ""
-                    in_code_block = False
-                else:
-                    # 开始代码块
-                    in_code_block = True
-                    code_block_language = stripped[3:].strip()  # 提取语言标识
-                i += 1
-                continue
-            
-            if in_code_block:
-                code_block_content.append(line)
-                i += 1
-                continue
-            
-            # 处理分割线
-            if re.match(r'^[-*_]{3,}$', stripped):
-                blocks.append({
-                    "block_type": 22,  # divider
-                    "divider": {}  # divider块需要有divider字段
-                })
-                i += 1
-                continue
-            
-            # 处理标题 (# 标题)
-            heading_match = re.match(r'^(#{1,9})\s+(.+)$', stripped)
-            if heading_match:
-                # 如果有未完成的列表，先结束它
-                if in_list:
-                    blocks.extend(self._create_list_blocks(list_items, list_type))
-                    list_items = []
-                    in_list = False
-                
-                level = len(heading_match.group(1))
-                text = heading_match.group(2)
-                # 解析行内格式（粗体、斜体）
-                elements = self._parse_inline_formatting(text)
-                
-                # 标题块使用 heading1-heading9 字段，block_type 为 3-11
-                # block_type: 3=heading1, 4=heading2, ..., 11=heading9
-                heading_field = f"heading{level}"
-                block_data = {
-                    "block_type": 2 + level,  # 3-11 for heading1-heading9
-                    heading_field: {
-                        "elements": elements
-                    }
-                }
-                blocks.append(block_data)
-                i += 1
-                continue
-            
-            # 处理引用 (> 引用内容)
-            if stripped.startswith('>'):
-                # 如果有未完成的列表，先结束它
-                if in_list:
-                    blocks.extend(self._create_list_blocks(list_items, list_type))
-                    list_items = []
-                    in_list = False
-                
-                quote_text = stripped[1:].strip()
-                elements = self._parse_inline_formatting(quote_text)
-                blocks.append({
-                    "block_type": 15,  # quote (引用块)
-                    "quote": {
-                        "elements": elements
-                    }
-                })
-                i += 1
-                continue
-            
-            # 处理无序列表 (- 或 * 开头)
-            bullet_match = re.match(r'^[-*]\s+(.+)$', stripped)
-            if bullet_match:
-                if not in_list or list_type != 'bullet':
-                    # 如果有未完成的列表，先结束它
-                    if in_list:
-                        blocks.extend(self._create_list_blocks(list_items, list_type))
-                        list_items = []
-                    in_list = True
-                    list_type = 'bullet'
-                
-                item_text = bullet_match.group(1)
-                list_items.append(item_text)
-                i += 1
-                continue
-            
-            # 处理有序列表 (1. 开头)
-            ordered_match = re.match(r'^\d+\.\s+(.+)$', stripped)
-            if ordered_match:
-                if not in_list or list_type != 'ordered':
-                    # 如果有未完成的列表，先结束它
-                    if in_list:
-                        blocks.extend(self._create_list_blocks(list_items, list_type))
-                        list_items = []
-                    in_list = True
-                    list_type = 'ordered'
-                
-                item_text = ordered_match.group(1)
-                list_items.append(item_text)
-                i += 1
-                continue
-            
-            # 处理普通段落
-            if stripped:
-                # 如果有未完成的列表，先结束它
-                if in_list:
-                    blocks.extend(self._create_list_blocks(list_items, list_type))
-                    list_items = []
-                    in_list = False
-                
-                elements = self._parse_inline_formatting(stripped)
-                blocks.append({
-                    "block_type": 2,  # text paragraph
-                    "text": {
-                        "elements": elements
-                    }
-                })
-            # 空行：如果有未完成的列表，结束它
-            elif in_list:
-                blocks.extend(self._create_list_blocks(list_items, list_type))
-                list_items = []
-                in_list = False
-            
-            i += 1
-        
-        # 处理文件末尾未完成的列表或代码块
-        if in_code_block and code_block_content:
-            language_code = 1  # 默认 PlainText
-            if code_block_language:
-                lang_map = {
-                    'python': 11, 'py': 11,
-                    'javascript': 12, 'js': 12,
-                    'java': 13,
-                    'cpp': 14, 'c++': 14,
-                    'c': 15,
-                    'go': 16,
-                    'rust': 17,
-                    'php': 18,
-                    'ruby': 19,
-                    'swift': 20,
-                    'kotlin': 21,
-                    'typescript': 22, 'ts': 22,
-                    'sql': 23,
-                    'html': 24,
-                    'css': 25,
-                    'json': 26,
-                    'xml': 27,
-                    'markdown': 28, 'md': 28,
-                    'bash': 29, 'shell': 29, 'sh': 29,
-                }
-                language_code = lang_map.get(code_block_language.lower(), 1)
-            
-            blocks.append({
-                "block_type": 14,  # code block
-                "code": {
-                    "language": language_code,
-                    "elements": [
-                        {
-                            "text_run": {
-                                "content": '\n'.join(code_block_content)
-                            }
-                        }
-                    ]
-                }
-            })
-        
-        if in_list and list_items:
-            blocks.extend(self._create_list_blocks(list_items, list_type))
-        
-        return blocks
+        return markdown_to_blocks(content)
     
     def _parse_inline_formatting(self, text: str) -> List[Dict[str, Any]]:
         """解析行内格式（粗体、斜体等）
@@ -1111,82 +1493,7 @@ class FeishuClient:
         Returns:
             飞书文档元素列表
         """
-        elements = []
-        # 使用正则表达式匹配粗体、斜体、删除线等
-        # 匹配模式：**粗体**、*斜体*、~~删除线~~
-        pattern = r'(\*\*([^*]+)\*\*|\*([^*]+)\*|~~([^~]+)~~|`([^`]+)`)'
-        
-        last_pos = 0
-        for match in re.finditer(pattern, text):
-            # 添加匹配前的普通文本
-            if match.start() > last_pos:
-                plain_text = text[last_pos:match.start()]
-                if plain_text:
-                    elements.append({
-                        "text_run": {
-                            "content": plain_text
-                        }
-                    })
-            
-            # 处理匹配的格式
-            if match.group(2):  # **粗体**
-                elements.append({
-                    "text_run": {
-                        "content": match.group(2),
-                        "text_element_style": {
-                            "bold": True
-                        }
-                    }
-                })
-            elif match.group(3):  # *斜体*
-                elements.append({
-                    "text_run": {
-                        "content": match.group(3),
-                        "text_element_style": {
-                            "italic": True
-                        }
-                    }
-                })
-            elif match.group(4):  # ~~删除线~~
-                elements.append({
-                    "text_run": {
-                        "content": match.group(4),
-                        "text_element_style": {
-                            "strikeThrough": True
-                        }
-                    }
-                })
-            elif match.group(5):  # `代码`
-                elements.append({
-                    "text_run": {
-                        "content": match.group(5),
-                        "text_element_style": {
-                            "codeInline": True
-                        }
-                    }
-                })
-            
-            last_pos = match.end()
-        
-        # 添加剩余的普通文本
-        if last_pos < len(text):
-            plain_text = text[last_pos:]
-            if plain_text:
-                elements.append({
-                    "text_run": {
-                        "content": plain_text
-                    }
-                })
-        
-        # 如果没有匹配到任何格式，返回纯文本
-        if not elements:
-            elements.append({
-                "text_run": {
-                    "content": text
-                }
-            })
-        
-        return elements
+        return parse_inline(text)
     
     def _create_list_blocks(self, items: List[str], list_type: str) -> List[Dict[str, Any]]:
         """创建列表块
@@ -1198,21 +1505,87 @@ class FeishuClient:
         Returns:
             飞书文档块列表
         """
+        return list_blocks(items, list_type)
+    
+    async def list_document_blocks(
+        self,
+        document_id: str,
+        use_user_token: bool = False,
+        revision_id: int = -1
+    ) -> List[Dict[str, Any]]:
+        """分页获取文档的全部块（revision_id 为 -1 时取最新版本）"""
+        endpoint = f"/docx/v1/documents/{document_id}/blocks"
         blocks = []
-        block_type = 12 if list_type == 'bullet' else 13  # 12=bullet, 13=ordered
-        list_field = "bullet" if list_type == 'bullet' else "ordered"
-        
-        for item in items:
-            elements = self._parse_inline_formatting(item)
-            blocks.append({
-                "block_type": block_type,
-                list_field: {
-                    "elements": elements
-                }
-            })
-        
+        page_token = None
+        while True:
+            params = {"document_revision_id": revision_id, "page_size": 500}
+            if page_token:
+                params["page_token"] = page_token
+            result = await self._request("GET", endpoint, params=params, use_user_token=use_user_token)
+            data = result.get("data", {})
+            blocks.extend(data.get("items", []))
+            page_token = data.get("page_token")
+            if not data.get("has_more") or not page_token:
+                break
         return blocks
-    
+
+    async def create_document_blocks(
+        self,
+        document_id: str,
+        children: Iterable[Dict[str, Any]],
+        index: Optional[int] = None,
+        parent_block_id: Optional[str] = None,
+        use_user_token: bool = False
+    ) -> int:
+        """在父块（默认根块）的指定位置插入子块（按接口上限分片、按顺序写入）
+
+        某个分片失败时，从最后确认写入的分片之后续写一次，已写入的块不会重复。
+
+        Raises:
+            BlockWriteError: 续写后仍失败；异常中记录已写入的块数
+        """
+        writer = BlockWriter(self, document_id, parent_block_id=parent_block_id, use_user_token=use_user_token)
+        try:
+            return await writer.write(children, index=index)
+        except BlockWriteError as e:
+            print(f"⚠️  {e}，从第 {e.written + 1} 个块继续写入...")
+            return await writer.resume()
+
+    async def delete_document_blocks(
+        self,
+        document_id: str,
+        start_index: int,
+        end_index: int,
+        parent_block_id: Optional[str] = None,
+        use_user_token: bool = False
+    ) -> None:
+        """删除父块（默认根块）下 [start_index, end_index) 范围的子块"""
+        parent_block_id = parent_block_id or document_id
+        endpoint = f"/docx/v1/documents/{document_id}/blocks/{parent_block_id}/children/batch_delete"
+        await self._request("DELETE", endpoint, params={"document_revision_id": -1},
+                            data={"start_index": start_index, "end_index": end_index},
+                            use_user_token=use_user_token)
+
+    async def update_document_block_texts(
+        self,
+        document_id: str,
+        updates: List[Tuple[str, List[Dict[str, Any]]]],
+        use_user_token: bool = False
+    ) -> None:
+        """批量原地更新块的文字元素
+
+        Args:
+            updates: [(block_id, elements), ...]
+        """
+        endpoint = f"/docx/v1/documents/{document_id}/blocks/batch_update"
+        for offset in range(0, len(updates), DOCX_MAX_UPDATES_PER_CALL):
+            requests = [
+                {"block_id": block_id, "update_text_elements": {"elements": elements}}
+                for block_id, elements in updates[offset:offset + DOCX_MAX_UPDATES_PER_CALL]
+            ]
+            await self._request("PATCH", endpoint, params={"document_revision_id": -1},
+                                data={"requests": requests}, use_user_token=use_user_token)
+
     async def update_document_content(
         self,
         document_id: str,
@@ -1221,6 +1594,9 @@ class FeishuClient:
     ) -> bool:
         """更新文档内容
 
+        把新内容转换成块后与文档现有的块逐块比较，只删除、插入、更新有变化的块；
+        未变化的块（及其评论）保持不变，请求数与修改量成正比。
+
         Args:
             document_id: 文档 ID
             content: 文档内容（Markdown 格式，会自动转换为飞书文档格式）
@@ -1229,58 +1605,6 @@ class FeishuClient:
         Returns:
             是否更新成功
         """
-        try:
-            # 第一步：获取文档信息，包括 revision_id 和现有块
-            doc_endpoint = f"/docx/v1/documents/{document_id}"
-            doc_result = await self._request("GET", doc_endpoint, use_user_token=use_user_token)
-            document_data = doc_result.get("data", {}).get("document", {})
-            revision_id = document_data.get("revision_id", -1)
-
-            # 第二步：获取根块的所有子块
-            blocks_endpoint = f"/docx/v1/documents/{document_id}/blocks"
-            blocks_result = await self._request("GET", blocks_endpoint, params={
-                "document_revision_id": -1,  # -1 表示最新版本
-                "page_size": 500
-            }, use_user_token=use_user_token)
-            
-            # 找到根块（block_id == document_id）
-            root_block = None
-            items = blocks_result.get("data", {}).get("items", [])
-            for item in items:
-                if item.get("block_id") == document_id:
-                    root_block = item
-                    break
-            
-            # 第三步：如果有现有子块，先删除它们
-            if root_block:
-                children = root_block.get("children", [])
-                if children:
-                    # 获取子块数量
-                    child_count = len(children)
-                    if child_count > 0:
-                        # 批量删除所有子块
-                        delete_endpoint = f"/docx/v1/documents/{document_id}/blocks/{document_id}/children/batch_delete"
-                        delete_data = {
-                            "start_index": 0,
-                            "end_index": child_count
-                        }
-                        try:
-                            await self._request("DELETE", delete_endpoint,
-                                              params={"document_revision_id": revision_id},
-                                              data=delete_data,
-                                              use_user_token=use_user_token)
-                            print(f"✅ 已删除 {child_count} 个现有块")
-                        except Exception as e:
-                            print(f"⚠️  删除现有块时出错（可能文档为空）: {e}")
-                            # 继续执行，可能文档本来就是空的
-        
-        except Exception as e:
-            print(f"⚠️  获取文档信息时出错，将直接添加内容: {e}")
-            # 如果获取失败，继续执行，直接添加内容
-        
-        # 第四步：将 Markdown 内容转换为飞书文档块格式并添加
-        endpoint = f"/docx/v1/documents/{document_id}/blocks/{document_id}/children"
-
         # 将 Markdown 内容转换为飞书文档块格式
         children = self._markdown_to_feishu_blocks(content)
 
@@ -1299,36 +1623,39 @@ class FeishuClient:
                 }
             })
 
-        # 分批添加块，避免单次请求过大
-        # 飞书API建议每次最多添加30-50个块
-        BATCH_SIZE = 30
-        total_blocks = len(children)
-
+        # 获取根块下现有的子块
+        existing = []
         try:
-            for batch_start in range(0, total_blocks, BATCH_SIZE):
-                batch_end = min(batch_start + BATCH_SIZE, total_blocks)
-                batch_children = children[batch_start:batch_end]
-
-                # 获取最新的 revision_id（每批次都需要获取最新的）
-                doc_result = await self._request("GET", f"/docx/v1/documents/{document_id}", use_user_token=use_user_token)
-                latest_revision = doc_result.get("data", {}).get("document", {}).get("revision_id", -1)
-
-                data = {
-                    "children": batch_children
-                }
+            blocks = (await self.load_document(document_id, use_user_token=use_user_token))["blocks"]
+            by_id = {block.get("block_id"): block for block in blocks}
+            root_block = by_id.get(document_id, {})
+            existing = [by_id.get(child_id, {"block_id": child_id}) for child_id in root_block.get("children", [])]
+        except Exception as e:
+            print(f"⚠️  获取文档块时出错，将直接添加内容: {e}")
 
-                await self._request("POST", endpoint,
-                                  params={"document_revision_id": latest_revision},
-                                  data=data,
-                                  use_user_token=use_user_token)
-                print(f"✅ 已添加第 {batch_start + 1}-{batch_end} 个块（共 {total_blocks} 个）")
+        ops = plan_block_diff(existing, children)
+        summary = summarize_ops(ops)
+        if not ops:
+            print("✅ 文档内容没有变化")
+            return True
 
-                # 如果还有更多批次，稍微延迟一下，避免触发频率限制
-                if batch_end < total_blocks:
-                    import asyncio
-                    await asyncio.sleep(0.5)  # 延迟500ms
+        try:
+            # 操作已按从后往前排序，依次执行时前面的索引不会失效
+            updates = []
+            for op in ops:
+                if op[0] == "delete":
+                    await self.delete_document_blocks(document_id, op[1], op[2], use_user_token=use_user_token)
+                elif op[0] == "insert":
+                    await self.create_document_blocks(document_id, op[2], index=op[1], use_user_token=use_user_token)
+                else:
+                    updates.append((op[1], op[2]))
+            if updates:
+                await self.update_document_block_texts(document_id, updates, use_user_token=use_user_token)
 
-            print(f"✅ 文档内容添加完成，共 {total_blocks} 个块")
+            print(
+                f"✅ 文档内容已更新：删除 {summary['deleted']} 个块，新增 {summary['inserted']} 个块，"
+                f"修改 {summary['updated']} 个块（未变化 {len(existing) - summary['deleted'] - summary['updated']} 个）"
+            )
             return True
         except Exception as e:
             # 如果更新失败，可能是格式问题
@@ -1344,12 +1671,14 @@ class FeishuClient:
         content: str,
         use_user_token: bool = False
     ) -> bool:
-        """追加内容到文档末尾（不清空已有内容）"""
-        endpoint = f"/docx/v1/documents/{document_id}/blocks/{document_id}/children"
+        """追加内容到文档末尾（不清空已有内容）
 
-        children = self._markdown_to_feishu_blocks(content)
-        if not children:
-            children.append({
+        边转换边上传：转换出第一个分片的块后就开始写入。
+        """
+        children = iter_markdown_blocks(content)
+        first = next(children, None)
+        if first is None:
+            first = {
                 "block_type": 2,
                 "text": {
                     "elements": [
@@ -1358,47 +1687,97 @@ class FeishuClient:
                         }
                     ]
                 }
-            })
+            }
+        children = itertools.chain([first], children)
 
         try:
-            doc_result = await self._request("GET", f"/docx/v1/documents/{document_id}", use_user_token=use_user_token)
-            latest_revision = doc_result.get("data", {}).get("document", {}).get("revision_id", -1)
-            data = {"children": children}
-            await self._request(
-                "POST",
-                endpoint,
-                params={"document_revision_id": latest_revision},
-                data=data,
-                use_user_token=use_user_token
-            )
+            await self.create_document_blocks(document_id, children, use_user_token=use_user_token)
             return True
-        except Exception as e:
-            print(f"⚠️  追加文档内容失败: {e}")
+        except BlockWriteError as e:
+            print(f"⚠️  追加文档内容失败（已写入 {e.written} 个块）: {e}")
             return False
 
     async def get_document_blocks(
         self,
-        document_id: str
+        document_id: str,
+        use_user_token: bool = False
     ) -> Dict[str, Any]:
-        """获取文档的所有块内容
+        """获取文档的所有块内容（分页读取全部块，文档未修改时使用本地缓存）
         
         Args:
             document_id: 文档 ID
+            use_user_token: 是否使用用户身份 token（默认 False）
         
         Returns:
-            文档块信息
+            文档块信息 {"items": [...], "revision_id": ...}
         """
-        endpoint = f"/docx/v1/documents/{document_id}/blocks"
         try:
-            result = await self._request("GET", endpoint, params={
-                "document_revision_id": -1,
-                "page_size": 500
-            })
-            return result.get("data", {})
+            document = await self.load_document(document_id, use_user_token=use_user_token)
+            return {"items": document["blocks"], "revision_id": document["revision_id"]}
         except Exception as e:
             print(f"⚠️  获取文档块失败: {e}")
             return {}
     
+    async def get_document_meta(
+        self,
+        document_id: str,
+        use_user_token: bool = False
+    ) -> Dict[str, Any]:
+        """获取文档元信息（document_id、revision_id、title），只有一次小请求"""
+        result = await self._request("GET", f"/docx/v1/documents/{document_id}", use_user_token=use_user_token)
+        return result.get("data", {}).get("document", {})
+    
+    async def load_document(
+        self,
+        document_id: str,
+        use_user_token: bool = False,
+        meta: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """读取文档的全部块和 Markdown 内容
+        
+        先获取文档元信息，revision_id 与本地缓存一致时直接使用缓存（只需一次请求）；
+        否则分页读取该版本的全部块，转换为 Markdown 后写入缓存。
+        缓存读写失败不影响读取结果。
+        
+        Args:
+            document_id: 文档 ID
+            use_user_token: 是否使用用户身份 token（默认 False）
+            meta: 调用方刚获取的文档元信息（可选，提供时不再重复请求）
+        
+        Returns:
+            {"document_id", "revision_id", "title", "blocks", "markdown", "cached"}
+        """
+        if meta is None:
+            meta = await self.get_document_meta(document_id, use_user_token=use_user_token)
+        revision_id = meta.get("revision_id", -1)
+        title = meta.get("title")
+
+        try:
+            cached = await get_cached_document(document_id)
+        except Exception as e:
+            print(f"⚠️  读取文档缓存失败: {e}")
+            cached = None
+        if cached and revision_id != -1 and cached["revision_id"] == revision_id:
+            cached["cached"] = True
+            cached["title"] = title or cached.get("title")
+            return cached
+
+        blocks = await self.list_document_blocks(document_id, use_user_token=use_user_token, revision_id=revision_id)
+        markdown = blocks_to_markdown(blocks, root_id=document_id)
+        if revision_id != -1:
+            try:
+                await save_cached_document(document_id, revision_id, title, blocks, markdown)
+            except Exception as e:
+                print(f"⚠️  写入文档缓存失败: {e}")
+        return {
+            "document_id": document_id,
+            "revision_id": revision_id,
+            "title": title,
+            "blocks": blocks,
+            "markdown": markdown,
+            "cached": False,
+        }
+    
     async def get_document(
         self,
         file_token: str
@@ -1474,8 +1853,11 @@ class FeishuClient:
     ) -> Optional[str]:
         """根据文件夹名称查找 folder_token
         
+        并发遍历文件夹树（层级最浅的匹配优先），遍历结果写入本地路径索引，
+        索引有效期内重复查找不再请求飞书。
+        
         Args:
-            folder_name: 文件夹名称
+            folder_name: 文件夹名称，也可以是相对起始文件夹的路径（如 "项目/周报"）
             parent_folder_token: 父文件夹 token（可选，不指定则从根目录开始查找）
             max_depth: 最大搜索深度，默认5
             use_user_token: 是否使用用户身份 token（默认 False，使用应用身份 token）
@@ -1495,31 +1877,16 @@ class FeishuClient:
                 print(f"⚠️  无法获取根目录: {e}")
                 return None
         
-        # 获取当前文件夹下的所有文件和文件夹
         try:
-            result = await self.list_documents(
-                folder_token=parent_folder_token, 
-                page_size=100,
+            found = await find_in_drive(
+                self,
+                parent_folder_token,
+                folder_name,
+                obj_type="folder",
+                max_depth=max_depth,
                 use_user_token=use_user_token
             )
-            files = result.get("files", [])
-            
-            # 查找匹配的文件夹
-            for file in files:
-                if file.get("type") == "folder" and file.get("name") == folder_name:
-                    return file.get("token")
-            
-            # 如果当前目录没找到，递归搜索子文件夹
-            for file in files:
-                if file.get("type") == "folder":
-                    found = await self.find_folder_by_name(
-                        folder_name=folder_name,
-                        parent_folder_token=file.get("token"),
-                        max_depth=max_depth - 1,
-                        use_user_token=use_user_token
-                    )
-                    if found:
-                        return found
+            return found.get("token") if found else None
         except Exception as e:
             print(f"⚠️  搜索文件夹时出错: {e}")
         
@@ -1600,6 +1967,52 @@ class FeishuClient:
         result = await self._request("GET", endpoint, params=params)
         return result.get("data", {})
     
+    async def iter_folder_files(
+        self,
+        folder_token: Optional[str] = None,
+        page_size: int = 200,
+        use_user_token: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页读取文件夹下的全部文件和子文件夹（不指定 folder_token 时为根目录）"""
+        endpoint = "/drive/v1/files"
+        page_token = None
+        while True:
+            params: Dict[str, Any] = {"page_size": min(page_size, 200)}
+            if folder_token:
+                params["folder_token"] = folder_token
+            if page_token:
+                params["page_token"] = page_token
+            result = await self._request("GET", endpoint, params=params, use_user_token=use_user_token)
+            data = result.get("data", {})
+            for file in data.get("files", []):
+                yield file
+            page_token = data.get("next_page_token") or data.get("page_token")
+            if not data.get("has_more") or not page_token:
+                break
+    
+    async def iter_wiki_nodes(
+        self,
+        space_id: str,
+        parent_node_token: Optional[str] = None,
+        page_size: int = 50
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """逐页读取知识库节点（不指定 parent_node_token 时为顶层节点）"""
+        endpoint = f"/wiki/v2/spaces/{space_id}/nodes"
+        page_token = None
+        while True:
+            params: Dict[str, Any] = {"page_size": min(page_size, 50)}
+            if parent_node_token:
+                params["parent_node_token"] = parent_node_token
+            if page_token:
+                params["page_token"] = page_token
+            result = await self._request("GET", endpoint, params=params)
+            data = result.get("data", {})
+            for node in data.get("items", []):
+                yield node
+            page_token = data.get("page_token")
+            if not data.get("has_more") or not page_token:
+                break
+    
     async def delete_document(
         self,
         file_token: str
@@ -1614,79 +2027,36 @@ class FeishuClient:
         """
         endpoint = f"/drive/v1/files/{file_token}"
         await self._request("DELETE", endpoint)
+        await self._invalidate_path_index(file_token=file_token)
         return True
 
 
-def convert_memory_to_feishu_fields(
-    memory: Dict[str, Any],
-    field_name_to_id: Optional[Dict[str, str]] = None
-) -> Dict[str, Any]:
-    """将记忆数据转换为飞书多维表格字段格式
-    
+_CLIENT_REGISTRY: Dict[tuple, FeishuClient] = {}
+_CLIENT_REGISTRY_LOCK = threading.Lock()
+
+
+def get_feishu_client(
+    app_token: Optional[str] = None,
+    table_id: Optional[str] = None,
+    identity: str = "tenant"
+) -> FeishuClient:
+    """获取进程内长期复用的飞书客户端
+
+    按 (app_token, table_id, identity) 缓存实例，复用其 token、字段元数据缓存和 HTTP 连接池，
+    避免每次工具调用都重新读取配置和 token 文件。
+
     Args:
-        memory: 记忆数据
-        field_name_to_id: 字段名称到字段ID的映射（可选，如果提供则使用字段ID）
+        app_token: 多维表格 App Token（默认使用环境变量 FEISHU_APP_TOKEN）
+        table_id: 数据表 ID（默认使用环境变量 FEISHU_TABLE_ID）
+        identity: 默认调用身份，tenant（应用身份）或 user（用户身份）
+
+    Raises:
+        ValueError: 缺少必要的飞书配置
     """
-    fields = {}
-    use_field_id = field_name_to_id is not None
-    
-    # 文本字段
-    if "title" in memory:
-        key = field_name_to_id.get("标题", "标题") if use_field_id else "标题"
-        fields[key] = memory["title"]
-    if "content" in memory:
-        key = field_name_to_id.get("内容", "内容") if use_field_id else "内容"
-        fields[key] = memory["content"]
-    if "id" in memory:
-        key = field_name_to_id.get("记忆ID", "记忆ID") if use_field_id else "记忆ID"
-        fields[key] = memory["id"]
-    if "project" in memory and memory["project"]:
-        key = field_name_to_id.get("项目", "项目") if use_field_id else "项目"
-        fields[key] = memory["project"]
-    
-    # 单选字段
-    if "category" in memory:
-        fields["分类"] = memory["category"]
-    if "source" in memory and "type" in memory["source"]:
-        fields["来源类型"] = memory["source"]["type"]
-    
-    # 数字字段
-    if "importance" in memory:
-        fields["重要性"] = memory["importance"]
-    
-    # 日期时间字段
-    # 飞书日期时间字段需要时间戳（毫秒）
-    if "created_at" in memory:
-        try:
-            dt_str = memory["created_at"].replace("Z", "+00:00")
-            dt = datetime.fromisoformat(dt_str)
-            # 转换为毫秒时间戳
-            fields["创建时间"] = int(dt.timestamp() * 1000)
-        except Exception as e:
-            # 如果转换失败，尝试其他格式或跳过
-            print(f"警告: 创建时间转换失败: {e}")
-            pass
-    
-    if "updated_at" in memory:
-        try:
-            dt_str = memory["updated_at"].replace("Z", "+00:00")
-            dt = datetime.fromisoformat(dt_str)
-            fields["更新时间"] = int(dt.timestamp() * 1000)
-        except Exception as e:
-            print(f"警告: 更新时间转换失败: {e}")
-            pass
-    
-    # 多选字段（标签）
-    # 飞书多选字段需要数组格式，空数组也要传
-    if "tags" in memory:
-        if isinstance(memory["tags"], list):
-            fields["标签"] = memory["tags"] if memory["tags"] else []
-        else:
-            fields["标签"] = []
-    
-    # 复选框字段
-    # 飞书复选框字段需要布尔值
-    if "archived" in memory:
-        fields["是否归档"] = bool(memory["archived"])
-    
-    return fields
+    key = (app_token or FEISHU_APP_TOKEN, table_id or FEISHU_TABLE_ID, identity)
+    with _CLIENT_REGISTRY_LOCK:
+        client = _CLIENT_REGISTRY.get(key)
+        if client is None:
+            client = FeishuClient(app_token=key[0], table_id=key[1], identity=identity)
+            _CLIENT_REGISTRY[key] = client
+        return client
@@ -0,0 +1,312 @@
+"""飞书多维表格字段映射
+
+把记忆数据转换为多维表格记录字段：
+- convert_memory_to_feishu_fields: 按字段名称转换（不依赖表结构）
+- TableSchema: 缓存的表结构及其指纹，用于发现字段变化
+- FieldMapper: 根据表结构预编译的映射，输出按字段 ID 提交的记录，并在本地校验字段值；
+  也负责把飞书记录解析回记忆字段（拉取飞书端修改）
+"""
+
+import hashlib
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 飞书多维表格字段类型
+FIELD_TYPE_TEXT = 1
+FIELD_TYPE_NUMBER = 2
+FIELD_TYPE_SINGLE_SELECT = 3
+FIELD_TYPE_MULTI_SELECT = 4
+FIELD_TYPE_DATETIME = 5
+FIELD_TYPE_CHECKBOX = 7
+FIELD_TYPE_CREATED_TIME = 1001
+FIELD_TYPE_MODIFIED_TIME = 1002
+
+# 记忆字段在飞书表格中的名称及期望的字段类型
+MEMORY_FIELD_TYPES: Dict[str, Tuple[int, ...]] = {
+    "标题": (FIELD_TYPE_TEXT,),
+    "内容": (FIELD_TYPE_TEXT,),
+    "记忆ID": (FIELD_TYPE_TEXT,),
+    "项目": (FIELD_TYPE_TEXT, FIELD_TYPE_SINGLE_SELECT),
+    "分类": (FIELD_TYPE_SINGLE_SELECT, FIELD_TYPE_TEXT),
+    "来源类型": (FIELD_TYPE_SINGLE_SELECT, FIELD_TYPE_TEXT),
+    "重要性": (FIELD_TYPE_NUMBER,),
+    "创建时间": (FIELD_TYPE_DATETIME,),
+    "更新时间": (FIELD_TYPE_DATETIME,),
+    "标签": (FIELD_TYPE_MULTI_SELECT,),
+    "是否归档": (FIELD_TYPE_CHECKBOX,),
+}
+
+# 同步时必须存在的字段（用于匹配本地记忆）
+REQUIRED_FIELDS = ("记忆ID",)
+
+# 可以在飞书中修改并拉取回本地的字段：飞书字段名称 -> 记忆字段
+PULLABLE_FIELDS: Dict[str, str] = {
+    "标题": "title",
+    "内容": "content",
+    "项目": "project",
+    "分类": "category",
+    "重要性": "importance",
+    "标签": "tags",
+    "是否归档": "archived",
+}
+
+
+def to_timestamp_ms(value: str) -> int:
+    """ISO 时间字符串转换为毫秒时间戳（飞书日期时间字段格式）"""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return int(dt.timestamp() * 1000)
+
+
+def field_text(value: Any) -> Optional[str]:
+    """读取文本类字段的值
+
+    记录接口返回的文本字段可能是字符串，也可能是富文本片段数组
+    [{"type": "text", "text": "..."}, ...]。
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "".join(
+            seg.get("text", "") if isinstance(seg, dict) else str(seg)
+            for seg in value
+        )
+    if isinstance(value, dict):
+        return value.get("text")
+    return str(value)
+
+
+def convert_memory_to_feishu_fields(
+    memory: Dict[str, Any],
+    field_name_to_id: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """将记忆数据转换为飞书多维表格字段格式
+
+    Args:
+        memory: 记忆数据
+        field_name_to_id: 字段名称到字段ID的映射（可选，如果提供则使用字段ID）
+    """
+    fields = {}
+
+    # 文本字段
+    if "title" in memory:
+        fields["标题"] = memory["title"]
+    if "content" in memory:
+        fields["内容"] = memory["content"]
+    if "id" in memory:
+        fields["记忆ID"] = memory["id"]
+    if "project" in memory and memory["project"]:
+        fields["项目"] = memory["project"]
+
+    # 单选字段
+    if "category" in memory:
+        fields["分类"] = memory["category"]
+    if "source" in memory and "type" in memory["source"]:
+        fields["来源类型"] = memory["source"]["type"]
+
+    # 数字字段
+    if "importance" in memory:
+        fields["重要性"] = memory["importance"]
+
+    # 日期时间字段
+    # 飞书日期时间字段需要时间戳（毫秒）
+    if "created_at" in memory:
+        try:
+            fields["创建时间"] = to_timestamp_ms(memory["created_at"])
+        except Exception as e:
+            # 如果转换失败，跳过
+            print(f"警告: 创建时间转换失败: {e}")
+
+    if "updated_at" in memory:
+        try:
+            fields["更新时间"] = to_timestamp_ms(memory["updated_at"])
+        except Exception as e:
+            print(f"警告: 更新时间转换失败: {e}")
+
+    # 多选字段（标签）
+    # 飞书多选字段需要数组格式，空数组也要传
+    if "tags" in memory:
+        if isinstance(memory["tags"], list):
+            fields["标签"] = memory["tags"] if memory["tags"] else []
+        else:
+            fields["标签"] = []
+
+    # 复选框字段
+    # 飞书复选框字段需要布尔值
+    if "archived" in memory:
+        fields["是否归档"] = bool(memory["archived"])
+
+    if field_name_to_id is not None:
+        fields = {field_name_to_id.get(name, name): value for name, value in fields.items()}
+
+    return fields
+
+
+class TableSchema:
+    """多维表格字段结构（带获取时间和指纹）"""
+
+    def __init__(self, table_id: str, fields: List[Dict[str, Any]]):
+        self.table_id = table_id
+        self.fields = fields
+        self.fetched_at = time.monotonic()
+        self.by_name = {f.get("field_name"): f for f in fields}
+        self.by_id = {f.get("field_id"): f for f in fields}
+        self.fingerprint = self._fingerprint(fields)
+
+    @staticmethod
+    def _fingerprint(fields: List[Dict[str, Any]]) -> str:
+        """只取影响写入的部分（字段 ID、名称、类型），忽略描述等无关属性"""
+        key = sorted((f.get("field_id") or "", f.get("field_name") or "", f.get("type") or 0) for f in fields)
+        return hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def diff(self, other: "TableSchema") -> Dict[str, List[str]]:
+        """对比两份表结构，返回新增、删除、类型变化的字段名称"""
+        added = [name for name in other.by_name if name not in self.by_name]
+        removed = [name for name in self.by_name if name not in other.by_name]
+        changed = [
+            name for name, field in other.by_name.items()
+            if name in self.by_name and (
+                self.by_name[name].get("type") != field.get("type")
+                or self.by_name[name].get("field_id") != field.get("field_id")
+            )
+        ]
+        return {"added": added, "removed": removed, "changed": changed}
+
+
+def _check_text(value: Any) -> Optional[str]:
+    return None if isinstance(value, str) else "应为文本"
+
+
+def _check_number(value: Any) -> Optional[str]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return "应为数字"
+    return None
+
+
+def _check_multi_select(value: Any) -> Optional[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+        return "应为非空字符串数组"
+    return None
+
+
+def _check_datetime(value: Any) -> Optional[str]:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        return "应为毫秒时间戳"
+    return None
+
+
+def _check_checkbox(value: Any) -> Optional[str]:
+    return None if isinstance(value, bool) else "应为布尔值"
+
+
+_TYPE_CHECKS: Dict[int, Callable[[Any], Optional[str]]] = {
+    FIELD_TYPE_TEXT: _check_text,
+    FIELD_TYPE_NUMBER: _check_number,
+    FIELD_TYPE_SINGLE_SELECT: _check_text,
+    FIELD_TYPE_MULTI_SELECT: _check_multi_select,
+    FIELD_TYPE_DATETIME: _check_datetime,
+    FIELD_TYPE_CHECKBOX: _check_checkbox,
+}
+
+
+class FieldMapper:
+    """根据表结构预编译的记忆字段映射
+
+    编译时确定每个记忆字段对应的字段 ID 和校验函数，
+    之后每条记录只需一次字典遍历即可得到按字段 ID 提交的数据和本地校验结果。
+    """
+
+    def __init__(self, schema: TableSchema):
+        self.schema = schema
+        self.fingerprint = schema.fingerprint
+        # 字段名称 -> (字段 ID, 校验函数)
+        self._compiled: Dict[str, Tuple[str, Callable[[Any], Optional[str]]]] = {}
+        # 表中不存在的字段，以及类型与期望不符的字段
+        self.missing_fields: List[str] = []
+        self.type_mismatches: Dict[str, int] = {}
+
+        for name, expected_types in MEMORY_FIELD_TYPES.items():
+            field = schema.by_name.get(name)
+            if field is None:
+                self.missing_fields.append(name)
+                continue
+            field_type = field.get("type")
+            if field_type not in expected_types:
+                self.type_mismatches[name] = field_type
+                continue
+            self._compiled[name] = (field["field_id"], _TYPE_CHECKS[field_type])
+
+    @property
+    def field_name_to_id(self) -> Dict[str, str]:
+        return {name: field_id for name, (field_id, _) in self._compiled.items()}
+
+    def schema_errors(self) -> List[str]:
+        """表结构层面的问题：缺少必需字段"""
+        errors = []
+        for name in REQUIRED_FIELDS:
+            if name in self.missing_fields:
+                errors.append(f"表格缺少必需字段「{name}」")
+            elif name in self.type_mismatches:
+                errors.append(f"字段「{name}」类型不匹配（当前类型 {self.type_mismatches[name]}）")
+        return errors
+
+    def build(self, memory: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """转换并校验一条记忆
+
+        表中不存在或类型不匹配的字段会被跳过，而不是发送后再由 API 报错。
+
+        Returns:
+            (按字段 ID 组织的字段数据, 错误列表)；错误列表非空时不应发送
+        """
+        errors = self.schema_errors()
+        fields: Dict[str, Any] = {}
+        for name, value in convert_memory_to_feishu_fields(memory).items():
+            compiled = self._compiled.get(name)
+            if compiled is None:
+                continue
+            field_id, check = compiled
+            problem = check(value)
+            if problem:
+                errors.append(f"字段「{name}」{problem}: {value!r}")
+                continue
+            fields[field_id] = value
+
+        importance = memory.get("importance")
+        if isinstance(importance, int) and not 1 <= importance <= 5:
+            errors.append(f"字段「重要性」应在 1-5 之间: {importance}")
+
+        return fields, errors
+
+    def parse_record(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """把飞书记录（按字段名称返回）解析为记忆字段
+
+        只解析表中存在且类型匹配的可拉取字段。飞书不返回空值字段，
+        所以表中存在但记录里缺失的字段按空值处理；标题和内容为空时不覆盖本地。
+        """
+        memory: Dict[str, Any] = {}
+        for name, key in PULLABLE_FIELDS.items():
+            if name not in self._compiled:
+                continue
+            value = fields.get(name)
+            if key in ("title", "content"):
+                text = field_text(value)
+                if text:
+                    memory[key] = text
+            elif key in ("project", "category"):
+                text = field_text(value)
+                if text or key == "project":
+                    memory[key] = text or None
+            elif key == "importance":
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    memory[key] = int(value)
+            elif key == "tags":
+                memory[key] = [field_text(v) for v in value] if isinstance(value, list) else []
+            elif key == "archived":
+                memory[key] = bool(value)
+        return memory
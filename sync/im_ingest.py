@@ -0,0 +1,170 @@
+"""飞书消息自动写入记忆（webhook 的可选入库阶段，FEISHU_IM_SAVE_TO_MEMORY=true 时启用）
+
+- 新消息按群聊缓冲，时间窗口（window 秒）内的消息合成一条 conversation 记忆
+- 单个群缓冲达到 max_messages 条时立即写入，超过的部分拆成多条记忆
+- 用 memory_suggest_category 的关键词规则判断内容偏 insight 还是 knowledge，写入标签
+- 同一次到期的所有群聊用 add_memories_bulk 一个事务写入
+- 写入后在收件箱中记录每条消息对应的 memory_id，便于追溯原始事件
+- 写入失败的消息保留在缓冲区，一个时间窗口后重试
+"""
+
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.inbox as inbox
+from storage.db import add_memories_bulk
+from tools.memory_suggest_category import analyze_content_features
+
+# 时间窗口（秒）：群里第一条待写入消息之后等待这么久再写入
+INGEST_WINDOW = float(os.getenv("FEISHU_IM_INGEST_WINDOW", "300"))
+
+# 单条记忆最多包含的消息数
+INGEST_MAX_MESSAGES = int(os.getenv("FEISHU_IM_INGEST_MAX_MESSAGES", "50"))
+
+
+class _Pending:
+    def __init__(self, since: float):
+        self.since = since
+        self.messages: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+class MemoryIngestor:
+    """按群聊和时间窗口把收件箱新消息批量写入记忆
+
+    Args:
+        write: 批量写入记忆的函数（默认 add_memories_bulk）
+        link: 记录 message_id → memory_id 的函数（默认 inbox.link_memories）
+        window: 时间窗口（秒）
+        max_messages: 单条记忆最多包含的消息数
+        clock: 时间函数（测试用）
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[dict]], Awaitable[List[dict]]] = add_memories_bulk,
+        link: Callable[[Dict[str, str]], Awaitable[int]] = inbox.link_memories,
+        window: float = INGEST_WINDOW,
+        max_messages: int = INGEST_MAX_MESSAGES,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.write = write
+        self.link = link
+        self.window = window
+        self.max_messages = max(1, max_messages)
+        self.clock = clock
+        self._pending: Dict[str, _Pending] = {}
+        self.ingested = 0
+
+    def add(self, entries: List[Dict[str, Any]]) -> None:
+        """把新消息加入所属群聊的缓冲区（按 message_id 去重）"""
+        now = self.clock()
+        for entry in entries:
+            if not entry.get("message_id"):
+                continue
+            chat_id = entry.get("chat_id") or "unknown"
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                pending = self._pending[chat_id] = _Pending(now)
+            pending.messages[entry["message_id"]] = entry
+
+    def pending_count(self) -> int:
+        return sum(len(p.messages) for p in self._pending.values())
+
+    def due_at(self, chat_id: str) -> Optional[float]:
+        """群聊的下一次写入时间（缓冲满时为立即）"""
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            return None
+        if len(pending.messages) >= self.max_messages:
+            return pending.since
+        return pending.since + self.window
+
+    def next_due(self) -> Optional[float]:
+        """所有群聊中最早的写入时间"""
+        dues = [self.due_at(chat_id) for chat_id in self._pending]
+        return min(dues) if dues else None
+
+    async def flush_due(self, force: bool = False) -> List[Dict[str, Any]]:
+        """把已到期群聊的消息写入记忆
+
+        Args:
+            force: 忽略时间窗口，立即写入全部缓冲（停止服务时使用）
+
+        Returns:
+            本次写入的记忆
+        """
+        now = self.clock()
+        due = [chat_id for chat_id in self._pending if force or self.due_at(chat_id) <= now]
+        if not due:
+            return []
+
+        # 先从缓冲区取出，写入期间新到的消息进入新的缓冲
+        batches = {chat_id: self._pending.pop(chat_id) for chat_id in due}
+        memories = []
+        links: Dict[str, str] = {}
+        for chat_id, pending in batches.items():
+            messages = list(pending.messages.values())
+            for start in range(0, len(messages), self.max_messages):
+                chunk = messages[start:start + self.max_messages]
+                memory = build_conversation_memory(chat_id, chunk)
+                memories.append(memory)
+                links.update({m["message_id"]: memory["memory_id"] for m in chunk})
+
+        try:
+            await self.write(memories)
+        except Exception as e:
+            print(f"❌ 写入记忆失败（{len(links)} 条消息，稍后重试）: {e}")
+            for chat_id, pending in batches.items():
+                pending.since = now
+                newer = self._pending.get(chat_id)
+                if newer is not None:
+                    pending.messages.update(newer.messages)
+                self._pending[chat_id] = pending
+            return []
+
+        self.ingested += len(links)
+        try:
+            await self.link(links)
+        except Exception as e:
+            # 记忆已写入，只是缺少追溯信息；不重试以免重复写入
+            print(f"⚠️  记录消息与记忆的对应关系失败: {e}")
+        print(f"✅ 已写入 {len(memories)} 条记忆（{len(links)} 条飞书消息）")
+        return memories
+
+
+def build_conversation_memory(chat_id: str, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """把一个群聊的一批消息合成一条 conversation 记忆（add_memories_bulk 的参数格式）"""
+    messages = sorted(messages, key=lambda m: (m.get("created_at") or "", m.get("seq") or 0))
+    start = (messages[0].get("created_at") or "")[:16].replace("T", " ")
+    end = (messages[-1].get("created_at") or "")[:16].replace("T", " ")
+
+    lines = [
+        f"[{(m.get('created_at') or '')[:19].replace('T', ' ')}] "
+        f"{m.get('sender_open_id') or '未知发送者'}: {m.get('text') or ''}"
+        for m in messages
+    ]
+    title = f"飞书群聊记录 {chat_id}（{start} ~ {end}，{len(messages)} 条）"
+    content = "\n".join([f"群聊：{chat_id}", f"时间：{start} ~ {end}", f"消息数：{len(messages)}", ""] + lines)
+
+    # 沿用 memory_suggest_category 的规则判断内容倾向，写入标签便于后续筛选
+    suggestion = analyze_content_features(title, "\n".join(m.get("text") or "" for m in messages))
+    tags = ["飞书消息", suggestion["suggested_category"]]
+
+    return {
+        "memory_id": f"feishu_{messages[0]['message_id']}_{uuid.uuid4().hex[:8]}",
+        "category": "conversation",
+        "title": title,
+        "content": content,
+        "importance": 3,
+        "source_type": "feishu_im",
+        "tags": tags,
+    }
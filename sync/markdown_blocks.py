@@ -0,0 +1,356 @@
+"""Markdown 与飞书文档块互相转换
+
+单遍扫描：每行用一个预编译的组合正则判断行类型（代码围栏、分割线、标题、
+引用、无序列表、有序列表），按顺序逐个产出块，调用方可以边转换边上传。
+
+转换规则与原先逐行处理的实现保持一致（见 tests/markdown_golden.json）：
+- 列表项去掉缩进后按同一层级输出，连续同类列表项合并为一个列表
+- 标题、引用、普通段落和空行会结束当前列表；分割线和代码块不会，
+  所以列表中间的分割线、代码块会先于待输出的列表项产出
+- 表格行按普通段落输出
+
+blocks_to_markdown 做反向转换（读取文档内容时使用），支持上面这些块类型，
+以及待办、表格、引用容器、高亮块和图片。
+"""
+
+import re
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import unquote
+
+# 飞书代码块语言代码（未识别的语言使用 1 = PlainText）
+CODE_LANGUAGES: Dict[str, int] = {
+    'python': 11, 'py': 11,
+    'javascript': 12, 'js': 12,
+    'java': 13,
+    'cpp': 14, 'c++': 14,
+    'c': 15,
+    'go': 16,
+    'rust': 17,
+    'php': 18,
+    'ruby': 19,
+    'swift': 20,
+    'kotlin': 21,
+    'typescript': 22, 'ts': 22,
+    'sql': 23,
+    'html': 24,
+    'css': 25,
+    'json': 26,
+    'xml': 27,
+    'markdown': 28, 'md': 28,
+    'bash': 29, 'shell': 29, 'sh': 29,
+}
+
+# 行类型（作用于去掉首尾空白的行，按分支顺序优先匹配）
+_LINE_PATTERN = re.compile(
+    r'(?P<fence>```)'
+    r'|(?P<divider>[-*_]{3,}$)'
+    r'|(?P<hashes>#{1,9})\s+(?P<heading>.+)$'
+    r'|(?P<quote>>)'
+    r'|[-*]\s+(?P<bullet>.+)$'
+    r'|\d+\.\s+(?P<ordered>.+)$'
+)
+
+# 行内样式：**粗体**、*斜体*、~~删除线~~、`代码`
+_INLINE_PATTERN = re.compile(r'\*\*([^*]+)\*\*|\*([^*]+)\*|~~([^~]+)~~|`([^`]+)`')
+_INLINE_STYLES = (None, "bold", "italic", "strikeThrough", "codeInline")
+_INLINE_CHARS = frozenset("*~`")
+
+_LIST_FIELDS = {"bullet": (12, "bullet"), "ordered": (13, "ordered")}
+
+
+def _text_run(content: str) -> Dict[str, Any]:
+    return {"text_run": {"content": content}}
+
+
+def parse_inline(text: str) -> List[Dict[str, Any]]:
+    """解析行内格式（粗体、斜体、删除线、行内代码）
+
+    Args:
+        text: 包含 Markdown 格式的文本
+
+    Returns:
+        飞书文档元素列表
+    """
+    # 没有格式字符时不需要正则扫描
+    if _INLINE_CHARS.isdisjoint(text):
+        return [_text_run(text)]
+
+    elements = []
+    last_pos = 0
+    for match in _INLINE_PATTERN.finditer(text):
+        start = match.start()
+        if start > last_pos:
+            elements.append(_text_run(text[last_pos:start]))
+        group = match.lastindex
+        elements.append({
+            "text_run": {
+                "content": match.group(group),
+                "text_element_style": {_INLINE_STYLES[group]: True}
+            }
+        })
+        last_pos = match.end()
+
+    if last_pos < len(text):
+        elements.append(_text_run(text[last_pos:]))
+    if not elements:
+        elements.append(_text_run(text))
+    return elements
+
+
+def _code_block(language: str, lines: List[str]) -> Dict[str, Any]:
+    return {
+        "block_type": 14,  # code block
+        "code": {
+            "language": CODE_LANGUAGES.get(language.lower(), 1) if language else 1,
+            "elements": [_text_run('\n'.join(lines))]
+        }
+    }
+
+
+def _text_block(block_type: int, field: str, text: str) -> Dict[str, Any]:
+    return {"block_type": block_type, field: {"elements": parse_inline(text)}}
+
+
+def iter_markdown_blocks(content: str) -> Iterator[Dict[str, Any]]:
+    """逐个产出 Markdown 内容对应的飞书文档块
+
+    Args:
+        content: Markdown 格式的内容
+
+    Yields:
+        飞书文档块
+    """
+    match_line = _LINE_PATTERN.match
+    in_code_block = False
+    code_language = ""
+    code_lines: List[str] = []
+    list_type = None  # 'bullet' / 'ordered' / None
+    list_items: List[str] = []
+
+    for line in content.split('\n'):
+        stripped = line.strip()
+
+        if in_code_block:
+            if stripped.startswith('```'):
+                if code_lines:
+                    yield _code_block(code_language, code_lines)
+                code_lines = []
+                in_code_block = False
+            else:
+                code_lines.append(line)
+            continue
+
+        match = match_line(stripped)
+        kind = match.lastgroup if match else None
+
+        if kind == "fence":
+            in_code_block = True
+            code_language = stripped[3:].strip()
+            continue
+        if kind == "divider":
+            yield {"block_type": 22, "divider": {}}
+            continue
+        if kind == "bullet" or kind == "ordered":
+            if list_type != kind and list_items:
+                block_type, field = _LIST_FIELDS[list_type]
+                for item in list_items:
+                    yield _text_block(block_type, field, item)
+                list_items = []
+            list_type = kind
+            list_items.append(match.group(kind))
+            continue
+
+        # 其余行都会结束当前列表（空行只结束列表）
+        if list_items:
+            block_type, field = _LIST_FIELDS[list_type]
+            for item in list_items:
+                yield _text_block(block_type, field, item)
+            list_items = []
+        list_type = None
+
+        if kind == "heading":
+            level = len(match.group("hashes"))
+            yield _text_block(2 + level, f"heading{level}", match.group("heading"))
+        elif kind == "quote":
+            yield _text_block(15, "quote", stripped[1:].strip())
+        elif stripped:
+            yield _text_block(2, "text", stripped)
+
+    # 文件末尾未闭合的代码块和未结束的列表
+    if in_code_block and code_lines:
+        yield _code_block(code_language, code_lines)
+    if list_items:
+        block_type, field = _LIST_FIELDS[list_type]
+        for item in list_items:
+            yield _text_block(block_type, field, item)
+
+
+def markdown_to_blocks(content: str) -> List[Dict[str, Any]]:
+    """将 Markdown 内容转换为飞书文档块列表"""
+    return list(iter_markdown_blocks(content))
+
+
+def list_blocks(items: List[str], list_type: str) -> List[Dict[str, Any]]:
+    """把列表项文本转换为列表块（list_type 为 'bullet' 或 'ordered'）"""
+    block_type, field = _LIST_FIELDS[list_type]
+    return [_text_block(block_type, field, item) for item in items]
+
+
+# ---- 飞书文档块 -> Markdown ----
+
+# 语言代码 -> 代码围栏上的语言名称（取每个代码的第一个名称）
+_LANGUAGE_NAMES: Dict[int, str] = {}
+for _name, _code in CODE_LANGUAGES.items():
+    _LANGUAGE_NAMES.setdefault(_code, _name)
+
+# 块内容所在字段（与 sync.doc_diff.BLOCK_PAYLOAD_KEYS 一致，另加待办和高亮块）
+_PAYLOAD_KEYS: Dict[int, str] = {
+    2: "text",
+    **{2 + level: f"heading{level}" for level in range(1, 10)},
+    12: "bullet",
+    13: "ordered",
+    14: "code",
+    15: "quote",
+    17: "todo",
+}
+
+# 子块需要作为引用输出的容器：19=高亮块，34=引用容器
+_QUOTE_CONTAINER_TYPES = {19, 34}
+
+
+def elements_to_markdown(elements: List[Dict[str, Any]]) -> str:
+    """把文字元素列表转换为带行内格式的 Markdown 文本"""
+    parts = []
+    for element in elements or []:
+        run = element.get("text_run")
+        if run is None:
+            if "equation" in element:
+                parts.append(f"${element['equation'].get('content', '').strip()}$")
+            elif "mention_doc" in element:
+                mention = element["mention_doc"]
+                parts.append(f"[{mention.get('title', '')}]({unquote(mention.get('url', ''))})")
+            continue
+        text = run.get("content", "")
+        if not text:
+            continue
+        style = run.get("text_element_style") or {}
+        if style.get("inline_code") or style.get("codeInline"):
+            text = f"`{text}`"
+        else:
+            if style.get("strikethrough") or style.get("strikeThrough"):
+                text = f"~~{text}~~"
+            if style.get("italic"):
+                text = f"*{text}*"
+            if style.get("bold"):
+                text = f"**{text}**"
+        link = (style.get("link") or {}).get("url")
+        if link:
+            text = f"[{text}]({unquote(link)})"
+        parts.append(text)
+    return "".join(parts)
+
+
+def _table_markdown(block: Dict[str, Any], by_id: Dict[str, Dict[str, Any]]) -> List[str]:
+    """表格块（31）按行输出为 Markdown 表格，单元格内容取其子块文字"""
+    columns = (block.get("table", {}).get("property") or {}).get("column_size") or 1
+    cells = []
+    for cell_id in block.get("children", []):
+        cell = by_id.get(cell_id, {})
+        texts = [
+            elements_to_markdown(by_id[child_id].get(_PAYLOAD_KEYS.get(by_id[child_id].get("block_type"), ""), {}).get("elements", []))
+            for child_id in cell.get("children", []) if child_id in by_id
+        ]
+        cells.append(" ".join(t for t in texts if t).replace("|", "\\|"))
+    rows = [cells[i:i + columns] for i in range(0, len(cells), columns)]
+    lines = []
+    for index, row in enumerate(rows):
+        lines.append("| " + " | ".join(row) + " |")
+        if index == 0:
+            lines.append("| " + " | ".join("---" for _ in row) + " |")
+    return lines
+
+
+def blocks_to_markdown(blocks: List[Dict[str, Any]], root_id: Optional[str] = None) -> str:
+    """把文档块列表（接口返回的全部块）转换为 Markdown
+
+    Args:
+        blocks: 文档的全部块（含页面根块，块之间通过 children 关联）
+        root_id: 根块 ID，默认取页面块（block_type=1）
+
+    Returns:
+        Markdown 文本；不支持的块类型跳过，但其子块照常输出
+    """
+    by_id = {block.get("block_id"): block for block in blocks}
+    if root_id is None:
+        root = next((block for block in blocks if block.get("block_type") == 1), None)
+        root_id = root.get("block_id") if root else None
+    if root_id not in by_id:
+        return ""
+
+    lines: List[str] = []
+
+    def render(block_ids: List[str], depth: int, prefix: str):
+        ordered_number = 0
+        for block_id in block_ids:
+            block = by_id.get(block_id)
+            if not block:
+                continue
+            block_type = block.get("block_type")
+            indent = prefix + "  " * depth
+            ordered_number = ordered_number + 1 if block_type == 13 else 0
+            payload = block.get(_PAYLOAD_KEYS.get(block_type, ""), {}) or {}
+            text = elements_to_markdown(payload.get("elements", []))
+            children = block.get("children", [])
+
+            if block_type == 2:
+                if text:
+                    lines.append(prefix + text)
+            elif 3 <= block_type <= 11:
+                lines.append(f"{prefix}{'#' * (block_type - 2)} {text}")
+            elif block_type == 12:
+                lines.append(f"{indent}- {text}")
+            elif block_type == 13:
+                lines.append(f"{indent}{ordered_number}. {text}")
+            elif block_type == 17:
+                done = (payload.get("style") or {}).get("done")
+                lines.append(f"{indent}- [{'x' if done else ' '}] {text}")
+            elif block_type == 14:
+                language = _LANGUAGE_NAMES.get((payload.get("style") or {}).get("language") or payload.get("language"), "")
+                code = "".join(e.get("text_run", {}).get("content", "") for e in payload.get("elements", []))
+                lines.append(f"{prefix}```{language}")
+                lines.extend(prefix + line for line in code.split("\n"))
+                lines.append(f"{prefix}```")
+            elif block_type == 15:
+                lines.append(f"{prefix}> {text}")
+            elif block_type == 22:
+                lines.append(prefix + "---")
+            elif block_type == 27:
+                lines.append(f"{prefix}![image]({block.get('image', {}).get('token', '')})")
+            elif block_type == 31:
+                lines.extend(prefix + line for line in _table_markdown(block, by_id))
+                continue
+            elif block_type in _QUOTE_CONTAINER_TYPES:
+                render(children, 0, prefix + "> ")
+                continue
+
+            if children:
+                # 列表、待办的子块缩进一级，其他块的子块按同级输出
+                nested = block_type in (12, 13, 17)
+                render(children, depth + 1 if nested else depth, prefix)
+
+    render(by_id[root_id].get("children", []), 0, "")
+    return "\n".join(lines)
+
+
+def blocks_to_text(blocks: List[Dict[str, Any]]) -> str:
+    """提取文档块的纯文本（每个有文字的块一行，用于全文索引）"""
+    lines = []
+    for block in blocks:
+        payload = block.get(_PAYLOAD_KEYS.get(block.get("block_type"), ""), {}) or {}
+        text = "".join(
+            element.get("text_run", {}).get("content", "")
+            for element in payload.get("elements", [])
+        ).strip()
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
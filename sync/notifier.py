@@ -0,0 +1,204 @@
+"""飞书新消息提醒的合并发送
+
+- 新消息按通知目标（群聊）缓冲，在合并窗口（window 秒）内到达的消息合成一条摘要
+- 摘要按来源群聊、发送者分组，使用富文本（post）消息：每个群的消息数、
+  各发送者的条数和最新一条内容
+- 同一目标两次发送之间至少间隔 min_interval 秒，突发消息只会产生一条提醒
+- 复用同一个 FeishuClient，群名通过 list_chats 查询一次后缓存
+- 发送失败的消息保留在缓冲区，一个合并窗口后重试
+"""
+
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# 合并窗口（秒）：第一条待发消息之后等待这么久再发送
+NOTIFY_WINDOW = float(os.getenv("FEISHU_NOTIFY_WINDOW", "60"))
+
+# 同一目标两次提醒的最小间隔（秒）
+NOTIFY_MIN_INTERVAL = float(os.getenv("FEISHU_NOTIFY_MIN_INTERVAL", "300"))
+
+# 摘要中最多列出的群聊数 / 每个群的发送者数 / 预览长度
+DIGEST_MAX_CHATS = 10
+DIGEST_MAX_SENDERS = 3
+DIGEST_PREVIEW_CHARS = 40
+
+
+class _Pending:
+    def __init__(self, since: float):
+        self.since = since
+        self.messages: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+class CoalescingNotifier:
+    """按目标合并新消息提醒
+
+    Args:
+        get_client: 返回 FeishuClient 的函数（第一次发送时调用一次）
+        window: 合并窗口（秒）
+        min_interval: 同一目标的最小发送间隔（秒）
+        clock: 时间函数（测试用）
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Any],
+        window: float = NOTIFY_WINDOW,
+        min_interval: float = NOTIFY_MIN_INTERVAL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.get_client = get_client
+        self.window = window
+        self.min_interval = min_interval
+        self.clock = clock
+        self._client = None
+        self._pending: Dict[str, _Pending] = {}
+        self._last_sent: Dict[str, float] = {}
+        self._chat_names: Optional[Dict[str, str]] = None
+        self.sent = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.get_client()
+        return self._client
+
+    def add(self, target: str, messages: List[Dict[str, Any]]) -> None:
+        """把新消息加入目标的缓冲区（按 message_id 去重）"""
+        if not messages:
+            return
+        pending = self._pending.get(target)
+        if pending is None:
+            pending = self._pending[target] = _Pending(self.clock())
+        for message in messages:
+            pending.messages[message["message_id"]] = message
+
+    def pending_count(self, target: Optional[str] = None) -> int:
+        if target is not None:
+            pending = self._pending.get(target)
+            return len(pending.messages) if pending else 0
+        return sum(len(p.messages) for p in self._pending.values())
+
+    def pending_floor(self) -> Optional[int]:
+        """缓冲区中最小的 seq（没有待发消息时为 None），用于决定可以持久化的游标"""
+        seqs = [m["seq"] for p in self._pending.values() for m in p.messages.values() if m.get("seq") is not None]
+        return min(seqs) if seqs else None
+
+    def due_at(self, target: str) -> Optional[float]:
+        """目标的下一次可发送时间（没有待发消息时为 None）"""
+        pending = self._pending.get(target)
+        if pending is None:
+            return None
+        last_sent = self._last_sent.get(target)
+        due = pending.since + self.window
+        if last_sent is not None:
+            due = max(due, last_sent + self.min_interval)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """所有目标中最早的可发送时间"""
+        dues = [self.due_at(target) for target in self._pending]
+        return min(dues) if dues else None
+
+    async def flush_due(self, unread: Optional[int] = None, force: bool = False) -> int:
+        """发送已到期目标的摘要
+
+        Args:
+            unread: 收件箱未归档总数（写入摘要标题）
+            force: 忽略合并窗口和最小间隔，立即发送
+
+        Returns:
+            本次发送的摘要数量
+        """
+        now = self.clock()
+        sent = 0
+        for target in list(self._pending):
+            if not force and self.due_at(target) > now:
+                continue
+            pending = self._pending[target]
+            messages = list(pending.messages.values())
+            try:
+                await self._send(target, messages, unread)
+            except Exception as e:
+                print(f"❌ 发送通知失败（{target}）: {e}")
+                # 保留消息，一个合并窗口后重试
+                pending.since = now
+                continue
+            del self._pending[target]
+            self._last_sent[target] = self.clock()
+            sent += 1
+            print(f"✅ 已发送通知：{len(messages)} 条新消息 → {target}")
+        self.sent += sent
+        return sent
+
+    async def _send(self, target: str, messages: List[Dict[str, Any]], unread: Optional[int]) -> None:
+        chat_names = await self._load_chat_names()
+        content = build_digest(messages, unread, chat_names)
+        await self.client.send_message(
+            receive_id_type="chat_id",
+            receive_id=target,
+            msg_type="post",
+            content=content,
+            use_user_token=False
+        )
+
+    async def _load_chat_names(self) -> Dict[str, str]:
+        if self._chat_names is not None:
+            return self._chat_names
+        names: Dict[str, str] = {}
+        try:
+            page_token = None
+            while True:
+                data = await self.client.list_chats(page_size=100, page_token=page_token)
+                for chat in data.get("items", []):
+                    names[chat.get("chat_id")] = chat.get("name") or chat.get("chat_id")
+                page_token = data.get("page_token")
+                if not data.get("has_more") or not page_token:
+                    break
+        except Exception as e:
+            print(f"⚠️  获取群名失败，摘要中使用群 ID: {e}")
+        self._chat_names = names
+        return names
+
+
+def _preview(text: Optional[str]) -> str:
+    text = " ".join((text or "").split())
+    if len(text) > DIGEST_PREVIEW_CHARS:
+        return text[:DIGEST_PREVIEW_CHARS] + "…"
+    return text
+
+
+def build_digest(
+    messages: List[Dict[str, Any]],
+    unread: Optional[int] = None,
+    chat_names: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """把新消息合成一条 post 富文本摘要（按群聊、发送者分组）"""
+    chat_names = chat_names or {}
+    by_chat: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    for message in sorted(messages, key=lambda m: m.get("created_at") or ""):
+        by_chat.setdefault(message.get("chat_id") or "unknown", []).append(message)
+
+    title = f"📬 {len(messages)} 条新的飞书消息"
+    if unread is not None:
+        title += f"（共 {unread} 条待处理）"
+
+    chats = sorted(by_chat.items(), key=lambda item: len(item[1]), reverse=True)
+    lines: List[List[Dict[str, Any]]] = []
+    for chat_id, chat_messages in chats[:DIGEST_MAX_CHATS]:
+        lines.append([{"tag": "text", "text": f"💬 {chat_names.get(chat_id, chat_id)}（{len(chat_messages)} 条）"}])
+        senders = Counter(m.get("sender_open_id") or "unknown" for m in chat_messages)
+        for sender, count in senders.most_common(DIGEST_MAX_SENDERS):
+            latest = [m for m in chat_messages if (m.get("sender_open_id") or "unknown") == sender][-1]
+            # 发送者用纯文本而不是 at 标签，避免在通知群里提醒到本人
+            name = sender if sender != "unknown" else "未知发送者"
+            lines.append([{"tag": "text", "text": f"    {name} {count} 条：{_preview(latest.get('text'))}"}])
+        if len(senders) > DIGEST_MAX_SENDERS:
+            lines.append([{"tag": "text", "text": f"    …另有 {len(senders) - DIGEST_MAX_SENDERS} 位发送者"}])
+    if len(chats) > DIGEST_MAX_CHATS:
+        rest = sum(len(m) for _, m in chats[DIGEST_MAX_CHATS:])
+        lines.append([{"tag": "text", "text": f"…另有 {len(chats) - DIGEST_MAX_CHATS} 个群共 {rest} 条"}])
+    lines.append([{"tag": "text", "text": "💡 在 Claude 中使用 feishu_fetch_inbox 查看详情"}])
+
+    return {"zh_cn": {"title": title, "content": lines}}
@@ -0,0 +1,55 @@
+"""飞书 API 请求限流
+
+进程内所有 FeishuClient 共享一个限流器，保证并发同步、文档写入等
+同时进行时总请求速率不超过 FEISHU_MAX_QPS。
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+# 每秒最多请求数（飞书多数接口的应用级限额为每秒 5~50 次，按最严格的写接口取默认值）
+FEISHU_MAX_QPS = float(os.getenv("FEISHU_MAX_QPS", "5"))
+
+# 遇到频率限制时的最大重试次数和退避基数（秒）
+FEISHU_MAX_RETRIES = int(os.getenv("FEISHU_MAX_RETRIES", "4"))
+RETRY_BASE_DELAY = 0.5
+
+
+class AsyncRateLimiter:
+    """按固定间隔发放请求时间槽的限流器
+
+    每次 acquire 预约下一个时间槽，调用方只需等待到自己的时间槽，
+    不需要在事件循环之间共享锁，因此可以被多个线程里的事件循环同时使用。
+    """
+
+    def __init__(self, qps: float):
+        self.interval = 1.0 / qps if qps > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间（指数退避 + 随机抖动）"""
+    return RETRY_BASE_DELAY * (2 ** attempt) * (1 + random.random())
+
+
+_RATE_LIMITER = AsyncRateLimiter(FEISHU_MAX_QPS)
+
+
+def get_rate_limiter() -> AsyncRateLimiter:
+    """进程共享的限流器"""
+    return _RATE_LIMITER
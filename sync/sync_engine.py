@@ -0,0 +1,335 @@
+"""并发同步引擎：把本地记忆的变化流水线式推送到飞书多维表格
+
+结构：
+- 生产者：按 (updated_at, id) 顺序分页读取变化的记忆，与同步状态比较后切分成批次
+- 工作者：固定数量的协程并发发送批量创建/更新请求（请求经过共享限流器）
+- 收集器：写入同步状态，按页推进可恢复的检查点，并回调进度
+
+检查点只会推进到“之前所有页都已成功”的位置，中断或失败后重新运行会从
+第一个未完成的页继续；已写入同步状态的记录因字段哈希一致会被直接跳过。
+"""
+
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuAPIError, FeishuClient, BITABLE_BATCH_SIZE, RECORD_NOT_FOUND_ERROR_CODE
+from sync.field_mapping import convert_memory_to_feishu_fields
+from storage.db import init_db, list_memories_updated_since
+from storage.sync_state import (
+    PUSH_WATERMARK_KEY,
+    fields_hash,
+    get_sync_meta,
+    set_sync_meta,
+    get_sync_states,
+    upsert_sync_states,
+)
+
+# 并发发送批量请求的工作者数量
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+
+# 每个批量请求的记录数
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "100"))
+
+# 每次从本地读取的记忆数量
+SYNC_PAGE_SIZE = 500
+
+# 全量同步的检查点（与增量水位线分开保存，完成后清除）
+FULL_SYNC_CHECKPOINT_KEY = "feishu_full_sync_checkpoint"
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+def build_sync_state(memory: Dict, record_id: Optional[str]) -> Dict:
+    """根据记忆内容生成同步状态（字段哈希按字段名称计算，与表结构无关）"""
+    return {
+        "memory_id": memory.get("id"),
+        "record_id": record_id,
+        "fields_hash": fields_hash(convert_memory_to_feishu_fields(memory)),
+        "memory_updated_at": memory.get("updated_at"),
+    }
+
+
+async def build_record_fields(client: FeishuClient, memory: Dict) -> Dict:
+    """按缓存的表结构把记忆转换为以字段 ID 为 key 的记录字段，并在本地校验
+
+    Raises:
+        ValueError: 字段校验失败（不会发送请求）
+    """
+    mapper = await client.get_field_mapper()
+    fields, errors = mapper.build(memory)
+    if errors:
+        raise ValueError("字段校验失败: " + "; ".join(errors))
+    return fields
+
+
+def _load_checkpoint(value: Optional[str]) -> Optional[Dict]:
+    """解析保存的检查点 {"updated_at": ..., "id": ...}"""
+    if not value:
+        return None
+    try:
+        checkpoint = json.loads(value)
+    except json.JSONDecodeError:
+        return None
+    return checkpoint if checkpoint.get("updated_at") else None
+
+
+class SyncEngine:
+    """并发推送引擎
+
+    Args:
+        client: 飞书客户端
+        concurrency: 并发工作者数量
+        batch_size: 每个批量请求的记录数（不超过 BITABLE_BATCH_SIZE）
+        progress: 进度回调，参数为当前统计 {"processed", "created", "updated", "unchanged", "failed"}
+        dry_run: 只计算需要写入的记录，不发送请求、不保存检查点
+    """
+
+    def __init__(
+        self,
+        client: FeishuClient,
+        concurrency: int = SYNC_CONCURRENCY,
+        batch_size: int = SYNC_BATCH_SIZE,
+        progress: Optional[ProgressCallback] = None,
+        dry_run: bool = False,
+        page_size: int = SYNC_PAGE_SIZE
+    ):
+        self.client = client
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, min(batch_size, BITABLE_BATCH_SIZE))
+        self.progress = progress
+        self.dry_run = dry_run
+        self.page_size = page_size
+        self.stats = {"processed": 0, "created": 0, "updated": 0, "unchanged": 0, "failed": 0, "watermark": None}
+        self.errors: List[str] = []
+        # 页序号 -> {"pending": 未完成批次数, "cursor": 页末游标, "failed": bool}
+        self._pages: Dict[int, Dict[str, Any]] = {}
+        self._next_commit = 0
+
+    async def run(
+        self,
+        full: bool = False,
+        limit: Optional[int] = None,
+        record_map: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """执行一轮同步
+
+        Args:
+            full: 全量模式，从头读取所有记忆（使用单独的检查点，完成后清除）；
+                否则从增量水位线开始只读取变化的记忆
+            limit: 最多处理的记忆数量（用于测试）
+            record_map: 飞书中已有记录的 记忆ID -> 记录ID 映射（全量模式用于对账，
+                优先于本地同步状态）；不提供时，没有同步状态的记忆通过
+                find_records 按 记忆ID 查找
+
+        Returns:
+            统计 {"processed", "created", "updated", "unchanged", "failed", "watermark"}
+        """
+        await init_db()
+        key = FULL_SYNC_CHECKPOINT_KEY if full else PUSH_WATERMARK_KEY
+        checkpoint = _load_checkpoint(await get_sync_meta(key))
+
+        batches: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+
+        workers = [asyncio.create_task(self._worker(batches, results)) for _ in range(self.concurrency)]
+        collector = asyncio.create_task(self._collect(results, key))
+        try:
+            await self._produce(batches, checkpoint, limit, record_map)
+        finally:
+            for _ in workers:
+                await batches.put(None)
+            await asyncio.gather(*workers, return_exceptions=True)
+            await results.put(None)
+            await collector
+
+        if full and not self.dry_run and not self._pages:
+            # 所有页都已完成，下次全量同步从头开始
+            await set_sync_meta(FULL_SYNC_CHECKPOINT_KEY, None)
+        return self.stats
+
+    async def _produce(
+        self,
+        batches: asyncio.Queue,
+        checkpoint: Optional[Dict],
+        limit: Optional[int],
+        record_map: Optional[Dict[str, str]]
+    ):
+        """读取变化的记忆，比较同步状态后切分成批次"""
+        cursor_at = checkpoint["updated_at"] if checkpoint else None
+        cursor_id = checkpoint.get("id") if checkpoint else None
+        remaining = limit
+        seq = 0
+
+        while remaining is None or remaining > 0:
+            page_size = self.page_size if remaining is None else min(self.page_size, remaining)
+            memories = await list_memories_updated_since(cursor_at, cursor_id, limit=page_size)
+            if not memories:
+                break
+            if remaining is not None:
+                remaining -= len(memories)
+            cursor_at, cursor_id = memories[-1]["updated_at"], memories[-1]["id"]
+
+            states = await get_sync_states(m["id"] for m in memories)
+            if record_map is None:
+                # 没有同步状态的记忆先在飞书中按 记忆ID 查找，避免重复创建
+                # （如状态表建立前同步的记录，或其他设备同步的记录）
+                missing = [m["id"] for m in memories if not states.get(m["id"], {}).get("record_id")]
+                if missing:
+                    found = await self.client.find_records("记忆ID", missing)
+                    for memory_id, record in found.items():
+                        states[memory_id] = {"record_id": record.get("record_id")}
+            creates: List[Tuple[Dict, Dict]] = []
+            updates: List[Tuple[Dict, Dict]] = []
+            for memory in memories:
+                state_row = build_sync_state(memory, None)
+                state = states.get(memory["id"], {})
+                record_id = state.get("record_id")
+                if record_map is not None:
+                    remote_id = record_map.get(memory["id"])
+                    if remote_id != record_id:
+                        # 飞书中的记录与本地状态不一致（被删除或重建），以飞书为准
+                        record_id, state = remote_id, {}
+                if record_id and state.get("fields_hash") == state_row["fields_hash"]:
+                    self.stats["unchanged"] += 1
+                    continue
+                try:
+                    fields = await build_record_fields(self.client, memory)
+                except ValueError as e:
+                    # 校验失败的记忆跳过（修改后 updated_at 变化会再次进入增量范围）
+                    self.stats["failed"] += 1
+                    self.errors.append(f"{memory.get('title', 'N/A')}: {e}")
+                    continue
+                if record_id:
+                    state_row["record_id"] = record_id
+                    updates.append((state_row, {"record_id": record_id, "fields": fields}))
+                else:
+                    creates.append((state_row, fields))
+            self.stats["processed"] += len(memories)
+
+            page_batches = [
+                ("create", creates[i:i + self.batch_size])
+                for i in range(0, len(creates), self.batch_size)
+            ] + [
+                ("update", updates[i:i + self.batch_size])
+                for i in range(0, len(updates), self.batch_size)
+            ]
+            self._pages[seq] = {
+                "pending": len(page_batches),
+                "cursor": {"updated_at": cursor_at, "id": cursor_id},
+                "failed": False,
+            }
+            if not page_batches:
+                # 没有需要写入的记录，通过收集器推进检查点
+                await batches.put(("noop", seq, []))
+            for kind, items in page_batches:
+                await batches.put((kind, seq, items))
+            seq += 1
+
+    async def _worker(self, batches: asyncio.Queue, results: asyncio.Queue):
+        """发送批量请求，结果交给收集器"""
+        while True:
+            item = await batches.get()
+            if item is None:
+                return
+            kind, seq, items = item
+            try:
+                if self.dry_run or kind == "noop":
+                    records = [{} for _ in items]
+                elif kind == "create":
+                    records = await self.client.batch_create_records([fields for _, fields in items])
+                else:
+                    try:
+                        records = await self.client.batch_update_records([record for _, record in items])
+                    except FeishuAPIError as e:
+                        if e.error_code != RECORD_NOT_FOUND_ERROR_CODE:
+                            raise
+                        await self._relocate(seq, items, results)
+                        continue
+                await results.put((kind, seq, items, records, None))
+            except Exception as e:
+                await results.put((kind, seq, items, None, e))
+
+    async def _relocate(self, seq: int, items: List[Tuple[Dict, Dict]], results: asyncio.Queue):
+        """批量更新中有记录已在飞书中被删除：按 记忆ID 重新查找，
+        仍存在的记录按查到的记录ID 更新，找不到的丢弃旧记录ID 后重新创建
+
+        否则这一批每次运行都会失败，检查点和水位线永远停在这里。
+        """
+        found = await self.client.find_records("记忆ID", [state_row["memory_id"] for state_row, _ in items])
+        updates: List[Tuple[Dict, Dict]] = []
+        creates: List[Tuple[Dict, Dict]] = []
+        for state_row, record in items:
+            record_id = (found.get(state_row["memory_id"]) or {}).get("record_id")
+            if record_id:
+                state_row["record_id"] = record_id
+                updates.append((state_row, {"record_id": record_id, "fields": record["fields"]}))
+            else:
+                state_row["record_id"] = None
+                creates.append((state_row, record["fields"]))
+
+        sends = [(kind, part) for kind, part in (("update", updates), ("create", creates)) if part]
+        # 一个批次拆成多个结果，先增加页的未完成数，避免检查点提前推进
+        self._pages[seq]["pending"] += len(sends) - 1
+        for kind, part in sends:
+            try:
+                if kind == "create":
+                    records = await self.client.batch_create_records([fields for _, fields in part])
+                else:
+                    records = await self.client.batch_update_records([record for _, record in part])
+                await results.put((kind, seq, part, records, None))
+            except Exception as e:
+                await results.put((kind, seq, part, None, e))
+
+    async def _collect(self, results: asyncio.Queue, checkpoint_key: str):
+        """写入同步状态，推进检查点，回调进度"""
+        while True:
+            item = await results.get()
+            if item is None:
+                return
+            kind, seq, items, records, error = item
+            page = self._pages[seq]
+
+            if error is not None:
+                page["failed"] = True
+                self.stats["failed"] += len(items)
+                self.errors.append(f"批量{'创建' if kind == 'create' else '更新'} {len(items)} 条失败: {error}")
+            elif kind != "noop":
+                if kind == "create":
+                    for (state_row, _), record in zip(items, records):
+                        state_row["record_id"] = record.get("record_id")
+                    self.stats["created"] += len(items)
+                else:
+                    self.stats["updated"] += len(items)
+                if not self.dry_run:
+                    await upsert_sync_states([state_row for state_row, _ in items])
+
+            if kind != "noop":
+                page["pending"] -= 1
+            await self._advance_checkpoint(checkpoint_key)
+
+            if self.progress:
+                self.progress(dict(self.stats))
+
+    async def _advance_checkpoint(self, checkpoint_key: str):
+        """检查点推进到连续完成（且未失败）的最后一页"""
+        cursor = None
+        while self._next_commit in self._pages:
+            page = self._pages[self._next_commit]
+            if page["pending"] > 0 or page["failed"]:
+                break
+            cursor = page["cursor"]
+            del self._pages[self._next_commit]
+            self._next_commit += 1
+        if cursor is None:
+            return
+        self.stats["watermark"] = cursor["updated_at"]
+        if not self.dry_run:
+            await set_sync_meta(checkpoint_key, json.dumps(cursor))
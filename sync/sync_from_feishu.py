@@ -0,0 +1,191 @@
+"""从飞书多维表格拉取修改到本地记忆（双向同步的拉取阶段）"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuClient, get_feishu_client
+from sync.field_mapping import FIELD_TYPE_MODIFIED_TIME, to_timestamp_ms, field_text
+from sync.sync_engine import build_sync_state
+from storage.db import init_db, get_memory, update_memories_bulk
+from storage.sync_state import (
+    PULL_WATERMARK_KEY,
+    get_sync_meta,
+    set_sync_meta,
+    get_sync_states,
+    upsert_sync_states,
+)
+
+# 表格中“最后更新时间”字段（类型 1002）的名称；未设置时自动查找该类型的字段
+FEISHU_LAST_MODIFIED_FIELD = os.getenv("FEISHU_LAST_MODIFIED_FIELD")
+
+# records/search 单页最大数量
+PULL_PAGE_SIZE = 500
+
+
+async def get_last_modified_field(client: FeishuClient) -> Optional[str]:
+    """查找用于服务端过滤的“最后更新时间”字段"""
+    schema = await client.get_table_schema()
+    if FEISHU_LAST_MODIFIED_FIELD and FEISHU_LAST_MODIFIED_FIELD in schema.by_name:
+        return FEISHU_LAST_MODIFIED_FIELD
+    for field in schema.fields:
+        if field.get("type") == FIELD_TYPE_MODIFIED_TIME:
+            return field.get("field_name")
+    return None
+
+
+def resolve_remote_changes(
+    local: Dict,
+    remote: Dict,
+    remote_modified_ms: int,
+    state: Optional[Dict] = None
+) -> Dict:
+    """比较本地记忆和飞书记录，返回需要写回本地的字段
+
+    冲突处理：本地在上次同步后也修改过、且本地 updated_at 晚于飞书的修改时间时，
+    以本地为准（推送阶段会覆盖飞书）；否则以飞书为准。
+    """
+    changes = {k: v for k, v in remote.items() if local.get(k) != v}
+    if not changes:
+        return {}
+
+    local_changed = not state or state.get("memory_updated_at") != local.get("updated_at")
+    if local_changed:
+        try:
+            if to_timestamp_ms(local["updated_at"]) > remote_modified_ms:
+                return {}
+        except (KeyError, ValueError):
+            pass
+    return changes
+
+
+async def pull_delta(dry_run: bool = False, verbose: bool = True) -> Dict:
+    """拉取上次同步后在飞书中修改的记录，写回本地记忆
+
+    用 records/search 按“最后更新时间”字段过滤并升序分页，只传输变化的记录；
+    每页处理完后推进水位线（毫秒时间戳）。表格没有“最后更新时间”字段时
+    退化为读取全表并按 last_modified_time 在本地过滤。
+
+    Returns:
+        {"pulled", "skipped", "unmapped", "watermark"}
+    """
+    await init_db()
+    client = get_feishu_client()
+    stats = {"pulled": 0, "skipped": 0, "unmapped": 0, "watermark": None}
+
+    watermark_value = await get_sync_meta(PULL_WATERMARK_KEY)
+    watermark = int(watermark_value) if watermark_value else 0
+    max_seen = watermark
+
+    mapper = await client.get_field_mapper()
+    modified_field = await get_last_modified_field(client)
+    filter_ = None
+    sort = None
+    if modified_field:
+        # 日期过滤按天比较，这里用 >= 取得候选，再按精确的 last_modified_time 过滤
+        sort = [{"field_name": modified_field, "desc": False}]
+        if watermark:
+            filter_ = {
+                "conjunction": "and",
+                "conditions": [{
+                    "field_name": modified_field,
+                    "operator": "isGreaterEqual",
+                    "value": ["ExactDate", str(watermark)]
+                }]
+            }
+    elif verbose:
+        print("⚠️ 表格没有“最后更新时间”字段，将读取全表后在本地过滤")
+        print("   建议在多维表格中添加“最后更新时间”字段以只拉取变化的记录")
+
+    page_token = None
+    while True:
+        result = await client.search_records(
+            filter=filter_,
+            sort=sort,
+            automatic_fields=True,
+            page_size=PULL_PAGE_SIZE,
+            page_token=page_token
+        )
+        records = [
+            r for r in result.get("items") or []
+            if (r.get("last_modified_time") or 0) > watermark
+        ]
+
+        candidates = []
+        for record in records:
+            memory_id = field_text(record.get("fields", {}).get("记忆ID"))
+            if not memory_id:
+                stats["unmapped"] += 1
+                continue
+            candidates.append((memory_id, record))
+
+        states = await get_sync_states(memory_id for memory_id, _ in candidates)
+        updates: List[Dict] = []
+        for memory_id, record in candidates:
+            local = await get_memory(memory_id)
+            if not local:
+                stats["unmapped"] += 1
+                continue
+            changes = resolve_remote_changes(
+                local,
+                mapper.parse_record(record.get("fields", {})),
+                record.get("last_modified_time") or 0,
+                states.get(memory_id)
+            )
+            if not changes:
+                stats["skipped"] += 1
+                continue
+            updates.append({"id": memory_id, **changes})
+            if verbose:
+                print(f"  ⬇️  {local.get('title', 'N/A')}: {', '.join(changes)}")
+
+        if not dry_run and updates:
+            entries = await update_memories_bulk(updates)
+            record_ids = {memory_id: record.get("record_id") for memory_id, record in candidates}
+            # 记录同步状态，推送阶段不会把刚拉取的内容再推回飞书
+            await upsert_sync_states([
+                build_sync_state(entry, record_ids.get(entry["id"])) for entry in entries
+            ])
+        stats["pulled"] += len(updates)
+
+        if records:
+            max_seen = max(max_seen, max(r.get("last_modified_time") or 0 for r in records))
+        # 按最后更新时间升序读取时，每页处理完即可推进水位线
+        if sort and not dry_run and max_seen > watermark:
+            await set_sync_meta(PULL_WATERMARK_KEY, str(max_seen))
+
+        page_token = result.get("page_token")
+        if not result.get("has_more") or not page_token:
+            break
+
+    if not dry_run and max_seen > watermark:
+        await set_sync_meta(PULL_WATERMARK_KEY, str(max_seen))
+    stats["watermark"] = max_seen or None
+    return stats
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="从飞书多维表格拉取修改到本地记忆")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="试运行，不写入本地"
+    )
+    args = parser.parse_args()
+
+    stats = await pull_delta(dry_run=args.dry_run)
+    print(f"📊 拉取完成: 更新 {stats['pulled']} 条，无变化 {stats['skipped']} 条，"
+          f"未关联 {stats['unmapped']} 条")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
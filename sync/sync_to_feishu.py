@@ -11,8 +11,10 @@ from datetime import datetime
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from sync.feishu_client import FeishuClient, convert_memory_to_feishu_fields
+from sync.feishu_client import FeishuClient, get_feishu_client, convert_memory_to_feishu_fields
+from sync.sync_engine import SyncEngine, ProgressCallback, SYNC_CONCURRENCY, build_record_fields, build_sync_state
 from storage.db import DB_PATH, search_memories, get_memory
+from storage.sync_state import get_sync_states, upsert_sync_states
 import aiosqlite
 
 
@@ -27,32 +29,46 @@ async def get_all_memories(limit: Optional[int] = None) -> List[Dict]:
     return results
 
 
+async def get_synced_record_map(client: FeishuClient) -> Dict[str, str]:
+    """遍历飞书表格，获取记忆ID到飞书记录ID的映射
+
+    Raises:
+        FeishuAPIError: 读取失败（调用方决定是否降级）
+    """
+    memory_id_to_record_id = {}
+    page_token = None
+    while True:
+        result = await client.list_records(page_token=page_token)
+        for record in result.get("items", []):
+            memory_id = record.get("fields", {}).get("记忆ID")
+            if memory_id:
+                memory_id_to_record_id[memory_id] = record.get("record_id")
+
+        # 检查是否有下一页
+        page_token = result.get("page_token")
+        if not page_token:
+            break
+    return memory_id_to_record_id
+
+
+async def find_record_ids(client: FeishuClient, memory_ids: List[str]) -> Dict[str, str]:
+    """按 记忆ID 查找飞书记录（服务端过滤，每 50 个 ID 一次请求）
+
+    Returns:
+        记忆ID -> 飞书记录ID；没有找到的记忆不在结果中
+    """
+    found = await client.find_records("记忆ID", memory_ids)
+    return {memory_id: record.get("record_id") for memory_id, record in found.items()}
+
+
 async def get_synced_record_ids(client: FeishuClient) -> set:
     """获取已同步的记录 ID"""
-    synced_ids = set()
-    
     try:
-        # 获取所有记录
-        page_token = None
-        while True:
-            result = await client.list_records(page_token=page_token)
-            records = result.get("items", [])
-            
-            for record in records:
-                fields = record.get("fields", {})
-                memory_id = fields.get("记忆ID")
-                if memory_id:
-                    synced_ids.add(memory_id)
-            
-            # 检查是否有下一页
-            page_token = result.get("page_token")
-            if not page_token:
-                break
+        return set(await get_synced_record_map(client))
     except Exception as e:
         print(f"⚠️ 获取已同步记录失败: {e}")
         print("   将同步所有记录")
-    
-    return synced_ids
+        return set()
 
 
 async def sync_memory_to_feishu(
@@ -62,9 +78,8 @@ async def sync_memory_to_feishu(
 ) -> bool:
     """同步单条记忆到飞书"""
     try:
-        fields = convert_memory_to_feishu_fields(memory)
-        
         if dry_run:
+            fields = convert_memory_to_feishu_fields(memory)
             print(f"  [DRY RUN] 将同步: {memory.get('title', 'N/A')}")
             print(f"    字段: {json.dumps(fields, ensure_ascii=False, indent=2)}")
             return True
@@ -78,7 +93,10 @@ async def sync_memory_to_feishu(
             pass
         
         # 创建记录
+        fields = await build_record_fields(client, memory)
         record = await client.create_record(fields)
+        if memory_id:
+            await upsert_sync_states([build_sync_state(memory, record.get("record_id"))])
         print(f"  ✅ 已同步: {memory.get('title', 'N/A')}")
         return True
         
@@ -102,7 +120,7 @@ async def auto_sync_memory_to_feishu(memory: Dict, silent: bool = True) -> bool:
     """
     try:
         # 尝试初始化飞书客户端
-        client = FeishuClient()
+        client = get_feishu_client()
     except Exception as e:
         # 如果配置不存在或初始化失败，静默返回
         if not silent:
@@ -114,26 +132,29 @@ async def auto_sync_memory_to_feishu(memory: Dict, silent: bool = True) -> bool:
         if not memory_id:
             return False
         
-        # 检查是否已同步（通过查询飞书记录）
-        synced_ids = await get_synced_record_ids(client)
-        
-        # 转换字段格式
-        fields = convert_memory_to_feishu_fields(memory)
-        
-        if memory_id in synced_ids:
-            # 如果已同步，尝试更新（需要先找到记录ID）
-            # 这里简化处理：由于飞书API需要通过记录ID更新，而查找记录ID需要遍历
-            # 为了性能考虑，已同步的记录暂时不更新，只在新增时同步
-            # 如果需要更新，可以调用全量同步工具
+        # 优先使用本地同步状态：内容未变化时不发请求，已有记录时直接更新
+        state_row = build_sync_state(memory, None)
+        state = (await get_sync_states([memory_id])).get(memory_id, {})
+        record_id = state.get("record_id")
+        if record_id and state.get("fields_hash") == state_row["fields_hash"]:
             if not silent:
                 print(f"  ℹ️  记忆已同步到飞书: {memory.get('title', 'N/A')}")
             return True
+        if not record_id:
+            # 没有同步状态（如状态表建立前同步的记录），按 记忆ID 在飞书中查找
+            record_id = (await find_record_ids(client, [memory_id])).get(memory_id)
+        
+        fields = await build_record_fields(client, memory)
+        if record_id:
+            await client.update_record(record_id, fields)
         else:
-            # 创建新记录
-            await client.create_record(fields)
-            if not silent:
-                print(f"  ✅ 已自动同步到飞书: {memory.get('title', 'N/A')}")
-            return True
+            record = await client.create_record(fields)
+            record_id = record.get("record_id")
+        state_row["record_id"] = record_id
+        await upsert_sync_states([state_row])
+        if not silent:
+            print(f"  ✅ 已自动同步到飞书: {memory.get('title', 'N/A')}")
+        return True
             
     except Exception as e:
         # 同步失败不影响保存操作，静默处理
@@ -142,11 +163,26 @@ async def auto_sync_memory_to_feishu(memory: Dict, silent: bool = True) -> bool:
         return False
 
 
+def print_progress(stats: Dict) -> None:
+    """命令行进度输出"""
+    print(
+        f"  已处理 {stats['processed']} 条：新增 {stats['created']}，更新 {stats['updated']}，"
+        f"未变化 {stats['unchanged']}，失败 {stats['failed']}"
+    )
+
+
 async def sync_all_memories(
     dry_run: bool = False,
-    limit: Optional[int] = None
-):
-    """同步所有记忆到飞书"""
+    limit: Optional[int] = None,
+    concurrency: int = SYNC_CONCURRENCY,
+    progress: Optional[ProgressCallback] = print_progress
+) -> Optional[Dict]:
+    """全量同步所有记忆到飞书
+    
+    先读取飞书中已有的记录用于对账，再由同步引擎并发推送：
+    飞书中缺失的记录会创建，内容与同步状态不一致的记录会更新。
+    中断后再次运行会从全量同步的检查点继续。
+    """
     print("=" * 60)
     print("🚀 开始同步记忆数据到飞书多维表格")
     print("=" * 60)
@@ -154,68 +190,66 @@ async def sync_all_memories(
     
     # 初始化客户端
     try:
-        client = FeishuClient()
+        client = get_feishu_client()
         print(f"✅ 飞书客户端初始化成功")
         print(f"   App Token: {client.app_token[:20]}...")
         print(f"   Table ID: {client.table_id}")
         print()
     except Exception as e:
         print(f"❌ 初始化失败: {e}")
-        return
-    
-    # 获取所有记忆
-    print("📚 获取本地记忆数据...")
-    memories = await get_all_memories(limit=limit)
-    print(f"   找到 {len(memories)} 条记忆")
-    print()
-    
-    if not memories:
-        print("⚠️ 没有找到需要同步的记忆")
-        return
+        return None
     
     # 获取已同步的记录
+    record_map = None
     if not dry_run:
         print("🔍 检查已同步记录...")
-        synced_ids = await get_synced_record_ids(client)
-        print(f"   已同步 {len(synced_ids)} 条记录")
+        record_map = await get_synced_record_map(client)
+        print(f"   已同步 {len(record_map)} 条记录")
         print()
-        
-        # 过滤出需要同步的记录
-        memories_to_sync = [
-            m for m in memories
-            if m.get("id") not in synced_ids
-        ]
-        print(f"📝 需要同步 {len(memories_to_sync)} 条新记录")
-    else:
-        memories_to_sync = memories
-        print(f"📝 [DRY RUN] 将同步 {len(memories_to_sync)} 条记录")
-    
-    print()
-    
-    # 同步记录
-    success_count = 0
-    fail_count = 0
     
-    for i, memory in enumerate(memories_to_sync, 1):
-        print(f"[{i}/{len(memories_to_sync)}] {memory.get('title', 'N/A')}")
-        success = await sync_memory_to_feishu(client, memory, dry_run=dry_run)
-        if success:
-            success_count += 1
-        else:
-            fail_count += 1
-        
-        # 避免请求过快
-        if not dry_run and i < len(memories_to_sync):
-            await asyncio.sleep(0.2)  # 200ms 延迟
+    print(f"📝 {'[DRY RUN] ' if dry_run else ''}开始同步（并发 {concurrency}）")
+    engine = SyncEngine(client, concurrency=concurrency, progress=progress, dry_run=dry_run)
+    stats = await engine.run(full=True, limit=limit, record_map=record_map)
     
     print()
     print("=" * 60)
     print("📊 同步完成")
     print("=" * 60)
-    print(f"✅ 成功: {success_count} 条")
-    if fail_count > 0:
-        print(f"❌ 失败: {fail_count} 条")
+    print(f"✅ 新增: {stats['created']} 条，更新: {stats['updated']} 条，未变化: {stats['unchanged']} 条")
+    if stats["failed"] > 0:
+        print(f"❌ 失败: {stats['failed']} 条")
+        for error in engine.errors[:5]:
+            print(f"   - {error}")
     print()
+    return stats
+
+
+async def sync_delta(
+    dry_run: bool = False,
+    concurrency: int = SYNC_CONCURRENCY,
+    progress: Optional[ProgressCallback] = None,
+    verbose: bool = True
+) -> Dict:
+    """增量同步：只推送上次同步后变化的记忆
+    
+    由同步引擎按 (updated_at, id) 水位线通过索引分页读取变化的记忆，与同步状态表中的
+    字段哈希比较，内容未变的跳过，其余并发批量创建/更新。水位线只推进到之前所有页
+    都写入成功的位置，失败时下一轮从失败的页重新开始。
+    
+    每轮的开销取决于变化的记忆数量，而不是表格大小。本地删除的记忆不在增量
+    范围内，需要时使用全量同步（memory_sync_to_feishu）清理。
+    
+    Returns:
+        {"processed", "created", "updated", "unchanged", "failed", "watermark"}
+    """
+    client = get_feishu_client()
+    
+    engine = SyncEngine(client, concurrency=concurrency, progress=progress, dry_run=dry_run)
+    stats = await engine.run()
+    if verbose:
+        for error in engine.errors:
+            print(f"  ❌ {error}")
+    return stats
 
 
 async def main():
@@ -233,12 +267,35 @@ async def main():
         type=int,
         help="限制同步数量（用于测试）"
     )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="增量同步：只推送上次同步后变化的记忆"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=SYNC_CONCURRENCY,
+        help=f"并发请求数，默认 {SYNC_CONCURRENCY}"
+    )
     
     args = parser.parse_args()
     
-    await sync_all_memories(dry_run=args.dry_run, limit=args.limit)
+    if args.delta:
+        stats = await sync_delta(
+            dry_run=args.dry_run,
+            concurrency=args.concurrency,
+            progress=print_progress
+        )
+        print(f"📊 增量同步完成: 新增 {stats['created']} 条，更新 {stats['updated']} 条，"
+              f"未变化 {stats['unchanged']} 条，失败 {stats['failed']} 条")
+    else:
+        await sync_all_memories(
+            dry_run=args.dry_run,
+            limit=args.limit,
+            concurrency=args.concurrency
+        )
 
 
 if __name__ == "__main__":
-    import json
     asyncio.run(main())
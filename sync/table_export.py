@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""多维表格流式导出（JSONL / CSV）
+
+- 逐页读取记录，处理当前页时已在预取下一页
+- 每页写完立即落盘，内存中最多只有两页记录，导出大表时内存占用恒定
+- 字段值不截断；JSONL 保留原始结构，CSV 把文本、人员、附件等转换为可读文本
+- 开始导出时先写入初始进度（起始页标记、表头后的偏移），每页写完后在
+  <导出文件>.progress.json 中记录下一页标记和文件偏移，中断后用 resume 从最后
+  完成的页继续（先截掉未记录的半页内容，不会重复）
+
+用法：
+    python sync/table_export.py APP_TOKEN TABLE_ID OUTPUT [--format jsonl|csv] [--resume]
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuClient, get_feishu_client
+from sync.field_mapping import field_text
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+
+def export_format_for(path: str, export_format: Optional[str] = None) -> str:
+    """导出格式：显式指定优先，否则按扩展名判断（默认 jsonl）"""
+    if export_format:
+        return export_format
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def progress_path(path: str) -> str:
+    return f"{path}.progress.json"
+
+
+def csv_value(value: Any) -> str:
+    """把字段值转换为 CSV 单元格文本"""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    if isinstance(value, list):
+        if all(isinstance(item, str) for item in value):
+            # 多选
+            return ", ".join(value)
+        if all(isinstance(item, dict) and "text" in item for item in value):
+            # 富文本片段
+            return field_text(value) or ""
+        if all(isinstance(item, dict) for item in value):
+            # 人员、附件、关联记录等
+            return ", ".join(
+                str(item.get("name") or item.get("text") or item.get("record_id") or item.get("token") or "")
+                for item in value
+            )
+    if isinstance(value, dict):
+        if "link" in value:
+            return value.get("link") or ""
+        if "text" in value:
+            return str(value.get("text") or "")
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _load_progress(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(progress_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _save_progress(path: str, progress: Dict[str, Any]):
+    tmp_path = progress_path(path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f, ensure_ascii=False)
+    os.replace(tmp_path, progress_path(path))
+
+
+async def export_table(
+    client: FeishuClient,
+    path: str,
+    table_id: Optional[str] = None,
+    export_format: Optional[str] = None,
+    page_token: Optional[str] = None,
+    resume: bool = False,
+    page_size: int = 500
+) -> Dict[str, Any]:
+    """把整张表流式导出到文件
+
+    Args:
+        client: 飞书客户端
+        path: 导出文件路径
+        table_id: 数据表ID（默认客户端的表）
+        export_format: jsonl 或 csv（默认按扩展名）
+        page_token: 从该分页标记开始，追加写入已有文件
+        resume: 从 <path>.progress.json 记录的位置继续
+        page_size: 每页数量，最大 500
+
+    Returns:
+        {"path", "format", "records", "pages", "next_page_token", "completed", "elapsed_seconds"}
+        导出中途失败时抛出异常，进度文件中保留最后完成的页
+    """
+    export_format = export_format_for(path, export_format)
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {export_format}（支持 {', '.join(EXPORT_FORMATS)}）")
+
+    progress = _load_progress(path) if resume else None
+    if resume and progress is None:
+        raise ValueError(f"没有找到导出进度文件: {progress_path(path)}")
+    if progress and progress.get("completed"):
+        return {**progress, "path": path, "format": export_format, "pages": 0, "elapsed_seconds": 0.0}
+
+    records = progress["records"] if progress else 0
+    columns: Optional[List[str]] = progress.get("columns") if progress else None
+    if progress:
+        page_token = progress.get("page_token")
+    append = bool(progress) or bool(page_token)
+
+    if export_format == "csv" and columns is None:
+        fields = await client.get_table_fields(table_id=table_id)
+        columns = [field.get("field_name") for field in fields]
+
+    if not progress:
+        # 新的导出：上一次导出留下的进度与即将写入的文件无关
+        try:
+            os.remove(progress_path(path))
+        except FileNotFoundError:
+            pass
+
+    start = time.monotonic()
+    pages = 0
+    with open(path, "a+b" if append else "wb") as f:
+        if progress:
+            # 截掉最后一次记录进度之后写入的半页内容
+            f.truncate(progress["offset"])
+        f.seek(0, os.SEEK_END)
+        if export_format == "csv" and f.tell() == 0:
+            f.write(_csv_line(["record_id"] + columns))
+        if not progress:
+            # 第一页失败也能 resume：从起始页标记、表头之后继续
+            f.flush()
+            os.fsync(f.fileno())
+            _save_progress(path, {
+                "page_token": page_token,
+                "offset": f.tell(),
+                "records": 0,
+                "columns": columns,
+                "completed": False,
+            })
+
+        next_token = page_token
+        async for page in client.iter_record_pages(table_id=table_id, page_size=page_size, page_token=page_token):
+            chunk = io.BytesIO()
+            for record in page["items"]:
+                if export_format == "jsonl":
+                    line = json.dumps(
+                        {"record_id": record.get("record_id"), "fields": record.get("fields", {})},
+                        ensure_ascii=False
+                    ) + "\n"
+                    chunk.write(line.encode("utf-8"))
+                else:
+                    fields = record.get("fields", {})
+                    chunk.write(_csv_line([record.get("record_id", "")] + [csv_value(fields.get(c)) for c in columns]))
+            f.write(chunk.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+
+            records += len(page["items"])
+            pages += 1
+            next_token = page["page_token"]
+            _save_progress(path, {
+                "page_token": next_token,
+                "offset": f.tell(),
+                "records": records,
+                "columns": columns,
+                "completed": next_token is None,
+            })
+
+    return {
+        "path": path,
+        "format": export_format,
+        "records": records,
+        "pages": pages,
+        "next_page_token": next_token,
+        "completed": next_token is None,
+        "elapsed_seconds": round(time.monotonic() - start, 2),
+    }
+
+
+def _csv_line(values: List[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="流式导出飞书多维表格到 JSONL / CSV")
+    parser.add_argument("app_token", help="多维表格的 App Token")
+    parser.add_argument("table_id", help="数据表的 Table ID")
+    parser.add_argument("output", help="导出文件路径")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="导出格式（默认按扩展名）")
+    parser.add_argument("--page-token", help="从该分页标记开始")
+    parser.add_argument("--resume", action="store_true", help="从上次中断的位置继续")
+    args = parser.parse_args()
+
+    client = get_feishu_client(app_token=args.app_token, table_id=args.table_id)
+    result = await export_table(
+        client,
+        args.output,
+        table_id=args.table_id,
+        export_format=args.format,
+        page_token=args.page_token,
+        resume=args.resume
+    )
+    print(f"✅ 导出 {result['records']} 条记录到 {result['path']}（{result['pages']} 页，{result['elapsed_seconds']} 秒）")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""同步吞吐量基准（使用本地模拟飞书 API，不需要网络）
+
+在临时数据库中生成记忆，启动 tests/fake_feishu_server.py，依次计时：
+- 全量推送：同步引擎并发批量创建记录
+- 增量推送：修改一部分记忆后只推送变化
+- 整表导出：流式导出到 JSONL
+- 文档写入：大文档按分片顺序写入
+
+用法：
+    python tests/benchmark_sync_throughput.py [--memories 2000] [--latency 0.05]
+        [--rate-limit-rate 0.02] [--failure-rate 0] [--concurrency 4] [--qps 0]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.db as db
+import storage.doc_cache as doc_cache
+import storage.sync_state as sync_state
+import sync.feishu_client as feishu_client
+import sync.rate_limiter as rate_limiter
+from sync.sync_engine import SyncEngine
+from sync.table_export import export_table
+from tests.benchmark_markdown_blocks import build_corpus
+from tests.fake_feishu_server import FakeFeishuConfig, FakeFeishuServer
+
+APP_TOKEN = "bench_app"
+TABLE_ID = "tblBench"
+
+
+async def _timed(label: str, server: FakeFeishuServer, count: int, unit: str, coro):
+    requests = sum(server.state.requests.values())
+    injected = sum(server.state.injected.values())
+    start = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - start
+    requests = sum(server.state.requests.values()) - requests
+    injected = sum(server.state.injected.values()) - injected
+    print(f"{label:<10} {count:>7,} {unit:<3} {elapsed:7.2f} s  {count / elapsed:>9,.0f} {unit}/秒  "
+          f"请求 {requests:>5}  注入错误 {injected}")
+    return result
+
+
+async def run(args):
+    tmp_dir = tempfile.mkdtemp()
+    db.DB_PATH = doc_cache.DB_PATH = sync_state.DB_PATH = os.path.join(tmp_dir, "memory.db")
+    db.ENTRIES_DIR = os.path.join(tmp_dir, "entries")
+    rate_limiter._RATE_LIMITER = rate_limiter.AsyncRateLimiter(args.qps)
+
+    await db.init_db()
+    for i in range(args.memories):
+        await db.add_memory(f"bench-{i:06d}", "insight", f"基准记忆 {i}", f"第 {i} 条记忆的内容。" * 10,
+                            tags=["基准"])
+
+    config = FakeFeishuConfig(
+        latency=args.latency,
+        jitter=args.latency / 2,
+        rate_limit_rate=args.rate_limit_rate,
+        failure_rate=args.failure_rate,
+        seed=42,
+    )
+    with FakeFeishuServer(config) as server:
+        server.state.add_table(APP_TOKEN, TABLE_ID)
+        feishu_client.FEISHU_API_BASE = server.base_url
+        feishu_client.FEISHU_APP_ID = "cli_bench"
+        feishu_client.FEISHU_APP_SECRET = "bench_secret"
+        client = feishu_client.FeishuClient(app_token=APP_TOKEN, table_id=TABLE_ID)
+
+        print("=" * 72)
+        print(f"📊 同步吞吐量基准：{args.memories} 条记忆，延迟 {args.latency * 1000:.0f} ms，"
+              f"频率限制 {args.rate_limit_rate:.0%}，失败 {args.failure_rate:.0%}，并发 {args.concurrency}")
+        print("=" * 72)
+
+        engine = SyncEngine(client, concurrency=args.concurrency, progress=None)
+        stats = await _timed("全量推送", server, args.memories, "条", engine.run(full=True, record_map={}))
+        if stats["failed"]:
+            print(f"   ⚠️  失败 {stats['failed']} 条: {engine.errors[:3]}")
+
+        changed = max(1, args.memories // 10)
+        await db.update_memories_bulk([{"id": f"bench-{i:06d}", "content": f"修改后的内容 {i}"} for i in range(changed)])
+        engine = SyncEngine(client, concurrency=args.concurrency, progress=None)
+        await _timed("增量推送", server, changed, "条", engine.run())
+
+        path = os.path.join(tmp_dir, "export.jsonl")
+        await _timed("整表导出", server, args.memories, "条", export_table(client, path, table_id=TABLE_ID))
+
+        document_id = server.state.add_document("基准文档")
+        corpus = build_corpus(args.doc_lines)
+        blocks = len(feishu_client.markdown_to_blocks(corpus))
+        await _timed("文档写入", server, blocks, "块", client.append_document_content(document_id, corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步吞吐量基准（模拟飞书 API）")
+    parser.add_argument("--memories", type=int, default=2000, help="记忆数量")
+    parser.add_argument("--doc-lines", type=int, default=2000, help="文档行数")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟接口延迟（秒）")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02, help="注入 99991400 的比例")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="注入 HTTP 500 的比例")
+    parser.add_argument("--concurrency", type=int, default=4, help="同步引擎并发数")
+    parser.add_argument("--qps", type=float, default=0, help="客户端限流（每秒请求数，0 不限制）")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
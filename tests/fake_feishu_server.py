@@ -0,0 +1,891 @@
+#!/usr/bin/env python3
+"""本地模拟飞书开放平台 API（只用标准库），用于离线测试和性能基准
+
+实现 FeishuClient 用到的接口：
+- 认证：tenant_access_token、user_access_token 换取 / 刷新
+- 多维表格：数据表、字段、记录（列出、创建、更新、删除、批量、search）
+- 新版文档：创建、元信息、块列表、插入 / 删除 / 批量更新子块（含 client_token 幂等）
+- 云空间：根目录、文件列表、移动、删除、公开权限；知识库空间和节点
+- IM：发送消息、群聊列表、消息列表
+
+数据保存在内存中（FakeFeishuState），每个请求在独立线程中处理，
+可配置延迟、频率限制（99991400）和服务端错误的注入比例，以及每秒请求上限。
+
+用法（命令行）：
+    python tests/fake_feishu_server.py --port 8765 --latency 0.05 --rate-limit-rate 0.02 --records 1000
+    export FEISHU_API_BASE=http://127.0.0.1:8765/open-apis
+
+用法（测试中）：
+    with FakeFeishuServer(FakeFeishuConfig(latency=0.01)) as server:
+        feishu_client.FEISHU_API_BASE = server.base_url
+        server.state.add_table("app", "tbl")
+"""
+
+import argparse
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.field_mapping import MEMORY_FIELD_TYPES, field_text
+from sync.markdown_blocks import markdown_to_blocks
+
+API_PREFIX = "/open-apis"
+
+RATE_LIMIT_CODE = 99991400
+SERVER_ERROR_CODE = 1254290
+
+# 记忆表的默认字段（与 sync.field_mapping 的期望类型一致），另加“最后更新时间”
+DEFAULT_FIELDS = [
+    {"field_name": name, "type": types[0]} for name, types in MEMORY_FIELD_TYPES.items()
+] + [{"field_name": "最后更新时间", "type": 1002}]
+
+# 块类型中保存文字元素的键（与 sync.markdown_blocks 一致的常用类型）
+_TEXT_PAYLOAD_KEYS = (
+    "text", "heading1", "heading2", "heading3", "heading4", "heading5", "heading6",
+    "bullet", "ordered", "code", "quote", "todo",
+)
+
+
+@dataclass
+class FakeFeishuConfig:
+    """故障注入和性能参数
+
+    Args:
+        latency: 每个请求的固定延迟（秒）
+        jitter: 额外的随机延迟上限（秒）
+        rate_limit_rate: 随机返回频率限制（HTTP 429，code 99991400）的比例
+        failure_rate: 随机返回服务端错误（HTTP 500）的比例
+        max_qps: 每秒请求上限，超过时返回频率限制（0 表示不限制）
+        seed: 随机数种子
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit_rate: float = 0.0
+    failure_rate: float = 0.0
+    max_qps: float = 0.0
+    seed: Optional[int] = None
+
+
+class ApiError(Exception):
+    """处理请求时返回的飞书风格错误"""
+
+    def __init__(self, status: int, code: int, msg: str):
+        super().__init__(msg)
+        self.status = status
+        self.code = code
+        self.msg = msg
+
+
+def _page(items: List[Any], params: Dict[str, str], default_size: int, max_size: int) -> Tuple[List[Any], bool, Optional[str]]:
+    """按 page_token（偏移量）分页"""
+    page_size = min(int(params.get("page_size") or default_size), max_size)
+    start = int(params.get("page_token") or 0)
+    end = start + page_size
+    has_more = end < len(items)
+    return items[start:end], has_more, str(end) if has_more else None
+
+
+class FakeFeishuState:
+    """模拟服务端的全部数据（线程安全）"""
+
+    ROOT_FOLDER = "fake_root_folder"
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._ids = itertools.count(1)
+        # app_token -> table_id -> {"name", "fields": [...], "records": {record_id: record}}
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # document_id -> {"title", "revision_id", "blocks": {block_id: block}, "client_tokens": {...}}
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        # folder_token -> [file, ...]
+        self.folders: Dict[str, List[Dict[str, Any]]] = {self.ROOT_FOLDER: []}
+        # space_id -> {"name", "nodes": {parent_node_token or "": [node, ...]}}
+        self.wiki_spaces: Dict[str, Dict[str, Any]] = {}
+        self.chats: List[Dict[str, Any]] = []
+        self.messages: List[Dict[str, Any]] = []
+        self.tokens: set = set()
+        # 统计：接口 -> 请求次数；注入的错误次数
+        self.requests: Counter = Counter()
+        self.injected: Counter = Counter()
+
+    def new_id(self, prefix: str) -> str:
+        return f"{prefix}{next(self._ids):08d}"
+
+    # ---------- 数据准备 ----------
+
+    def add_table(
+        self,
+        app_token: str,
+        table_id: str,
+        fields: Optional[List[Dict[str, Any]]] = None,
+        records: int = 0,
+        name: str = "记忆"
+    ) -> Dict[str, Any]:
+        """创建数据表；records 指定时写入对应数量的示例记录"""
+        with self.lock:
+            table_fields = [
+                {"field_id": self.new_id("fld"), "field_name": f["field_name"], "type": f.get("type", 1)}
+                for f in (fields or DEFAULT_FIELDS)
+            ]
+            table = {"name": name, "fields": table_fields, "records": {}}
+            self.tables.setdefault(app_token, {})[table_id] = table
+            for i in range(records):
+                self.insert_record(table, {
+                    "标题": f"示例记忆 {i}",
+                    "内容": f"第 {i} 条示例记忆的内容。" * 5,
+                    "记忆ID": f"fake-{i:06d}",
+                    "分类": "insight",
+                    "重要性": 3,
+                    "标签": ["示例"],
+                })
+            return table
+
+    def add_document(self, title: str, markdown: str = "", folder_token: Optional[str] = None) -> str:
+        """创建文档并放入文件夹（默认根目录）"""
+        with self.lock:
+            document_id = self.new_id("doxcn")
+            self.documents[document_id] = {
+                "title": title,
+                "revision_id": 1,
+                "blocks": {document_id: {"block_id": document_id, "block_type": 1, "children": [],
+                                         "page": {"elements": [{"text_run": {"content": title}}]}}},
+                "client_tokens": {},
+            }
+            if markdown:
+                self.insert_children(document_id, document_id, markdown_to_blocks(markdown), -1)
+            self.add_file(folder_token or self.ROOT_FOLDER, title, "docx", token=document_id)
+            return document_id
+
+    def add_folder(self, parent_token: Optional[str], name: str) -> str:
+        with self.lock:
+            token = self.new_id("fldcn")
+            self.folders[token] = []
+            self.add_file(parent_token or self.ROOT_FOLDER, name, "folder", token=token)
+            return token
+
+    def add_file(self, folder_token: str, name: str, obj_type: str, token: Optional[str] = None) -> str:
+        with self.lock:
+            token = token or self.new_id("boxcn")
+            self.folders.setdefault(folder_token, []).append({
+                "token": token,
+                "name": name,
+                "type": obj_type,
+                "parent_token": folder_token,
+                "url": f"https://fake.feishu.cn/{obj_type}/{token}",
+                "created_time": str(int(time.time())),
+                "modified_time": str(int(time.time())),
+            })
+            return token
+
+    def add_wiki_space(self, name: str, space_id: Optional[str] = None) -> str:
+        with self.lock:
+            space_id = space_id or str(7000000000000000000 + next(self._ids))
+            self.wiki_spaces[space_id] = {"name": name, "nodes": {}}
+            return space_id
+
+    def add_wiki_node(self, space_id: str, title: str, parent_node_token: Optional[str] = None,
+                      obj_type: str = "docx", markdown: str = "") -> str:
+        with self.lock:
+            obj_token = self.add_document(title, markdown) if obj_type == "docx" else self.new_id("obj")
+            node_token = self.new_id("wikcn")
+            nodes = self.wiki_spaces[space_id]["nodes"]
+            nodes.setdefault(parent_node_token or "", []).append({
+                "space_id": space_id,
+                "node_token": node_token,
+                "obj_token": obj_token,
+                "obj_type": obj_type,
+                "parent_node_token": parent_node_token or "",
+                "title": title,
+                "has_child": False,
+            })
+            if parent_node_token:
+                for siblings in nodes.values():
+                    for node in siblings:
+                        if node["node_token"] == parent_node_token:
+                            node["has_child"] = True
+            return node_token
+
+    def add_chat(self, name: str) -> str:
+        with self.lock:
+            chat_id = self.new_id("oc_")
+            self.chats.append({"chat_id": chat_id, "name": name, "description": "", "owner_id": ""})
+            return chat_id
+
+    # ---------- 多维表格 ----------
+
+    def table(self, app_token: str, table_id: str) -> Dict[str, Any]:
+        table = self.tables.get(app_token, {}).get(table_id)
+        if table is None:
+            raise ApiError(404, 1254004, "WrongTableId")
+        return table
+
+    def _field_names(self, table: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """把按字段 ID 提交的字段转换为字段名称（飞书按名称返回记录）"""
+        by_id = {f["field_id"]: f["field_name"] for f in table["fields"]}
+        names = {f["field_name"] for f in table["fields"]}
+        converted = {}
+        for key, value in fields.items():
+            name = by_id.get(key, key)
+            if name not in names:
+                raise ApiError(400, 1254045, "FieldNameNotFound")
+            converted[name] = value
+        return converted
+
+    def insert_record(self, table: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        now = int(time.time() * 1000)
+        record = {
+            "record_id": self.new_id("rec"),
+            "fields": self._field_names(table, fields),
+            "created_time": now,
+            "last_modified_time": now,
+        }
+        table["records"][record["record_id"]] = record
+        return record
+
+    def update_record(self, table: Dict[str, Any], record_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        record = table["records"].get(record_id)
+        if record is None:
+            raise ApiError(400, 1254043, "RecordIdNotFound")
+        record["fields"].update(self._field_names(table, fields))
+        record["last_modified_time"] = max(int(time.time() * 1000), record["last_modified_time"] + 1)
+        return record
+
+    def record_out(self, table: Dict[str, Any], record: Dict[str, Any], automatic: bool = False,
+                    field_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        fields = dict(record["fields"])
+        for f in table["fields"]:
+            if f["type"] == 1002:
+                fields[f["field_name"]] = record["last_modified_time"]
+            elif f["type"] == 1001:
+                fields[f["field_name"]] = record["created_time"]
+        if field_names:
+            fields = {name: value for name, value in fields.items() if name in field_names}
+        out = {"record_id": record["record_id"], "fields": fields}
+        if automatic:
+            out["created_time"] = record["created_time"]
+            out["last_modified_time"] = record["last_modified_time"]
+        return out
+
+    def search(self, table: Dict[str, Any], body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        automatic = bool(body.get("automatic_fields"))
+        records = [self.record_out(table, r, automatic=True) for r in table["records"].values()]
+        filter_ = body.get("filter")
+        if filter_ and filter_.get("conditions"):
+            check = any if filter_.get("conjunction") == "or" else all
+            records = [r for r in records if check(_match(r, c) for c in filter_["conditions"])]
+        for sort in reversed(body.get("sort") or []):
+            name = sort.get("field_name")
+            records.sort(key=lambda r: _sort_key(r["fields"].get(name)), reverse=bool(sort.get("desc")))
+        field_names = body.get("field_names")
+        results = []
+        for r in records:
+            if field_names:
+                r["fields"] = {k: v for k, v in r["fields"].items() if k in field_names}
+            if not automatic:
+                r.pop("created_time", None)
+                r.pop("last_modified_time", None)
+            results.append(r)
+        return results
+
+    # ---------- 文档 ----------
+
+    def document(self, document_id: str) -> Dict[str, Any]:
+        doc = self.documents.get(document_id)
+        if doc is None:
+            raise ApiError(404, 1770002, "document not found")
+        return doc
+
+    def insert_children(self, document_id: str, parent_id: str, children: List[Dict[str, Any]], index: int) -> List[Dict[str, Any]]:
+        doc = self.document(document_id)
+        parent = doc["blocks"].get(parent_id)
+        if parent is None:
+            raise ApiError(400, 1770003, "block not found")
+        siblings = parent.setdefault("children", [])
+        if index is None or index < 0 or index > len(siblings):
+            index = len(siblings)
+        created = []
+        for child in children:
+            block = json.loads(json.dumps(child))
+            block["block_id"] = self.new_id("doxcnblk")
+            block["parent_id"] = parent_id
+            block.pop("children", None)
+            doc["blocks"][block["block_id"]] = block
+            created.append(block)
+        siblings[index:index] = [b["block_id"] for b in created]
+        doc["revision_id"] += 1
+        return created
+
+    def delete_subtree(self, doc: Dict[str, Any], block_id: str):
+        block = doc["blocks"].pop(block_id, None)
+        for child_id in (block or {}).get("children", []):
+            self.delete_subtree(doc, child_id)
+
+    def ordered_blocks(self, document_id: str) -> List[Dict[str, Any]]:
+        """按文档顺序（先序遍历）返回全部块"""
+        doc = self.document(document_id)
+        ordered = []
+        stack = [document_id]
+        while stack:
+            block = doc["blocks"][stack.pop()]
+            ordered.append(block)
+            stack.extend(reversed(block.get("children", [])))
+        return ordered
+
+    def remove_file(self, token: str) -> bool:
+        for files in self.folders.values():
+            for i, file in enumerate(files):
+                if file["token"] == token:
+                    del files[i]
+                    self.documents.pop(token, None)
+                    return True
+        return False
+
+
+def _condition_value(condition: Dict[str, Any]) -> Any:
+    value = condition.get("value") or []
+    if len(value) == 2 and value[0] == "ExactDate":
+        return int(value[1])
+    return value[0] if value else None
+
+
+def _match(record: Dict[str, Any], condition: Dict[str, Any]) -> bool:
+    """records/search 过滤条件（常用运算符）"""
+    raw = record["fields"].get(condition.get("field_name"))
+    operator = condition.get("operator", "is")
+    if operator == "isEmpty":
+        return raw in (None, "", [])
+    if operator == "isNotEmpty":
+        return raw not in (None, "", [])
+    expected = _condition_value(condition)
+    if operator in ("isGreater", "isGreaterEqual", "isLess", "isLessEqual"):
+        if not isinstance(raw, (int, float)):
+            return False
+        return {
+            "isGreater": raw > expected,
+            "isGreaterEqual": raw >= expected,
+            "isLess": raw < expected,
+            "isLessEqual": raw <= expected,
+        }[operator]
+    if isinstance(raw, list) and not _is_segments(raw):
+        # 多选、人员等：任一选项匹配
+        hit = str(expected) in [field_text(v) if isinstance(v, (dict, list)) else str(v) for v in raw]
+    else:
+        text = str(raw) if isinstance(raw, (int, float)) else (field_text(raw) or "")
+        hit = str(expected) in text if operator in ("contains", "doesNotContain") else text == str(expected)
+    if operator in ("isNot", "doesNotContain"):
+        return not hit
+    return hit
+
+
+def _is_segments(value: Any) -> bool:
+    return isinstance(value, list) and bool(value) and all(isinstance(v, dict) and "text" in v for v in value)
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    if value is None:
+        return (0, "")
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, field_text(value) if isinstance(value, (list, dict)) else str(value))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        # 默认不输出访问日志（基准测试时会刷屏）
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_PATCH(self):
+        self._handle("PATCH")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method: str):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            body = json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            return self._send(400, {"code": 9499, "msg": "invalid json"})
+
+        path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else url.path
+        fake: FakeFeishuServer = self.server.fake
+        try:
+            fake.before_request(method, path, self.headers.get("Authorization"))
+            data = fake.dispatch(method, path, params, body)
+        except ApiError as e:
+            return self._send(e.status, {"code": e.code, "msg": e.msg, "data": {}})
+        except Exception as e:  # 服务端自身的错误也按飞书格式返回
+            return self._send(500, {"code": SERVER_ERROR_CODE, "msg": f"fake server error: {e}", "data": {}})
+        if isinstance(data, dict) and "code" in data and "data" not in data:
+            return self._send(200, data)
+        self._send(200, {"code": 0, "msg": "success", "data": data})
+
+    def _send(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, fake: "FakeFeishuServer", verbose: bool = False):
+        super().__init__(address, _Handler)
+        self.fake = fake
+        self.verbose = verbose
+
+
+class FakeFeishuServer:
+    """模拟飞书 API 服务
+
+    Args:
+        config: 延迟和故障注入参数
+        host / port: 监听地址，port 为 0 时自动分配
+        state: 共享的数据（默认新建）
+    """
+
+    def __init__(
+        self,
+        config: Optional[FakeFeishuConfig] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        state: Optional[FakeFeishuState] = None,
+        verbose: bool = False
+    ):
+        self.config = config or FakeFeishuConfig()
+        self.state = state or FakeFeishuState()
+        self._random = random.Random(self.config.seed)
+        self._random_lock = threading.Lock()
+        self._recent = deque()
+        # 测试用：接下来 N 个请求返回指定错误
+        self._forced: deque = deque()
+        self._httpd = _Server((host, port), self, verbose=verbose)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self) -> "FakeFeishuServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeFeishuServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def inject(self, kind: str, count: int = 1):
+        """让接下来 count 个请求返回 rate_limit（99991400）或 failure（500）"""
+        with self._random_lock:
+            self._forced.extend([kind] * count)
+
+    # ---------- 故障注入 ----------
+
+    def before_request(self, method: str, path: str, authorization: Optional[str]):
+        config = self.config
+        if config.latency or config.jitter:
+            with self._random_lock:
+                delay = config.latency + self._random.random() * config.jitter
+            time.sleep(delay)
+
+        if path.startswith("/auth/") or path.startswith("/authen/"):
+            return
+        if not authorization or not authorization.startswith("Bearer ") or authorization[7:] not in self.state.tokens:
+            self.state.injected["unauthorized"] += 1
+            raise ApiError(401, 99991663, "Invalid access token for authorization")
+
+        with self._random_lock:
+            forced = self._forced.popleft() if self._forced else None
+            roll = self._random.random()
+            now = time.monotonic()
+            over_qps = False
+            if config.max_qps:
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                over_qps = len(self._recent) >= config.max_qps
+                if not over_qps:
+                    self._recent.append(now)
+
+        if forced == "rate_limit" or over_qps or (forced is None and roll < config.rate_limit_rate):
+            self.state.injected["rate_limit"] += 1
+            raise ApiError(429, RATE_LIMIT_CODE, "request trigger frequency limit")
+        if forced == "failure" or (forced is None and roll < config.rate_limit_rate + config.failure_rate):
+            self.state.injected["failure"] += 1
+            raise ApiError(500, SERVER_ERROR_CODE, "internal error (injected)")
+
+    # ---------- 路由 ----------
+
+    def dispatch(self, method: str, path: str, params: Dict[str, str], body: Dict[str, Any]) -> Any:
+        parts = [p for p in path.split("/") if p]
+        state = self.state
+        with state.lock:
+            route = self._route(method, parts)
+            state.requests[route] += 1
+            handler = getattr(self, "_" + route.replace(" ", "_").replace("/", "_"), None)
+            if handler is None:
+                raise ApiError(404, 404, f"not implemented: {method} {path}")
+            return handler(parts, params, body)
+
+    @staticmethod
+    def _route(method: str, parts: List[str]) -> str:
+        """把请求路径归类为处理函数名（也用作请求统计的 key）"""
+        joined = "/".join(parts)
+        if joined == "auth/v3/tenant_access_token/internal":
+            return "tenant_token"
+        if joined in ("authen/v1/access_token", "authen/v1/refresh_access_token"):
+            return "user_token"
+        if parts[:2] == ["bitable", "v1"] and len(parts) >= 4:
+            tail = parts[4:]
+            if tail == ["tables"] or len(parts) == 4:
+                return "list_tables"
+            tail = parts[6:]
+            if tail == ["fields"]:
+                return "list_fields"
+            if tail == ["records"]:
+                return "list_records" if method == "GET" else "create_record"
+            if len(tail) == 2 and tail[0] == "records":
+                if tail[1] in ("batch_create", "batch_update", "batch_delete", "search"):
+                    return tail[1] if tail[1] == "search" else tail[1] + "_records"
+                return {"PUT": "update_record", "GET": "get_record", "DELETE": "delete_record"}.get(method, "unknown")
+        if parts[:2] == ["docx", "v1"]:
+            tail = parts[4:]
+            if len(parts) == 3:
+                return "create_document"
+            if not tail:
+                return "get_document"
+            if tail == ["blocks"]:
+                return "list_blocks"
+            if tail == ["blocks", "batch_update"]:
+                return "batch_update_blocks"
+            if len(tail) == 3 and tail[2] == "children":
+                return "create_blocks"
+            if len(tail) == 4 and tail[2:] == ["children", "batch_delete"]:
+                return "delete_blocks"
+        if joined == "drive/explorer/v2/root_folder/meta":
+            return "root_folder"
+        if parts[:3] == ["drive", "v1", "files"]:
+            if len(parts) == 3:
+                return "list_files"
+            if len(parts) == 5 and parts[4] == "move":
+                return "move_file"
+            if len(parts) == 4 and method == "DELETE":
+                return "delete_file"
+        if parts[:3] == ["drive", "v1", "permissions"]:
+            return "set_permission"
+        if parts[:2] == ["wiki", "v2"]:
+            return "list_wiki_spaces" if len(parts) == 3 else "list_wiki_nodes"
+        if joined == "im/v1/messages":
+            return "send_message" if method == "POST" else "list_messages"
+        if joined == "im/v1/chats":
+            return "list_chats"
+        return "unknown"
+
+    # 认证
+
+    def _tenant_token(self, parts, params, body):
+        if not body.get("app_id") or not body.get("app_secret"):
+            raise ApiError(400, 10003, "invalid param")
+        token = "t-" + self.state.new_id("fake")
+        self.state.tokens.add(token)
+        return {"code": 0, "msg": "ok", "tenant_access_token": token, "expire": 7200}
+
+    def _user_token(self, parts, params, body):
+        token = "u-" + self.state.new_id("fake")
+        self.state.tokens.add(token)
+        return {"access_token": token, "refresh_token": "ur-" + token[2:], "expires_in": 7200,
+                "refresh_expires_in": 2592000, "token_type": "Bearer"}
+
+    # 多维表格
+
+    def _list_tables(self, parts, params, body):
+        tables = self.state.tables.get(parts[3], {})
+        items = [{"table_id": table_id, "name": t["name"], "revision": 1} for table_id, t in tables.items()]
+        return {"items": items, "has_more": False, "total": len(items)}
+
+    def _list_fields(self, parts, params, body):
+        fields = self.state.table(parts[3], parts[5])["fields"]
+        items, has_more, token = _page(fields, params, 20, 100)
+        return {"items": items, "has_more": has_more, "page_token": token, "total": len(fields)}
+
+    def _list_records(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        items, has_more, token = _page(list(table["records"].values()), params, 20, 500)
+        return {"items": [self.state.record_out(table, r) for r in items], "has_more": has_more,
+                "page_token": token, "total": len(table["records"])}
+
+    def _get_record(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        record = table["records"].get(parts[7])
+        if record is None:
+            raise ApiError(400, 1254043, "RecordIdNotFound")
+        return {"record": self.state.record_out(table, record)}
+
+    def _create_record(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        return {"record": self.state.record_out(table, self.state.insert_record(table, body.get("fields") or {}))}
+
+    def _update_record(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        record = self.state.update_record(table, parts[7], body.get("fields") or {})
+        return {"record": self.state.record_out(table, record)}
+
+    def _delete_record(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        if table["records"].pop(parts[7], None) is None:
+            raise ApiError(400, 1254043, "RecordIdNotFound")
+        return {"deleted": True, "record_id": parts[7]}
+
+    def _batch_create_records(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        records = body.get("records") or []
+        if len(records) > 500:
+            raise ApiError(400, 1254104, "RecordAddOnceExceedLimit")
+        created = [self.state.insert_record(table, r.get("fields") or {}) for r in records]
+        return {"records": [self.state.record_out(table, r) for r in created]}
+
+    def _batch_update_records(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        records = body.get("records") or []
+        if len(records) > 500:
+            raise ApiError(400, 1254104, "RecordAddOnceExceedLimit")
+        missing = [r.get("record_id") for r in records if r.get("record_id") not in table["records"]]
+        if missing:
+            raise ApiError(400, 1254043, "RecordIdNotFound")
+        updated = [self.state.update_record(table, r["record_id"], r.get("fields") or {}) for r in records]
+        return {"records": [self.state.record_out(table, r) for r in updated]}
+
+    def _batch_delete_records(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        results = []
+        for record_id in body.get("records") or []:
+            results.append({"record_id": record_id, "deleted": table["records"].pop(record_id, None) is not None})
+        return {"records": results}
+
+    def _search(self, parts, params, body):
+        table = self.state.table(parts[3], parts[5])
+        records = self.state.search(table, body)
+        items, has_more, token = _page(records, params, 20, 500)
+        return {"items": items, "has_more": has_more, "page_token": token, "total": len(records)}
+
+    # 文档
+
+    def _document_meta(self, document_id: str) -> Dict[str, Any]:
+        doc = self.state.document(document_id)
+        return {"document_id": document_id, "revision_id": doc["revision_id"], "title": doc["title"]}
+
+    def _create_document(self, parts, params, body):
+        document_id = self.state.add_document(body.get("title") or "未命名文档", folder_token=body.get("folder_token"))
+        return {"document": self._document_meta(document_id)}
+
+    def _get_document(self, parts, params, body):
+        return {"document": self._document_meta(parts[3])}
+
+    def _list_blocks(self, parts, params, body):
+        blocks = self.state.ordered_blocks(parts[3])
+        items, has_more, token = _page(blocks, params, 500, 500)
+        return {"items": json.loads(json.dumps(items)), "has_more": has_more, "page_token": token}
+
+    def _create_blocks(self, parts, params, body):
+        document_id, parent_id = parts[3], parts[5]
+        doc = self.state.document(document_id)
+        children = body.get("children") or []
+        if len(children) > 50:
+            raise ApiError(400, 1770001, "invalid param: children exceed 50")
+        client_token = params.get("client_token")
+        if client_token and client_token in doc["client_tokens"]:
+            # 同一 client_token 重试时返回第一次的结果，不重复插入
+            return doc["client_tokens"][client_token]
+        created = self.state.insert_children(document_id, parent_id, children, body.get("index", -1))
+        result = {"children": json.loads(json.dumps(created)), "document_revision_id": doc["revision_id"],
+                  "client_token": client_token}
+        if client_token:
+            doc["client_tokens"][client_token] = result
+        return result
+
+    def _delete_blocks(self, parts, params, body):
+        document_id, parent_id = parts[3], parts[5]
+        doc = self.state.document(document_id)
+        parent = doc["blocks"].get(parent_id)
+        if parent is None:
+            raise ApiError(400, 1770003, "block not found")
+        start, end = int(body.get("start_index", 0)), int(body.get("end_index", 0))
+        children = parent.get("children", [])
+        if not 0 <= start < end <= len(children):
+            raise ApiError(400, 1770001, "invalid param: index out of range")
+        for block_id in children[start:end]:
+            self.state.delete_subtree(doc, block_id)
+        del children[start:end]
+        doc["revision_id"] += 1
+        return {"document_revision_id": doc["revision_id"]}
+
+    def _batch_update_blocks(self, parts, params, body):
+        doc = self.state.document(parts[3])
+        updated = []
+        for request in body.get("requests") or []:
+            block = doc["blocks"].get(request.get("block_id"))
+            if block is None:
+                raise ApiError(400, 1770003, "block not found")
+            elements = (request.get("update_text_elements") or {}).get("elements")
+            if elements is not None:
+                key = next((k for k in _TEXT_PAYLOAD_KEYS if k in block), None)
+                if key is None:
+                    raise ApiError(400, 1770001, "block has no text elements")
+                block[key]["elements"] = elements
+            updated.append(block)
+        doc["revision_id"] += 1
+        return {"blocks": json.loads(json.dumps(updated)), "document_revision_id": doc["revision_id"]}
+
+    # 云空间和知识库
+
+    def _root_folder(self, parts, params, body):
+        return {"token": FakeFeishuState.ROOT_FOLDER, "id": "1", "user_id": "fake_user"}
+
+    def _list_files(self, parts, params, body):
+        files = self.state.folders.get(params.get("folder_token") or FakeFeishuState.ROOT_FOLDER)
+        if files is None:
+            raise ApiError(404, 1061007, "folder not found")
+        items, has_more, token = _page(files, params, 50, 200)
+        return {"files": [dict(f) for f in items], "has_more": has_more, "next_page_token": token}
+
+    def _move_file(self, parts, params, body):
+        token, target = parts[3], body.get("folder_token")
+        if target not in self.state.folders:
+            raise ApiError(404, 1061007, "folder not found")
+        for files in self.state.folders.values():
+            for i, file in enumerate(files):
+                if file["token"] == token:
+                    moved = files.pop(i)
+                    moved["parent_token"] = target
+                    self.state.folders[target].append(moved)
+                    return {"task_id": self.state.new_id("task")}
+        raise ApiError(404, 1061003, "file not found")
+
+    def _delete_file(self, parts, params, body):
+        if not self.state.remove_file(parts[3]):
+            raise ApiError(404, 1061003, "file not found")
+        return {"task_id": self.state.new_id("task")}
+
+    def _set_permission(self, parts, params, body):
+        return {"permission_public": dict(body)}
+
+    def _list_wiki_spaces(self, parts, params, body):
+        items = [{"space_id": space_id, "name": s["name"]} for space_id, s in self.state.wiki_spaces.items()]
+        return {"items": items, "has_more": False}
+
+    def _list_wiki_nodes(self, parts, params, body):
+        space = self.state.wiki_spaces.get(parts[3])
+        if space is None:
+            raise ApiError(404, 131005, "space not found")
+        nodes = space["nodes"].get(params.get("parent_node_token") or "", [])
+        items, has_more, token = _page(nodes, params, 50, 50)
+        return {"items": [dict(n) for n in items], "has_more": has_more, "page_token": token}
+
+    # IM
+
+    def _send_message(self, parts, params, body):
+        message = {
+            "message_id": self.state.new_id("om_"),
+            "chat_id": body.get("receive_id") if params.get("receive_id_type", "chat_id") == "chat_id" else None,
+            "receive_id": body.get("receive_id"),
+            "receive_id_type": params.get("receive_id_type"),
+            "msg_type": body.get("msg_type"),
+            "body": {"content": body.get("content")},
+            "create_time": str(int(time.time() * 1000)),
+        }
+        self.state.messages.append(message)
+        return message
+
+    def _list_messages(self, parts, params, body):
+        messages = [m for m in self.state.messages if m.get("chat_id") == params.get("container_id")]
+        items, has_more, token = _page(messages, params, 20, 50)
+        return {"items": items, "has_more": has_more, "page_token": token}
+
+    def _list_chats(self, parts, params, body):
+        items, has_more, token = _page(self.state.chats, params, 20, 100)
+        return {"items": items, "has_more": has_more, "page_token": token}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="启动本地模拟飞书 API 服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="随机返回 99991400 的比例")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="随机返回 HTTP 500 的比例")
+    parser.add_argument("--max-qps", type=float, default=0.0, help="每秒请求上限（0 不限制）")
+    parser.add_argument("--app-token", default="fake_app_token")
+    parser.add_argument("--table-id", default="tblFakeMemories")
+    parser.add_argument("--records", type=int, default=0, help="预先写入的示例记录数")
+    parser.add_argument("--verbose", action="store_true", help="输出访问日志")
+    args = parser.parse_args()
+
+    config = FakeFeishuConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit_rate=args.rate_limit_rate,
+        failure_rate=args.failure_rate,
+        max_qps=args.max_qps,
+    )
+    server = FakeFeishuServer(config, host=args.host, port=args.port, verbose=args.verbose)
+    server.state.add_table(args.app_token, args.table_id, records=args.records)
+    server.state.add_chat("通知群")
+
+    print(f"🚀 模拟飞书 API 已启动: {server.base_url}")
+    print(f"   export FEISHU_API_BASE={server.base_url}")
+    print(f"   export FEISHU_APP_ID=cli_fake FEISHU_APP_SECRET=fake "
+          f"FEISHU_APP_TOKEN={args.app_token} FEISHU_TABLE_ID={args.table_id}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 已停止")
+        print(f"   请求统计: {dict(server.state.requests)}")
+        print(f"   注入错误: {dict(server.state.injected)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""测试飞书消息批量归档（单事务批量写入记忆、批量 PATCH 标记归档、逐条状态）
+
+在本地随机端口启动 webhook 服务，记忆库、收件箱写到临时目录，不影响真实数据。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import aiosqlite
+import httpx
+
+import scripts.feishu_event_webhook as webhook
+import storage.db as db
+import storage.inbox as inbox
+import tools.feishu_archive_batch_to_memory as batch_tool
+from models import FeishuArchiveBatchToMemoryInput
+from scripts.feishu_event_webhook import FeishuWebhook
+from storage.event_dedup import EventDedup
+
+# 使用临时记忆库、收件箱和去重文件
+_tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+db.ENTRIES_DIR = os.path.join(_tmp_dir, "entries")
+inbox.INBOX_DB_PATH = str(_tmp_dir / "feishu_inbox.db")
+inbox.LEGACY_JSONL_PATH = _tmp_dir / "feishu_temp_inbox.jsonl"
+inbox.COLD_DB_PATH = str(_tmp_dir / "feishu_inbox_archive.db")
+webhook.DEDUP = EventDedup(_tmp_dir / "feishu_event_ids.log")
+webhook.VERIFICATION_TOKEN = ""
+webhook.READ_API_TOKEN = "read-token"
+os.environ["FEISHU_WEBHOOK_READ_TOKEN"] = "read-token"
+
+
+def _entry(i):
+    return {
+        "message_id": f"om_{i}",
+        "chat_id": "oc_a",
+        "chat_type": "group",
+        "sender_open_id": "ou_user",
+        "created_at": f"2026-01-01T00:00:{i:02d}",
+        "text": f"消息 {i}",
+    }
+
+
+def _item(i, **extra):
+    return {"message_id": f"om_{i}", "analyzed_title": f"标题 {i}", "analyzed_content": f"内容 {i}", **extra}
+
+
+async def _count(sql, args=()):
+    async with aiosqlite.connect(db.DB_PATH) as conn:
+        cursor = await conn.execute(sql, args)
+        return (await cursor.fetchone())[0]
+
+
+async def test_inbox_archive_messages():
+    print("测试：收件箱一次事务批量归档...")
+    await inbox.add_messages([_entry(i) for i in range(10)])
+    assert await inbox.archive_message("om_0")
+    archived = await inbox.archive_messages(["om_0", "om_1", "om_2", "om_missing", "om_1"])
+    assert archived == ["om_0", "om_1", "om_2"], archived
+    assert await inbox.count_messages() == 7 and await inbox.count_messages(archived=True) == 3
+    assert await inbox.archive_messages([]) == []
+    print("  ✓ 已存在的消息全部归档，重复和不存在的 ID 不影响计数")
+
+
+async def test_add_memories_bulk():
+    print("测试：记忆单事务批量写入...")
+    entries = await db.add_memories_bulk([
+        {"memory_id": "bulk_1", "category": "conversation", "title": "批量一", "content": "内容一", "tags": ["a", "b"]},
+        {"memory_id": "bulk_2", "category": "insight", "title": "批量二", "content": "内容二", "importance": 5},
+    ])
+    assert [e["id"] for e in entries] == ["bulk_1", "bulk_2"]
+    assert (await db.get_memory("bulk_2"))["importance"] == 5
+    assert await _count("SELECT COUNT(*) FROM memory_tags WHERE memory_id = 'bulk_1'") == 2
+
+    # 任何一条失败则整批回滚
+    try:
+        await db.add_memories_bulk([
+            {"memory_id": "bulk_3", "category": "conversation", "title": "三", "content": "三"},
+            {"memory_id": "bulk_1", "category": "conversation", "title": "重复", "content": "重复"},
+        ])
+        assert False, "重复 ID 应当失败"
+    except Exception as e:
+        assert not isinstance(e, AssertionError), e
+    assert await db.get_memory("bulk_3") is None
+    print("  ✓ 2 条写入成功，失败批次整体回滚")
+
+
+async def test_batch_tool():
+    print("测试：批量归档工具（一次写入 + 一次 PATCH）...")
+    server = FeishuWebhook(queue_size=10, store_workers=1)
+    port = await server.start("127.0.0.1", 0)
+    batch_tool.os.environ["FEISHU_WEBHOOK_BASE_URL"] = f"http://127.0.0.1:{port}"
+    requests = []
+    handle = server.handle
+
+    async def counting_handle(request):
+        requests.append((request.method, request.path))
+        return await handle(request)
+
+    server.http.handler = counting_handle
+    try:
+        params = FeishuArchiveBatchToMemoryInput(items=[
+            _item(3, tags=["批量"]), _item(4, importance=5), _item(3), _item(99),
+        ])
+        result = json.loads(await batch_tool.feishu_archive_batch_to_memory(params))
+        assert result["status"] == "success", result
+        assert result["saved"] == 3
+        statuses = [(r["message_id"], r["status"], r.get("inbox")) for r in result["results"]]
+        assert statuses == [
+            ("om_3", "archived", "archived"),
+            ("om_4", "archived", "archived"),
+            ("om_3", "duplicate", None),
+            ("om_99", "saved", "not_found"),
+        ], statuses
+        assert requests == [("PATCH", "/feishu/temp_inbox")], requests
+        assert await _count("SELECT COUNT(*) FROM memories WHERE source_type = 'feishu_im'") == 3
+        assert (await inbox.get_message("om_4"))["archived"] is True
+
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            r = await client.patch("/feishu/temp_inbox", json={"message_ids": ["om_5"], "archived": True})
+            assert r.status_code == 401
+            r = await client.patch("/feishu/temp_inbox", params={"token": "read-token"}, json={"archived": True})
+            assert r.status_code == 400
+    finally:
+        await server.stop()
+    print("  ✓ 3 条写入记忆，1 次 PATCH，逐条返回状态")
+
+
+async def test_batch_tool_rollback():
+    print("测试：写入失败时整批不归档...")
+    server = FeishuWebhook(queue_size=10, store_workers=1)
+    port = await server.start("127.0.0.1", 0)
+    batch_tool.os.environ["FEISHU_WEBHOOK_BASE_URL"] = f"http://127.0.0.1:{port}"
+    original = batch_tool.add_memories_bulk
+
+    async def failing_bulk(memories):
+        raise RuntimeError("disk full")
+
+    batch_tool.add_memories_bulk = failing_bulk
+    try:
+        params = FeishuArchiveBatchToMemoryInput(items=[_item(5), _item(6)])
+        result = json.loads(await batch_tool.feishu_archive_batch_to_memory(params))
+        assert result["status"] == "error", result
+        assert (await inbox.get_message("om_5"))["archived"] is False
+    finally:
+        batch_tool.add_memories_bulk = original
+        await server.stop()
+    print("  ✓ 返回错误，收件箱消息保持未归档")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书消息批量归档测试")
+    print("=" * 60)
+    await db.init_db()
+    tests = [
+        test_inbox_archive_messages,
+        test_add_memories_bulk,
+        test_batch_tool,
+        test_batch_tool_rollback,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""测试文档块分片写入（分片大小、顺序、失败后续写不重复）
+
+使用模拟的 _request，不访问飞书 API。
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuAPIError
+from sync.block_writer import BlockWriter, BlockWriteError, DOCX_MAX_CHILDREN_PER_CALL
+import sync.block_writer as block_writer
+
+
+def _blocks(count):
+    return [{"block_type": 2, "text": {"elements": [{"text_run": {"content": f"第 {i} 行"}}]}} for i in range(count)]
+
+
+class FakeDocClient:
+    """模拟文档子块创建接口；按 client_token 去重，可按调用次数注入失败"""
+
+    def __init__(self, fail_calls=(), fail_status=None):
+        self.children = []
+        self.calls = []
+        self.seen_tokens = set()
+        self.fail_calls = set(fail_calls)
+        self.fail_status = fail_status
+        self.revision = 1
+
+    async def _request(self, method, endpoint, params=None, data=None, use_user_token=False):
+        call_no = len(self.calls)
+        self.calls.append({"params": dict(params), "count": len(data["children"]), "index": data.get("index")})
+        assert len(data["children"]) <= DOCX_MAX_CHILDREN_PER_CALL
+        token = params["client_token"]
+        if token not in self.seen_tokens:
+            self.seen_tokens.add(token)
+            index = data.get("index", len(self.children))
+            self.children[index:index] = data["children"]
+            self.revision += 1
+        if call_no in self.fail_calls:
+            # 请求已生效但响应丢失（超时），或参数错误
+            raise FeishuAPIError("模拟失败", status_code=self.fail_status)
+        return {"code": 0, "data": {"document_revision_id": self.revision}}
+
+
+async def test_chunks_in_order():
+    print("测试：按接口上限分片、按顺序写入...")
+    client = FakeDocClient()
+    blocks = _blocks(5000)
+    written = await BlockWriter(client, "doc1").write(blocks)
+    assert written == 5000
+    assert len(client.calls) == 100, len(client.calls)
+    assert client.children == blocks, "块顺序不一致"
+    # 后续请求使用上一次返回的版本号
+    assert client.calls[0]["params"]["document_revision_id"] == -1
+    assert client.calls[1]["params"]["document_revision_id"] == 2
+    print("  ✓ 5000 个块分 100 次写入，顺序正确")
+
+
+async def test_retry_reuses_client_token():
+    print("测试：超时重试不重复插入...")
+    client = FakeDocClient(fail_calls={3})
+    block_writer.backoff_delay = lambda attempt: 0
+    blocks = _blocks(200)
+    await BlockWriter(client, "doc1").write(blocks, index=0)
+    assert client.children == blocks, "重试后出现重复或缺失"
+    assert client.calls[3]["params"]["client_token"] == client.calls[4]["params"]["client_token"]
+    print("  ✓ 重试使用同一 client_token，内容无重复")
+
+
+async def test_resume_after_failure():
+    print("测试：失败后从最后确认的分片续写...")
+    client = FakeDocClient(fail_calls={2}, fail_status=400)
+    blocks = _blocks(180)
+    writer = BlockWriter(client, "doc1")
+    try:
+        await writer.write(blocks)
+        raise AssertionError("应抛出 BlockWriteError")
+    except BlockWriteError as e:
+        assert e.written == 100 and e.total == 180, (e.written, e.total)
+    await writer.resume()
+    assert client.children == blocks, "续写后内容不一致"
+    assert [call["count"] for call in client.calls] == [50, 50, 50, 50, 30]
+    print("  ✓ 续写从第 101 个块开始，内容完整")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 文档块分片写入测试")
+    print("=" * 60)
+    tests = [test_chunks_in_order, test_retry_reuses_client_token, test_resume_after_failure]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
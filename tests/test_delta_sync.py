@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""测试增量同步（updated_at 水位线 + 字段哈希 + 批量写入）和飞书端修改的拉取
+
+使用临时数据库和假的飞书客户端，不访问飞书 API。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import aiosqlite
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.db as db
+import storage.sync_state as sync_state
+import sync.sync_to_feishu as sync_to_feishu
+import sync.sync_from_feishu as sync_from_feishu
+import tools.memory_sync_to_feishu as sync_tool
+from models import MemorySyncToFeishuInput
+from sync.sync_engine import SyncEngine
+from sync.feishu_client import FeishuAPIError, RECORD_NOT_FOUND_ERROR_CODE
+from sync.field_mapping import FieldMapper, TableSchema, MEMORY_FIELD_TYPES, FIELD_TYPE_MODIFIED_TIME, to_timestamp_ms
+
+# 使用临时数据库，避免影响真实数据
+_tmp_dir = tempfile.mkdtemp()
+db.DB_PATH = sync_state.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+db.ENTRIES_DIR = os.path.join(_tmp_dir, "entries")
+
+
+class FakeClient:
+    """记录批量请求的假客户端"""
+
+    def __init__(self):
+        fields = [
+            {"field_id": f"fld{i}", "field_name": name, "type": types[0]}
+            for i, (name, types) in enumerate(MEMORY_FIELD_TYPES.items())
+        ]
+        fields.append({"field_id": "fldmod", "field_name": "最后更新时间", "type": FIELD_TYPE_MODIFIED_TIME})
+        self.schema = TableSchema("tbl", fields)
+        self.mapper = FieldMapper(self.schema)
+        self.created = []
+        self.updated = []
+        self.remote_records = []
+        self.searches = []
+        self.lookups = []
+        # 飞书中已有、但本地没有同步状态的记录：记忆ID -> 记录ID
+        self.existing = {}
+        # 飞书中已删除的记录ID（批量更新时返回 RecordIdNotFound）
+        self.deleted = set()
+
+    async def get_field_mapper(self, table_id=None):
+        return self.mapper
+
+    async def get_table_schema(self, table_id=None, max_age=None):
+        return self.schema
+
+    async def search_records(self, filter=None, sort=None, automatic_fields=False,
+                             page_size=500, page_token=None, **kwargs):
+        self.searches.append(filter)
+        return {"items": self.remote_records, "has_more": False}
+
+    async def list_records(self, table_id=None, page_size=100, page_token=None):
+        return {"items": []}
+
+    async def batch_create_records(self, fields_list, table_id=None):
+        start = len(self.created)
+        self.created.extend(fields_list)
+        return [{"record_id": f"rec{start + i}"} for i in range(len(fields_list))]
+
+    async def batch_update_records(self, records, table_id=None):
+        if any(r["record_id"] in self.deleted for r in records):
+            raise FeishuAPIError("RecordIdNotFound", status_code=400, error_code=RECORD_NOT_FOUND_ERROR_CODE)
+        self.updated.extend(records)
+        return records
+
+    async def update_record(self, record_id, fields, table_id=None):
+        self.updated.append({"record_id": record_id, "fields": fields})
+        return {"record_id": record_id}
+
+    async def find_records(self, field_name, values, table_id=None):
+        self.lookups.append(list(values))
+        return {
+            value: {"record_id": self.existing[value]}
+            for value in values if value in self.existing
+        }
+
+
+async def _touch(memory_id: str, title: str):
+    """修改记忆标题并更新 updated_at（与 memory_update 工具一致）"""
+    memory = await db.get_memory(memory_id)
+    async with aiosqlite.connect(db.DB_PATH) as conn:
+        cursor = await conn.execute("SELECT entry_path FROM memories WHERE id = ?", (memory_id,))
+        entry_path = (await cursor.fetchone())[0]
+        memory["title"] = title
+        memory["updated_at"] = datetime.now().isoformat()
+        with open(entry_path, "w", encoding="utf-8") as f:
+            json.dump(memory, f, ensure_ascii=False)
+        await conn.execute(
+            "UPDATE memories SET title = ?, updated_at = ? WHERE id = ?",
+            (title, memory["updated_at"], memory_id)
+        )
+        await conn.commit()
+
+
+async def test_delta_sync_only_pushes_changes():
+    """首轮批量创建，之后只更新变化的记录"""
+    print("测试：增量同步只推送变化...")
+    await db.init_db()
+    for i in range(5):
+        await db.add_memory(f"mem-{i}", "insight", f"标题 {i}", f"内容 {i}")
+
+    client = FakeClient()
+    sync_to_feishu.get_feishu_client = lambda: client
+
+    stats = await sync_to_feishu.sync_delta(verbose=False)
+    assert stats["created"] == 5, f"首轮应创建 5 条，实际 {stats}"
+    assert len(client.created) == 5
+
+    stats = await sync_to_feishu.sync_delta(verbose=False)
+    assert stats == {"processed": 0, "created": 0, "updated": 0, "unchanged": 0, "failed": 0, "watermark": None}, \
+        f"无变化时不应读取或写入任何记录，实际 {stats}"
+
+    await _touch("mem-2", "新标题")
+    stats = await sync_to_feishu.sync_delta(verbose=False)
+    assert stats["updated"] == 1 and stats["created"] == 0, f"应只更新 1 条，实际 {stats}"
+    assert client.updated[0]["record_id"] == "rec2"
+    print("  ✓ 首轮创建 5 条，之后只更新修改过的 1 条")
+
+
+async def test_pull_applies_remote_edits():
+    """拉取飞书端修改写回本地，且不会再被推回飞书"""
+    print("测试：拉取飞书端修改...")
+    client = sync_to_feishu.get_feishu_client()
+    sync_from_feishu.get_feishu_client = lambda: client
+
+    edited = await db.get_memory("mem-3")
+    unchanged = await db.get_memory("mem-4")
+    modified_ms = to_timestamp_ms(datetime.now().isoformat()) + 1000
+    client.remote_records = [
+        {
+            "record_id": "rec3",
+            "last_modified_time": modified_ms,
+            "fields": {
+                "记忆ID": [{"type": "text", "text": "mem-3"}],
+                "标题": [{"type": "text", "text": "飞书中改的标题"}],
+                "内容": edited["content"],
+                "分类": edited["category"],
+                "重要性": edited["importance"],
+            },
+        },
+        {
+            "record_id": "rec4",
+            "last_modified_time": modified_ms,
+            "fields": {
+                "记忆ID": "mem-4",
+                "标题": unchanged["title"],
+                "内容": unchanged["content"],
+                "分类": unchanged["category"],
+                "重要性": unchanged["importance"],
+            },
+        },
+    ]
+
+    stats = await sync_from_feishu.pull_delta(verbose=False)
+    assert stats["pulled"] == 1 and stats["skipped"] == 1, f"应拉取 1 条、跳过 1 条，实际 {stats}"
+    assert (await db.get_memory("mem-3"))["title"] == "飞书中改的标题"
+
+    updates_before = len(client.updated)
+    stats = await sync_to_feishu.sync_delta(verbose=False)
+    assert len(client.updated) == updates_before, f"拉取的修改不应再推回飞书，实际 {stats}"
+
+    # 第二次拉取按水位线过滤，不再处理同一批记录
+    stats = await sync_from_feishu.pull_delta(verbose=False)
+    assert stats["pulled"] == 0 and client.searches[-1] is not None
+    print("  ✓ 飞书端修改已写回本地，未回推，水位线生效")
+
+
+class FlakyClient(FakeClient):
+    """第 fail_on 次批量创建请求失败"""
+
+    def __init__(self, fail_on: int):
+        super().__init__()
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def batch_create_records(self, fields_list, table_id=None):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0.01 * (call % 3))  # 让批次乱序完成
+        if call == self.fail_on:
+            raise RuntimeError("模拟请求失败")
+        return await super().batch_create_records(fields_list, table_id)
+
+
+async def test_engine_checkpoint_stops_at_failed_page():
+    """并发写入时检查点只推进到连续成功的页，重跑后补齐"""
+    print("测试：同步引擎检查点...")
+    for i in range(10, 20):
+        await db.add_memory(f"mem-{i}", "insight", f"标题 {i}", f"内容 {i}")
+    progress = []
+
+    client = FlakyClient(fail_on=2)
+    engine = SyncEngine(client, concurrency=3, batch_size=2, page_size=2, progress=progress.append)
+    stats = await engine.run()
+    assert stats["created"] == 8 and stats["failed"] == 2, f"应成功 8 条、失败 2 条，实际 {stats}"
+    assert progress and progress[-1]["created"] == 8
+
+    # 重跑：从失败的页开始，已成功的记录因哈希一致跳过
+    client.fail_on = 0
+    stats = await SyncEngine(client, concurrency=3, batch_size=2, page_size=2).run()
+    assert stats["created"] == 2, f"重跑应只补齐失败的 2 条，实际 {stats}"
+    stats = await SyncEngine(client, concurrency=3, batch_size=2, page_size=2).run()
+    assert stats["processed"] == 0, f"检查点应已推进到末尾，实际 {stats}"
+    print("  ✓ 失败页之后的检查点未推进，重跑只补齐失败的记录")
+
+
+async def test_missing_state_uses_server_side_lookup():
+    """没有同步状态时按 记忆ID 查找已有记录，更新而不是重复创建"""
+    print("测试：按 记忆ID 查找已有记录...")
+    entry = await db.add_memory("mem-lookup", "insight", "已在飞书中", "内容")
+    client = FakeClient()
+    client.existing = {"mem-lookup": "rec-existing"}
+    sync_to_feishu.get_feishu_client = lambda: client
+
+    ok = await sync_to_feishu.auto_sync_memory_to_feishu(entry)
+    assert ok and client.lookups == [["mem-lookup"]], f"应查找一次，实际 {client.lookups}"
+    assert not client.created and client.updated[0]["record_id"] == "rec-existing"
+    print("  ✓ 一次查找请求定位到已有记录并更新")
+
+
+async def test_deleted_record_is_recreated():
+    """飞书中已删除的记录：更新失败后按 记忆ID 查找，找不到的重新创建，水位线继续推进"""
+    print("测试：飞书中已删除的记录...")
+    await db.add_memory("mem-gone", "insight", "将被删除", "内容")
+    await db.add_memory("mem-kept", "insight", "仍然存在", "内容")
+    client = FakeClient()
+    sync_to_feishu.get_feishu_client = lambda: client
+    await sync_to_feishu.sync_delta(verbose=False)
+    states = await sync_state.get_sync_states(["mem-gone", "mem-kept"])
+    gone_id = states["mem-gone"]["record_id"]
+
+    client.deleted.add(gone_id)
+    client.existing = {"mem-kept": states["mem-kept"]["record_id"]}
+    await _touch("mem-gone", "删除后修改")
+    await _touch("mem-kept", "同批修改")
+    stats = await sync_to_feishu.sync_delta(verbose=False)
+    assert stats["failed"] == 0 and stats["created"] == 1 and stats["updated"] == 1, f"实际 {stats}"
+    assert client.lookups[-1] == ["mem-gone", "mem-kept"], client.lookups
+    new_id = (await sync_state.get_sync_states(["mem-gone"]))["mem-gone"]["record_id"]
+    assert new_id and new_id != gone_id
+
+    stats = await sync_to_feishu.sync_delta(verbose=False)
+    assert stats["processed"] == 0, f"水位线应已越过被删除的记录，实际 {stats}"
+    print("  ✓ 已删除的记录重新创建，同批记录照常更新，水位线推进")
+
+
+async def test_full_sync_survives_list_failure():
+    """全量同步读取飞书记录失败时，不把空结果当作“飞书中没有记录”重复创建"""
+    print("测试：读取飞书记录失败时的全量同步...")
+    client = FakeClient()
+
+    async def failing_list_records(table_id=None, page_size=100, page_token=None):
+        raise RuntimeError("模拟读取失败")
+
+    client.list_records = failing_list_records
+    sync_tool.get_feishu_client = lambda: client
+    result = await sync_tool.memory_sync_to_feishu(MemorySyncToFeishuInput(mode="full"))
+    assert "读取飞书记录失败" in result, result
+    assert not client.created, f"已同步的记忆不应重新创建，实际创建 {len(client.created)} 条"
+    print("  ✓ 读取失败时按本地同步状态同步，没有重复创建")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 增量同步测试")
+    print("=" * 60)
+    tests = [
+        test_delta_sync_only_pushes_changes,
+        test_pull_applies_remote_edits,
+        test_engine_checkpoint_stops_at_failed_page,
+        test_missing_state_uses_server_side_lookup,
+        test_deleted_record_is_recreated,
+        test_full_sync_survives_list_failure,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(main())
+    sys.exit(0 if ok else 1)
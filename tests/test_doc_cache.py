@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""测试文档内容缓存（按 revision_id 复用）和文档块转 Markdown
+
+使用临时数据库和模拟的 _request，不访问飞书 API。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.db as db
+import storage.doc_cache as doc_cache
+from sync.feishu_client import FeishuClient
+from sync.markdown_blocks import blocks_to_markdown, markdown_to_blocks
+from sync.doc_diff import block_signature
+
+# 使用临时数据库，避免影响真实数据
+_tmp_dir = tempfile.mkdtemp()
+db.DB_PATH = doc_cache.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+
+DOC = """# 周报
+
+本周完成 **三项** 任务，*一项* 延期，~~取消~~ 一项，见 `report.md`
+
+- 同步引擎
+- 文档写入
+1. 分片上传
+2. 块级差异
+
+> 提醒：下周完成迁移
+
+```python
+print("hi")
+```
+
+---
+结尾段落"""
+
+
+def _as_document(document_id, blocks):
+    """模拟接口返回的文档块：页面根块 + 子块"""
+    children = []
+    for i, block in enumerate(blocks):
+        children.append({**block, "block_id": f"blk{i}", "parent_id": document_id})
+    page = {"block_id": document_id, "block_type": 1, "children": [b["block_id"] for b in children]}
+    return [page] + children
+
+
+class FakeDocApi:
+    """模拟文档元信息和分页块列表接口"""
+
+    def __init__(self, document_id, blocks, page_size=3):
+        self.document_id = document_id
+        self.blocks = blocks
+        self.revision_id = 7
+        self.page_size = page_size
+        self.requests = []
+
+    async def __call__(self, method, endpoint, params=None, data=None, use_user_token=False):
+        self.requests.append(endpoint)
+        if endpoint.endswith("/blocks"):
+            start = int(params.get("page_token") or 0)
+            end = start + self.page_size
+            return {"code": 0, "data": {
+                "items": self.blocks[start:end],
+                "has_more": end < len(self.blocks),
+                "page_token": str(end),
+            }}
+        return {"code": 0, "data": {"document": {
+            "document_id": self.document_id, "revision_id": self.revision_id, "title": "周报"
+        }}}
+
+
+def _client(api):
+    client = FeishuClient.__new__(FeishuClient)
+    client._request = api
+    return client
+
+
+def test_blocks_to_markdown_round_trip():
+    print("测试：文档块转 Markdown 再转回块内容不变...")
+    blocks = markdown_to_blocks(DOC)
+    markdown = blocks_to_markdown(_as_document("doc1", blocks))
+    again = markdown_to_blocks(markdown)
+    assert [block_signature(b) for b in again] == [block_signature(b) for b in blocks], markdown
+    print(f"  ✓ {len(blocks)} 个块往返一致")
+
+
+def test_nested_list_and_table():
+    print("测试：嵌套列表和表格...")
+    blocks = [
+        {"block_id": "doc1", "block_type": 1, "children": ["b1", "t1"]},
+        {"block_id": "b1", "block_type": 12, "bullet": {"elements": [{"text_run": {"content": "父级"}}]}, "children": ["b2"]},
+        {"block_id": "b2", "block_type": 13, "ordered": {"elements": [{"text_run": {"content": "子级"}}]}},
+        {"block_id": "t1", "block_type": 31, "table": {"property": {"row_size": 2, "column_size": 2}},
+         "children": ["c1", "c2", "c3", "c4"]},
+    ]
+    for i, text in enumerate(["名称", "数量", "苹果", "3"], start=1):
+        blocks.append({"block_id": f"c{i}", "block_type": 32, "children": [f"p{i}"]})
+        blocks.append({"block_id": f"p{i}", "block_type": 2, "text": {"elements": [{"text_run": {"content": text}}]}})
+    markdown = blocks_to_markdown(blocks)
+    expected = "- 父级\n  1. 子级\n| 名称 | 数量 |\n| --- | --- |\n| 苹果 | 3 |"
+    assert markdown == expected, markdown
+    print("  ✓ 子列表缩进，表格按行输出")
+
+
+async def test_revision_cache():
+    print("测试：版本未变时只请求元信息...")
+    await db.init_db()
+    api = FakeDocApi("doc1", _as_document("doc1", markdown_to_blocks(DOC)))
+    client = _client(api)
+
+    first = await client.load_document("doc1")
+    assert not first["cached"]
+    # 1 次元信息 + 分页读取全部块
+    assert len(api.requests) == 1 + -(-len(api.blocks) // api.page_size), api.requests
+    assert len(first["blocks"]) == len(api.blocks)
+
+    api.requests.clear()
+    second = await client.load_document("doc1")
+    assert second["cached"] and len(api.requests) == 1, api.requests
+    assert second["markdown"] == first["markdown"]
+
+    api.revision_id = 8
+    api.blocks = _as_document("doc1", markdown_to_blocks(DOC + "\n新增段落"))
+    api.requests.clear()
+    third = await client.load_document("doc1")
+    assert not third["cached"] and third["markdown"].endswith("新增段落")
+    print("  ✓ 命中缓存时 1 次请求，版本变化后重新读取")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 文档内容缓存测试")
+    print("=" * 60)
+    tests = [test_blocks_to_markdown_round_trip, test_nested_list_and_table, test_revision_cache]
+    failed = 0
+    for test in tests:
+        try:
+            result = test()
+            if asyncio.iscoroutine(result):
+                await result
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""测试文档块级差异（只对有变化的块发出删除/插入/更新）
+
+在内存中模拟文档块列表执行操作，不访问飞书 API。
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuClient
+from sync.doc_diff import BLOCK_PAYLOAD_KEYS, block_signature, plan_block_diff, summarize_ops
+
+_converter = FeishuClient.__new__(FeishuClient)
+
+
+def _to_blocks(markdown: str):
+    return _converter._markdown_to_feishu_blocks(markdown)
+
+
+def _as_existing(blocks):
+    """模拟接口返回的块：带 block_id，样式名称为接口格式"""
+    existing = copy.deepcopy(blocks)
+    for i, block in enumerate(existing):
+        block["block_id"] = f"blk{i}"
+        payload = block.get(BLOCK_PAYLOAD_KEYS[block["block_type"]], {})
+        for element in payload.get("elements", []):
+            style = element["text_run"].get("text_element_style", {})
+            if style.pop("codeInline", None):
+                style["inline_code"] = True
+            element["text_run"]["text_element_style"] = {"bold": False, **style}
+    return existing
+
+
+def _apply(existing, ops):
+    """按顺序在内存中执行操作"""
+    blocks = list(existing)
+    for op in ops:
+        if op[0] == "delete":
+            del blocks[op[1]:op[2]]
+        elif op[0] == "insert":
+            blocks[op[1]:op[1]] = op[2]
+        else:
+            block = next(b for b in blocks if b.get("block_id") == op[1])
+            block[BLOCK_PAYLOAD_KEYS[block["block_type"]]]["elements"] = op[2]
+    return blocks
+
+
+DOC = "\n".join(
+    ["# 周报", ""]
+    + [f"第 {i} 段，包含 **重点** 和 `代码`" for i in range(200)]
+    + ["", "- 条目一", "- 条目二", "", "```python", "print(1)", "```"]
+)
+
+
+def test_unchanged_document_needs_no_ops():
+    print("测试：内容不变...")
+    existing = _as_existing(_to_blocks(DOC))
+    ops = plan_block_diff(existing, _to_blocks(DOC))
+    assert ops == [], f"内容不变时不应有操作，实际 {summarize_ops(ops)}"
+    print("  ✓ 0 个操作")
+
+
+def test_single_paragraph_edit_is_one_update():
+    print("测试：修改一个段落...")
+    existing = _as_existing(_to_blocks(DOC))
+    new_blocks = _to_blocks(DOC.replace("第 100 段", "第 100 段（已修改）"))
+    ops = plan_block_diff(existing, new_blocks)
+    assert summarize_ops(ops) == {"deleted": 0, "inserted": 0, "updated": 1}, summarize_ops(ops)
+    assert ops[0][1] == "blk101"
+    result = _apply(existing, ops)
+    assert [block_signature(b) for b in result] == [block_signature(b) for b in new_blocks]
+    print("  ✓ 1 个原地更新，其余 200+ 个块保持不变")
+
+
+def test_insert_delete_and_type_change():
+    print("测试：插入、删除和块类型变化...")
+    existing = _as_existing(_to_blocks(DOC))
+    edited = DOC.replace("第 5 段，包含 **重点** 和 `代码`", "")
+    edited = edited.replace("第 50 段，包含 **重点** 和 `代码`", "## 新标题\n新增段落")
+    edited = edited.replace("- 条目二", "1. 条目二")
+    new_blocks = _to_blocks(edited)
+    ops = plan_block_diff(existing, new_blocks)
+    result = _apply(existing, ops)
+    assert [block_signature(b) for b in result] == [block_signature(b) for b in new_blocks]
+    summary = summarize_ops(ops)
+    assert summary["deleted"] + summary["inserted"] + summary["updated"] <= 6, summary
+    print(f"  ✓ 结果与新内容一致，操作 {summary}")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 文档块级差异测试")
+    print("=" * 60)
+    tests = [
+        test_unchanged_document_needs_no_ops,
+        test_single_paragraph_edit_is_one_update,
+        test_insert_delete_and_type_change,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""测试飞书文档本地全文索引（按 revision_id 增量）和记忆 + 文档联合搜索
+
+使用临时数据库和模拟的 _request，不访问飞书 API。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.db as db
+import storage.doc_cache as doc_cache
+import storage.doc_index as doc_index
+from sync.feishu_client import FeishuClient
+from sync.markdown_blocks import markdown_to_blocks
+from sync.doc_indexer import index_documents
+
+# 使用临时数据库，避免影响真实数据
+_tmp_dir = tempfile.mkdtemp()
+db.DB_PATH = doc_cache.DB_PATH = doc_index.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+db.ENTRIES_DIR = os.path.join(_tmp_dir, "entries")
+
+
+class FakeDocsApi:
+    """模拟多个文档的元信息和块列表接口"""
+
+    def __init__(self):
+        self.docs = {}
+        self.block_requests = []
+
+    def set_doc(self, document_id, title, markdown, revision_id):
+        blocks = [{**b, "block_id": f"{document_id}_{i}"} for i, b in enumerate(markdown_to_blocks(markdown))]
+        page = {"block_id": document_id, "block_type": 1, "children": [b["block_id"] for b in blocks]}
+        self.docs[document_id] = {"title": title, "revision_id": revision_id, "blocks": [page] + blocks}
+
+    async def __call__(self, method, endpoint, params=None, data=None, use_user_token=False):
+        document_id = endpoint.split("/")[4]
+        doc = self.docs[document_id]
+        if endpoint.endswith("/blocks"):
+            self.block_requests.append(document_id)
+            return {"code": 0, "data": {"items": doc["blocks"], "has_more": False}}
+        return {"code": 0, "data": {"document": {
+            "document_id": document_id, "revision_id": doc["revision_id"], "title": doc["title"]
+        }}}
+
+
+def _client(api):
+    client = FeishuClient.__new__(FeishuClient)
+    client._request = api
+    return client
+
+
+async def test_incremental_index():
+    print("测试：按 revision_id 增量索引...")
+    await db.init_db()
+    api = FakeDocsApi()
+    api.set_doc("doc1", "季度复盘", "# 季度复盘\n完成了退休规划的第一阶段\n- meditation habit", 3)
+    api.set_doc("doc2", "读书笔记", "《原则》读书笔记\n**核心**：极度透明", 5)
+    documents = {doc_id: {"title": d["title"], "url": f"https://my.feishu.cn/docx/{doc_id}"} for doc_id, d in api.docs.items()}
+    client = _client(api)
+
+    stats = await index_documents(client, documents, verbose=False)
+    assert stats["indexed"] == 2, stats
+
+    api.block_requests.clear()
+    api.set_doc("doc2", "读书笔记", "《原则》读书笔记\n新增：可信度加权", 6)
+    stats = await index_documents(client, documents, verbose=False)
+    assert stats == {"indexed": 1, "unchanged": 1, "failed": 0, "removed": 0}, stats
+    assert api.block_requests == ["doc2"], api.block_requests
+
+    stats = await index_documents(client, {"doc1": documents["doc1"]}, prune=True, verbose=False)
+    assert stats["removed"] == 1 and set(await doc_index.get_indexed_revisions()) == {"doc1"}
+    print("  ✓ 只重新读取版本变化的文档，完整发现后移除已删除的文档")
+
+
+async def test_search_memories_and_docs():
+    print("测试：记忆和文档联合搜索...")
+    await db.add_memory("mem-1", "goal", "退休规划", "50岁退休，为身体和精神做准备")
+    await db.add_memory("mem-2", "insight", "Meditation notes", "daily meditation habit improves focus")
+
+    results = await doc_index.search_knowledge("退休规划")
+    sources = {(r["source"], r["id"]) for r in results}
+    assert ("memory", "mem-1") in sources and ("doc", "doc1") in sources, results
+    doc_hit = next(r for r in results if r["source"] == "doc")
+    assert "退休规划" in doc_hit["snippet"] and doc_hit["url"].endswith("doc1")
+
+    results = await doc_index.search_knowledge("meditation habit")
+    assert {r["source"] for r in results} == {"memory", "doc"}, results
+
+    only_docs = await doc_index.search_knowledge("退休", include_memories=False)
+    assert only_docs and all(r["source"] == "doc" for r in only_docs)
+    assert await doc_index.search_knowledge("不存在的内容xyz") == []
+    print("  ✓ 一次查询同时返回记忆和文档，中英文均可检索")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书文档索引测试")
+    print("=" * 60)
+    tests = [test_incremental_index, test_search_memories_and_docs]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""测试文件夹树 / 知识库并发遍历和本地路径索引
+
+使用临时数据库和假的飞书客户端，不访问飞书 API。
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.db as db
+import storage.path_index as path_index
+from sync.drive_walker import walk_drive, walk_wiki, find_in_drive
+
+# 使用临时数据库，避免影响真实数据
+_tmp_dir = tempfile.mkdtemp()
+db.DB_PATH = path_index.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+
+
+def _build_tree():
+    """root 下 4 个文件夹，每个文件夹 3 个子文件夹，每个子文件夹 5 个文档"""
+    tree = {"root": []}
+    for i in range(4):
+        tree["root"].append({"token": f"f{i}", "name": f"项目{i}", "type": "folder"})
+        tree[f"f{i}"] = []
+        for j in range(3):
+            tree[f"f{i}"].append({"token": f"f{i}_{j}", "name": f"子目录{j}", "type": "folder"})
+            tree[f"f{i}_{j}"] = [
+                {"token": f"d{i}_{j}_{k}", "name": f"文档{k}", "type": "docx"} for k in range(5)
+            ]
+    tree["f3_2"].append({"token": "target", "name": "周报", "type": "folder"})
+    tree["target"] = []
+    return tree
+
+
+class FakeDriveClient:
+    """按文件夹分页返回文件，记录请求次数和最大并发数"""
+
+    def __init__(self, tree, page_size=2, fail=()):
+        self.tree = tree
+        self.page_size = page_size
+        self.fail = set(fail)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _page(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.005)
+        self.in_flight -= 1
+
+    async def iter_folder_files(self, folder_token=None, page_size=200, use_user_token=False):
+        if folder_token in self.fail:
+            raise RuntimeError("没有权限")
+        files = self.tree.get(folder_token, [])
+        for start in range(0, max(len(files), 1), self.page_size):
+            await self._page()
+            for file in files[start:start + self.page_size]:
+                yield file
+
+    async def iter_wiki_nodes(self, space_id, parent_node_token=None, page_size=50):
+        for file in self.tree.get(parent_node_token or "root", []):
+            await self._page()
+            yield {
+                "node_token": file["token"], "title": file["name"], "obj_type": file["type"],
+                "obj_token": "obj_" + file["token"], "has_child": file["type"] == "folder",
+            }
+
+
+async def _collect(walker):
+    return [entry async for entry in walker]
+
+
+async def test_concurrent_walk_and_index():
+    print("测试：并发遍历并写入路径索引...")
+    await db.init_db()
+    client = FakeDriveClient(_build_tree())
+    stats = {}
+    entries = await _collect(walk_drive(client, "root", max_depth=4, concurrency=4, stats=stats))
+    assert len(entries) == 4 + 12 + 60 + 1, len(entries)
+    assert stats["listed"] == 1 + 4 + 12 + 1, stats
+    assert 1 < client.max_in_flight <= 4, client.max_in_flight
+    paths = {e["path"] for e in entries}
+    assert "/项目3/子目录2/周报" in paths and "/项目0/子目录1/文档4" in paths
+
+    requests = client.requests
+    stats = {}
+    again = await _collect(walk_drive(client, "root", max_depth=4, stats=stats))
+    assert client.requests == requests, "索引有效期内不应再请求"
+    assert len(again) == len(entries) and stats["listed"] == 0
+    print(f"  ✓ {len(entries)} 个条目，最大并发 {client.max_in_flight}，第二次遍历 0 次请求")
+
+
+async def test_find_folder_is_local_after_walk():
+    print("测试：按名称 / 路径查找文件夹...")
+    client = FakeDriveClient(_build_tree())
+    found = await find_in_drive(client, "root", "周报", max_depth=5)
+    assert found and found["token"] == "target"
+    requests = client.requests
+    assert (await find_in_drive(client, "root", "项目3/子目录2/周报"))["token"] == "target"
+    assert (await find_in_drive(client, "root", "周报"))["token"] == "target"
+    assert await find_in_drive(client, "root", "不存在的目录") is None
+    assert client.requests == requests, "重复查找应只读取本地索引"
+    print("  ✓ 首次遍历后查找全部命中本地索引")
+
+
+async def test_early_stop_and_errors():
+    print("测试：提前结束和列出失败...")
+    client = FakeDriveClient(_build_tree(), fail={"f1"})
+    walker = walk_drive(client, "root", max_depth=4, max_age=0)
+    first = await walker.__anext__()
+    await walker.aclose()
+    assert first["depth"] == 1
+
+    # 子目录失败时跳过，起始目录失败时抛出
+    entries = await _collect(walk_drive(client, "root", max_depth=2, max_age=0))
+    assert not any(e["parent_token"] == "f1" for e in entries)
+    try:
+        await _collect(walk_drive(FakeDriveClient({}, fail={"root"}), "root", max_age=0))
+        raise AssertionError("起始目录失败应抛出异常")
+    except RuntimeError:
+        pass
+    print("  ✓ 提前结束后停止遍历，子目录失败跳过，起始目录失败抛出")
+
+
+async def test_wiki_walk():
+    print("测试：知识库节点遍历...")
+    client = FakeDriveClient(_build_tree())
+    nodes = await _collect(walk_wiki(client, "root", max_depth=2))
+    assert len(nodes) == 4 + 12, len(nodes)
+    assert all(n["obj_token"].startswith("obj_") for n in nodes)
+    print(f"  ✓ {len(nodes)} 个节点")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 文件夹树遍历测试")
+    print("=" * 60)
+    tests = [
+        test_concurrent_walk_and_index,
+        test_find_folder_is_local_after_walk,
+        test_early_stop_and_errors,
+        test_wiki_walk,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
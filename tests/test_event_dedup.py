@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""测试飞书事件去重（有序限时 LRU、Bloom 过滤器、追加日志持久化、线程安全）"""
+
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from storage.event_dedup import BloomFilter, EventDedup
+
+_tmp_dir = Path(tempfile.mkdtemp())
+
+
+def test_lru_order_and_ttl():
+    print("测试：按时间过期，容量满时淘汰最旧的事件...")
+    dedup = EventDedup(ttl=0.2, max_entries=3)
+    assert dedup.add(["e1", "e2", "e2", "e3"]) == 3
+    assert dedup.filter_new(["e1", "e4", "e4", "e5"]) == ["e4", "e5"]
+
+    dedup.add(["e4"])
+    assert len(dedup) == 3 and list(dedup._recent) == ["e2", "e3", "e4"], list(dedup._recent)
+    # e1 已被挤出 LRU，仍由 Bloom 过滤器识别为重复
+    assert "e1" in dedup
+
+    time.sleep(0.25)
+    assert "e4" not in dedup and dedup.add(["e4"]) == 1
+    print("  ✓ 最近的事件保留，过期后重新接受")
+
+
+def test_append_log_and_reload():
+    print("测试：每批追加一次日志，重启后恢复...")
+    path = _tmp_dir / "events.log"
+    dedup = EventDedup(path, ttl=3600, max_entries=100)
+    for batch in range(10):
+        dedup.add([f"evt_{batch}_{i}" for i in range(5)])
+    dedup.add(["evt_0_0"])  # 重复不写日志
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 50
+
+    reloaded = EventDedup(path, ttl=3600, max_entries=100)
+    assert len(reloaded) == 50 and "evt_9_4" in reloaded and "evt_new" not in reloaded
+    assert list(reloaded._recent)[0] == "evt_0_0"
+
+    # 日志超过 2 倍容量时压缩为快照
+    small = EventDedup(_tmp_dir / "small.log", ttl=3600, max_entries=10)
+    for i in range(25):
+        small.add([f"s{i}"])
+    assert len((_tmp_dir / "small.log").read_text(encoding="utf-8").splitlines()) <= 20
+    print("  ✓ 50 条事件、10 次追加，重启后全部识别")
+
+
+def test_migrate_legacy_json():
+    print("测试：迁移旧版 feishu_event_ids.json...")
+    legacy = _tmp_dir / "feishu_event_ids.json"
+    legacy.write_text(json.dumps(["old_1", "old_2"]), encoding="utf-8")
+    dedup = EventDedup(_tmp_dir / "feishu_event_ids.log")
+    assert "old_1" in dedup and "old_2" in dedup
+    assert not legacy.exists() and (_tmp_dir / "feishu_event_ids.json.migrated").exists()
+    print("  ✓ 旧 ID 已导入日志")
+
+
+def test_thread_safety():
+    print("测试：多线程同时写入相同事件...")
+    dedup = EventDedup(_tmp_dir / "threads.log", max_entries=10_000)
+    counts = []
+
+    def worker():
+        counts.append(sum(dedup.add([f"evt_{i}"]) for i in range(1000)))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(counts) == 1000, counts
+    assert len((_tmp_dir / "threads.log").read_text(encoding="utf-8").splitlines()) == 1000
+    print("  ✓ 8 个线程，每个事件只记录一次")
+
+
+def test_bloom_false_positive_rate():
+    print("测试：Bloom 过滤器误判率...")
+    bloom = BloomFilter(10_000, error_rate=1e-3)
+    for i in range(10_000):
+        bloom.add(f"in_{i}")
+    assert all(f"in_{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"out_{i}" in bloom for i in range(20_000))
+    assert false_positives < 60, false_positives
+    print(f"  ✓ 20000 次查询误判 {false_positives} 次（目标 0.1%）")
+
+
+def main():
+    print("=" * 60)
+    print("🧪 飞书事件去重测试")
+    print("=" * 60)
+    tests = [
+        test_lru_order_and_ttl,
+        test_append_log_and_reload,
+        test_migrate_legacy_json,
+        test_thread_safety,
+        test_bloom_false_positive_rate,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
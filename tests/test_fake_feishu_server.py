@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""通过本地模拟飞书 API（tests/fake_feishu_server.py）端到端测试 FeishuClient
+
+真实发送 HTTP 请求，覆盖认证、记录读写、同步引擎、文档块写入和 IM，
+并验证频率限制 / 服务端错误注入后客户端的重试行为。不访问飞书 API。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.db as db
+import storage.doc_cache as doc_cache
+import storage.path_index as path_index
+import storage.sync_state as sync_state
+import sync.feishu_client as feishu_client
+import sync.rate_limiter as rate_limiter
+import tools.feishu_list_documents as list_documents_tool
+from models import FeishuListDocumentsInput
+from sync.drive_walker import walk_drive
+from sync.sync_engine import SyncEngine
+from tests.fake_feishu_server import FakeFeishuConfig, FakeFeishuServer
+
+# 使用临时数据库，避免影响真实数据
+_tmp_dir = tempfile.mkdtemp()
+db.DB_PATH = doc_cache.DB_PATH = path_index.DB_PATH = sync_state.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+db.ENTRIES_DIR = os.path.join(_tmp_dir, "entries")
+
+# 不限制客户端请求速率，缩短重试等待
+rate_limiter._RATE_LIMITER = rate_limiter.AsyncRateLimiter(0)
+rate_limiter.RETRY_BASE_DELAY = 0.01
+
+APP_TOKEN = "fake_app"
+TABLE_ID = "tblFake"
+
+
+def _client(server):
+    feishu_client.FEISHU_API_BASE = server.base_url
+    feishu_client.FEISHU_APP_ID = "cli_fake_test"
+    feishu_client.FEISHU_APP_SECRET = "fake_secret"
+    # 每个模拟服务只认自己签发的 token，丢弃上一个服务的缓存
+    feishu_client._TOKEN_MANAGERS.clear()
+    return feishu_client.FeishuClient(app_token=APP_TOKEN, table_id=TABLE_ID)
+
+
+async def test_records_with_rate_limits():
+    print("测试：记录读写和频率限制重试...")
+    with FakeFeishuServer(FakeFeishuConfig(latency=0.002)) as server:
+        server.state.add_table(APP_TOKEN, TABLE_ID)
+        client = _client(server)
+        mapper = await client.get_field_mapper()
+        assert not mapper.missing_fields, mapper.missing_fields
+
+        server.inject("rate_limit", 2)
+        created = await client.batch_create_records([{"标题": f"记录{i}", "记忆ID": f"m{i}"} for i in range(600)])
+        assert len(created) == 600
+        assert server.state.injected["rate_limit"] == 2
+        assert server.state.requests["batch_create_records"] == 2, server.state.requests
+
+        records = [r async for r in client.iter_records(page_size=250)]
+        assert len(records) == 600 and records[0]["fields"]["标题"] == "记录0"
+
+        found = await client.find_records("记忆ID", ["m5", "m599", "missing"])
+        assert set(found) == {"m5", "m599"}
+        print(f"  ✓ 600 条记录，注入 2 次 99991400 后自动重试成功")
+
+
+async def test_sync_engine_push():
+    print("测试：同步引擎通过 HTTP 推送记忆...")
+    await db.init_db()
+    for i in range(150):
+        await db.add_memory(f"mem-{i:03d}", "insight", f"记忆 {i}", f"内容 {i}", tags=["测试"])
+
+    with FakeFeishuServer(FakeFeishuConfig(latency=0.005)) as server:
+        server.state.add_table(APP_TOKEN, TABLE_ID)
+        client = _client(server)
+        engine = SyncEngine(client, concurrency=4, batch_size=50, progress=None)
+        stats = await engine.run(full=True, record_map={})
+        assert stats["created"] == 150 and stats["failed"] == 0, (stats, engine.errors)
+        table = server.state.tables[APP_TOKEN][TABLE_ID]
+        ids = {r["fields"]["记忆ID"] for r in table["records"].values()}
+        assert len(ids) == 150 and "mem-149" in ids
+        assert server.state.requests["batch_create_records"] == 3, server.state.requests
+        print(f"  ✓ 150 条记忆，{server.state.requests['batch_create_records']} 次批量创建")
+
+
+async def test_document_write_and_read():
+    print("测试：文档块写入、失败重试和读取...")
+    with FakeFeishuServer() as server:
+        client = _client(server)
+        folder = server.state.add_folder(None, "周报")
+        document_id = server.state.add_document("周报 第1周", folder_token=folder)
+        markdown = "\n".join(f"- 第 {i} 项" for i in range(120))
+
+        ok = await client.append_document_content(document_id, markdown)
+        assert ok
+        # 写入请求失败一次后重试，client_token 保证不会重复插入
+        server.inject("failure", 1)
+        ok = await client.append_document_content(document_id, "# 总结\n**完成**")
+        assert ok and server.state.injected["failure"] == 1
+
+        document = await client.load_document(document_id)
+        lines = document["markdown"].splitlines()
+        assert lines[0] == "- 第 0 项" and lines[119] == "- 第 119 项", lines[:3]
+        assert lines[-2:] == ["# 总结", "**完成**"], lines[-3:]
+        assert len(document["blocks"]) == 1 + 122, len(document["blocks"])
+
+        entries = [e async for e in walk_drive(client, server.state.ROOT_FOLDER, max_age=0)]
+        assert any(e["path"] == "/周报/周报 第1周" for e in entries), entries
+        print(f"  ✓ 122 个块，修订版本 {document['revision_id']}")
+
+
+async def test_folder_listing_after_writes():
+    print("测试：创建、移动、删除文档后文件夹列表立即更新...")
+    await db.init_db()
+    with FakeFeishuServer() as server:
+        client = _client(server)
+        folder = server.state.add_folder(None, "资料")
+        archive = server.state.add_folder(None, "归档")
+        old = server.state.add_document("old", folder_token=folder)
+
+        async def names(token):
+            return sorted([e["name"] async for e in walk_drive(client, token)])
+
+        assert await names(folder) == ["old"]
+        assert await names(archive) == []
+
+        created = await client.create_document("new doc", "", folder_token=folder)
+        assert await names(folder) == ["new doc", "old"]
+
+        await client.move_file_to_folder(created["file"]["token"], archive)
+        assert await names(folder) == ["old"] and await names(archive) == ["new doc"]
+
+        await client.delete_document(old)
+        assert await names(folder) == []
+
+        # 飞书端的修改（不经过本进程）在索引有效期内需要 refresh 才能看到
+        server.state.add_file(folder, "外部新增", "docx")
+        list_documents_tool.get_feishu_client = lambda: client
+
+        async def tool_names(refresh):
+            result = json.loads(await list_documents_tool.feishu_list_documents(
+                FeishuListDocumentsInput(folder_token=folder, refresh=refresh)
+            ))
+            return [d["name"] for d in result["documents"]]
+
+        assert await tool_names(False) == []
+        assert await tool_names(True) == ["外部新增"]
+        print("  ✓ 本进程的写入立即可见，refresh=true 重新列出飞书端的修改")
+
+
+async def test_im_send_and_list():
+    print("测试：IM 发送和群聊列表...")
+    with FakeFeishuServer() as server:
+        client = _client(server)
+        chat_id = server.state.add_chat("通知群")
+        chats = await client.list_chats()
+        assert [c["chat_id"] for c in chats["items"]] == [chat_id]
+        message = await client.send_message("chat_id", chat_id, "text", {"text": "你好"})
+        assert message["message_id"] and server.state.messages[0]["chat_id"] == chat_id
+        print("  ✓ 消息已发送到模拟群聊")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 模拟飞书 API 端到端测试")
+    print("=" * 60)
+    tests = [
+        test_records_with_rate_limits,
+        test_sync_engine_push,
+        test_document_write_and_read,
+        test_folder_listing_after_writes,
+        test_im_send_and_list,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""测试飞书消息轮询（持久化游标、归档与新消息同时发生、发送失败重试、旧状态升级）
+
+使用临时收件箱数据库和模拟的飞书客户端，不访问飞书 API。
+"""
+
+import asyncio
+import json
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import scripts.feishu_poller as poller
+import storage.inbox as inbox
+from sync.notifier import CoalescingNotifier
+
+_tmp_dir = Path(tempfile.mkdtemp())
+inbox.INBOX_DB_PATH = str(_tmp_dir / "feishu_inbox.db")
+inbox.LEGACY_JSONL_PATH = _tmp_dir / "feishu_temp_inbox.jsonl"
+inbox.COLD_DB_PATH = str(_tmp_dir / "feishu_inbox_archive.db")
+poller.LAST_NOTIFIED_PATH = _tmp_dir / "feishu_poller_state.json"
+poller.NOTIFICATION_CHAT_ID = "oc_notify"
+
+SENT = []
+FAIL = {"next": False}
+
+
+class FakeClient:
+    """记录发送的摘要为 (新消息数, 未读总数)"""
+
+    async def send_message(self, receive_id_type, receive_id, msg_type, content, use_user_token=False):
+        if FAIL["next"]:
+            FAIL["next"] = False
+            raise RuntimeError("网络错误")
+        title = content["zh_cn"]["title"]
+        SENT.append(tuple(int(n) for n in re.findall(r"\d+", title)))
+        return {"message_id": "om_notify"}
+
+    async def list_chats(self, page_size=50, page_token=None, use_user_token=False):
+        return {"items": [], "has_more": False}
+
+
+# 合并窗口和最小间隔为 0：每轮有新消息就发送
+poller._NOTIFIER = CoalescingNotifier(FakeClient, window=0, min_interval=0)
+
+
+def _entry(i):
+    return {"message_id": f"om_{i}", "chat_id": "oc_a", "created_at": f"2026-01-01T00:00:{i:02d}", "text": f"消息 {i}"}
+
+
+def _state():
+    return json.loads(poller.LAST_NOTIFIED_PATH.read_text(encoding="utf-8"))
+
+
+async def test_archive_and_arrival_dont_cancel_out():
+    print("测试：归档和新消息同时发生时仍然通知...")
+    await inbox.add_messages([_entry(i) for i in range(3)])
+    await poller._poll_once()
+    assert SENT == [(3, 3)], SENT
+    assert _state()["cursor"] == 3 and _state()["unread"] == 3
+
+    # 无新消息不通知
+    await poller._poll_once()
+    assert len(SENT) == 1
+
+    # 归档 1 条同时到达 1 条：未读数不变，旧逻辑会漏掉
+    await inbox.archive_message("om_0")
+    await inbox.add_messages([_entry(3)])
+    await poller._poll_once()
+    assert SENT[-1] == (1, 3), SENT
+    assert _state()["archived"] == 1 and _state()["cursor"] == 4
+    print("  ✓ 按游标识别新消息，未读数准确")
+
+
+async def test_failed_send_keeps_cursor():
+    print("测试：通知发送失败时保留游标...")
+    SENT.clear()
+    await inbox.add_messages([_entry(4), _entry(5)])
+    FAIL["next"] = True
+    await poller._poll_once()
+    assert not SENT and _state()["cursor"] == 4
+    await poller._poll_once()
+    assert SENT == [(2, 5)], SENT
+
+    # 到达后已被归档的消息不计为新消息
+    await inbox.add_messages([_entry(6)])
+    await inbox.archive_message("om_6")
+    await poller._poll_once()
+    assert SENT == [(2, 5)] and _state()["cursor"] == 7
+    print("  ✓ 下一轮补发，已归档的新消息不通知")
+
+
+async def test_upgrade_from_count_state():
+    print("测试：从旧版计数状态升级...")
+    SENT.clear()
+    poller.LAST_NOTIFIED_PATH.write_text(json.dumps({"count": 5}), encoding="utf-8")
+    poller._SCAN_CURSOR = None
+    await poller._poll_once()
+    assert not SENT and _state()["cursor"] == 7, _state()
+    await inbox.add_messages([_entry(7)])
+    await poller._poll_once()
+    assert SENT == [(1, 6)], SENT
+    print("  ✓ 已有消息视为已通知，只提醒之后的新消息")
+
+
+async def test_poll_cost_independent_of_history():
+    print("测试：轮询只读取游标之后的消息...")
+    SENT.clear()
+    await inbox.add_messages([_entry(i) for i in range(100, 400)])
+    await poller._poll_once()
+    assert SENT == [(300, 306)], SENT
+
+    calls = []
+    list_since = inbox.list_since
+
+    async def counting_list_since(*args, **kwargs):
+        page = await list_since(*args, **kwargs)
+        calls.append(len(page))
+        return page
+
+    inbox.list_since = counting_list_since
+    try:
+        await inbox.add_messages([_entry(500)])
+        await poller._poll_once()
+    finally:
+        inbox.list_since = list_since
+    assert calls == [1], calls
+    print("  ✓ 306 条历史消息，本轮只读取 1 条")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书消息轮询测试")
+    print("=" * 60)
+    tests = [
+        test_archive_and_arrival_dont_cancel_out,
+        test_failed_send_keeps_cursor,
+        test_upgrade_from_count_state,
+        test_poll_cost_independent_of_history,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""测试飞书事件 Webhook（asyncio HTTP 服务、有界队列、批量写入、背压、SSE / 长轮询）
+
+在本地随机端口启动 scripts/feishu_event_webhook.py，用 httpx 发送真实请求。
+收件箱数据库和去重文件写到临时目录，不影响真实数据。
+"""
+
+import asyncio
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+import scripts.feishu_event_webhook as webhook
+import storage.inbox as inbox
+from scripts.feishu_event_webhook import FeishuWebhook
+from models import FeishuFetchInboxInput
+from storage.event_dedup import EventDedup
+from tools.feishu_fetch_inbox import feishu_fetch_inbox
+
+# 使用临时收件箱和去重文件
+_tmp_dir = Path(tempfile.mkdtemp())
+inbox.INBOX_DB_PATH = str(_tmp_dir / "feishu_inbox.db")
+inbox.LEGACY_JSONL_PATH = _tmp_dir / "feishu_temp_inbox.jsonl"
+inbox.COLD_DB_PATH = str(_tmp_dir / "feishu_inbox_archive.db")
+webhook.DEDUP = EventDedup(_tmp_dir / "feishu_event_ids.log")
+webhook.VERIFICATION_TOKEN = ""
+webhook.READ_API_TOKEN = ""
+
+
+def _event(i, chat_id="oc_test"):
+    return {
+        "schema": "2.0",
+        "header": {"event_id": f"evt_{i}", "event_type": "im.message.receive_v1"},
+        "event": {
+            "sender": {"sender_id": {"open_id": "ou_user", "union_id": "on_user"}},
+            "message": {
+                "message_id": f"om_{i}",
+                "chat_id": chat_id,
+                "chat_type": "group",
+                "message_type": "text",
+                "content": json.dumps({"text": f"消息 {i}"}, ensure_ascii=False),
+                "create_time": str(1700000000000 + i * 1000),
+            },
+        },
+    }
+
+
+def _reset_inbox():
+    inbox._READY.clear()
+    db_files = [Path(db_path + s) for db_path in (inbox.INBOX_DB_PATH, inbox.COLD_DB_PATH) for s in ("", "-wal", "-shm")]
+    for path in [_tmp_dir / "feishu_event_ids.log"] + db_files:
+        if path.exists():
+            path.unlink()
+    webhook.DEDUP = EventDedup(_tmp_dir / "feishu_event_ids.log")
+
+
+async def test_burst_stored_in_batches():
+    print("测试：突发消息进入队列后批量写入...")
+    _reset_inbox()
+    batches = []
+
+    async def store(payloads):
+        batches.append(len(payloads))
+        return await webhook._store_events(payloads)
+
+    server = FeishuWebhook(queue_size=500, store_workers=2, batch_size=100, batch_wait=0.05, store=store)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            # 300 条消息并发到达，其中 20 条是飞书重推的重复事件
+            events = [_event(i) for i in range(300)] + [_event(i) for i in range(20)]
+            responses = await asyncio.gather(*(client.post("/", json=e) for e in events))
+            assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+            await server.queue.join()
+
+            # 写入后飞书再次重推，不进入队列直接确认
+            response = await client.post("/", json=_event(7))
+            assert response.json() == {"ok": True, "duplicate": True}
+            assert server.stats["duplicates"] == 1 and server.queue.qsize() == 0
+
+            response = await client.get("/feishu/temp_inbox", params={"limit": 100})
+            data = response.json()
+            assert data["count"] == 100 and data["items"][0]["message_id"] == "om_299", data["items"][:1]
+    finally:
+        await server.stop()
+
+    assert await inbox.count_messages() == 300
+    assert server.stats["stored"] == 300 and sum(batches) == 320, (server.stats, batches)
+    assert len(batches) < 20 and max(batches) <= 100, batches
+    print(f"  ✓ 320 个请求，{len(batches)} 批写入 300 条（去重 20 条）")
+
+
+async def test_keep_alive():
+    print("测试：HTTP/1.1 keep-alive 复用连接...")
+    server = FeishuWebhook(store_workers=1)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            for _ in range(20):
+                response = await client.get("/health")
+                assert response.status_code == 200 and response.json()["ok"]
+            response = await client.post("/", json={"type": "url_verification", "challenge": "abc"})
+            assert response.json() == {"challenge": "abc"}
+            response = await client.get("/missing")
+            assert response.status_code == 404
+    finally:
+        await server.stop()
+    assert server.http.connections == 1, server.http.connections
+    print("  ✓ 22 个请求共用 1 个连接")
+
+
+async def test_backpressure_when_queue_full():
+    print("测试：队列满时返回 503 + Retry-After...")
+    _reset_inbox()
+    release = asyncio.Event()
+
+    async def slow_store(payloads):
+        await release.wait()
+        return await webhook._store_events(payloads)
+
+    server = FeishuWebhook(queue_size=10, store_workers=1, batch_size=5, batch_wait=0, store=slow_store)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            statuses = []
+            for i in range(30):
+                response = await client.post("/", json=_event(i))
+                statuses.append(response.status_code)
+                if response.status_code == 503:
+                    assert response.headers["Retry-After"] == "1"
+            accepted = statuses.count(200)
+            # 1 批在写入中（最多 5 条）+ 队列 10 条，其余被拒绝
+            assert 10 <= accepted <= 15 and statuses.count(503) == 30 - accepted, statuses
+            assert server.stats["rejected"] == 30 - accepted
+            release.set()
+            await server.queue.join()
+    finally:
+        release.set()
+        await server.stop()
+    assert server.stats["stored"] == accepted, server.stats
+    print(f"  ✓ 接收 {accepted} 条，拒绝 {30 - accepted} 条，释放后全部写入")
+
+
+async def _read_sse(lines, count):
+    """从 SSE 行迭代器读取 count 个消息事件，返回 [(id, data)] 和收到的注释行"""
+    events, comments, event_id = [], [], None
+    async for line in lines:
+        if line.startswith(":"):
+            comments.append(line)
+        elif line.startswith("id: "):
+            event_id = int(line[4:])
+        elif line.startswith("data: "):
+            events.append((event_id, json.loads(line[6:])))
+            if len(events) == count:
+                break
+    return events, comments
+
+
+async def test_long_poll_since_cursor():
+    print("测试：since 游标和长轮询...")
+    _reset_inbox()
+    server = FeishuWebhook(store_workers=1, batch_wait=0)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            await client.post("/", json=_event(1))
+            await server.queue.join()
+            data = (await client.get("/feishu/temp_inbox")).json()
+            cursor = data["cursor"]
+            assert data["count"] == 1 and cursor == 1, data
+
+            # 没有新消息时等待到超时
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            data = (await client.get("/feishu/temp_inbox", params={"since": cursor, "wait": 0.3})).json()
+            assert data["count"] == 0 and data["cursor"] == cursor and loop.time() - start >= 0.3
+
+            # 等待期间到达的消息立即返回
+            async def post_later():
+                await asyncio.sleep(0.2)
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as other:
+                    await other.post("/", json=_event(2))
+                    await other.post("/", json=_event(3, chat_id="oc_other"))
+
+            start = loop.time()
+            poster = asyncio.create_task(post_later())
+            data = (await client.get("/feishu/temp_inbox", params={"since": cursor, "wait": 10})).json()
+            await poster
+            assert 0.2 <= loop.time() - start < 2, loop.time() - start
+            assert [item["message_id"] for item in data["items"]][0] == "om_2" and data["cursor"] >= 2, data
+            await server.queue.join()
+
+            data = (await client.get("/feishu/temp_inbox", params={"since": 0, "chat_id": "oc_other"})).json()
+            assert [item["message_id"] for item in data["items"]] == ["om_3"], data
+            response = await client.get("/feishu/temp_inbox", params={"since": "abc"})
+            assert response.status_code == 400
+    finally:
+        await server.stop()
+    print("  ✓ 长轮询在新消息到达后立即返回，游标递增")
+
+
+async def test_sse_stream_resume():
+    print("测试：SSE 推送、心跳和 Last-Event-ID 续传...")
+    _reset_inbox()
+    webhook.HEARTBEAT_INTERVAL = 0.2
+    server = FeishuWebhook(store_workers=1, batch_wait=0)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=10) as client:
+            async with client.stream("GET", "/feishu/stream") as response:
+                assert response.headers["content-type"].startswith("text/event-stream")
+                for i in range(3):
+                    await client.post("/", json=_event(i))
+                events, _ = await _read_sse(response.aiter_lines(), 3)
+            assert [e[1]["message_id"] for e in events] == ["om_0", "om_1", "om_2"], events
+            last_id = events[-1][0]
+
+            # 断开期间到达的消息在重连后补发
+            for i in range(3, 5):
+                await client.post("/", json=_event(i))
+            await server.queue.join()
+            async with client.stream("GET", "/feishu/stream", headers={"Last-Event-ID": str(last_id)}) as response:
+                lines = response.aiter_lines()
+                replayed, _ = await _read_sse(lines, 2)
+                await asyncio.sleep(0.5)
+                await client.post("/", json=_event(5))
+                live, comments = await _read_sse(lines, 1)
+            assert [e[1]["message_id"] for e in replayed + live] == ["om_3", "om_4", "om_5"], replayed + live
+            assert [e[0] for e in replayed + live] == [last_id + 1, last_id + 2, last_id + 3]
+            assert ": keep-alive" in comments, comments
+        # 断开的订阅者在下一次心跳写入失败后移除
+        await asyncio.sleep(0.5)
+        assert not server.subscribers, server.subscribers
+    finally:
+        webhook.HEARTBEAT_INTERVAL = 15
+        await server.stop()
+    print("  ✓ 断线重连补发 2 条，心跳正常")
+
+
+async def test_slow_subscriber_catches_up():
+    print("测试：订阅者缓冲区满时从收件箱补齐...")
+    _reset_inbox()
+    webhook.SUBSCRIBER_QUEUE_SIZE = 5
+    server = FeishuWebhook(store_workers=1, batch_size=100, batch_wait=0.2)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=10) as client:
+            async with client.stream("GET", "/feishu/stream") as response:
+                await asyncio.sleep(0.1)
+                # 一批写入 50 条，远超订阅者缓冲区
+                await asyncio.gather(*(client.post("/", json=_event(i)) for i in range(50)))
+                events, _ = await _read_sse(response.aiter_lines(), 50)
+        seqs = [e[0] for e in events]
+        assert seqs == sorted(set(seqs)) and len(seqs) == 50, seqs
+    finally:
+        webhook.SUBSCRIBER_QUEUE_SIZE = 100
+        await server.stop()
+    print("  ✓ 50 条消息按顺序送达，无重复")
+
+
+async def test_fetch_inbox_tool():
+    print("测试：feishu_fetch_inbox 增量拉取...")
+    _reset_inbox()
+    server = FeishuWebhook(store_workers=1, batch_wait=0)
+    port = await server.start("127.0.0.1", 0)
+    webhook.READ_API_TOKEN = "secret"
+    os.environ["FEISHU_WEBHOOK_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ["FEISHU_WEBHOOK_READ_TOKEN"] = "secret"
+    try:
+        await webhook._store_events([_event(1), _event(2)])
+        result = json.loads(await feishu_fetch_inbox(FeishuFetchInboxInput(limit=10)))
+        assert result["count"] == 2 and result["cursor"] == 2, result
+        result = json.loads(await feishu_fetch_inbox(FeishuFetchInboxInput(since=1)))
+        assert [item["message_id"] for item in result["items"]] == ["om_2"] and result["cursor"] == 2, result
+        result = json.loads(await feishu_fetch_inbox(FeishuFetchInboxInput(since=2, wait=1)))
+        assert result["count"] == 0 and result["cursor"] == 2, result
+    finally:
+        webhook.READ_API_TOKEN = ""
+        await server.stop()
+    print("  ✓ cursor 和 since 往返一致")
+
+
+async def test_archive_and_errors():
+    print("测试：归档消息和错误请求...")
+    _reset_inbox()
+    await webhook._store_events([_event(1), _event(2)])
+    server = FeishuWebhook(store_workers=1)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            response = await client.patch("/feishu/temp_inbox/om_1", json={"archived": True})
+            assert response.status_code == 200, response.text
+            response = await client.patch("/feishu/temp_inbox/om_404", json={"archived": True})
+            assert response.status_code == 404
+            items = (await client.get("/temp_inbox")).json()["items"]
+            assert [item["message_id"] for item in items] == ["om_2"], items
+
+            response = await client.post("/", content=b"not json")
+            assert response.status_code == 400 and response.json()["error"] == "invalid_json"
+            response = await client.post("/", json={"header": {"event_type": "im.chat.updated_v1"}})
+            assert response.status_code == 200 and server.queue.qsize() == 0
+
+            webhook.READ_API_TOKEN = "secret"
+            try:
+                assert (await client.get("/temp_inbox")).status_code == 401
+                response = await client.get("/temp_inbox", headers={"Authorization": "Bearer secret"})
+                assert response.status_code == 200
+            finally:
+                webhook.READ_API_TOKEN = ""
+    finally:
+        await server.stop()
+    print("  ✓ 归档、404、非法 JSON 和鉴权均符合预期")
+
+
+async def test_compaction_and_history():
+    print("测试：启动时压缩旧归档消息，按群查询冷存储历史...")
+    _reset_inbox()
+    await webhook._store_events([_event(i, "oc_a" if i < 5 else "oc_b") for i in range(8)])
+    await inbox.archive_messages([f"om_{i}" for i in range(6)])
+    with sqlite3.connect(inbox.INBOX_DB_PATH) as conn:
+        conn.execute("UPDATE feishu_inbox SET archived_at = '2020-01-01T00:00:00' WHERE archived = 1")
+    server = FeishuWebhook(store_workers=1, compact_interval=3600)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        await asyncio.sleep(0.2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            items = (await client.get("/feishu/temp_inbox", params={"include_archived": "true"})).json()["items"]
+            assert sorted(item["message_id"] for item in items) == ["om_6", "om_7"], items
+            page = (await client.get("/feishu/temp_inbox/history", params={"chat_id": "oc_a", "limit": 3})).json()
+            assert [item["message_id"] for item in page["items"]] == ["om_4", "om_3", "om_2"], page
+            page = (await client.get("/feishu/temp_inbox/history",
+                                     params={"chat_id": "oc_a", "before": page["before"]})).json()
+            assert [item["message_id"] for item in page["items"]] == ["om_1", "om_0"], page
+            assert (await client.get("/feishu/temp_inbox/history")).status_code == 400
+    finally:
+        await server.stop()
+    print("  ✓ 6 条旧归档消息移入冷存储，按群分页查询")
+
+
+async def test_shared_store_follow():
+    print("测试：多进程模式下从收件箱 seq 跟随其他进程写入的消息...")
+    _reset_inbox()
+    a = FeishuWebhook(store_workers=1, batch_wait=0, shared_store=True)
+    b = FeishuWebhook(store_workers=1, batch_wait=0, shared_store=True)
+    port_a = await a.start("127.0.0.1", 0)
+    port_b = await b.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(timeout=10) as client:
+            async with client.stream("GET", f"http://127.0.0.1:{port_b}/feishu/stream") as response:
+                # 两个进程交替写入，订阅者按 seq 顺序收到全部消息
+                for i in range(6):
+                    port = port_a if i % 2 == 0 else port_b
+                    await client.post(f"http://127.0.0.1:{port}/", json=_event(i))
+                events, _ = await _read_sse(response.aiter_lines(), 6)
+            assert [e[0] for e in events] == list(range(1, 7)), events
+            # 另一个进程（没有本进程的内存去重记录）存过的事件被 SQLite 认领表拦截
+            webhook.DEDUP = EventDedup()
+            retried = _event(0)
+            retried["event"]["message"]["message_id"] = "om_retried"
+            assert await webhook._store_events([retried]) == []
+    finally:
+        await a.stop()
+        await b.stop()
+    print("  ✓ 订阅者收到两个进程写入的 6 条消息，顺序正确")
+
+
+async def test_worker_processes():
+    print("测试：--workers 多进程共享端口、崩溃重启...")
+    tmp = Path(tempfile.mkdtemp())
+    probe = socket.socket()
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    env = dict(os.environ, FEISHU_INBOX_DB_PATH=str(tmp / "inbox.db"),
+               FEISHU_INBOX_COLD_DB_PATH=str(tmp / "archive.db"),
+               FEISHU_VERIFICATION_TOKEN="", FEISHU_WEBHOOK_READ_TOKEN="", PYTHONUNBUFFERED="1")
+    proc = subprocess.Popen(
+        [sys.executable, str(project_root / "scripts" / "feishu_event_webhook.py"),
+         "--host", "127.0.0.1", "--port", str(port), "--workers", "3"],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    base_url = f"http://127.0.0.1:{port}"
+
+    async def worker_pids(tries=30):
+        pids = set()
+        for _ in range(tries):
+            # 每次新建连接，由内核分配到不同的 worker
+            async with httpx.AsyncClient(timeout=5) as client:
+                pids.add((await client.get(f"{base_url}/health")).json()["pid"])
+        return pids
+
+    try:
+        for _ in range(50):
+            try:
+                async with httpx.AsyncClient(timeout=1) as client:
+                    await client.get(f"{base_url}/health")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        pids = await worker_pids()
+        assert len(pids) >= 2, pids
+
+        events = [_event(i) for i in range(200)] + [_event(i) for i in range(30)]
+        limits = httpx.Limits(max_connections=20)
+        async with httpx.AsyncClient(timeout=10, limits=limits) as client:
+            responses = await asyncio.gather(*(client.post(f"{base_url}/", json=e) for e in events))
+        assert all(r.status_code == 200 for r in responses), {r.status_code for r in responses}
+
+        inbox.INBOX_DB_PATH = str(tmp / "inbox.db")
+        try:
+            for _ in range(50):
+                if await inbox.count_messages() == 200:
+                    break
+                await asyncio.sleep(0.1)
+            assert await inbox.count_messages() == 200
+            assert await inbox.latest_seq() == 200
+        finally:
+            inbox.INBOX_DB_PATH = str(_tmp_dir / "feishu_inbox.db")
+
+        # 杀掉一个 worker，supervisor 重新拉起
+        killed = next(iter(pids))
+        os.kill(killed, signal.SIGKILL)
+        for _ in range(50):
+            await asyncio.sleep(0.2)
+            current = await worker_pids(10)
+            if killed not in current and len(current | pids) > len(pids):
+                break
+        assert killed not in current and len(current | pids) > len(pids), (pids, current)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    output = proc.stdout.read().decode("utf-8", "replace")
+    assert proc.returncode == 0, output
+    assert "restarting" in output and "Supervisor stopped" in output, output
+    print(f"  ✓ {len(pids)} 个 worker 处理请求，230 个事件存入 200 条，崩溃的 worker 已重启")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书事件 Webhook 测试")
+    print("=" * 60)
+    tests = [
+        test_burst_stored_in_batches,
+        test_keep_alive,
+        test_backpressure_when_queue_full,
+        test_archive_and_errors,
+        test_compaction_and_history,
+        test_shared_store_follow,
+        test_worker_processes,
+        test_long_poll_since_cursor,
+        test_sse_stream_resume,
+        test_slow_subscriber_catches_up,
+        test_fetch_inbox_tool,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""测试表结构缓存指纹和预编译字段映射（不访问飞书 API）"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.field_mapping import FieldMapper, TableSchema
+
+SCHEMA_FIELDS = [
+    {"field_id": "fld_title", "field_name": "标题", "type": 1},
+    {"field_id": "fld_content", "field_name": "内容", "type": 1},
+    {"field_id": "fld_mid", "field_name": "记忆ID", "type": 1},
+    {"field_id": "fld_cat", "field_name": "分类", "type": 3},
+    {"field_id": "fld_imp", "field_name": "重要性", "type": 2},
+    {"field_id": "fld_created", "field_name": "创建时间", "type": 5},
+    {"field_id": "fld_tags", "field_name": "标签", "type": 4},
+    {"field_id": "fld_arch", "field_name": "是否归档", "type": 7},
+]
+
+MEMORY = {
+    "id": "m-1",
+    "title": "标题",
+    "content": "内容",
+    "category": "insight",
+    "importance": 3,
+    "created_at": "2026-01-17T10:00:00",
+    "tags": ["a", "b"],
+    "archived": False,
+    "source": {"type": "claude_ai", "timestamp": "2026-01-17T10:00:00"},
+}
+
+
+def test_build_uses_field_ids():
+    print("测试：按字段 ID 输出记录...")
+    mapper = FieldMapper(TableSchema("tbl", SCHEMA_FIELDS))
+    fields, errors = mapper.build(MEMORY)
+    assert not errors, errors
+    assert fields["fld_mid"] == "m-1"
+    assert fields["fld_cat"] == "insight"
+    assert fields["fld_tags"] == ["a", "b"]
+    # 表中没有的字段（来源类型、更新时间）不发送
+    assert set(fields) <= {f["field_id"] for f in SCHEMA_FIELDS}
+    assert "来源类型" in mapper.missing_fields
+    print("  ✓ 字段 ID 映射正确，缺失字段被跳过")
+
+
+def test_local_validation():
+    print("测试：本地校验...")
+    mapper = FieldMapper(TableSchema("tbl", SCHEMA_FIELDS))
+    _, errors = mapper.build({**MEMORY, "importance": 9, "tags": [""]})
+    assert len(errors) == 2, errors
+
+    schema = TableSchema("tbl", [f for f in SCHEMA_FIELDS if f["field_name"] != "记忆ID"])
+    _, errors = FieldMapper(schema).build(MEMORY)
+    assert any("记忆ID" in e for e in errors), errors
+    print("  ✓ 非法值和缺失必需字段在本地被拦截")
+
+
+def test_schema_change_detection():
+    print("测试：字段结构变化检测...")
+    old = TableSchema("tbl", SCHEMA_FIELDS)
+    same = TableSchema("tbl", list(reversed(SCHEMA_FIELDS)))
+    assert old.fingerprint == same.fingerprint
+
+    renamed = [dict(f) for f in SCHEMA_FIELDS]
+    renamed[0]["field_name"] = "名称"
+    new = TableSchema("tbl", renamed)
+    assert old.fingerprint != new.fingerprint
+    changes = old.diff(new)
+    assert changes["added"] == ["名称"] and changes["removed"] == ["标题"], changes
+    print("  ✓ 字段顺序无关，重命名可被发现")
+
+
+if __name__ == "__main__":
+    tests = [test_build_uses_field_ids, test_local_validation, test_schema_change_detection]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print(f"\n通过: {len(tests) - failed}/{len(tests)}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""测试飞书消息自动写入记忆（按群聊和时间窗口批量写入、分类标签、消息与记忆关联）
+
+记忆库、收件箱写到临时目录，不影响真实数据。
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+import scripts.feishu_event_webhook as webhook
+import storage.db as db
+import storage.inbox as inbox
+from scripts.feishu_event_webhook import FeishuWebhook
+from storage.event_dedup import EventDedup
+from sync.im_ingest import MemoryIngestor, build_conversation_memory
+
+# 使用临时记忆库、收件箱和去重文件
+_tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = os.path.join(_tmp_dir, "memory.db")
+db.ENTRIES_DIR = os.path.join(_tmp_dir, "entries")
+inbox.INBOX_DB_PATH = str(_tmp_dir / "feishu_inbox.db")
+inbox.LEGACY_JSONL_PATH = _tmp_dir / "feishu_temp_inbox.jsonl"
+inbox.COLD_DB_PATH = str(_tmp_dir / "feishu_inbox_archive.db")
+webhook.DEDUP = EventDedup(_tmp_dir / "feishu_event_ids.log")
+webhook.VERIFICATION_TOKEN = ""
+webhook.READ_API_TOKEN = ""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _entry(i, chat_id="oc_a", text=None):
+    return {
+        "message_id": f"om_{i}",
+        "chat_id": chat_id,
+        "sender_open_id": "ou_user",
+        "created_at": f"2026-01-01T10:{i // 60:02d}:{i % 60:02d}",
+        "text": text or f"消息 {i}",
+        "seq": i + 1,
+    }
+
+
+def _event(i, chat_id="oc_a"):
+    return {
+        "schema": "2.0",
+        "header": {"event_id": f"evt_{i}", "event_type": "im.message.receive_v1"},
+        "event": {
+            "sender": {"sender_id": {"open_id": "ou_user", "union_id": "on_user"}},
+            "message": {
+                "message_id": f"om_{i}",
+                "chat_id": chat_id,
+                "chat_type": "group",
+                "message_type": "text",
+                "content": json.dumps({"text": f"消息 {i}"}, ensure_ascii=False),
+                "create_time": str(1700000000000 + i * 1000),
+            },
+        },
+    }
+
+
+async def test_build_memory():
+    print("测试：一批消息合成一条 conversation 记忆...")
+    memory = build_conversation_memory("oc_a", [
+        _entry(2, text="参考：https://example.com 这篇文章的方法"),
+        _entry(1, text="我发现这个概念很有用"),
+    ])
+    assert memory["category"] == "conversation" and memory["source_type"] == "feishu_im"
+    assert memory["memory_id"].startswith("feishu_om_1_"), memory["memory_id"]
+    assert memory["content"].index("我发现") < memory["content"].index("参考："), memory["content"]
+    assert "2 条" in memory["title"] and memory["tags"][0] == "飞书消息"
+    assert memory["tags"][1] in ("insight", "knowledge")
+    print(f"  ✓ {memory['title']}，标签 {memory['tags']}")
+
+
+async def test_window_and_chat_batching():
+    print("测试：按群聊和时间窗口批量写入...")
+    clock = FakeClock()
+    writes, links = [], {}
+
+    async def write(memories):
+        writes.append(memories)
+        return memories
+
+    async def link(mapping):
+        links.update(mapping)
+        return len(mapping)
+
+    ingestor = MemoryIngestor(write=write, link=link, window=60, max_messages=5, clock=clock)
+    ingestor.add([_entry(i, "oc_a") for i in range(3)])
+    assert ingestor.next_due() == 1060
+    assert await ingestor.flush_due() == [] and not writes
+
+    # oc_b 稍后到达，只有 oc_a 到期
+    clock.now = 1030
+    ingestor.add([_entry(10, "oc_b"), _entry(11, "oc_b")])
+    clock.now = 1060
+    await ingestor.flush_due()
+    assert len(writes) == 1 and len(writes[0]) == 1, writes
+    assert ingestor.pending_count() == 2 and ingestor.next_due() == 1090
+
+    # 缓冲满 5 条立即到期，12 条拆成 3 条记忆
+    ingestor.add([_entry(i, "oc_c") for i in range(20, 32)])
+    assert ingestor.next_due() == clock.now
+    memories = await ingestor.flush_due()
+    assert len(memories) == 3 and len(writes) == 2
+
+    clock.now = 1090
+    await ingestor.flush_due()
+    assert len(writes) == 3 and ingestor.pending_count() == 0
+    assert len(links) == 3 + 12 + 2 and len(set(links.values())) == 5
+    assert ingestor.ingested == 17
+    print("  ✓ 3 次批量写入，17 条消息关联到 5 条记忆")
+
+
+async def test_retry_after_write_failure():
+    print("测试：写入失败后保留消息重试...")
+    clock = FakeClock()
+    calls = []
+
+    async def write(memories):
+        calls.append(len(memories))
+        if len(calls) == 1:
+            # 写入期间新到的消息不能丢
+            ingestor.add([_entry(5)])
+            raise RuntimeError("database is locked")
+        return memories
+
+    async def link(mapping):
+        return len(mapping)
+
+    ingestor = MemoryIngestor(write=write, link=link, window=10, max_messages=50, clock=clock)
+    ingestor.add([_entry(i) for i in range(3)])
+    clock.now += 10
+    assert await ingestor.flush_due() == []
+    assert ingestor.pending_count() == 4
+    assert await ingestor.flush_due() == []  # 一个窗口后才重试
+    clock.now += 10
+    memories = await ingestor.flush_due()
+    assert len(memories) == 1 and "4 条" in memories[0]["title"], memories
+    print("  ✓ 失败后 4 条消息在下一个窗口写入")
+
+
+async def test_webhook_ingestion():
+    print("测试：webhook 写入收件箱后自动入库并关联 memory_id...")
+    await db.init_db()
+    ingestor = MemoryIngestor(window=0.2, max_messages=50)
+    server = FeishuWebhook(queue_size=100, store_workers=1, ingestor=ingestor)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+            events = [_event(i, "oc_a" if i % 2 else "oc_b") for i in range(6)]
+            responses = await asyncio.gather(*(client.post("/", json=e) for e in events))
+            assert all(r.status_code == 200 for r in responses)
+            await server.queue.join()
+            await asyncio.sleep(0.5)
+            assert server.stats["ingested"] == 6, server.stats
+
+            # 停止时立即写入仍在窗口内的消息
+            await client.post("/", json=_event(100, "oc_c"))
+            await server.queue.join()
+    finally:
+        await server.stop()
+    assert server.stats["ingested"] == 7, server.stats
+
+    message = await inbox.get_message("om_1")
+    assert message["event_id"] == "evt_1" and message["memory_id"], message
+    linked = await inbox.list_by_memory(message["memory_id"])
+    assert [m["message_id"] for m in linked] == ["om_1", "om_3", "om_5"], linked
+    memory = await db.get_memory(message["memory_id"])
+    assert memory["category"] == "conversation" and "消息 3" in memory["content"]
+    assert (await inbox.get_message("om_100"))["memory_id"]
+    print("  ✓ 7 条消息写入 3 条记忆，收件箱可按 memory_id 追溯")
+
+
+async def test_restart_recovers_buffered():
+    print("测试：进程崩溃后重启，恢复缓冲区中尚未写入的消息...")
+    server = FeishuWebhook(queue_size=10, store_workers=1, ingestor=MemoryIngestor(window=60), compact_interval=0)
+    port = await server.start("127.0.0.1", 0)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        for i in (200, 201):
+            await client.post("/", json=_event(i, "oc_d"))
+    await server.queue.join()
+    assert server.ingestor.pending_count() == 2
+    # 模拟崩溃：缓冲区中的消息没有写入
+    server._ingest_task.cancel()
+    server._ingest_task = None
+    await server.stop()
+    assert (await inbox.get_message("om_200"))["memory_id"] is None
+
+    restarted = FeishuWebhook(
+        queue_size=10, store_workers=1, ingestor=MemoryIngestor(window=0.1), compact_interval=0, shared_store=True
+    )
+    await restarted.start("127.0.0.1", 0)
+    try:
+        await asyncio.sleep(0.4)
+    finally:
+        await restarted.stop()
+    assert restarted.stats["ingested"] == 2, restarted.stats
+    memory_id = (await inbox.get_message("om_200"))["memory_id"]
+    assert memory_id and memory_id == (await inbox.get_message("om_201"))["memory_id"]
+    print("  ✓ 重启后 2 条消息写入记忆，已写入的消息不重复")
+
+
+async def test_disabled_by_default():
+    print("测试：默认不写入记忆...")
+    assert webhook.SAVE_TO_MEMORY is (os.getenv("FEISHU_IM_SAVE_TO_MEMORY", "false").lower() == "true")
+    server = FeishuWebhook(queue_size=10, store_workers=1)
+    assert server.ingestor is None and "ingested" not in server.stats
+    print("  ✓ 未配置 FEISHU_IM_SAVE_TO_MEMORY 时不启用")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书消息自动入库测试")
+    print("=" * 60)
+    tests = [
+        test_build_memory,
+        test_window_and_chat_batching,
+        test_retry_after_write_failure,
+        test_webhook_ingestion,
+        test_restart_recovers_buffered,
+        test_disabled_by_default,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
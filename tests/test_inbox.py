@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""测试飞书临时收件箱（SQLite WAL、索引查询、计数、旧 JSONL 迁移、多进程并发写入、保留策略和冷存储）"""
+
+import asyncio
+import json
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import storage.inbox as inbox
+
+_tmp_dir = Path(tempfile.mkdtemp())
+
+
+def _use_db(name):
+    inbox.INBOX_DB_PATH = str(_tmp_dir / f"{name}.db")
+    inbox.LEGACY_JSONL_PATH = _tmp_dir / f"{name}.jsonl"
+    inbox.COLD_DB_PATH = str(_tmp_dir / f"{name}_archive.db")
+
+
+def _entry(i, chat_id="oc_a", archived=False):
+    return {
+        "message_id": f"om_{i}",
+        "chat_id": chat_id,
+        "chat_type": "group",
+        "sender_open_id": "ou_user",
+        "created_at": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}",
+        "text": f"消息 {i}",
+        "archived": archived,
+    }
+
+
+async def test_migrate_legacy_jsonl():
+    print("测试：首次使用时导入旧 JSONL 收件箱...")
+    _use_db("migrate")
+    lines = [json.dumps(_entry(i, archived=i < 3), ensure_ascii=False) for i in range(10)]
+    lines += [json.dumps(_entry(5), ensure_ascii=False), "坏行"]
+    inbox.LEGACY_JSONL_PATH.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    assert await inbox.init_inbox() == 10
+    assert not inbox.LEGACY_JSONL_PATH.exists()
+    assert inbox.LEGACY_JSONL_PATH.with_name("migrate.jsonl.migrated").exists()
+    assert await inbox.count_messages() == 7 and await inbox.count_messages(archived=True) == 3
+    items = await inbox.list_messages(limit=3)
+    assert [item["message_id"] for item in items] == ["om_9", "om_8", "om_7"], items
+    assert items[0]["archived"] is False
+    with sqlite3.connect(inbox.INBOX_DB_PATH) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    print("  ✓ 导入 10 条（跳过重复和坏行），WAL 模式")
+
+
+async def test_add_archive_and_counts():
+    print("测试：写入去重、归档和计数...")
+    _use_db("counts")
+    inserted = await inbox.add_messages([_entry(i, chat_id="oc_a" if i % 2 else "oc_b") for i in range(50)])
+    assert len(inserted) == 50
+    inserted = await inbox.add_messages([_entry(49), _entry(50), {"text": "缺少 message_id"}])
+    assert [e["message_id"] for e in inserted] == ["om_50"], inserted
+
+    assert await inbox.archive_message("om_10")
+    assert await inbox.archive_message("om_10")  # 重复归档不影响计数
+    assert not await inbox.archive_message("om_missing")
+    assert await inbox.count_messages() == 50 and await inbox.count_messages(archived=True) == 1
+    assert (await inbox.get_message("om_10"))["archived_at"]
+
+    items = await inbox.list_messages(limit=100, chat_id="oc_a")
+    assert len(items) == 26 and all(item["chat_id"] == "oc_a" for item in items)
+    assert len(await inbox.list_messages(limit=100, include_archived=True)) == 51
+    assert len(await inbox.list_messages(limit=0)) == 1
+    print("  ✓ 51 条消息，计数与归档状态一致")
+
+
+async def test_seq_cursor():
+    print("测试：到达序号游标和旧库升级...")
+    _use_db("seq")
+    await inbox.add_messages([_entry(i) for i in range(5)])
+    inserted = await inbox.add_messages([_entry(4), _entry(5, chat_id="oc_b"), _entry(6)])
+    assert [e["seq"] for e in inserted] == [6, 7], inserted
+    assert await inbox.latest_seq() == 7
+    items = await inbox.list_since(3, limit=2)
+    assert [item["seq"] for item in items] == [4, 5], items
+    assert [item["message_id"] for item in await inbox.list_since(0, chat_id="oc_b")] == ["om_5"]
+
+    # 没有 seq 列的旧收件箱按 rowid 补齐
+    _use_db("upgrade")
+    with sqlite3.connect(inbox.INBOX_DB_PATH) as conn:
+        conn.execute("CREATE TABLE feishu_inbox (message_id TEXT PRIMARY KEY, chat_id TEXT, chat_type TEXT, "
+                     "sender_open_id TEXT, sender_union_id TEXT, created_at TEXT NOT NULL, text TEXT, "
+                     "archived INTEGER NOT NULL DEFAULT 0, received_at TEXT, archived_at TEXT)")
+        conn.execute("INSERT INTO feishu_inbox (message_id, created_at) VALUES ('old_1', '2025'), ('old_2', '2025')")
+    inserted = await inbox.add_messages([_entry(1)])
+    assert inserted[0]["seq"] == 3, inserted
+    assert [item["message_id"] for item in await inbox.list_since(1)] == ["old_2", "om_1"]
+    print("  ✓ 序号连续递增，重复消息不占用序号")
+
+
+async def test_list_uningested():
+    print("测试：尚未写入记忆的消息...")
+    _use_db("uningested")
+    await inbox.add_messages([_entry(i) for i in range(3)])
+    # 首次调用记录起点，启用前的积压消息不算
+    assert await inbox.list_uningested() == []
+    await inbox.add_messages([_entry(i) for i in range(3, 7)])
+    await inbox.archive_message("om_4")
+    await inbox.link_memories({"om_5": "mem_1"})
+    assert [e["message_id"] for e in await inbox.list_uningested()] == ["om_3", "om_6"]
+    print("  ✓ 只返回启用后到达、未归档且没有 memory_id 的消息")
+
+
+async def test_queries_use_indexes():
+    print("测试：列表和按群查询走索引...")
+    _use_db("plans")
+    await inbox.init_inbox()
+    with sqlite3.connect(inbox.INBOX_DB_PATH) as conn:
+        plans = {
+            "unarchived": "SELECT * FROM feishu_inbox WHERE archived = 0 ORDER BY created_at DESC LIMIT 20",
+            "all": "SELECT * FROM feishu_inbox ORDER BY created_at DESC LIMIT 20",
+            "chat": "SELECT * FROM feishu_inbox WHERE archived = 0 AND chat_id = 'x' ORDER BY created_at DESC",
+            "message": "SELECT * FROM feishu_inbox WHERE message_id = 'x'",
+            "since": "SELECT * FROM feishu_inbox WHERE seq > 10 AND archived = 0 ORDER BY seq LIMIT 20",
+            "chat_since": "SELECT * FROM feishu_inbox WHERE seq > 10 AND chat_id = 'x' ORDER BY seq LIMIT 20",
+        }
+        for name, sql in plans.items():
+            detail = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+            assert "USING" in detail and "TEMP B-TREE" not in detail, (name, detail)
+    print("  ✓ 无全表扫描和临时排序")
+
+
+async def test_compaction_to_cold_store():
+    print("测试：保留策略把旧消息移入按群聚簇的冷存储...")
+    _use_db("compact")
+    await inbox.add_messages([_entry(i, chat_id="oc_a" if i % 2 else "oc_b") for i in range(40)])
+    await inbox.archive_messages([f"om_{i}" for i in range(30)])
+    now = datetime.now()
+    with sqlite3.connect(inbox.INBOX_DB_PATH) as conn:
+        # om_0..om_19 归档于 10 天前，om_20..om_29 刚归档
+        conn.execute("UPDATE feishu_inbox SET archived_at = ? WHERE seq <= 20",
+                     ((now - timedelta(days=10)).isoformat(),))
+        # 最新一条也被归档：移走后 seq 不能复用
+        conn.execute("UPDATE feishu_inbox SET archived = 1, archived_at = ? WHERE message_id = 'om_39'",
+                     ((now - timedelta(days=10)).isoformat(),))
+
+    result = await inbox.compact(archived_days=7, batch_size=8, now=now)
+    assert (result["moved"], result["purged"]) == (21, 0), result
+    assert await inbox.count_messages() == 9 and await inbox.count_messages(archived=True) == 10
+    assert len(await inbox.list_messages(limit=100, include_archived=True)) == 19
+    assert (await inbox.compact(archived_days=7, now=now))["moved"] == 0
+
+    inserted = await inbox.add_messages([_entry(100)])
+    assert inserted[0]["seq"] == 41 and await inbox.latest_seq() == 41, inserted
+
+    # 冷存储仍可按 ID、按群查询
+    cold = await inbox.get_message("om_3")
+    assert cold["compacted"] and cold["archived"] and cold["chat_id"] == "oc_a", cold
+    history = await inbox.list_history("oc_a", limit=5)
+    assert [m["message_id"] for m in history] == ["om_39", "om_19", "om_17", "om_15", "om_13"], history
+    older = await inbox.list_history("oc_a", before=history[-1]["seq"], limit=100)
+    assert len(older) == 6 and all(m["chat_id"] == "oc_a" for m in older)
+    with sqlite3.connect(inbox.COLD_DB_PATH) as conn:
+        detail = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM feishu_inbox_cold WHERE chat_id = 'oc_a' AND seq < 10 "
+            "ORDER BY seq DESC LIMIT 20"))
+        assert "PRIMARY KEY" in detail and "TEMP B-TREE" not in detail, detail
+
+    # 未归档消息默认不过期；配置后按到达时间移入冷存储
+    assert (await inbox.compact(archived_days=0, unarchived_days=365 * 30, now=now))["moved"] == 0
+    result = await inbox.compact(archived_days=0, unarchived_days=1, cold_days=365 * 30, now=now)
+    assert result["moved"] == 10 and await inbox.count_messages() == 0, result
+    result = await inbox.compact(archived_days=0, cold_days=1, now=now)
+    assert result["purged"] == 31 and await inbox.get_message("om_3") is None, result
+    print("  ✓ 移入冷存储 21 条，seq 不复用，按群历史走主键范围扫描")
+
+
+WRITER = """
+import sqlite3, sys
+conn = sqlite3.connect(sys.argv[1], timeout=10)
+for i in range(200):
+    conn.execute("INSERT OR IGNORE INTO feishu_inbox (message_id, created_at, archived) VALUES (?, ?, 0)",
+                 (f"om_proc_{i}", f"2026-02-01T00:00:{i % 60:02d}"))
+    conn.commit()
+"""
+
+
+async def test_concurrent_processes():
+    print("测试：另一个进程同时写入...")
+    _use_db("concurrent")
+    await inbox.init_inbox()
+    proc = subprocess.Popen([sys.executable, "-c", WRITER, inbox.INBOX_DB_PATH])
+    for start in range(0, 200, 20):
+        await inbox.add_messages([_entry(i) for i in range(start, start + 20)])
+        await inbox.list_messages(limit=10)
+    assert proc.wait(timeout=30) == 0
+    assert await inbox.count_messages() == 400
+    print("  ✓ 两个进程各写入 200 条，计数 400")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书临时收件箱测试")
+    print("=" * 60)
+    tests = [
+        test_migrate_legacy_jsonl,
+        test_add_archive_and_counts,
+        test_seq_cursor,
+        test_list_uningested,
+        test_queries_use_indexes,
+        test_compaction_to_cold_store,
+        test_concurrent_processes,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""测试 Markdown 转飞书文档块（与 markdown_golden.json 中的期望输出逐块比较）
+
+期望输出由原逐行转换实现生成，转换器改写后行为必须保持一致。
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+from itertools import islice
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.markdown_blocks import iter_markdown_blocks, markdown_to_blocks
+from sync.block_writer import BlockWriter
+from tests.benchmark_markdown_blocks import build_corpus
+
+GOLDEN = json.loads((Path(__file__).parent / "markdown_golden.json").read_text(encoding="utf-8"))
+
+
+def test_golden_cases():
+    print("测试：各类语法与期望输出一致...")
+    mismatched = [
+        case["id"] for case in GOLDEN["cases"]
+        if markdown_to_blocks(case["markdown"]) != case["expected"]
+    ]
+    assert not mismatched, f"输出不一致: {mismatched}"
+    print(f"  ✓ {len(GOLDEN['cases'])} 个用例一致")
+
+
+def test_benchmark_corpus():
+    print("测试：基准语料整体输出一致...")
+    blocks = markdown_to_blocks(build_corpus(GOLDEN["corpus"]["lines"]))
+    digest = hashlib.sha1(json.dumps(blocks, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    assert digest == GOLDEN["corpus"]["sha1"], f"语料输出哈希变化: {digest}"
+    print(f"  ✓ {len(blocks)} 个块一致")
+
+
+def test_lazy_iteration():
+    print("测试：按需产出块...")
+    lines = ["段落"] * 100 + ["``` 未闭合"]
+    # 只取前 10 个块时不需要读到文件末尾
+    first = list(islice(iter_markdown_blocks("\n".join(lines)), 10))
+    assert len(first) == 10
+    print("  ✓ 取前 10 个块即可开始上传")
+
+
+async def test_streaming_upload():
+    print("测试：迭代器分片上传...")
+
+    class FakeDocClient:
+        def __init__(self):
+            self.children = []
+            self.calls = 0
+
+        async def _request(self, method, endpoint, params=None, data=None, use_user_token=False):
+            self.calls += 1
+            self.children.extend(data["children"])
+            return {"code": 0, "data": {"document_revision_id": self.calls}}
+
+    corpus = build_corpus(1000)
+    client = FakeDocClient()
+    written = await BlockWriter(client, "doc1").write(iter_markdown_blocks(corpus))
+    expected = markdown_to_blocks(corpus)
+    assert written == len(expected) and client.children == expected
+    assert client.calls == -(-len(expected) // 50)
+    print(f"  ✓ {written} 个块分 {client.calls} 次上传")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 Markdown 转换测试")
+    print("=" * 60)
+    tests = [test_golden_cases, test_benchmark_corpus, test_lazy_iteration, test_streaming_upload]
+    failed = 0
+    for test in tests:
+        try:
+            result = test()
+            if asyncio.iscoroutine(result):
+                await result
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""测试飞书提醒合并发送（合并窗口、最小间隔、按群/发送者分组、失败重试、复用客户端）
+
+使用可控时钟和模拟客户端，不访问飞书 API。
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.notifier import DIGEST_MAX_CHATS, CoalescingNotifier, build_digest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    instances = 0
+
+    def __init__(self):
+        FakeClient.instances += 1
+        self.sent = []
+        self.list_calls = 0
+        self.fail = 0
+
+    async def send_message(self, receive_id_type, receive_id, msg_type, content, use_user_token=False):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("99991400 频率限制")
+        self.sent.append((receive_id, msg_type, content))
+        return {"message_id": f"om_{len(self.sent)}"}
+
+    async def list_chats(self, page_size=50, page_token=None, use_user_token=False):
+        self.list_calls += 1
+        return {"items": [{"chat_id": "oc_a", "name": "产品群"}], "has_more": False}
+
+
+def _message(i, chat_id="oc_a", sender="ou_1"):
+    return {"message_id": f"om_{i}", "seq": i, "chat_id": chat_id, "sender_open_id": sender,
+            "created_at": f"2026-01-01T00:00:{i % 60:02d}", "text": f"消息 {i}"}
+
+
+def _text(content):
+    return "\n".join(item["text"] for line in content["zh_cn"]["content"] for item in line)
+
+
+async def test_burst_coalesced_into_one_digest():
+    print("测试：合并窗口内的突发消息只发一条摘要...")
+    clock = Clock()
+    client = FakeClient()
+    notifier = CoalescingNotifier(lambda: client, window=60, min_interval=300, clock=clock)
+
+    for i in range(10):
+        notifier.add("oc_notify", [_message(i, chat_id="oc_a" if i < 7 else "oc_b", sender=f"ou_{i % 2}")])
+        clock.now += 5
+        assert await notifier.flush_due(unread=10) == 0
+    assert notifier.pending_floor() == 0 and notifier.next_due() == 1060
+
+    clock.now = 1060
+    assert await notifier.flush_due(unread=10) == 1
+    target, msg_type, content = client.sent[0]
+    assert target == "oc_notify" and msg_type == "post"
+    assert content["zh_cn"]["title"] == "📬 10 条新的飞书消息（共 10 条待处理）", content["zh_cn"]["title"]
+    text = _text(content)
+    assert "💬 产品群（7 条）" in text and "💬 oc_b（3 条）" in text, text
+    assert "ou_0 4 条：消息 6" in text and "ou_1 3 条：消息 5" in text, text
+    assert notifier.pending_count() == 0 and notifier.pending_floor() is None
+    print("  ✓ 10 条消息合成 1 条摘要，按群和发送者分组")
+
+
+async def test_min_interval_per_target():
+    print("测试：同一目标的最小发送间隔...")
+    clock = Clock()
+    client = FakeClient()
+    notifier = CoalescingNotifier(lambda: client, window=0, min_interval=300, clock=clock)
+
+    notifier.add("oc_x", [_message(1)])
+    notifier.add("oc_y", [_message(1)])
+    assert await notifier.flush_due() == 2
+
+    clock.now += 10
+    notifier.add("oc_x", [_message(2)])
+    notifier.add("oc_x", [_message(3), _message(2)])
+    assert await notifier.flush_due() == 0 and notifier.due_at("oc_x") == 1300
+    assert notifier.pending_count("oc_x") == 2
+
+    clock.now = 1300
+    assert await notifier.flush_due() == 1
+    assert [s[0] for s in client.sent] == ["oc_x", "oc_y", "oc_x"]
+    assert client.sent[-1][2]["zh_cn"]["title"].startswith("📬 2 条")
+    # 客户端只创建一次，群名只查询一次
+    assert client.list_calls == 1
+    print("  ✓ 间隔内的消息合并到下一条摘要")
+
+
+async def test_failed_send_retried():
+    print("测试：发送失败后保留消息并重试...")
+    clock = Clock()
+    client = FakeClient()
+    client.fail = 1
+    notifier = CoalescingNotifier(lambda: client, window=30, min_interval=0, clock=clock)
+    notifier.add("oc_x", [_message(5), _message(6)])
+    clock.now += 30
+    assert await notifier.flush_due() == 0
+    assert notifier.pending_floor() == 5 and notifier.due_at("oc_x") == clock.now + 30
+    clock.now += 30
+    assert await notifier.flush_due() == 1 and len(client.sent) == 1
+    print("  ✓ 一个窗口后重试成功")
+
+
+async def test_single_client_instance():
+    print("测试：复用同一个飞书客户端...")
+    FakeClient.instances = 0
+    notifier = CoalescingNotifier(FakeClient, window=0, min_interval=0, clock=Clock())
+    for i in range(5):
+        notifier.add("oc_x", [_message(i)])
+        await notifier.flush_due()
+    assert FakeClient.instances == 1 and notifier.sent == 5
+    print("  ✓ 5 次发送共用 1 个客户端")
+
+
+def test_digest_limits():
+    print("测试：摘要长度上限...")
+    messages = [_message(i, chat_id=f"oc_{i % 15}", sender=f"ou_{i % 5}") for i in range(150)]
+    messages[0]["text"] = "很长" * 100
+    content = build_digest(messages)
+    text = _text(content)
+    assert text.count("💬") == DIGEST_MAX_CHATS
+    assert "…另有 5 个群共 50 条" in text, text
+    assert "…另有 2 位发送者" not in text  # 每个群 10 条只有 2 位发送者
+    assert all(len(item["text"]) < 80 for line in content["zh_cn"]["content"] for item in line)
+    print("  ✓ 最多列出 10 个群，内容截断")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 飞书提醒合并发送测试")
+    print("=" * 60)
+    tests = [
+        test_burst_coalesced_into_one_digest,
+        test_min_interval_per_target,
+        test_failed_send_retried,
+        test_single_client_instance,
+        test_digest_limits,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            result = test()
+            if asyncio.iscoroutine(result):
+                await result
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
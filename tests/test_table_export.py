@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""测试多维表格流式导出（预取下一页、JSONL / CSV、不截断、断点续传）
+
+使用模拟的 _request，不访问飞书 API。
+"""
+
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sync.feishu_client import FeishuClient
+from sync.table_export import export_table, progress_path
+
+_tmp_dir = tempfile.mkdtemp()
+
+LONG_TEXT = "很长的内容" * 300
+
+
+class FakeRecordsApi:
+    """按 page_token 分页返回记录，记录请求顺序"""
+
+    def __init__(self, total=23, fail_on_page=None):
+        self.records = [
+            {
+                "record_id": f"rec{i}",
+                "fields": {
+                    "标题": [{"type": "text", "text": f"记录{i}"}],
+                    "正文": LONG_TEXT if i == 0 else f"正文 {i}, 含逗号",
+                    "标签": ["读书", "复盘"],
+                    "分数": i,
+                },
+            }
+            for i in range(total)
+        ]
+        self.fail_on_page = fail_on_page
+        self.requests = []
+
+    async def __call__(self, method, endpoint, params=None, data=None, use_user_token=False):
+        params = params or {}
+        start = int(params.get("page_token") or 0)
+        self.requests.append(start)
+        await asyncio.sleep(0.01)
+        if self.fail_on_page is not None and start == self.fail_on_page:
+            raise RuntimeError("网络中断")
+        end = start + params["page_size"]
+        return {"code": 0, "data": {
+            "items": self.records[start:end],
+            "has_more": end < len(self.records),
+            "page_token": str(end),
+        }}
+
+
+def _client(api):
+    client = FeishuClient.__new__(FeishuClient)
+    client.table_id = "tbl"
+    client.app_token = "app"
+    client._request = api
+
+    async def get_table_fields(table_id=None, use_cache=True):
+        return [{"field_name": name} for name in ["标题", "正文", "标签", "分数"]]
+
+    client.get_table_fields = get_table_fields
+    return client
+
+
+async def test_prefetch_next_page():
+    print("测试：处理当前页时预取下一页...")
+    api = FakeRecordsApi(total=23)
+    client = _client(api)
+    seen = []
+    async for page in client.iter_record_pages(page_size=5):
+        await asyncio.sleep(0.02)  # 模拟处理当前页
+        # 产出当前页时，下一页请求已经发出
+        seen.append((len(page["items"]), len(api.requests)))
+    assert [n for n, _ in seen] == [5, 5, 5, 5, 3], seen
+    assert all(requested == min(i + 2, 5) for i, (_, requested) in enumerate(seen)), seen
+    print(f"  ✓ {len(seen)} 页，每页产出时已请求下一页")
+
+
+async def test_export_jsonl_and_csv():
+    print("测试：导出 JSONL / CSV 不截断...")
+    api = FakeRecordsApi(total=23)
+    client = _client(api)
+
+    path = os.path.join(_tmp_dir, "table.jsonl")
+    result = await export_table(client, path, page_size=5)
+    assert result["records"] == 23 and result["pages"] == 5 and result["completed"], result
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["record_id"] for r in rows] == [f"rec{i}" for i in range(23)]
+    assert rows[0]["fields"]["正文"] == LONG_TEXT
+
+    path = os.path.join(_tmp_dir, "table.csv")
+    result = await export_table(client, path, page_size=10)
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["record_id", "标题", "正文", "标签", "分数"], rows[0]
+    assert len(rows) == 24 and rows[1][2] == LONG_TEXT
+    assert rows[2] == ["rec1", "记录1", "正文 1, 含逗号", "读书, 复盘", "1"], rows[2]
+    print("  ✓ 23 条记录完整写入 JSONL 和 CSV")
+
+
+async def test_resume_after_failure():
+    print("测试：导出中断后续传...")
+    api = FakeRecordsApi(total=23, fail_on_page=15)
+    client = _client(api)
+    path = os.path.join(_tmp_dir, "resume.csv")
+    try:
+        await export_table(client, path, page_size=5)
+        raise AssertionError("第 4 页失败时应抛出异常")
+    except RuntimeError:
+        pass
+    with open(progress_path(path), encoding="utf-8") as f:
+        progress = json.load(f)
+    assert progress["page_token"] == "15" and progress["records"] == 15, progress
+
+    # 模拟中断时写了一半的内容
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("rec15,半行")
+
+    api.fail_on_page = None
+    api.requests.clear()
+    result = await export_table(client, path, page_size=5, resume=True)
+    assert result["records"] == 23 and result["completed"], result
+    assert api.requests[0] == 15, api.requests
+    with open(path, encoding="utf-8", newline="") as f:
+        ids = [row[0] for row in csv.reader(f)][1:]
+    assert ids == [f"rec{i}" for i in range(23)], ids
+    print("  ✓ 从第 4 页继续，没有重复或残缺的行")
+
+
+async def test_fresh_export_fails_on_first_page():
+    print("测试：重新导出时第一页失败，再续传...")
+    api = FakeRecordsApi(total=3)
+    client = _client(api)
+    path = os.path.join(_tmp_dir, "fresh.jsonl")
+    result = await export_table(client, path, page_size=5)
+    assert result["completed"] and result["records"] == 3, result
+
+    # 同一路径重新导出，第一页就失败：旧的“已完成”进度不能留下
+    api.records = api.records[:2]
+    api.fail_on_page = 0
+    try:
+        await export_table(client, path, page_size=5)
+        raise AssertionError("第 1 页失败时应抛出异常")
+    except RuntimeError:
+        pass
+    with open(progress_path(path), encoding="utf-8") as f:
+        progress = json.load(f)
+    assert progress == {"page_token": None, "offset": 0, "records": 0, "columns": None, "completed": False}, progress
+
+    api.fail_on_page = None
+    result = await export_table(client, path, page_size=5, resume=True)
+    assert result["completed"] and result["records"] == 2, result
+    with open(path, encoding="utf-8") as f:
+        ids = [json.loads(line)["record_id"] for line in f]
+    assert ids == ["rec0", "rec1"], ids
+
+    # CSV：初始进度记录表头之后的偏移，续传不会截掉表头
+    path = os.path.join(_tmp_dir, "fresh.csv")
+    api.fail_on_page = 0
+    try:
+        await export_table(client, path, page_size=5)
+        raise AssertionError("第 1 页失败时应抛出异常")
+    except RuntimeError:
+        pass
+    api.fail_on_page = None
+    await export_table(client, path, page_size=5, resume=True)
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][0] == "record_id" and [r[0] for r in rows[1:]] == ["rec0", "rec1"], rows
+    print("  ✓ 旧进度被替换，续传后文件只包含本次导出的记录")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 多维表格导出测试")
+    print("=" * 60)
+    tests = [
+        test_prefetch_next_page,
+        test_export_jsonl_and_csv,
+        test_resume_after_failure,
+        test_fresh_export_fails_on_first_page,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""测试进程级 token 管理器（single-flight 刷新、共享缓存、后台续期）
+
+不访问飞书 API：用计数的假刷新函数替换真实请求。
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+import sync.feishu_client as feishu_client
+from sync.feishu_client import FeishuTokenManager
+
+
+class CountingTokenManager(FeishuTokenManager):
+    """用本地计数代替真实 token 接口"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tenant_calls = 0
+        self.user_calls = 0
+
+    async def _fetch_tenant_token(self) -> str:
+        self.tenant_calls += 1
+        await asyncio.sleep(0.05)
+        self.tenant_token = f"t-{self.tenant_calls}"
+        self.tenant_expires_at = datetime.now() + timedelta(hours=2)
+        return self.tenant_token
+
+    async def _refresh_user_token(self) -> str:
+        self.user_calls += 1
+        await asyncio.sleep(0.05)
+        self.user_access_token = f"u-{self.user_calls}"
+        self.user_token_expires_at = datetime.now() + timedelta(hours=2)
+        return self.user_access_token
+
+
+def _new_manager() -> CountingTokenManager:
+    token_file = Path(tempfile.mkdtemp()) / ".user_token.json"
+    return CountingTokenManager("app", "secret", token_file=token_file)
+
+
+async def test_concurrent_tenant_refresh_is_single_flight():
+    """并发获取 token 只发一次刷新请求"""
+    print("测试：并发获取应用身份 token...")
+    manager = _new_manager()
+    tokens = await asyncio.gather(*[manager.get_tenant_token() for _ in range(20)])
+    assert manager.tenant_calls == 1, f"刷新次数应为 1，实际 {manager.tenant_calls}"
+    assert set(tokens) == {"t-1"}
+    print("  ✓ 20 个并发调用共享 1 次刷新")
+
+
+async def test_expired_user_token_refreshed_once():
+    """用户 token 过期时并发调用只消耗一次 refresh_token"""
+    print("测试：并发刷新用户身份 token...")
+    manager = _new_manager()
+    manager.refresh_token = "r-0"
+    manager.user_access_token = "u-0"
+    manager.user_token_expires_at = datetime.now() - timedelta(seconds=1)
+    tokens = await asyncio.gather(*[manager.get_user_token() for _ in range(10)])
+    assert manager.user_calls == 1, f"刷新次数应为 1，实际 {manager.user_calls}"
+    assert set(tokens) == {"u-1"}
+    print("  ✓ 10 个并发调用共享 1 次刷新")
+
+
+async def test_near_expiry_returns_cached_token():
+    """临近过期时立即返回当前 token，由后台完成续期"""
+    print("测试：临近过期不阻塞调用...")
+    manager = _new_manager()
+    manager.tenant_token = "t-old"
+    manager.tenant_expires_at = datetime.now() + timedelta(seconds=60)
+
+    token = await manager.get_tenant_token()
+    assert token == "t-old", "临近过期时应直接返回缓存 token"
+
+    await asyncio.sleep(0.2)
+    assert manager.tenant_calls == 1, "后台应完成一次续期"
+    assert await manager.get_tenant_token() == "t-1"
+    print("  ✓ 调用方未等待，后台已续期")
+
+
+class FakeHTTP:
+    """只返回固定响应的假 HTTP 客户端"""
+
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self.body = body
+        self.calls = 0
+
+    async def post(self, url, json=None):
+        self.calls += 1
+        return httpx.Response(self.status_code, json=self.body, request=httpx.Request("POST", url))
+
+
+async def test_invalid_refresh_token_stops_renewal():
+    """refresh_token 失效时清除用户 token，后台不再反复重试"""
+    print("测试：refresh_token 失效后停止续期...")
+    manager = FeishuTokenManager("app", "secret", token_file=Path(tempfile.mkdtemp()) / ".user_token.json")
+    manager.refresh_token = "r-revoked"
+    manager.user_access_token = "u-old"
+    manager.user_token_expires_at = datetime.now() + timedelta(seconds=60)
+    http = FakeHTTP(400, {"code": 20037, "msg": "refresh token expired"})
+    original = feishu_client.get_http_client
+    feishu_client.get_http_client = lambda: http
+    try:
+        manager.ensure_background_renewal()
+        await asyncio.wait_for(manager._renewal_task, timeout=1)
+        assert http.calls == 1, f"应只请求一次，实际 {http.calls}"
+        assert manager.refresh_token is None and manager.user_access_token is None
+        try:
+            await manager.get_user_token()
+            assert False, "应提示重新授权"
+        except AssertionError:
+            raise
+        except Exception as e:
+            assert "授权" in str(e), e
+        assert http.calls == 1
+    finally:
+        feishu_client.get_http_client = original
+    print("  ✓ 请求 1 次后停止续期，调用方得到重新授权提示")
+
+
+class FailingTokenManager(FeishuTokenManager):
+    """应用身份 token 续期一直失败，记录每次请求的时间"""
+
+    RENEWAL_RETRY_DELAY = 0.02
+    RENEWAL_MAX_RETRY_DELAY = 0.08
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.attempts = []
+
+    async def _fetch_tenant_token(self) -> str:
+        self.attempts.append(time.monotonic())
+        raise RuntimeError("网络错误")
+
+
+async def test_transient_failures_back_off():
+    """临时错误时重试间隔指数增长，且不超过上限"""
+    print("测试：后台续期失败指数退避...")
+    manager = FailingTokenManager("app", "secret", token_file=Path(tempfile.mkdtemp()) / ".user_token.json")
+    manager.tenant_token = "t-old"
+    manager.tenant_expires_at = datetime.now() + timedelta(seconds=60)
+    manager.ensure_background_renewal()
+    await asyncio.sleep(0.5)
+    manager._renewal_task.cancel()
+    gaps = [b - a for a, b in zip(manager.attempts, manager.attempts[1:])]
+    assert len(gaps) >= 4, f"应重试多次，实际 {len(manager.attempts)} 次"
+    assert gaps[2] > gaps[0] * 2, f"间隔应增长，实际 {gaps}"
+    assert max(gaps) < 0.08 * 2, f"间隔不应超过上限，实际 {gaps}"
+    print(f"  ✓ 0.5 秒内重试 {len(manager.attempts)} 次，间隔逐步增长到上限")
+
+
+async def main():
+    print("=" * 60)
+    print("🧪 token 管理器测试")
+    print("=" * 60)
+    tests = [
+        test_concurrent_tenant_refresh_is_single_flight,
+        test_expired_user_token_refreshed_once,
+        test_near_expiry_returns_cached_token,
+        test_invalid_refresh_token_stops_renewal,
+        test_transient_failures_back_off,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            await test()
+        except AssertionError as e:
+            failed += 1
+            print(f"  ✗ 失败: {e}")
+    print()
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(main())
+    sys.exit(0 if ok else 1)
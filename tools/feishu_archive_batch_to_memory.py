@@ -0,0 +1,116 @@
+"""Feishu batch archive to memory tool implementation."""
+
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List
+import httpx
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from models import FeishuArchiveBatchToMemoryInput
+from storage.db import add_memories_bulk
+
+
+async def _mark_archived(message_ids: List[str]) -> Dict[str, str]:
+    """用一次批量 PATCH 标记临时收件箱中的消息为已归档，返回每条消息的收件箱状态"""
+    base_url = os.getenv("FEISHU_WEBHOOK_BASE_URL", "https://webhook.jason2026.top")
+    token = os.getenv("FEISHU_WEBHOOK_READ_TOKEN", "")
+    if not token:
+        return {message_id: "skipped" for message_id in message_ids}
+
+    try:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.patch(
+                f"{base_url}/feishu/temp_inbox",
+                params={"token": token},
+                json={"message_ids": message_ids, "archived": True}
+            )
+            response.raise_for_status()
+            data = response.json()
+    except Exception as e:
+        # Non-critical: memories already saved, just log the error
+        print(f"⚠️  批量标记归档失败（已写入记忆）: {e}")
+        return {message_id: "failed" for message_id in message_ids}
+
+    not_found = set(data.get("not_found") or [])
+    return {
+        message_id: "not_found" if message_id in not_found else "archived"
+        for message_id in message_ids
+    }
+
+
+async def feishu_archive_batch_to_memory(params: FeishuArchiveBatchToMemoryInput) -> str:
+    """将多条分析后的飞书消息一次性归档到记忆系统。
+
+    所有记忆在一个事务中写入永久记忆库，再用一次批量请求把消息标记为已归档。
+    同一批中重复的 message_id 只归档第一条。
+
+    Args:
+        params: 输入参数
+            - items: 分析后的消息列表，每条包含 message_id、analyzed_title、
+              analyzed_content、category、tags、importance、project
+
+    Returns:
+        JSON 格式的归档结果，包含每条消息的状态
+    """
+    try:
+        # 1) Add all memories in one transaction
+        memories = []
+        results = []
+        seen = set()
+        for item in params.items:
+            if item.message_id in seen:
+                results.append({"message_id": item.message_id, "status": "duplicate"})
+                continue
+            seen.add(item.message_id)
+            memory_id = f"feishu_{item.message_id}_{uuid.uuid4().hex[:8]}"
+            memories.append({
+                "memory_id": memory_id,
+                "category": item.category or "conversation",
+                "title": item.analyzed_title,
+                "content": item.analyzed_content,
+                "project": item.project,
+                "importance": item.importance or 3,
+                "source_type": "feishu_im",
+                "tags": item.tags or []
+            })
+            results.append({
+                "message_id": item.message_id,
+                "status": "saved",
+                "memory_id": memory_id,
+                "title": item.analyzed_title
+            })
+
+        await add_memories_bulk(memories)
+
+        # 2) Mark all messages as archived in temp inbox with one request
+        inbox_status = await _mark_archived([item["message_id"] for item in results if "memory_id" in item])
+        for item in results:
+            if "memory_id" in item:
+                item["inbox"] = inbox_status[item["message_id"]]
+                if item["inbox"] == "archived":
+                    item["status"] = "archived"
+
+        saved = len(memories)
+        marked = sum(1 for item in results if item["status"] == "archived")
+        response = {
+            "status": "success",
+            "message": f"已归档 {saved} 条消息到记忆系统（收件箱已标记 {marked} 条）",
+            "saved": saved,
+            "results": results
+        }
+        if marked < saved:
+            response["suggestion"] = "未标记的消息已写入记忆，可稍后在收件箱中手动归档"
+        return json.dumps(response, ensure_ascii=False, indent=2)
+
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "message": f"批量归档失败: {str(e)}",
+            "suggestion": "请检查记忆系统是否正常（本批消息均未写入）"
+        }, ensure_ascii=False, indent=2)
@@ -3,7 +3,7 @@
 import json
 import os
 from typing import Optional
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
 from models import FeishuCreateDocumentInput
 
 
@@ -24,7 +24,7 @@ async def feishu_create_document(params: FeishuCreateDocumentInput) -> str:
     """
     try:
         # 创建客户端
-        client = FeishuClient()
+        client = get_feishu_client()
         
         # 创建文档
         # 注意：如果需要访问用户云盘文件夹，需要使用用户身份 token
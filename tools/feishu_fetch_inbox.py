@@ -18,11 +18,14 @@ async def feishu_fetch_inbox(params: FeishuFetchInboxInput) -> str:
     """拉取飞书临时收件箱消息。
     
     从服务器临时收件箱拉取未归档的飞书消息，供 AI 分析决策。
+    传入 since 时只返回游标之后的新消息，配合 wait 长轮询等待新消息到达。
     
     Args:
         params: 输入参数
             - limit: 返回数量，默认10
             - include_archived: 是否包含已归档，默认False
+            - since: 增量游标（上次返回的 cursor）
+            - wait: 长轮询等待秒数，默认0
     
     Returns:
         JSON 格式的消息列表
@@ -46,9 +49,14 @@ async def feishu_fetch_inbox(params: FeishuFetchInboxInput) -> str:
             "include_archived": str(params.include_archived or False).lower(),
             "token": token
         }
+        wait = 0
+        if params.since is not None:
+            wait = params.wait or 0
+            params_dict["since"] = params.since
+            params_dict["wait"] = wait
         
-        # Make HTTP request
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        # Make HTTP request (long-poll requests are held by the server for up to `wait` seconds)
+        async with httpx.AsyncClient(timeout=30.0 + wait) as client:
             response = await client.get(url, params=params_dict)
             response.raise_for_status()
             data = response.json()
@@ -61,19 +69,22 @@ async def feishu_fetch_inbox(params: FeishuFetchInboxInput) -> str:
             }, ensure_ascii=False, indent=2)
         
         items = data.get("items", [])
+        cursor = data.get("cursor")
         
         if not items:
             return json.dumps({
                 "status": "success",
                 "count": 0,
                 "message": "暂无新消息",
-                "items": []
+                "items": [],
+                "cursor": cursor
             }, ensure_ascii=False, indent=2)
         
         return json.dumps({
             "status": "success",
             "count": len(items),
-            "items": items
+            "items": items,
+            "cursor": cursor
         }, ensure_ascii=False, indent=2)
     
     except httpx.HTTPStatusError as e:
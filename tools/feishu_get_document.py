@@ -1,7 +1,7 @@
 """读取飞书文档信息和内容"""
 
 import json
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
 from models import FeishuGetDocumentInput
 
 
@@ -15,31 +15,30 @@ async def feishu_get_document(params: FeishuGetDocumentInput) -> str:
             - file_token: 文档 token
     
     Returns:
-        JSON格式的文档信息，包括标题、URL、内容等
+        JSON格式的文档信息，包括标题、URL、版本号和 Markdown 格式的内容
     """
     try:
         # 创建客户端
-        client = FeishuClient()
+        client = get_feishu_client()
         
-        # 获取文档信息
-        result = await client.get_document(params.file_token)
+        # 获取文档内容（文档未修改时使用本地缓存，只需一次元信息请求）
+        document = await client.load_document(params.file_token)
         
-        file_info = result.get("file", {})
-        file_token = file_info.get("token", params.file_token)
-        file_name = file_info.get("name", "N/A")
+        file_token = document.get("document_id") or params.file_token
         
         # 构建文档 URL
         # 注意：docx API 创建的文档，URL 格式是 https://my.feishu.cn/docx/{document_id}
         url = f"https://my.feishu.cn/docx/{file_token}" if file_token else None
         
-        # 注意：飞书文档内容可能需要通过其他 API 获取
-        # 这里先返回基本信息
         return json.dumps({
             "status": "success",
             "file_token": file_token,
-            "title": file_name,
+            "title": document.get("title") or "N/A",
             "url": url,
-            "note": "文档内容需要通过飞书文档内容 API 获取，当前返回基本信息"
+            "revision_id": document.get("revision_id"),
+            "block_count": len(document.get("blocks", [])),
+            "cached": document.get("cached", False),
+            "content": document.get("markdown", "")
         }, ensure_ascii=False, indent=2)
         
     except FeishuAPIError as e:
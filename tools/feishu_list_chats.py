@@ -1,7 +1,7 @@
 """列出飞书群聊"""
 
 import json
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
 from models import FeishuListChatsInput
 
 
@@ -18,7 +18,7 @@ async def feishu_list_chats(params: FeishuListChatsInput) -> str:
         JSON 格式的群聊列表
     """
     try:
-        client = FeishuClient()
+        client = get_feishu_client()
         result = await client.list_chats(
             page_size=params.page_size,
             page_token=params.page_token,
@@ -1,8 +1,8 @@
 """列出飞书文档列表"""
 
 import json
-from typing import Optional
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
+from sync.drive_walker import walk_drive, PATH_INDEX_TTL
 from models import FeishuListDocumentsInput
 
 
@@ -14,14 +14,17 @@ async def feishu_list_documents(params: FeishuListDocumentsInput) -> str:
     Args:
         params: 参数对象
             - folder_token: 文件夹 token（可选，不指定则列出根目录）
-            - page_size: 每页数量，默认50，最大100
+            - page_size: 最多返回的条目数，默认50
+            - recursive: 是否递归列出子文件夹
+            - max_depth: 递归时最多列出的层数
+            - refresh: 忽略本地路径索引，重新从飞书列出
     
     Returns:
         JSON格式的文档列表，包括文档名称、类型、token等信息
     """
     try:
         # 创建客户端
-        client = FeishuClient()
+        client = get_feishu_client()
         
         # 如果没有指定 folder_token，尝试获取根目录
         folder_token = params.folder_token
@@ -36,40 +39,49 @@ async def feishu_list_documents(params: FeishuListDocumentsInput) -> str:
                     print("   将读取应用创建的文档（不是用户文档库）")
                     print("   💡 提示：设置 use_user_token=True 可以使用用户身份访问你的文档库")
         
-        # 获取文档列表
-        result = await client.list_documents(
-            folder_token=folder_token,
-            page_size=params.page_size,
-            use_user_token=params.use_user_token
-        )
-        
-        files = result.get("files", [])
-        page_token = result.get("page_token")
-        
-        # 格式化结果
+        # 遍历文件夹（完整分页，索引有效期内直接读取本地路径索引），够数后停止
+        max_depth = params.max_depth if params.recursive else 1
+        stats = {}
         documents = []
         folders = []
-        for file in files:
-            file_type = file.get("type", "N/A")
-            if file_type == "folder":
-                # 文件夹
-                folders.append({
-                    "token": file.get("token", "N/A"),
-                    "name": file.get("name", "N/A"),
-                    "type": "folder",
-                    "created_time": file.get("created_time", "N/A"),
-                    "modified_time": file.get("modified_time", "N/A")
-                })
-            else:
-                # 文档
-                documents.append({
-                    "token": file.get("token", "N/A"),
-                    "name": file.get("name", "N/A"),
-                    "type": file_type,
-                    "url": file.get("url") or (f"https://my.feishu.cn/docx/{file.get('token', '')}" if file_type == "docx" else None),
-                    "created_time": file.get("created_time", "N/A"),
-                    "modified_time": file.get("modified_time", "N/A")
-                })
+        truncated = False
+        walker = walk_drive(
+            client,
+            folder_token or "",
+            max_depth=max_depth,
+            use_user_token=params.use_user_token,
+            max_age=0 if params.refresh else PATH_INDEX_TTL,
+            stats=stats
+        )
+        try:
+            async for file in walker:
+                if len(documents) + len(folders) >= params.page_size:
+                    truncated = True
+                    break
+                file_type = file.get("obj_type") or "N/A"
+                if file_type == "folder":
+                    # 文件夹
+                    folders.append({
+                        "token": file.get("token", "N/A"),
+                        "name": file.get("name", "N/A"),
+                        "type": "folder",
+                        "path": file.get("path"),
+                        "created_time": file.get("created_time", "N/A"),
+                        "modified_time": file.get("modified_time", "N/A")
+                    })
+                else:
+                    # 文档
+                    documents.append({
+                        "token": file.get("token", "N/A"),
+                        "name": file.get("name", "N/A"),
+                        "type": file_type,
+                        "path": file.get("path"),
+                        "url": file.get("url") or (f"https://my.feishu.cn/docx/{file.get('token', '')}" if file_type == "docx" else None),
+                        "created_time": file.get("created_time", "N/A"),
+                        "modified_time": file.get("modified_time", "N/A")
+                    })
+        finally:
+            await walker.aclose()
         
         return json.dumps({
             "status": "success",
@@ -78,8 +90,9 @@ async def feishu_list_documents(params: FeishuListDocumentsInput) -> str:
             "folder_count": len(folders),
             "documents": documents,
             "folders": folders,
-            "page_token": page_token,
-            "has_more": bool(page_token),
+            "has_more": truncated,
+            "folders_listed": stats.get("listed", 0),
+            "folders_from_index": stats.get("cached", 0),
             "note": "如果这些不是你的文档，可能需要指定具体的文件夹 token，或者你的文档在其他子文件夹中"
         }, ensure_ascii=False, indent=2)
         
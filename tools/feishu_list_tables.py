@@ -2,7 +2,7 @@
 
 import json
 from typing import Optional
-from sync.feishu_client import FeishuClient
+from sync.feishu_client import get_feishu_client
 from models import BaseModel, Field
 
 
@@ -24,19 +24,12 @@ async def feishu_list_tables(params: FeishuListTablesInput) -> str:
         JSON格式的表格列表，包括名称、ID等信息
     """
     try:
-        # 创建客户端（使用环境变量中的 APP_ID 和 APP_SECRET）
-        client = FeishuClient()
-        
-        # 临时使用新的表格配置
-        original_app_token = client.app_token
-        client.app_token = params.app_token
+        # 获取指向该多维表格的共享客户端（使用环境变量中的 APP_ID 和 APP_SECRET）
+        client = get_feishu_client(app_token=params.app_token)
         
         # 获取所有表格
         tables = await client.list_tables()
         
-        # 恢复原始配置
-        client.app_token = original_app_token
-        
         # 格式化结果
         result = {
             "status": "success",
@@ -1,7 +1,8 @@
 """列出飞书知识库（Wiki）中的文档列表"""
 
 import json
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
+from sync.drive_walker import walk_wiki, PATH_INDEX_TTL
 from models import FeishuListWikiNodesInput
 
 
@@ -13,58 +14,69 @@ async def feishu_list_wiki_nodes(params: FeishuListWikiNodesInput) -> str:
     Args:
         params: 参数对象
             - space_id: 知识库空间 ID（从知识库 URL 中获取，如 https://my.feishu.cn/wiki/{space_id}）
-            - page_size: 每页数量，默认50，最大100
+            - page_size: 最多返回的节点数，默认50
+            - recursive: 是否递归列出子节点
+            - max_depth: 递归时最多列出的层数
+            - refresh: 忽略本地路径索引，重新从飞书列出
     
     Returns:
         JSON格式的节点列表，包括文档名称、类型、token等信息
     """
     try:
         # 创建客户端
-        client = FeishuClient()
+        client = get_feishu_client()
         
-        # 获取知识库节点列表
-        result = await client.list_wiki_nodes(
-            space_id=params.space_id,
-            page_size=params.page_size
-        )
-        
-        nodes = result.get("items", [])
-        page_token = result.get("page_token")
-        
-        # 格式化结果
+        # 遍历知识库节点（完整分页，索引有效期内直接读取本地路径索引），够数后停止
+        max_depth = params.max_depth if params.recursive else 1
+        stats = {}
         documents = []
-        for node in nodes:
-            obj_type = node.get("obj_type", "N/A")
-            obj_token = node.get("obj_token", "N/A")
-            node_token = node.get("node_token", "N/A")
-            title = node.get("title", "N/A")
-            
-            # 根据类型构建 URL
-            url = None
-            if obj_type == "doc":
-                url = f"https://my.feishu.cn/docs/{obj_token}"
-            elif obj_type == "docx":
-                url = f"https://my.feishu.cn/docx/{obj_token}"
-            elif obj_type == "sheet":
-                url = f"https://my.feishu.cn/sheets/{obj_token}"
-            elif obj_type == "bitable":
-                url = f"https://my.feishu.cn/base/{obj_token}"
-            
-            documents.append({
-                "node_token": node_token,
-                "obj_token": obj_token,
-                "obj_type": obj_type,
-                "title": title,
-                "url": url
-            })
+        truncated = False
+        walker = walk_wiki(
+            client,
+            params.space_id,
+            max_depth=max_depth,
+            max_age=0 if params.refresh else PATH_INDEX_TTL,
+            stats=stats
+        )
+        try:
+            async for node in walker:
+                if len(documents) >= params.page_size:
+                    truncated = True
+                    break
+                obj_type = node.get("obj_type") or "N/A"
+                obj_token = node.get("obj_token") or "N/A"
+                
+                # 根据类型构建 URL
+                url = None
+                if obj_type == "doc":
+                    url = f"https://my.feishu.cn/docs/{obj_token}"
+                elif obj_type == "docx":
+                    url = f"https://my.feishu.cn/docx/{obj_token}"
+                elif obj_type == "sheet":
+                    url = f"https://my.feishu.cn/sheets/{obj_token}"
+                elif obj_type == "bitable":
+                    url = f"https://my.feishu.cn/base/{obj_token}"
+                
+                documents.append({
+                    "node_token": node.get("token") or "N/A",
+                    "obj_token": obj_token,
+                    "obj_type": obj_type,
+                    "title": node.get("name") or "N/A",
+                    "path": node.get("path"),
+                    "has_child": node.get("has_child", False),
+                    "url": url
+                })
+        finally:
+            await walker.aclose()
         
         return json.dumps({
             "status": "success",
             "space_id": params.space_id,
             "node_count": len(documents),
             "nodes": documents,
-            "page_token": page_token,
-            "has_more": bool(page_token)
+            "has_more": truncated,
+            "nodes_listed": stats.get("listed", 0),
+            "nodes_from_index": stats.get("cached", 0)
         }, ensure_ascii=False, indent=2)
         
     except FeishuAPIError as e:
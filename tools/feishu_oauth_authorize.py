@@ -1,7 +1,7 @@
 """飞书 OAuth 授权工具"""
 
 import json
-from sync.feishu_client import FeishuClient
+from sync.feishu_client import get_feishu_client
 from models import FeishuOAuthAuthorizeInput
 
 
@@ -21,7 +21,7 @@ async def feishu_oauth_authorize(params: FeishuOAuthAuthorizeInput) -> str:
     Returns:
         授权链接 URL 和使用说明
     """
-    client = FeishuClient()
+    client = get_feishu_client()
     auth_url = client.get_oauth_authorize_url(
         redirect_uri=params.redirect_uri,
         state=params.state
@@ -1,7 +1,7 @@
 """飞书 OAuth 授权码换取 token 工具"""
 
 import json
-from sync.feishu_client import FeishuClient
+from sync.feishu_client import get_feishu_client
 from models import FeishuOAuthExchangeTokenInput
 
 
@@ -15,7 +15,7 @@ async def feishu_oauth_exchange_token(params: FeishuOAuthExchangeTokenInput) ->
     Returns:
         user_access_token 信息
     """
-    client = FeishuClient()
+    client = get_feishu_client()
     
     try:
         token_data = await client.exchange_user_access_token(params.code)
@@ -1,17 +1,10 @@
 """读取飞书多维表格中的数据"""
 
 import json
-from typing import Optional
-from sync.feishu_client import FeishuClient
-from models import BaseModel, Field
-
-
-class FeishuReadTableInput(BaseModel):
-    """Input model for feishu_read_table tool."""
-    app_token: str = Field(..., description="多维表格的 App Token")
-    table_id: str = Field(..., description="数据表的 Table ID")
-    limit: Optional[int] = Field(10, description="返回记录数量，默认10，最大100", ge=1, le=100)
-    show_fields: Optional[bool] = Field(True, description="是否显示字段列表，默认true")
+import os
+from sync.feishu_client import get_feishu_client
+from sync.table_export import export_table, progress_path
+from models import FeishuReadTableInput
 
 
 async def feishu_read_table(params: FeishuReadTableInput) -> str:
@@ -26,20 +19,20 @@ async def feishu_read_table(params: FeishuReadTableInput) -> str:
             - table_id: 数据表的 Table ID
             - limit: 返回记录数量，默认10
             - show_fields: 是否显示字段列表，默认true
+            - export_path: 导出文件路径，指定后流式导出整张表
+            - export_format: jsonl 或 csv
+            - page_token: 导出起始分页标记
+            - resume: 是否从上次中断的导出继续
     
     Returns:
-        JSON格式的表格数据，包括字段列表和记录
+        JSON格式的表格数据，包括字段列表和记录；导出模式下返回导出结果
     """
     try:
-        # 创建客户端
-        client = FeishuClient()
-        
-        # 临时使用新的表格配置
-        original_app_token = client.app_token
-        original_table_id = client.table_id
-        
-        client.app_token = params.app_token
-        client.table_id = params.table_id
+        # 获取指向该表格的共享客户端（不修改其他调用方的客户端）
+        client = get_feishu_client(app_token=params.app_token, table_id=params.table_id)
+
+        if params.export_path:
+            return await _export(client, params)
         
         result = {
             "status": "success",
@@ -125,10 +118,6 @@ async def feishu_read_table(params: FeishuReadTableInput) -> str:
         result["record_count"] = len(result["records"])
         result["total_found"] = len(all_records)
         
-        # 恢复原始配置
-        client.app_token = original_app_token
-        client.table_id = original_table_id
-        
         return json.dumps(result, ensure_ascii=False, indent=2)
         
     except Exception as e:
@@ -137,3 +126,47 @@ async def feishu_read_table(params: FeishuReadTableInput) -> str:
             "message": str(e),
             "suggestion": "请检查：1. 应用是否已添加为该表格的协作者 2. app_token 和 table_id 是否正确"
         }, ensure_ascii=False, indent=2)
+
+
+async def _export(client, params: FeishuReadTableInput) -> str:
+    """流式导出整张表；失败时返回可用于续传的提示"""
+    try:
+        result = await export_table(
+            client,
+            params.export_path,
+            table_id=params.table_id,
+            export_format=params.export_format,
+            page_token=params.page_token,
+            resume=bool(params.resume)
+        )
+    except ValueError as e:
+        return json.dumps({
+            "status": "error",
+            "message": str(e),
+            "suggestion": "请检查 export_path 和 export_format；resume 需要之前未完成的导出"
+        }, ensure_ascii=False, indent=2)
+    except Exception as e:
+        if os.path.exists(progress_path(params.export_path)):
+            suggestion = "已完成的页已写入文件，使用 resume=true 从中断处继续"
+        else:
+            suggestion = "导出尚未开始写入，请检查后重新导出"
+        return json.dumps({
+            "status": "error",
+            "message": f"导出中断: {e}",
+            "export_path": params.export_path,
+            "suggestion": suggestion
+        }, ensure_ascii=False, indent=2)
+
+    return json.dumps({
+        "status": "success",
+        "app_token": params.app_token,
+        "table_id": params.table_id,
+        "export_path": result["path"],
+        "export_format": result["format"],
+        "record_count": result["records"],
+        "pages": result["pages"],
+        "completed": result["completed"],
+        "next_page_token": result["next_page_token"],
+        "elapsed_seconds": result["elapsed_seconds"],
+        "message": f"已导出 {result['records']} 条记录到 {result['path']}"
+    }, ensure_ascii=False, indent=2)
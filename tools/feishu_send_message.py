@@ -1,7 +1,7 @@
 """发送飞书消息（IM）"""
 
 import json
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
 from models import FeishuSendMessageInput
 
 
@@ -20,7 +20,7 @@ async def feishu_send_message(params: FeishuSendMessageInput) -> str:
         JSON 格式的发送结果
     """
     try:
-        client = FeishuClient()
+        client = get_feishu_client()
 
         receive_id_type = params.receive_id_type
         receive_id = params.receive_id
@@ -1,7 +1,7 @@
 """更新飞书文档内容"""
 
 import json
-from sync.feishu_client import FeishuClient, FeishuAPIError
+from sync.feishu_client import get_feishu_client, FeishuAPIError
 from models import FeishuUpdateDocumentInput
 
 
@@ -21,7 +21,7 @@ async def feishu_update_document(params: FeishuUpdateDocumentInput) -> str:
     """
     try:
         # 创建客户端
-        client = FeishuClient()
+        client = get_feishu_client()
         
         # 更新文档内容
         # 注意：file_token 在 docx API 中就是 document_id
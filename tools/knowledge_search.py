@@ -0,0 +1,50 @@
+"""Knowledge search tool: memories and indexed Feishu documents together."""
+
+import json
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from storage.doc_index import search_knowledge
+from models import KnowledgeSearchInput
+
+
+async def knowledge_search(params: KnowledgeSearchInput) -> str:
+    """同时搜索记忆和已索引的飞书文档。
+    
+    在本地一次查询完成，标题命中的结果排在前面，其余按更新时间排序。
+    """
+    try:
+        source = params.source or "all"
+        results = await search_knowledge(
+            query=params.query,
+            limit=params.limit or 10,
+            include_memories=source in ("all", "memory"),
+            include_docs=source in ("all", "doc")
+        )
+        
+        if not results:
+            return json.dumps({
+                "status": "success",
+                "count": 0,
+                "message": "没有找到相关记录（飞书文档需要先运行 sync/doc_indexer.py 建立索引）",
+                "results": []
+            }, ensure_ascii=False, indent=2)
+        
+        return json.dumps({
+            "status": "success",
+            "count": len(results),
+            "memory_count": sum(1 for r in results if r["source"] == "memory"),
+            "doc_count": sum(1 for r in results if r["source"] == "doc"),
+            "results": results
+        }, ensure_ascii=False, indent=2)
+    
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "message": f"搜索失败: {str(e)}",
+            "suggestion": "请检查查询参数是否正确，或稍后重试"
+        }, ensure_ascii=False, indent=2)
@@ -1,6 +1,5 @@
 """同步记忆数据到飞书多维表格的 MCP 工具"""
 
-import asyncio
 import sys
 from pathlib import Path
 from typing import Optional, Tuple, Dict
@@ -9,8 +8,12 @@ from typing import Optional, Tuple, Dict
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from sync.feishu_client import FeishuClient, convert_memory_to_feishu_fields
-from storage.db import search_memories
+from sync.feishu_client import FeishuClient, get_feishu_client
+from sync.sync_to_feishu import get_synced_record_map, sync_delta
+from sync.sync_from_feishu import pull_delta
+from sync.sync_engine import SyncEngine, SYNC_CONCURRENCY
+from storage.db import list_memory_ids
+from storage.sync_state import delete_sync_states
 from models import MemorySyncToFeishuInput
 
 
@@ -21,34 +24,44 @@ async def get_synced_records(client: FeishuClient) -> Tuple[set, Dict[str, str]]
         (synced_memory_ids, memory_id_to_record_id): 
         - synced_memory_ids: 已同步的记忆ID集合
         - memory_id_to_record_id: 记忆ID到飞书记录ID的映射
-    """
-    synced_ids = set()
-    memory_id_to_record_id = {}
     
+    Raises:
+        FeishuAPIError: 读取失败（不能当作飞书中没有记录，否则会重复创建整张表）
+    """
+    memory_id_to_record_id = await get_synced_record_map(client)
+    return set(memory_id_to_record_id), memory_id_to_record_id
+
+
+async def _memory_sync_delta(dry_run: bool, concurrency: int) -> str:
+    """双向增量同步：先拉取飞书端的修改，再推送上次同步后变化的记忆"""
+    try:
+        pulled = await pull_delta(dry_run=dry_run, verbose=False)
+    except Exception as e:
+        pulled = None
+        pull_error = str(e)
     try:
-        # 获取所有记录
-        page_token = None
-        while True:
-            result = await client.list_records(page_token=page_token)
-            records = result.get("items", [])
-            
-            for record in records:
-                record_id = record.get("record_id")
-                fields = record.get("fields", {})
-                memory_id = fields.get("记忆ID")
-                if memory_id:
-                    synced_ids.add(memory_id)
-                    memory_id_to_record_id[memory_id] = record_id
-            
-            # 检查是否有下一页
-            page_token = result.get("page_token")
-            if not page_token:
-                break
+        stats = await sync_delta(dry_run=dry_run, concurrency=concurrency, verbose=False)
     except Exception as e:
-        # 如果获取失败，返回空集合，将同步所有记录
-        pass
+        return f"❌ 增量同步失败: {str(e)}\n已同步的部分已记录，下次会从失败处继续"
     
-    return synced_ids, memory_id_to_record_id
+    result = []
+    result.append("=" * 60)
+    result.append("📊 增量同步完成")
+    result.append("=" * 60)
+    if pulled is not None:
+        result.append(f"⬇️  拉取飞书端修改: {pulled['pulled']} 条")
+    else:
+        result.append(f"⚠️ 拉取飞书端修改失败: {pull_error}")
+    result.append(f"✅ 新增: {stats['created']} 条")
+    result.append(f"🔄 更新: {stats['updated']} 条")
+    result.append(f"⏭️  未变化: {stats['unchanged']} 条")
+    if stats["failed"]:
+        result.append(f"❌ 校验失败: {stats['failed']} 条")
+    if stats["watermark"]:
+        result.append(f"\n同步水位线: {stats['watermark']}")
+    if dry_run:
+        result.append("\n⚠️ 这是试运行，未实际同步数据")
+    return "\n".join(result)
 
 
 async def memory_sync_to_feishu(params: MemorySyncToFeishuInput) -> str:
@@ -61,94 +74,73 @@ async def memory_sync_to_feishu(params: MemorySyncToFeishuInput) -> str:
         params: 同步参数
             - dry_run: 是否试运行（不实际同步），默认 False
             - limit: 限制同步数量（用于测试），默认 None（同步所有）
+            - mode: full（全量）或 delta（增量），默认 full
+            - concurrency: 并发请求数
     
     Returns:
         同步结果摘要，包括成功和失败的数量
     """
     dry_run = params.dry_run or False
     limit = params.limit
+    concurrency = params.concurrency or SYNC_CONCURRENCY
+    
+    if params.mode == "delta":
+        return await _memory_sync_delta(dry_run, concurrency)
     
     try:
         # 初始化客户端
-        client = FeishuClient()
+        client = get_feishu_client()
     except Exception as e:
         return f"❌ 初始化飞书客户端失败: {str(e)}\n请检查 .env 文件中的配置（FEISHU_APP_ID, FEISHU_APP_SECRET, FEISHU_APP_TOKEN, FEISHU_TABLE_ID）"
     
-    # 获取所有记忆
-    memories = await search_memories(
-        query="",
-        limit=limit or 1000
-    )
+    # 获取本地记忆ID集合（全部记忆，不受 limit 影响，避免误删飞书记录）
+    local_memory_ids = set(await list_memory_ids())
     
-    if not memories:
+    if not local_memory_ids:
         return "⚠️ 没有找到需要同步的记忆"
     
-    # 获取本地记忆ID集合
-    local_memory_ids = {m.get("id") for m in memories if m.get("id")}
-    
     # 获取已同步的记录
     synced_ids = set()
     memory_id_to_record_id = {}
+    list_error = None
     if not dry_run:
-        synced_ids, memory_id_to_record_id = await get_synced_records(client)
+        try:
+            synced_ids, memory_id_to_record_id = await get_synced_records(client)
+        except Exception as e:
+            # 读取失败时不对账、不删除，由同步引擎按本地状态和 记忆ID 查找同步
+            list_error = str(e)
+    initial_synced_count = len(synced_ids)
     
     # 找出需要删除的记录（飞书中有但本地没有的）
-    records_to_delete = []
-    if not dry_run:
-        for memory_id, record_id in memory_id_to_record_id.items():
-            if memory_id not in local_memory_ids:
-                records_to_delete.append((memory_id, record_id))
+    records_to_delete = [
+        (memory_id, record_id)
+        for memory_id, record_id in memory_id_to_record_id.items()
+        if memory_id not in local_memory_ids
+    ]
     
-    # 删除飞书中多余的记录
+    # 删除飞书中多余的记录（请求经过共享限流器，无需手动等待）
     deleted_count = 0
     delete_fail_count = 0
-    if records_to_delete:
-        for memory_id, record_id in records_to_delete:
-            try:
-                if not dry_run:
-                    await client.delete_record(record_id)
-                    # 从 synced_ids 中移除被删除的记录ID
-                    synced_ids.discard(memory_id)
-                    deleted_count += 1
-                    await asyncio.sleep(0.2)  # 避免请求过快
-                else:
-                    deleted_count += 1
-            except Exception as e:
-                delete_fail_count += 1
-    
-    # 过滤出需要同步的记录（本地有但飞书中没有的）
-    if not dry_run:
-        memories_to_sync = [
-            m for m in memories
-            if m.get("id") not in synced_ids
-        ]
-    else:
-        memories_to_sync = memories
-    
-    # 同步记录
-    success_count = 0
-    fail_count = 0
-    fail_details = []
-    
-    for i, memory in enumerate(memories_to_sync, 1):
+    for memory_id, record_id in records_to_delete:
         try:
-            fields = convert_memory_to_feishu_fields(memory)
-            
-            if not dry_run:
-                # 创建记录
-                await client.create_record(fields)
-                success_count += 1
-                
-                # 避免请求过快
-                if i < len(memories_to_sync):
-                    await asyncio.sleep(0.2)  # 200ms 延迟
-            else:
-                success_count += 1
-                
+            await client.delete_record(record_id)
+            await delete_sync_states([memory_id])
+            synced_ids.discard(memory_id)
+            memory_id_to_record_id.pop(memory_id, None)
+            deleted_count += 1
         except Exception as e:
-            fail_count += 1
-            title = memory.get("title", "N/A")
-            fail_details.append(f"  - {title}: {str(e)}")
+            delete_fail_count += 1
+    
+    # 由同步引擎并发创建缺失的记录、更新内容有变化的记录
+    engine = SyncEngine(client, concurrency=concurrency, dry_run=dry_run)
+    try:
+        stats = await engine.run(
+            full=True,
+            limit=limit,
+            record_map=None if dry_run or list_error else memory_id_to_record_id
+        )
+    except Exception as e:
+        return f"❌ 同步失败: {str(e)}\n已同步的部分已记录，再次运行会从中断处继续"
     
     # 构建结果摘要
     result = []
@@ -156,33 +148,33 @@ async def memory_sync_to_feishu(params: MemorySyncToFeishuInput) -> str:
     result.append("📊 同步完成")
     result.append("=" * 60)
     
-    if records_to_delete:
+    if list_error:
+        result.append(f"⚠️ 读取飞书记录失败，本次未清理多余记录: {list_error}")
+    elif records_to_delete:
         result.append(f"🗑️  删除: {deleted_count} 条（飞书中多余的记录）")
         if delete_fail_count > 0:
             result.append(f"   ❌ 删除失败: {delete_fail_count} 条")
     elif not dry_run:
         result.append(f"🗑️  删除: 0 条（飞书中没有多余的记录）")
     
-    if memories_to_sync:
-        result.append(f"✅ 新增: {success_count} 条")
-        if fail_count > 0:
-            result.append(f"❌ 失败: {fail_count} 条")
-            if fail_details:
-                result.append("\n失败详情:")
-                result.extend(fail_details[:5])  # 只显示前5个失败详情
-                if len(fail_details) > 5:
-                    result.append(f"  ... 还有 {len(fail_details) - 5} 条失败记录")
-    else:
-        result.append(f"✅ 新增: 0 条（所有记忆已同步）")
-    
-    result.append(f"\n总计: {len(memories)} 条本地记忆")
-    if not dry_run:
-        initial_synced_count = len(synced_ids) + len(records_to_delete) if records_to_delete else len(synced_ids)
+    result.append(f"✅ 新增: {stats['created']} 条")
+    result.append(f"🔄 更新: {stats['updated']} 条")
+    result.append(f"⏭️  未变化: {stats['unchanged']} 条")
+    if stats["failed"] > 0:
+        result.append(f"❌ 失败: {stats['failed']} 条")
+        if engine.errors:
+            result.append("\n失败详情:")
+            result.extend(f"  - {error}" for error in engine.errors[:5])  # 只显示前5个失败详情
+            if len(engine.errors) > 5:
+                result.append(f"  ... 还有 {len(engine.errors) - 5} 条失败记录")
+    
+    result.append(f"\n总计: {len(local_memory_ids)} 条本地记忆（本次处理 {stats['processed']} 条）")
+    if not dry_run and not list_error:
         result.append(f"飞书记录: {initial_synced_count} 条（同步前）")
         if records_to_delete:
-            result.append(f"本次删除: {len(records_to_delete)} 条")
-        result.append(f"本次新增: {len(memories_to_sync)} 条")
-        result.append(f"飞书记录: {len(synced_ids)} 条（同步后）")
+            result.append(f"本次删除: {deleted_count} 条")
+        result.append(f"本次新增: {stats['created']} 条")
+        result.append(f"飞书记录: {len(synced_ids) + stats['created']} 条（同步后）")
     
     if dry_run:
         result.append("\n⚠️ 这是试运行，未实际同步数据")